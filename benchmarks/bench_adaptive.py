@@ -0,0 +1,77 @@
+"""Adaptive TF-Luna/IMU rates against fixed full rates.
+
+A simulated pan/tilt head in the default room goes through a session of
+phases: still, a fast pan, still, a slow pan, and a slow pan with weak
+returns (most ranges dropped, as on a dark or distant surface). The same
+session is run twice on simulated time: once at the fixed full rates
+(TF-Luna 250 Hz, IMU 100 Hz) and once under `hal.adaptive.RateController`.
+For each it reports samples read, useful points (good returns at least
+`--resolution` apart), samples per useful point and rate commands sent.
+
+Usage:
+  python -m benchmarks.bench_adaptive
+  python -m benchmarks.bench_adaptive --phase 5 --resolution 0.25
+"""
+import argparse
+import math
+import time
+
+from hal.adaptive import RateController
+from hal.simulator import Room, SimIMU, pan_tilt_rig
+
+
+def session(phase, resolution, adapt, step=0.05):
+    """Run the phases; returns the controller's report."""
+    head, rng, sim = pan_tilt_rig(Room.default(), seed=0)
+    imu = SimIMU(sim, 100.0)
+    imu.block = None
+    ctl = RateController(rng, imu, resolution=resolution, adapt=adapt)
+    # (start, pan target, speed, dropout)
+    plan = [(0, None, None, 0.002), (1, 2 * math.pi, 2.0, 0.002), (2, None, None, 0.002),
+            (3, 2 * math.pi + 0.1 * phase, 0.1, 0.002), (4, 2 * math.pi + 0.2 * phase, 0.1, 0.95)]
+    T = 0.0
+    for k, pan, speed, dropout in plan:
+        if pan is not None:
+            head.move_to(pan, 0.0, speed)
+        sim.dropout = dropout
+        while T < (k + 1) * phase:
+            T += step
+            r = rng.read_batch(max(0, math.ceil((T - rng.now) * rng.rate)))
+            m = imu.read_batch(max(0, math.ceil((T - imu.now) * imu.rate)))
+            ctl.update(m, r)
+    return ctl.report()
+
+
+def show(name, report, wall):
+    states = ", ".join(f"{k} {v:.1f} s" for k, v in report["state_seconds"].items())
+    print(f"  {name:8s} range {report['range']['samples']:6d} ({report['range']['mean_hz']:5.1f} Hz), "
+          f"imu {report['imu']['samples']:5d} ({report['imu']['mean_hz']:5.1f} Hz), "
+          f"{report['useful_points']:5d} useful points, "
+          f"{report['samples_per_useful_point']:5.2f} samples/point "
+          f"({report['range_samples_per_useful_point']:.2f} range), "
+          f"{report['range']['changes'] + report['imu']['changes']} rate commands [{wall:.1f} s to simulate]")
+    print(f"           {states}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Adaptive sample rate benchmark")
+    parser.add_argument("--phase", type=float, default=4.0, help="Seconds per phase")
+    parser.add_argument("--resolution", type=float, default=0.5, help="Degrees between useful points")
+    args = parser.parse_args()
+
+    res = math.radians(args.resolution)
+    print(f"5 phases of {args.phase:.0f} s: still, fast pan, still, slow pan, weak returns; "
+          f"useful points {args.resolution} deg apart")
+    reports = {}
+    for name, adapt in (("fixed", False), ("adaptive", True)):
+        t0 = time.perf_counter()
+        reports[name] = session(args.phase, res, adapt)
+        show(name, reports[name], time.perf_counter() - t0)
+    fixed, adaptive = reports["fixed"], reports["adaptive"]
+    print(f"  adaptive reads {adaptive['samples_per_useful_point'] / fixed['samples_per_useful_point']:.0%} "
+          f"of the samples per useful point and keeps "
+          f"{adaptive['useful_points'] / max(1, fixed['useful_points']):.0%} of the useful points")
+
+
+if __name__ == "__main__":
+    main()
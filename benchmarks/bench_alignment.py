@@ -0,0 +1,104 @@
+"""Batch anchor alignment vs the online sliding-window aligner.
+
+Builds a synthetic marker log: `--anchors` anchors seen every frame,
+camera-frame poses with noise, and some anchors that report consistently
+wrong poses. It then compares:
+
+  batch:  tools/anchor_alignment.py's path, i.e. load the whole log, take
+          the latest sample per anchor and run one Umeyama. A live scanner
+          would need to repeat this for every new frame.
+  online: OnlineAligner fed frame by frame, publishing a fit per frame.
+
+Usage:
+  python -m benchmarks.bench_alignment --frames 20000 --anchors 12 --bad 2
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from scanner.alignment import OnlineAligner, umeyama
+from scanner.scanlog import MARKER_RECORD, markers_to_jsonl
+from tools import anchor_alignment
+
+
+def synthetic_log(frames, anchors, bad, rate, noise, seed=0):
+    rng = np.random.default_rng(seed)
+    world = rng.uniform(-3.0, 3.0, (anchors, 3))
+    angle = 0.4
+    rot = np.array([[np.cos(angle), 0.0, np.sin(angle)], [0.0, 1.0, 0.0], [-np.sin(angle), 0.0, np.cos(angle)]])
+    trans = np.array([0.2, 1.0, -0.5])
+    cam = (world - trans) @ rot
+    rec = np.zeros(frames * anchors, dtype=MARKER_RECORD)
+    rec["t"] = np.repeat(np.arange(frames) / rate, anchors)
+    rec["id"] = np.tile(np.arange(anchors), frames)
+    rec["has_pose"] = 1
+    tvec = np.tile(cam, (frames, 1)) + rng.normal(0.0, noise, (frames * anchors, 3))
+    wrong = rec["id"] < bad
+    tvec[wrong] += rng.normal(0.0, 0.3, 3)
+    rec["tvec"] = tvec
+    return rec, {i: world[i].tolist() for i in range(anchors)}, rot, trans
+
+
+def rot_error_deg(a, b):
+    c = (np.trace(a.T @ b) - 1.0) / 2.0
+    return float(np.degrees(np.arccos(np.clip(c, -1.0, 1.0))))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Anchor alignment benchmark")
+    parser.add_argument("--frames", type=int, default=20000)
+    parser.add_argument("--anchors", type=int, default=12)
+    parser.add_argument("--bad", type=int, default=2, help="Anchors with consistently wrong poses")
+    parser.add_argument("--rate", type=float, default=30.0, help="Camera frames per second")
+    parser.add_argument("--noise", type=float, default=0.005, help="Pose noise (m)")
+    parser.add_argument("--window", type=float, default=1.0)
+    args = parser.parse_args()
+
+    records, known, rot, trans = synthetic_log(args.frames, args.anchors, args.bad, args.rate, args.noise)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "anchors.jsonl")
+        with open(path, "w") as fh:
+            for line in markers_to_jsonl(records):
+                fh.write(line + "\n")
+
+        t0 = time.perf_counter()
+        obs = anchor_alignment.load_observations([path])
+        t1 = time.perf_counter()
+        ids = sorted(obs)
+        src = np.vstack([max(obs[i], key=lambda x: x[0])[1] for i in ids])
+        dst = np.array([known[i] for i in ids])
+        batch_r, batch_t = umeyama(src, dst)
+        t2 = time.perf_counter()
+
+    aligner = OnlineAligner(known, window=args.window)
+    per_frame = []
+    fit = None
+    t3 = time.perf_counter()
+    starts = np.arange(0, len(records), args.anchors)
+    for a in starts.tolist():
+        f0 = time.perf_counter()
+        fit = aligner.observe(records[a:a + args.anchors])
+        per_frame.append(time.perf_counter() - f0)
+    t4 = time.perf_counter()
+    per_frame = np.array(per_frame) * 1e6
+
+    print(f"{args.frames} frames x {args.anchors} anchors ({args.bad} bad)")
+    print(f"batch:  load {t1 - t0:.3f} s + solve {(t2 - t1) * 1e3:.2f} ms per re-run; "
+          f"rotation error {rot_error_deg(batch_r, rot):.2f} deg, "
+          f"translation error {np.linalg.norm(batch_t - trans) * 100:.1f} cm")
+    print(f"online: {args.frames / (t4 - t3):.0f} frames/s, per frame p50 {np.percentile(per_frame, 50):.0f} us, "
+          f"p99 {np.percentile(per_frame, 99):.0f} us; rotation error {rot_error_deg(fit['R'], rot):.2f} deg, "
+          f"translation error {np.linalg.norm(fit['t'] - trans) * 100:.1f} cm, inliers {len(fit['inliers'])}")
+    print(json.dumps({
+        "batch_rerun_s": t2 - t0,
+        "online_frame_us_p50": float(np.percentile(per_frame, 50)),
+        "speedup_per_update": (t2 - t0) / (np.median(per_frame) * 1e-6),
+    }))
+
+
+if __name__ == "__main__":
+    main()
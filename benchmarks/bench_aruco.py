@@ -0,0 +1,90 @@
+"""ArUco throughput: the old serial loop vs the pipelined detector.
+
+Frames come from `MockCamera(size=...)`, which renders real markers, so the
+numbers reflect OpenCV's detection cost without a camera attached.
+"serial" mirrors the loop in the original tools (capture, convert, detect,
+pose, one after another); "pipeline" overlaps them across worker threads,
+with and without ROI tracking.
+
+Usage:
+  python -m benchmarks.bench_aruco --frames 200 --workers 3
+"""
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+from hal.mocks import MockCamera
+from scanner.markers import DetectionPipeline, MarkerDetector
+
+
+def camera_matrix(width, height):
+    f = 0.9 * width
+    return np.array([[f, 0.0, width / 2], [0.0, f, height / 2], [0.0, 0.0, 1.0]]), np.zeros(5)
+
+
+def serial(args, frames, k, dist):
+    import cv2
+
+    aruco = cv2.aruco.ArucoDetector(cv2.aruco.getPredefinedDictionary(cv2.aruco.DICT_4X4_50))
+    detector = MarkerDetector(camera_matrix=k, dist_coeffs=dist)
+    t0 = time.perf_counter()
+    for frame in frames:
+        gray = cv2.cvtColor(frame["data"], cv2.COLOR_BGR2GRAY) if args.color else frame["data"]
+        corners, ids, _ = aruco.detectMarkers(gray)
+        if ids is not None:
+            detector.estimate_poses([c.reshape(4, 2) for c in corners])
+    return len(frames) / (time.perf_counter() - t0)
+
+
+class Replay:
+    """Camera stand-in that hands out pre-rendered frames."""
+
+    def __init__(self, frames):
+        self._frames = iter(frames)
+
+    def capture(self):
+        return next(self._frames)
+
+
+def pipelined(frames, k, dist, workers, roi):
+    detector = MarkerDetector(camera_matrix=k, dist_coeffs=dist, roi=roi)
+    with DetectionPipeline(detector, workers=workers) as pipe:
+        for _ in pipe.stream(Replay(frames), max_frames=len(frames)):
+            pass
+        return pipe.report()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ArUco pipeline benchmark")
+    parser.add_argument("--frames", type=int, default=200)
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--markers", type=int, default=4)
+    parser.add_argument("--workers", type=int, default=min(4, os.cpu_count() or 1))
+    parser.add_argument("--color", action="store_true", help="Feed BGR frames so conversion is included")
+    args = parser.parse_args()
+
+    cam = MockCamera(seed=0, size=(args.width, args.height), marker_ids=range(args.markers))
+    frames = [cam.capture() for _ in range(args.frames)]
+    if args.color:
+        import cv2
+
+        for f in frames:
+            f["data"] = cv2.cvtColor(f["data"], cv2.COLOR_GRAY2BGR)
+    k, dist = camera_matrix(args.width, args.height)
+
+    fps = serial(args, frames, k, dist)
+    print(f"serial:                  {fps:7.1f} fps")
+    for workers in sorted({1, args.workers}):
+        for roi in (False, True):
+            rep = pipelined(frames, k, dist, workers, roi)
+            label = f"pipeline x{workers}{' + roi' if roi else ''}:"
+            print(f"{label:25s}{rep['fps']:7.1f} fps ({rep['fps'] / fps:.1f}x)")
+            print(json.dumps({stage: round(v["p50"], 2) for stage, v in rep["latency_ms"].items()}))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""Calibration: ChArUco detection over a process pool, solves and cached maps.
+
+Renders `--frames` ChArUco views at the Pi Camera 3 preview size through
+a distorting lens and writes them as PNGs, as a recorded frame set would
+be. Corner detection is timed in this process and on pools of
+`--workers`, then the intrinsics solve. Extrinsics are solved from
+`--minutes` of simulated handheld scanning, with the error against the
+simulated mount. Finally it compares three ways a tool can get
+undistorted frames: `cv2.undistort` on every frame (maps rebuilt each
+time), maps computed at start-up, and maps loaded from the calibration
+store.
+
+Usage:
+  python -m benchmarks.bench_calibration
+  python -m benchmarks.bench_calibration --frames 60 --workers 1,2,4 --minutes 5
+"""
+import argparse
+import math
+import os
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+from hal.mocks import charuco_frames
+from hal.simulator import HandheldTrajectory, Room, ScanSimulator
+from scanner.calibration import (
+    CalibrationStore,
+    CharucoBoard,
+    calibrate_extrinsics,
+    calibrate_intrinsics,
+    detect_frames,
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Calibration benchmark")
+    parser.add_argument("--frames", type=int, default=40)
+    parser.add_argument("--size", default="1280x720", help="Frame size WxH")
+    parser.add_argument("--workers", default="1,2,4", help="Comma-separated pool sizes to time")
+    parser.add_argument("--minutes", type=float, default=3.0, help="Simulated scanning for the extrinsics")
+    parser.add_argument("--remaps", type=int, default=30, help="Frames to undistort per method")
+    args = parser.parse_args()
+    w, h = (int(v) for v in args.size.lower().split("x"))
+
+    board = CharucoBoard()
+    k = np.array([[0.78 * w, 0.0, w / 2 + 4.0], [0.0, 0.78 * w, h / 2 - 3.0], [0.0, 0.0, 1.0]])
+    dist = np.array([-0.21, 0.06, 0.001, -0.0008, 0.0])
+    t0 = time.perf_counter()
+    frames, _ = charuco_frames(board, k, dist, size=(w, h), count=args.frames)
+    print(f"{args.frames} ChArUco views at {w}x{h} rendered in {time.perf_counter() - t0:.2f} s "
+          f"({os.cpu_count()} cores)")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = []
+        for i, frame in enumerate(frames):
+            paths.append(os.path.join(tmp, f"view{i:03d}.png"))
+            cv2.imwrite(paths[-1], frame)
+        for workers in (int(x) for x in args.workers.split(",")):
+            t0 = time.perf_counter()
+            detections = detect_frames(paths, board, workers=workers)
+            elapsed = time.perf_counter() - t0
+            print(f"  detect   {workers} worker{'s' if workers > 1 else ' '} {elapsed:6.2f} s "
+                  f"({args.frames / elapsed:5.1f} frames/s)")
+        calib, report = calibrate_intrinsics(detections, board)
+        fx_err = abs(calib.camera_matrix[0, 0] / k[0, 0] - 1.0)
+        print(f"  intrinsics {report['solve_s'] * 1e3:6.1f} ms over {report['corners']} corners: "
+              f"rms {report['rms_px']:.2f} px, fx off by {fx_err:.2%}")
+
+        beam = np.array([1.0, 0.02, 0.01]) / np.linalg.norm([1.0, 0.02, 0.01])
+        origin = np.array([0.03, -0.02, 0.04])
+        sim = ScanSimulator(Room.default(), HandheldTrajectory(), beam=beam, beam_origin=origin)
+        session = sim.generate(args.minutes * 60.0)
+        ext, report = calibrate_extrinsics([session])
+        rng = report["range"]
+        print(f"  extrinsics {args.minutes:.0f} min of scanning ({len(session['range'])} ranges, "
+              f"{len(session['marker'])} marker sightings): camera {report['camera_s'] * 1e3:.1f} ms, "
+              f"rangefinder {report['range_s'] * 1e3:.1f} ms over {rng['inliers']} samples; "
+              f"beam off by {math.degrees(math.acos(min(1.0, ext.range_beam @ beam))):.2f} deg, "
+              f"origin by {np.linalg.norm(ext.range_origin - origin) * 1e3:.1f} mm")
+
+        store = CalibrationStore(os.path.join(tmp, "calibration"))
+        store.save(calib.merged(ext), serial="bench")
+        n = args.remaps
+        t0 = time.perf_counter()
+        for i in range(n):
+            cv2.undistort(frames[i % len(frames)], calib.camera_matrix, calib.dist_coeffs)
+        per_frame = (time.perf_counter() - t0) / n
+        t0 = time.perf_counter()
+        cold = store.load("bench")
+        out = cold.undistort(frames[0])
+        first = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        warm = store.load("bench")
+        warm.undistort(frames[0], out=out)
+        cached = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        for i in range(n):
+            warm.undistort(frames[i % len(frames)], out=out)
+        remap = (time.perf_counter() - t0) / n
+        print(f"  undistort: cv2.undistort {per_frame * 1e3:.1f} ms/frame; with maps {remap * 1e3:.1f} ms/frame")
+        print(f"  load + first frame: {first * 1e3:.1f} ms computing the maps, {cached * 1e3:.1f} ms "
+              f"with them from the store")
+
+
+if __name__ == "__main__":
+    main()
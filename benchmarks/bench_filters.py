@@ -0,0 +1,55 @@
+"""Per-stage cost of the TF-Luna filter chain, batch vs per-sample.
+
+Reports microseconds per sample for each stage and the fraction of the
+real-time budget used at the target rate (1.0 = just keeping up).
+
+Usage:
+  python -m benchmarks.bench_filters --samples 50000 --batch 25 --rate 250
+"""
+import argparse
+import json
+
+import numpy as np
+
+from scanner.filters import FilterChain, HampelFilter, Kalman1D, RangeGate, RollingMedian
+
+
+def make_chain(args):
+    return FilterChain(
+        RangeGate(),
+        [RollingMedian(args.median), HampelFilter(args.hampel), Kalman1D()],
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Filter chain benchmark")
+    parser.add_argument("--samples", type=int, default=50000)
+    parser.add_argument("--batch", type=int, default=25, help="Samples per decoder batch (250 Hz / 10 reads per s)")
+    parser.add_argument("--rate", type=float, default=250.0)
+    parser.add_argument("--median", type=int, default=5)
+    parser.add_argument("--hampel", type=int, default=9)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    d = 2.0 + rng.normal(0.0, 0.01, args.samples)
+    d[rng.integers(0, args.samples, args.samples // 100)] += 1.0
+    s = rng.integers(50, 3000, args.samples)
+    tc = np.full(args.samples, 40.0)
+
+    batch_chain = make_chain(args)
+    for i in range(0, args.samples, args.batch):
+        batch_chain.process(d[i:i + args.batch], s[i:i + args.batch], tc[i:i + args.batch])
+
+    inc_chain = make_chain(args)
+    for di, si in zip(d.tolist(), s.tolist()):
+        inc_chain.update(di, si, 40.0)
+
+    for label, chain in (("batch", batch_chain), (f"per-sample", inc_chain)):
+        t = chain.timings(rate_hz=args.rate)
+        print(f"{label}: total {t['total_us_per_sample']:.1f} us/sample, "
+              f"real-time load at {args.rate:g} Hz = {t['realtime_load'] * 100:.2f}%")
+        print(json.dumps({k: round(v["us_per_sample"], 2) for k, v in t.items() if isinstance(v, dict)}))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""Cost of the IMU/marker fusion filter per IMU sample and per late fix.
+
+Drives `PoseFilter` with a scripted circle walk from `hal.mocks` (simulated
+time, so it runs as fast as the filter allows). Marker fixes arrive
+`--delay` seconds late, so every fix triggers a rewind and replay.
+
+Usage:
+  python -m benchmarks.bench_fusion --seconds 60 --imu-rate 100 --fix-rate 15 --delay 0.1
+"""
+import argparse
+import time
+import tracemalloc
+
+import numpy as np
+
+from hal.mocks import MockIMU, ScriptedTrajectory
+from scanner.fusion import PoseFilter
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fusion filter benchmark")
+    parser.add_argument("--seconds", type=float, default=60.0)
+    parser.add_argument("--imu-rate", type=float, default=100.0)
+    parser.add_argument("--fix-rate", type=float, default=15.0)
+    parser.add_argument("--delay", type=float, default=0.1, help="Fix latency in seconds")
+    args = parser.parse_args()
+
+    traj = ScriptedTrajectory.circle()
+    imu = MockIMU(seed=0, rate=args.imu_rate, trajectory=traj, realtime=False, yaw_drift=0.01, accel_noise=0.05)
+    n = int(args.seconds * args.imu_rate)
+    samples = [imu.read() for _ in range(n)]
+    every = max(1, int(round(args.imu_rate / args.fix_rate)))
+    fixes = [(s["timestamp"] + args.delay, s["timestamp"]) + traj.pose(s["timestamp"]) for s in samples[::every]]
+
+    f = PoseFilter()
+    predict_s = 0.0
+    correct_s = 0.0
+    k = 0
+    clock = time.perf_counter
+    for s in samples:
+        t = s["timestamp"]
+        t0 = clock()
+        f.predict(t, s["quat"], s["accel"])
+        t1 = clock()
+        predict_s += t1 - t0
+        while k < len(fixes) and fixes[k][0] <= t:
+            _, t_fix, p, q = fixes[k]
+            t0 = clock()
+            f.correct(t_fix, p, q)
+            correct_s += clock() - t0
+            k += 1
+
+    error = np.linalg.norm(f.pose["position"] - traj.pose(f.t)[0])
+    report = f.report()
+
+    # Allocation check on the hot path: keep feeding the last sample.
+    last = samples[-1]
+    tracemalloc.start()
+    for i in range(1, 1001):
+        f.predict(last["timestamp"] + i / args.imu_rate, last["quat"], last["accel"])
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    per_predict = predict_s / n
+    per_fix = correct_s / max(1, k)
+    load = per_predict * args.imu_rate + per_fix * args.fix_rate
+    print(f"predict: {per_predict * 1e6:.1f} us/sample, peak traced memory over 1000 samples {peak} B")
+    print(f"late fix ({args.delay * 1e3:.0f} ms, ~{args.delay * args.imu_rate:.0f} samples replayed): "
+          f"{per_fix * 1e6:.1f} us/fix")
+    print(f"real-time load at {args.imu_rate:g} Hz IMU + {args.fix_rate:g} Hz fixes: {load * 100:.2f}%")
+    print(f"final position error {error * 100:.1f} cm; {report}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Dict-per-sample reads against batched `read_batch` reads.
+
+For each sensor, the dict path calls the single-read method N times and
+packs the dicts into the same structured array a vectorized consumer
+needs. The batched path calls `read_batch(--batch)` into one preallocated
+buffer. The sensors are unpaced, so this measures the cost of the API
+itself.
+
+Usage:
+  python -m benchmarks.bench_hal_batch --samples 200000 --batch 256
+"""
+import argparse
+import time
+
+import numpy as np
+
+from hal.interfaces import IMU_SAMPLE, RANGE_SAMPLE
+from hal.mocks import MockIMU, MockRangefinder
+from hal.simulator import Room, ScanSimulator, StepperTrajectory
+
+
+def dict_path(read, to_row, dtype, n):
+    t0 = time.perf_counter()
+    rows = [to_row(read()) for _ in range(n)]
+    arr = np.array(rows, dtype=dtype)
+    return time.perf_counter() - t0, arr
+
+
+def batch_path(sensor, dtype, n, batch):
+    out = np.empty(n, dtype=dtype)
+    t0 = time.perf_counter()
+    done = 0
+    while done < n:
+        k = min(batch, n - done)
+        got = sensor.read_batch(k, out=out[done:done + k])
+        done += len(got)
+    return time.perf_counter() - t0, out
+
+
+def range_row(r):
+    return r["timestamp"], r["distance_m"], r.get("strength", 0), r.get("temperature_c", 0.0)
+
+
+def imu_row(r):
+    return r["timestamp"], r["quat"], r["accel"], r["gyro"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HAL batch read benchmark")
+    parser.add_argument("--samples", type=int, default=100000)
+    parser.add_argument("--batch", type=int, default=256)
+    args = parser.parse_args()
+
+    sim = ScanSimulator(Room.default(), StepperTrajectory(), seed=0)
+    sim_range, sim_imu, _ = sim.sensors()
+    sim_range2, sim_imu2, _ = sim.sensors()
+    cases = (
+        ("MockRangefinder", MockRangefinder(seed=0), MockRangefinder(seed=0), "distance", range_row, RANGE_SAMPLE),
+        ("MockIMU", MockIMU(seed=0), MockIMU(seed=0), "read", imu_row, IMU_SAMPLE),
+        ("SimRangefinder", sim_range, sim_range2, "distance", range_row, RANGE_SAMPLE),
+        ("SimIMU", sim_imu, sim_imu2, "read", imu_row, IMU_SAMPLE),
+    )
+    n = args.samples
+    print(f"{n} samples per sensor, batches of {args.batch}")
+    for name, single, batched, method, to_row, dtype in cases:
+        t_dict, _ = dict_path(getattr(single, method), to_row, dtype, n)
+        t_batch, _ = batch_path(batched, dtype, n, args.batch)
+        print(f"{name:16s} dict {n / t_dict / 1e3:8.0f} k/s ({t_dict / n * 1e6:5.2f} us/sample)   "
+              f"batch {n / t_batch / 1e3:8.0f} k/s ({t_batch / n * 1e6:5.3f} us/sample)   "
+              f"x{t_dict / t_batch:.0f}")
+
+
+if __name__ == "__main__":
+    main()
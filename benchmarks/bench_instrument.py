@@ -0,0 +1,163 @@
+"""Overhead of `scanner.instrument` with metrics disabled and enabled.
+
+Reports:
+  - the per-call cost of each metric operation, against an empty method call
+  - end-to-end TF-Luna decoding (one feed() per 8-frame UART read, the Pi's
+    typical drain size) and OnlineAligner solves, with metrics off and on
+  - the slowdown a SamplingProfiler at `--profile-interval` causes in a
+    pure-Python loop
+
+Exits with status 1 if enabled metrics slow decoding or alignment by
+more than `--max-overhead` percent.
+
+Usage:
+  python -m benchmarks.bench_instrument
+  python -m benchmarks.bench_instrument --ops 500000 --max-overhead 10
+"""
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from hal.tfluna import TFLunaDecoder, encode_frames
+from scanner import instrument
+from scanner.alignment import OnlineAligner
+
+
+class _Empty:
+    def call(self, n=1):
+        pass
+
+
+def per_call_ns(fn, ops):
+    t0 = time.perf_counter()
+    for _ in range(ops):
+        fn()
+    return (time.perf_counter() - t0) / ops * 1e9
+
+
+def timer_ns(hist, ops):
+    t0 = time.perf_counter()
+    for _ in range(ops):
+        with hist.time():
+            pass
+    return (time.perf_counter() - t0) / ops * 1e9
+
+
+def best_of(fn, repeat):
+    return min(fn() for _ in range(repeat))
+
+
+def decode_run(chunks):
+    def run():
+        dec = TFLunaDecoder()
+        t0 = time.perf_counter()
+        for chunk in chunks:
+            dec.feed(chunk)
+        return time.perf_counter() - t0
+    return run
+
+
+def align_run(frames, known):
+    def run():
+        aligner = OnlineAligner(known, window=0.5)
+        t0 = time.perf_counter()
+        for records in frames:
+            aligner.observe(records)
+        return time.perf_counter() - t0
+    return run
+
+
+def alignment_frames(n):
+    from scanner.scanlog import MARKER_RECORD
+
+    rng = np.random.default_rng(0)
+    known = {i: rng.uniform(-2, 2, 3).tolist() for i in range(6)}
+    world = np.array([known[i] for i in range(6)])
+    frames = []
+    for k in range(n):
+        rec = np.zeros(6, dtype=MARKER_RECORD)
+        rec["t"] = k / 30.0
+        rec["id"] = np.arange(6)
+        rec["has_pose"] = 1
+        rec["tvec"] = world + [0.1, -0.2, 1.5] + rng.normal(0, 0.005, (6, 3))
+        frames.append(rec)
+    return frames, known
+
+
+def spin(n):
+    total = 0
+    for i in range(n):
+        total += i * i % 7
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Instrumentation overhead benchmark")
+    parser.add_argument("--ops", type=int, default=200000, help="Calls per micro-benchmark")
+    parser.add_argument("--frames", type=int, default=400000, help="TF-Luna frames to decode")
+    parser.add_argument("--solves", type=int, default=3000, help="OnlineAligner solves")
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--profile-interval", type=float, default=0.005)
+    parser.add_argument("--max-overhead", type=float, default=10.0, help="Allowed end-to-end slowdown (%%)")
+    args = parser.parse_args()
+
+    was_enabled = instrument.ENABLED
+    reg = instrument.Registry()
+    c, h = reg.counter("bench_total"), reg.histogram("bench_seconds")
+    empty = _Empty()
+
+    def micro(label, fn):
+        instrument.disable()
+        off = fn()
+        instrument.enable()
+        on = fn()
+        print(f"  {label:18s} off {off:6.0f}   on {on:6.0f}")
+
+    print(f"per call (ns, {args.ops} calls):")
+    print(f"  {'empty method':18s}     {per_call_ns(empty.call, args.ops):6.0f}")
+    micro("counter.inc", lambda: per_call_ns(c.inc, args.ops))
+    micro("hist.record(x)", lambda: per_call_ns(lambda: h.record(2.5e-4), args.ops) - per_call_ns(lambda: None, args.ops))
+    micro("with hist.time()", lambda: timer_ns(h, args.ops))
+    values = np.random.default_rng(0).lognormal(-8, 1, args.ops)
+    t0 = time.perf_counter()
+    h.record_many(values)
+    print(f"  {'hist.record_many':18s}     {(time.perf_counter() - t0) / args.ops * 1e9:6.1f} per value")
+
+    raw = encode_frames(np.arange(args.frames) % 800 + 20, 1000, 40.0)
+    chunks = [raw[i:i + 72] for i in range(0, len(raw), 72)]
+    frames, known = alignment_frames(args.solves)
+    failed = False
+    print("end to end (best of %d):" % args.repeat)
+    for label, run, n, unit in (("tfluna feed", decode_run(chunks), len(chunks), "feeds"),
+                                ("alignment", align_run(frames, known), len(frames), "solves")):
+        # Alternate the two modes so drift in machine load hits both alike.
+        off, on = [], []
+        for _ in range(args.repeat):
+            instrument.disable()
+            off.append(run())
+            instrument.enable()
+            on.append(run())
+        off, on = min(off), min(on)
+        overhead = (on / off - 1) * 100
+        failed |= overhead > args.max_overhead
+        print(f"  {label:12s} off {n / off / 1e3:8.1f} k {unit}/s   on {n / on / 1e3:8.1f} k {unit}/s   "
+              f"overhead {overhead:+.1f}%")
+
+    spins = 200000
+    base = best_of(lambda: per_call_ns(lambda: spin(spins), 3), args.repeat)
+    with instrument.SamplingProfiler(args.profile_interval) as prof:
+        sampled = best_of(lambda: per_call_ns(lambda: spin(spins), 3), args.repeat)
+    print(f"sampling profiler every {args.profile_interval * 1e3:.0f} ms: {prof.samples} samples, "
+          f"{prof.sample_time / max(prof.samples, 1) * 1e6:.0f} us each, loop slowdown {(sampled / base - 1) * 100:+.1f}%")
+
+    if not was_enabled:
+        instrument.disable()
+    if failed:
+        print(f"FAILED: overhead above {args.max_overhead}%")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Tiled map store: size on disk, write, append and level-of-detail reads.
+
+Casts random rays from a few spots in the default room to make a dense
+scan of its surfaces, then writes it to a `scanner.mapstore` store and
+compares the size with raw float32 points and a compressed .npz. Reports
+the time to open the store and load the coarsest level (what a viewer
+shows first), to read a 1 m box at full resolution, and to append a
+second session that covers one wall.
+
+Usage:
+  python -m benchmarks.bench_mapstore
+  python -m benchmarks.bench_mapstore --points 4000000 --quantum 0.002
+"""
+import argparse
+import io
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from hal.simulator import Room
+from scanner.mapstore import MapStoreReader, MapStoreWriter
+
+
+def room_scan(n, seed=0):
+    rng = np.random.default_rng(seed)
+    room = Room.default()
+    origins = rng.uniform([-1.5, -1.0, 1.0], [1.5, 1.0, 1.6], (8, 3))[rng.integers(0, 8, n)]
+    dirs = rng.normal(size=(n, 3))
+    dirs /= np.linalg.norm(dirs, axis=1, keepdims=True)
+    dist = room.cast(origins, dirs)[0]
+    ok = np.isfinite(dist)
+    return (origins[ok] + dirs[ok] * dist[ok, None]).astype(np.float32)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Map store benchmark")
+    parser.add_argument("--points", type=int, default=1_000_000)
+    parser.add_argument("--quantum", type=float, default=0.005, help="Level 0 cell size (m)")
+    parser.add_argument("--tile-cells", type=int, default=128)
+    parser.add_argument("--levels", type=int, default=6)
+    args = parser.parse_args()
+
+    points = room_scan(args.points)
+    wall = room_scan(args.points // 4, seed=1)
+    wall = wall[wall[:, 0] > 2.0]
+    npz = io.BytesIO()
+    np.savez_compressed(npz, points=points)
+    print(f"{len(points)} points: {points.nbytes / 1e6:.1f} MB as float32, {len(npz.getvalue()) / 1e6:.1f} MB as .npz")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "room.scanmap")
+        t0 = time.perf_counter()
+        with MapStoreWriter(path, quantum=args.quantum, tile_cells=args.tile_cells, levels=args.levels) as store:
+            store.add(points)
+        write = time.perf_counter() - t0
+        size = os.path.getsize(path)
+        print(f"  write    {write:6.2f} s, {size / 1e6:.2f} MB ({8 * size / len(points):.1f} bits/point)")
+
+        t0 = time.perf_counter()
+        reader = MapStoreReader(path)
+        top = reader.levels - 1
+        centres, _ = reader.read(top)
+        print(f"  open + level {top} ({reader.cell_size(top) * 100:.0f} cm cells): "
+              f"{len(centres)} cells in {(time.perf_counter() - t0) * 1e3:.1f} ms")
+        for s in reader.stats():
+            print(f"    level {s['level']}: {s['tiles']:5d} tiles, {s['cells']:8d} cells, {s['bytes'] / 1e3:8.1f} kB")
+
+        lo, hi = np.array([1.5, 1.0, 0.0]), np.array([2.5, 2.0, 1.0])
+        t0 = time.perf_counter()
+        centres, _ = MapStoreReader(path).read(0, lo, hi)
+        print(f"  1 m box at level 0: {len(centres)} cells in {(time.perf_counter() - t0) * 1e3:.1f} ms")
+
+        t0 = time.perf_counter()
+        with MapStoreWriter(path, session="wall") as store:
+            store.add(wall)
+        append = time.perf_counter() - t0
+        grown = os.path.getsize(path) - size
+        print(f"  append   {append:6.2f} s for {len(wall)} points on one wall, "
+              f"+{grown / 1e6:.2f} MB ({grown / size:.0%} of the store)")
+
+
+if __name__ == "__main__":
+    main()
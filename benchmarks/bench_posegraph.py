@@ -0,0 +1,123 @@
+"""Pose graph solve times on synthetic handheld scans.
+
+A keyframe trajectory wanders a 6 x 6 m room for `--nodes` keyframes, with
+noisy odometry between consecutive keyframes, a loop closure whenever it
+comes back within 0.3 m of a keyframe at least 200 keyframes older, and
+sightings of the room's ArUco anchors (half of them known). Reports:
+
+  - batch: one full solve from the drifted odometry guess
+  - incremental: `update()` after every keyframe, as the live scanner
+    would call it, with per-update latency and the number of loop-closure solves
+  - position error against ground truth before and after
+
+Usage:
+  python -m benchmarks.bench_posegraph
+  python -m benchmarks.bench_posegraph --nodes 1000 5000 10000 --window 64
+"""
+import argparse
+import time
+
+import numpy as np
+
+from scanner import quaternion
+from scanner.posegraph import PoseGraph, relative
+
+
+ANCHORS = {i: np.array([x, y, z]) for i, (x, y, z) in enumerate(
+    [(3, 0, 1), (-3, 0, 1), (0, 3, 1.5), (0, -3, 1.5), (3, 3, 2), (-3, -3, 2), (3, -3, 0.5), (-3, 3, 0.5)])}
+
+
+def synthetic(n, seed):
+    rng = np.random.default_rng(seed)
+    heading = np.cumsum(rng.normal(0, 0.08, n))
+    step = np.stack([np.cos(heading), np.sin(heading), rng.normal(0, 0.05, n)], axis=1) * 0.05
+    pos = np.zeros((n, 3))
+    pos[0] = (0, 0, 1.2)
+    for i in range(1, n):
+        p = pos[i - 1] + step[i]
+        # Bounce off the walls of the room.
+        out = np.abs(p[:2]) > 2.7
+        heading[i:] += np.pi * out.any()
+        pos[i] = np.where(np.r_[out, False], pos[i - 1], p)
+        pos[i, 2] = np.clip(pos[i, 2], 0.8, 1.8)
+    quat = quaternion.from_rvec(np.stack([rng.normal(0, 0.05, n), rng.normal(0, 0.05, n), heading], axis=1))
+    odo = []
+    for i in range(1, n):
+        dq, dp = relative(quat[i - 1], pos[i - 1], quat[i], pos[i])
+        odo.append((quaternion.multiply(dq, quaternion.from_rvec(rng.normal(0, 0.003, 3))), dp + rng.normal(0, 0.005, 3)))
+    loops = []
+    for i in range(200, n, 10):
+        d = np.linalg.norm(pos[:i - 200] - pos[i], axis=1)
+        if len(d) and d.min() < 0.3:
+            j = int(np.argmin(d))
+            dq, dp = relative(quat[j], pos[j], quat[i], pos[i])
+            loops.append((j, i, dq, dp + rng.normal(0, 0.01, 3)))
+    sightings = []
+    for i in range(0, n, 4):
+        r_t = quaternion.to_matrix(quaternion.conjugate(quat[i]))
+        for m, a in ANCHORS.items():
+            z = r_t @ (a - pos[i])
+            if np.linalg.norm(z) < 2.5:
+                sightings.append((i, m, z + rng.normal(0, 0.02, 3)))
+    return quat, pos, odo, loops, sightings
+
+
+def build(quat, pos, odo, loops, sightings, graph, on_node=None):
+    by_node = {}
+    for s in sightings:
+        by_node.setdefault(s[0], []).append(s)
+    loops_at = {i: (j, dq, dp) for j, i, dq, dp in loops}
+    q, p = quat[0], pos[0]
+    graph.add_node(q, p, fixed=True)
+    for i in range(1, len(quat)):
+        dq, dp = odo[i - 1]
+        p = p + quaternion.to_matrix(q) @ dp
+        q = quaternion.multiply(q, dq)
+        graph.add_node(q, p)
+        graph.add_odometry(i - 1, i, dq, dp, rot_std=0.003, pos_std=0.005)
+        if i in loops_at:
+            j, lq, lp = loops_at[i]
+            graph.add_loop(j, i, lq, lp, rot_std=0.01, pos_std=0.01)
+        for _, m, z in by_node.get(i, ()):
+            graph.add_sighting(i, graph.anchor(m, ANCHORS[m] if m % 2 == 0 else None), z, std=0.02)
+        if on_node is not None:
+            on_node(graph)
+    return graph
+
+
+def rms(a, b):
+    return float(np.sqrt((np.linalg.norm(a - b, axis=1) ** 2).mean()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pose graph benchmark")
+    parser.add_argument("--nodes", type=int, nargs="+", default=[1000, 5000])
+    parser.add_argument("--window", type=int, default=64, help="Incremental window (keyframes)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    for n in args.nodes:
+        quat, pos, odo, loops, sightings = synthetic(n, args.seed)
+        graph = build(quat, pos, odo, loops, sightings, PoseGraph())
+        drift = rms(graph.poses()[1], pos)
+        rep = graph.optimize(iterations=30)
+        print(f"{n} keyframes, {len(loops)} loop closures, {len(sightings)} sightings; odometry RMS error {drift:.3f} m")
+        print(f"  batch        {rep['seconds']:7.3f} s  {rep['iterations']:2d} iterations  "
+              f"RMS error {rms(graph.poses()[1], pos):.3f} m")
+
+        times, modes = [], []
+
+        def on_node(g):
+            t0 = time.perf_counter()
+            modes.append(g.update(window=args.window)["mode"])
+            times.append(time.perf_counter() - t0)
+
+        inc = build(quat, pos, odo, loops, sightings, PoseGraph(), on_node)
+        ms = np.array(times) * 1e3
+        print(f"  incremental  {ms.sum() / 1e3:7.3f} s total  per update p50 {np.percentile(ms, 50):6.2f} ms  "
+              f"p99 {np.percentile(ms, 99):6.2f} ms  max {ms.max():7.2f} ms  "
+              f"({modes.count('loop')} loop solves)  RMS error {rms(inc.poses()[1], pos):.3f} m")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Benchmark range + orientation -> point projection throughput.
+
+Generates a handheld-style sweep (IMU at 100 Hz, TF-Luna at 250 Hz) and
+times `scanner.projection.project` over growing batch sizes, alongside a
+per-point Python loop on a small slice for reference.
+
+Usage:
+  python -m benchmarks.bench_projection --sizes 100000 1000000 4000000
+"""
+import argparse
+import math
+import time
+
+import numpy as np
+
+from scanner.projection import Extrinsics, project
+
+
+def synthetic_session(n_points, range_hz=250.0, imu_hz=100.0, seed=0):
+    rng = np.random.default_rng(seed)
+    duration = n_points / range_hz
+    imu_t = np.arange(0.0, duration + 2.0 / imu_hz, 1.0 / imu_hz)
+    # Random-walk yaw/pitch sweep, as if waving the scanner around a room.
+    yaw = np.cumsum(rng.normal(0.0, 0.02, len(imu_t)))
+    pitch = 0.3 * np.sin(np.cumsum(rng.normal(0.0, 0.01, len(imu_t))))
+    cy, sy = np.cos(yaw / 2), np.sin(yaw / 2)
+    cp, sp = np.cos(pitch / 2), np.sin(pitch / 2)
+    quats = np.stack([cy * cp, -sy * sp, cy * sp, sy * cp], axis=1)
+    range_t = np.sort(rng.uniform(0.0, duration, n_points))
+    dist = rng.uniform(0.2, 8.0, n_points)
+    return dist, range_t, quats, imu_t
+
+
+def naive_project(dist, range_t, quats, imu_t, ext):
+    out = []
+    beam = ext.beam_body
+    for d, t in zip(dist.tolist(), range_t.tolist()):
+        i = min(max(int(np.searchsorted(imu_t, t, side="right")), 1), len(imu_t) - 1)
+        u = (t - imu_t[i - 1]) / (imu_t[i] - imu_t[i - 1])
+        q0, q1 = quats[i - 1], quats[i]
+        dot = float(q0 @ q1)
+        if dot < 0:
+            q1, dot = -q1, -dot
+        theta = math.acos(min(dot, 1.0))
+        if theta < 1e-6:
+            q = q0 * (1 - u) + q1 * u
+        else:
+            q = (math.sin((1 - u) * theta) * q0 + math.sin(u * theta) * q1) / math.sin(theta)
+        w, x, y, z = q / np.linalg.norm(q)
+        R = np.array(
+            [
+                [1 - 2 * (y * y + z * z), 2 * (x * y - w * z), 2 * (x * z + w * y)],
+                [2 * (x * y + w * z), 1 - 2 * (x * x + z * z), 2 * (y * z - w * x)],
+                [2 * (x * z - w * y), 2 * (y * z + w * x), 1 - 2 * (x * x + y * y)],
+            ]
+        )
+        out.append(R @ (ext.translation + d * beam))
+    return np.asarray(out, dtype=np.float32)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Point projection benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100000, 1000000, 4000000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--naive", type=int, default=20000, help="Points for the per-point loop baseline")
+    args = parser.parse_args()
+
+    ext = Extrinsics(translation=(0.03, 0.0, 0.02))
+
+    dist, range_t, quats, imu_t = synthetic_session(args.naive)
+    t0 = time.perf_counter()
+    ref = naive_project(dist, range_t, quats, imu_t, ext)
+    t_naive = time.perf_counter() - t0
+    fast = project(dist, range_t, quats, imu_t, ext)
+    err = float(np.abs(fast - ref).max())
+    print(f"per-point loop: {args.naive / t_naive / 1e6:.3f} Mpts/s (max diff vs batched {err:.2e} m)")
+
+    for n in args.sizes:
+        dist, range_t, quats, imu_t = synthetic_session(n)
+        best = float("inf")
+        for _ in range(args.repeat):
+            t0 = time.perf_counter()
+            pts = project(dist, range_t, quats, imu_t, ext)
+            best = min(best, time.perf_counter() - t0)
+        print(f"batched n={n:>9}: {n / best / 1e6:6.2f} Mpts/s ({best * 1e3:.1f} ms, {len(pts)} points)")
+
+
+if __name__ == "__main__":
+    main()
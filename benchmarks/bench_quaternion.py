@@ -0,0 +1,110 @@
+"""Vectorized quaternion ops vs a naive per-sample implementation.
+
+The naive versions are what a straightforward port of the BNO055 print
+loop looks like: one Python call per sample using `math`.
+
+Usage:
+  python -m benchmarks.bench_quaternion --samples 100000
+"""
+import argparse
+import math
+import time
+
+import numpy as np
+
+from scanner import quaternion as quat
+
+
+def naive_normalize(q):
+    n = math.sqrt(sum(c * c for c in q))
+    if n < 1e-9:
+        return (1.0, 0.0, 0.0, 0.0)
+    return tuple(c / n for c in q)
+
+
+def naive_multiply(a, b):
+    aw, ax, ay, az = a
+    bw, bx, by, bz = b
+    return (
+        aw * bw - ax * bx - ay * by - az * bz,
+        aw * bx + ax * bw + ay * bz - az * by,
+        aw * by - ax * bz + ay * bw + az * bx,
+        aw * bz + ax * by - ay * bx + az * bw,
+    )
+
+
+def naive_rotate(q, v):
+    p = naive_multiply(naive_multiply(q, (0.0,) + tuple(v)), (q[0], -q[1], -q[2], -q[3]))
+    return p[1:]
+
+
+def naive_to_matrix(q):
+    w, x, y, z = q
+    return (
+        (1 - 2 * (y * y + z * z), 2 * (x * y - w * z), 2 * (x * z + w * y)),
+        (2 * (x * y + w * z), 1 - 2 * (x * x + z * z), 2 * (y * z - w * x)),
+        (2 * (x * z - w * y), 2 * (y * z + w * x), 1 - 2 * (x * x + y * y)),
+    )
+
+
+def naive_slerp(a, b, u):
+    dot = sum(x * y for x, y in zip(a, b))
+    if dot < 0:
+        b = tuple(-c for c in b)
+        dot = -dot
+    theta = math.acos(min(dot, 1.0))
+    if theta < 1e-6:
+        return naive_normalize(tuple((1 - u) * x + u * y for x, y in zip(a, b)))
+    s = math.sin(theta)
+    w0 = math.sin((1 - u) * theta) / s
+    w1 = math.sin(u * theta) / s
+    return tuple(w0 * x + w1 * y for x, y in zip(a, b))
+
+
+def naive_to_rvec(q):
+    w, x, y, z = q if q[0] >= 0 else tuple(-c for c in q)
+    s = math.sqrt(x * x + y * y + z * z)
+    if s < 1e-9:
+        return (2 * x, 2 * y, 2 * z)
+    k = 2 * math.atan2(s, w) / s
+    return (k * x, k * y, k * z)
+
+
+def timed(fn):
+    t0 = time.perf_counter()
+    fn()
+    return time.perf_counter() - t0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Quaternion benchmark")
+    parser.add_argument("--samples", type=int, default=100000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    raw = rng.normal(size=(args.samples, 4))
+    raw[::100] = 0.0  # BNO055 start-up style zero readings
+    a, _ = quat.normalize(raw)
+    b, _ = quat.normalize(rng.normal(size=(args.samples, 4)))
+    v = rng.normal(size=(args.samples, 3))
+    u = rng.uniform(size=args.samples)
+    raw_l, a_l, b_l, v_l, u_l = raw.tolist(), a.tolist(), b.tolist(), v.tolist(), u.tolist()
+
+    cases = [
+        ("normalize", lambda: [naive_normalize(q) for q in raw_l], lambda: quat.normalize(raw)),
+        ("multiply", lambda: [naive_multiply(x, y) for x, y in zip(a_l, b_l)], lambda: quat.multiply(a, b)),
+        ("rotate", lambda: [naive_rotate(q, w) for q, w in zip(a_l, v_l)], lambda: quat.rotate(a, v)),
+        ("to_matrix", lambda: [naive_to_matrix(q) for q in a_l], lambda: quat.to_matrix(a)),
+        ("slerp", lambda: [naive_slerp(x, y, t) for x, y, t in zip(a_l, b_l, u_l)], lambda: quat.slerp(a, b, u)),
+        ("to_rvec", lambda: [naive_to_rvec(q) for q in a_l], lambda: quat.to_rvec(a)),
+    ]
+    print(f"{args.samples} quaternions")
+    for name, naive, vec in cases:
+        tn = timed(naive)
+        tv = timed(vec)
+        print(f"{name:10s} naive {tn * 1e9 / args.samples:8.1f} ns/q   "
+              f"vectorized {tv * 1e9 / args.samples:6.1f} ns/q   {tn / tv:6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""Scaling of offline reconstruction with the number of worker processes.
+
+Simulates a recorded session (or uses `--log`), rebuilds its voxel map
+with 1, 2, 4 and all-core workers, and reports wall time, speedup over
+one worker and whether every map matches the single-worker map exactly.
+
+Usage:
+  python -m benchmarks.bench_reconstruct --duration 1800
+  python -m benchmarks.bench_reconstruct --log test_outputs/scan.scanlog --workers 1 2 4 8
+"""
+import argparse
+import os
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from hal.simulator import HandheldTrajectory, Room, ScanSimulator
+from scanner.reconstruct import reconstruct
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reconstruction scaling benchmark")
+    parser.add_argument("--log", default=None, help="Existing .scanlog (default: simulate one)")
+    parser.add_argument("--duration", type=float, default=1200.0, help="Seconds of simulated session")
+    parser.add_argument("--voxel", type=float, default=0.02)
+    parser.add_argument("--chunk", type=float, default=10.0)
+    parser.add_argument("--workers", type=int, nargs="+", default=None, help="Worker counts (default: 1 2 4 N)")
+    parser.add_argument("--repeat", type=int, default=3, help="Best of this many runs per worker count")
+    args = parser.parse_args()
+
+    counts = args.workers or sorted({1, 2, 4, os.cpu_count() or 1})
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.log
+        if path is None:
+            path = Path(tmp) / "bench.scanlog"
+            t0 = time.perf_counter()
+            ScanSimulator(Room.default(), HandheldTrajectory(), seed=0).write(path, args.duration, camera_rate=0)
+            print(f"simulated {args.duration:.0f} s session in {time.perf_counter() - t0:.1f} s")
+        print(f"{os.cpu_count()} cores, {args.chunk:g} s chunks, {args.voxel:g} m voxels")
+        base = None
+        for workers in counts:
+            best = None
+            for _ in range(args.repeat):
+                vmap, report = reconstruct([path], voxel_size=args.voxel, workers=workers, chunk_seconds=args.chunk)
+                if best is None or report["total_s"] < best["total_s"]:
+                    best = report
+            snap = vmap.snapshot()
+            if base is None:
+                base, ref = best, snap
+            same = all(np.array_equal(ref[k], snap[k]) for k in ("ijk", "centroid", "count", "log_odds"))
+            print(f"workers {workers:3d}  {best['total_s']:7.3f} s  ({best['samples'] / best['total_s'] / 1e6:5.2f} M samples/s, "
+                  f"merge {best['merge_s'] * 1e3:6.1f} ms)  x{base['total_s'] / best['total_s']:4.2f}  "
+                  f"{best['voxels']} voxels  {'identical' if same else 'DIFFERENT'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""Replay throughput and memory for recorded sessions.
+
+Records `--samples` mock range readings (plus IMU at 2/5 the count)
+through `SessionRecorder`, writes the same data as tool text output, then
+replays both as fast as possible. Peak traced memory shows that replay
+streams the file instead of loading it.
+
+Usage:
+  python -m benchmarks.bench_replay --samples 1000000
+"""
+import argparse
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from hal.mocks import MockIMU, MockRangefinder
+from hal.replay import ReplayIMU, ReplayRangefinder, SessionRecorder
+
+
+def replay(sensor_cls, path):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    n = sum(1 for _ in sensor_cls(path, speed=0))
+    elapsed = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return n, elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay benchmark")
+    parser.add_argument("--samples", type=int, default=300000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        log_path = Path(tmp) / "bench.scanlog"
+        text_path = Path(tmp) / "tfluna_output.txt"
+        rng = MockRangefinder(seed=0, base=2.0)
+        imu = MockIMU(seed=0)
+        with SessionRecorder(log_path) as rec, open(text_path, "w") as fh:
+            r_rng = rec.wrap(rng)
+            r_imu = rec.wrap(imu)
+            for k in range(args.samples):
+                r = r_rng.distance()
+                fh.write(f"{r['timestamp']:.3f} dist_cm={round(r['distance_m'] * 100)} strength=0 temp_c=0.00\n")
+                if k % 5 < 2:
+                    r_imu.read()
+
+        size = log_path.stat().st_size + text_path.stat().st_size
+        print(f"session: {args.samples} range samples, {log_path.stat().st_size / 1e6:.1f} MB scanlog, "
+              f"{text_path.stat().st_size / 1e6:.1f} MB text ({size / 1e6:.1f} MB total)")
+        for label, cls, path in (("range from scanlog", ReplayRangefinder, log_path),
+                                 ("imu from scanlog", ReplayIMU, log_path),
+                                 ("range from text", ReplayRangefinder, text_path)):
+            n, elapsed, peak = replay(cls, path)
+            print(f"{label}: {n} samples in {elapsed:.2f} s ({n / elapsed / 1e3:.0f} k samples/s), "
+                  f"peak traced memory {peak / 1e6:.2f} MB")
+
+
+if __name__ == "__main__":
+    main()
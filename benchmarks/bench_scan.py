@@ -0,0 +1,88 @@
+"""Pan/tilt room sweeps: on-the-fly acquisition against stop-and-go.
+
+A simulated head on a tripod in the default room sweeps the full room
+(pan all the way round, tilt from the floor to near the ceiling) with a
+raster, and a spiral around the horizon, through `hal.scheduler`. Time is
+simulated, so a sweep that would take minutes on the real head runs in
+seconds. For each it reports achieved points/s against the sensor's
+rate, the scan time against the theoretical minimum for the path, and
+the actual angular spacing.
+
+Stop-and-go (move one step, stop, read one range) is run over the first
+`--stop-rows` rows of the raster and extrapolated to the whole room.
+
+Usage:
+  python -m benchmarks.bench_scan
+  python -m benchmarks.bench_scan --resolution 0.25 --range-rate 100 --stop-rows 1
+"""
+import argparse
+import math
+import time
+
+import numpy as np
+
+from hal.scheduler import ScanScheduler, raster, spiral
+from hal.simulator import Room, pan_tilt_rig
+
+
+def stop_and_go(head, rng, path, resolution):
+    """Seconds of simulated time to visit every grid point of `path` one at a time."""
+    t0 = rng.now
+    points = 0
+    for a, b in zip(path[:-1], path[1:]):
+        if not b["sweep"]:
+            continue
+        n = max(1, int(round(abs(b["pan"] - a["pan"]) * math.cos(b["tilt"]) / resolution)))
+        for pan in np.linspace(a["pan"], b["pan"], n + 1):
+            head.move_to(pan, b["tilt"])
+            while head.moving():
+                rng.read_batch(1)
+            rng.read_batch(1)
+            points += 1
+    return rng.now - t0, points
+
+
+def show(name, report, wall):
+    print(f"  {name:8s} {report['points']:7d} points in {report['seconds']:6.1f} s "
+          f"({report['points_per_s']:5.1f} points/s of {report['max_points_per_s']:.0f}), "
+          f"minimum {report['full_sweep_s']:6.1f} s, efficiency {report['efficiency']:.0%}, "
+          f"spacing {math.degrees(report['spacing']):.3f} deg, {report['commands']} moves "
+          f"[{wall:.1f} s to simulate]")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pan/tilt scan scheduler benchmark")
+    parser.add_argument("--resolution", type=float, default=0.5, help="Degrees between points")
+    parser.add_argument("--range-rate", type=float, default=250.0, help="Simulated TF-Luna rate (Hz)")
+    parser.add_argument("--tilt", type=float, nargs=2, default=(-0.6, 0.9), help="Tilt range (rad)")
+    parser.add_argument("--stop-rows", type=int, default=2, help="Raster rows to time stop-and-go over")
+    args = parser.parse_args()
+
+    res = math.radians(args.resolution)
+    path = raster((-math.pi, math.pi), tuple(args.tilt), res)
+    print(f"full room at {args.resolution} deg: {len(path) // 2} rows, TF-Luna at {args.range_rate:.0f} Hz")
+
+    head, rng, _ = pan_tilt_rig(Room.default(), range_rate=args.range_rate)
+    t0 = time.perf_counter()
+    _, report = ScanScheduler(head, rng, resolution=res).run(path)
+    show("raster", report, time.perf_counter() - t0)
+
+    head, rng, _ = pan_tilt_rig(Room.default(), range_rate=args.range_rate)
+    t0 = time.perf_counter()
+    _, spi = ScanScheduler(head, rng, resolution=res).run(spiral((0.0, 0.0), 0.5, res))
+    show("spiral", spi, time.perf_counter() - t0)
+
+    head, rng, _ = pan_tilt_rig(Room.default(), range_rate=args.range_rate)
+    rows = path[:2 * args.stop_rows]
+    head.move_to(rows["pan"][0], rows["tilt"][0])
+    while head.moving():
+        rng.read_batch(1)
+    seconds, points = stop_and_go(head, rng, rows, res)
+    whole = seconds * len(path) / len(rows)
+    print(f"  stop-and-go {points / seconds:5.1f} points/s over {args.stop_rows} rows; "
+          f"whole room about {whole / 60:.1f} min against {report['seconds'] / 60:.1f} min on the fly "
+          f"(x{whole / report['seconds']:.1f})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Compare text/JSONL logs with the binary scan log: size, write and read time.
+
+Usage:
+  python -m benchmarks.bench_scanlog --records 1000000
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from scanner.scanlog import RANGE_RECORD, ScanLogReader, ScanLogWriter, parse_text_line, range_to_text
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scan log benchmark")
+    parser.add_argument("--records", type=int, default=500000)
+    args = parser.parse_args()
+
+    n = args.records
+    rng = np.random.default_rng(0)
+    rec = np.zeros(n, dtype=RANGE_RECORD)
+    rec["t"] = 1.77e9 + np.arange(n) * 0.004
+    rec["distance_m"] = np.round(rng.uniform(0.2, 8.0, n), 2)
+    rec["strength"] = rng.integers(100, 5000, n)
+    rec["temperature_c"] = 40.0
+    cols = {k: rec[k] for k in rec.dtype.names}
+    tmp = tempfile.mkdtemp()
+
+    text_path = os.path.join(tmp, "tfluna_output.txt")
+    t0 = time.perf_counter()
+    with open(text_path, "w") as fh:
+        for line in range_to_text(cols):
+            fh.write(line + "\n")
+            fh.flush()
+    t_text_w = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    with open(text_path) as fh:
+        parsed = [parse_text_line(line) for line in fh]
+    t_text_r = time.perf_counter() - t0
+
+    log_path = os.path.join(tmp, "scan.scanlog")
+    t0 = time.perf_counter()
+    with ScanLogWriter(log_path) as log:
+        for i in range(0, n, 250):
+            log.append("range", rec[i:i + 250])
+    t_bin_w = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    reader = ScanLogReader(log_path)
+    d = reader.read("range")["distance_m"]
+    total = float(d.sum())
+    t_bin_r = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    mid = rec["t"][n // 2]
+    win = reader.read("range", mid, mid + 1.0)
+    t_win = time.perf_counter() - t0
+
+    print(f"{n} range records")
+    print(f"text   : {os.path.getsize(text_path) / 1e6:7.1f} MB  write {t_text_w:6.2f}s  parse {t_text_r:6.2f}s ({len(parsed)} lines)")
+    print(f"scanlog: {os.path.getsize(log_path) / 1e6:7.1f} MB  write {t_bin_w:6.2f}s  read  {t_bin_r:6.3f}s (sum {total:.0f})")
+    print(f"1 s window lookup: {t_win * 1e6:.0f} us ({len(win['t'])} records)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Simulator throughput, and a downstream stress run on its output.
+
+Times vectorized generation of TF-Luna ranges, BNO055 samples and marker
+detections for a handheld walk through the default room. The same
+samples are then pushed through projection and the voxel map, with peak
+traced memory for each stage.
+
+Usage:
+  python -m benchmarks.bench_simulator --samples 2000000
+  python -m benchmarks.bench_simulator --samples 10000000 --trajectory stepper --voxel 0.02
+"""
+import argparse
+import time
+import tracemalloc
+
+import numpy as np
+
+from hal.simulator import HandheldTrajectory, Room, ScanSimulator, StepperTrajectory
+from scanner.projection import project
+from scanner.voxel import VoxelMap
+
+
+def timed(fn, *args, **kwargs):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    out = fn(*args, **kwargs)
+    elapsed = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return out, elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulator benchmark")
+    parser.add_argument("--samples", type=int, default=1000000, help="TF-Luna samples (250 Hz)")
+    parser.add_argument("--trajectory", choices=("handheld", "stepper"), default="handheld")
+    parser.add_argument("--voxel", type=float, default=0.02)
+    parser.add_argument("--batch", type=int, default=250000)
+    args = parser.parse_args()
+
+    trajectory = StepperTrajectory() if args.trajectory == "stepper" else HandheldTrajectory()
+    sim = ScanSimulator(Room.default(), trajectory, seed=0)
+    t_range = np.arange(args.samples) / 250.0
+    t_imu = np.arange(int(args.samples * 100 / 250) + 2) / 100.0
+    t_cam = np.arange(int(args.samples * 15 / 250)) / 15.0
+
+    ranges, s_range, m_range = timed(sim.ranges, t_range)
+    imu, s_imu, m_imu = timed(sim.imu, t_imu)
+    markers, s_cam, m_cam = timed(sim.markers, t_cam)
+    print(f"simulated {args.samples / 250.0:.0f} s of {args.trajectory} scanning")
+    print(f"ranges:  {len(ranges)} in {s_range:.2f} s ({len(ranges) / s_range / 1e6:.2f} M/s), "
+          f"peak {m_range / 1e6:.0f} MB, {np.mean(ranges['distance_m'] == 0) * 100:.2f}% dropouts")
+    print(f"imu:     {len(imu)} in {s_imu:.2f} s ({len(imu) / s_imu / 1e6:.2f} M/s), peak {m_imu / 1e6:.0f} MB")
+    print(f"markers: {len(markers)} detections in {len(t_cam)} frames in {s_cam:.2f} s "
+          f"({len(t_cam) / s_cam / 1e3:.0f} k frames/s), peak {m_cam / 1e6:.0f} MB")
+
+    def project_all():
+        return [project(ranges["distance_m"][a:a + args.batch], ranges["t"][a:a + args.batch], imu["quat"], imu["t"],
+                        origins=trajectory.position(ranges["t"][a:a + args.batch]))
+                for a in range(0, len(ranges), args.batch)]
+
+    batches, s_proj, m_proj = timed(project_all)
+    n_points = sum(len(b) for b in batches)
+    print(f"project: {n_points} points in {s_proj:.2f} s ({n_points / s_proj / 1e6:.2f} M/s), "
+          f"peak {m_proj / 1e6:.0f} MB")
+
+    def insert_all():
+        vmap = VoxelMap(voxel_size=args.voxel)
+        for pts in batches:
+            vmap.insert(pts)
+        return vmap
+
+    vmap, s_vox, m_vox = timed(insert_all)
+    print(f"voxel:   {n_points} points -> {len(vmap)} voxels in {s_vox:.2f} s "
+          f"({n_points / s_vox / 1e6:.2f} M/s), peak {m_vox / 1e6:.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
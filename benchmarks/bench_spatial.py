@@ -0,0 +1,102 @@
+"""Spatial index build and query costs at scan-sized point counts.
+
+Points come from a simulated handheld scan of the default room, projected
+with `scanner.projection`, so the cloud has real wall/obstacle structure.
+They are appended `--batch` points at a time, the way a live map grows.
+For each size the benchmark reports append throughput, memory per point,
+and batched kNN, radius, box and outlier queries. One brute-force scan
+and a scipy cKDTree over the same points serve as references.
+
+Usage:
+  python -m benchmarks.bench_spatial
+  python -m benchmarks.bench_spatial --points 1000000 10000000 --queries 20000
+"""
+import argparse
+import time
+
+import numpy as np
+
+from hal.simulator import HandheldTrajectory, Room, ScanSimulator
+from scanner.projection import project
+from scanner.spatial import PointIndex
+
+
+def scan_points(n, seed):
+    trajectory = HandheldTrajectory()
+    sim = ScanSimulator(Room.default(), trajectory, seed=seed)
+    parts, have, t0 = [], 0, 0.0
+    while have < n:
+        t = t0 + np.arange(500000) / 250.0
+        rng = sim.ranges(t)
+        imu_t = np.arange(np.floor(t[0] * 100) - 1, np.ceil(t[-1] * 100) + 2) / 100.0
+        imu = sim.imu(imu_t)
+        pts = project(rng["distance_m"], rng["t"], imu["quat"], imu["t"], origins=trajectory.position(rng["t"]))
+        parts.append(pts)
+        have += len(pts)
+        t0 = t[-1] + 1 / 250.0
+    return np.concatenate(parts)[:n]
+
+
+def timed(fn, *args, **kwargs):
+    t0 = time.perf_counter()
+    out = fn(*args, **kwargs)
+    return out, time.perf_counter() - t0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Spatial index benchmark")
+    parser.add_argument("--points", type=int, nargs="+", default=[1000000, 10000000])
+    parser.add_argument("--batch", type=int, default=2500, help="Points per append (10 s at 250 Hz)")
+    parser.add_argument("--cell", type=float, default=0.05)
+    parser.add_argument("--queries", type=int, default=10000)
+    parser.add_argument("--k", type=int, default=8)
+    parser.add_argument("--radius", type=float, default=0.05)
+    parser.add_argument("--no-kdtree", action="store_true", help="Skip the cKDTree reference")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    for n in args.points:
+        pts, s_gen = timed(scan_points, n, args.seed)
+        print(f"{n} points (simulated and projected in {s_gen:.1f} s)")
+        index = PointIndex(cell_size=args.cell, capacity=n)
+        t0 = time.perf_counter()
+        worst = 0.0
+        for a in range(0, n, args.batch):
+            t1 = time.perf_counter()
+            index.extend(pts[a:a + args.batch])
+            worst = max(worst, time.perf_counter() - t1)
+        s_build = time.perf_counter() - t0
+        mem = index.memory()
+        print(f"  append   {n / s_build / 1e6:6.2f} M points/s in batches of {args.batch} "
+              f"(slowest append {worst * 1e3:.0f} ms, {index.merges} merges, {len(index.segments)} segments)")
+        print(f"  memory   {index.nbytes / 1e6:7.1f} MB, {index.nbytes / n:5.1f} B/point  "
+              + "  ".join(f"{k} {v / 1e6:.1f}" for k, v in mem.items()))
+
+        q = pts[rng.integers(0, n, args.queries)] + rng.normal(0, 0.01, (args.queries, 3)).astype(np.float32)
+        (dist, _), s_knn = timed(index.knn, q, args.k)
+        (_, offsets), s_rad = timed(index.radius, q, args.radius)
+        lo = pts[rng.integers(0, n, 100)]
+        boxes, s_box = timed(lambda: [index.box(b, b + 0.5) for b in lo])
+        _, s_out = timed(index.inliers, args.radius, 5, np.arange(min(n, 100000)))
+        print(f"  knn      {args.queries / s_knn / 1e3:7.1f} k queries/s (k={args.k}, median k-th distance "
+              f"{np.median(dist[:, -1]) * 1e3:.1f} mm)")
+        print(f"  radius   {args.queries / s_rad / 1e3:7.1f} k queries/s (r={args.radius}, "
+              f"{np.diff(offsets).mean():.0f} neighbours on average)")
+        print(f"  box      {len(lo) / s_box:7.1f} queries/s (0.5 m cubes, {np.mean([len(b) for b in boxes]):.0f} points on average)")
+        print(f"  outliers {min(n, 100000) / s_out / 1e3:7.1f} k points/s")
+
+        few = q[:20].astype(np.float64)
+        _, s_brute = timed(lambda: [np.argpartition(((pts - p) ** 2).sum(axis=1), args.k)[:args.k] for p in few])
+        print(f"  brute    {len(few) / s_brute / 1e3:7.3f} k queries/s (knn, x{(len(few) / s_brute) ** -1 * args.queries / s_knn:.0f} slower)")
+        if not args.no_kdtree:
+            from scipy.spatial import cKDTree
+
+            tree, s_tree = timed(cKDTree, pts)
+            _, s_tq = timed(tree.query, q, args.k)
+            print(f"  cKDTree  build {s_tree:.2f} s (one shot, no appends), knn {args.queries / s_tq / 1e3:.1f} k queries/s")
+        del index, pts
+
+
+if __name__ == "__main__":
+    main()
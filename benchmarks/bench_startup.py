@@ -0,0 +1,84 @@
+"""Cold-start time of the command-line entry points.
+
+Each command is started `--runs` times in a fresh interpreter with
+`--help` and timed to exit: the fixed cost paid before a command does
+any work. Every `python -m scanner` subcommand is timed next to running
+its tools/ script directly. The list of commands and `backends` are
+timed with the detection cache warm and cold.
+
+Sensor checks are timed two ways: a fresh process per check (what
+`run_all_tests.py` does, one interpreter per test), and `scanner check
+--repeat`, which keeps one worker process per sensor across checks.
+
+Usage:
+  python -m benchmarks.bench_startup
+  python -m benchmarks.bench_startup --runs 10 --checks 5
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from scanner.cli import COMMANDS, TOOLS
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def timed(cmd, runs, env):
+    """Median wall time (s) of `runs` fresh runs of `cmd`."""
+    times = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        proc = subprocess.run(cmd, env=env, cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        times.append(time.perf_counter() - t0)
+        if proc.returncode:
+            raise RuntimeError(f"{' '.join(cmd)} failed: {proc.stderr.decode()[-300:]}")
+    return sorted(times)[len(times) // 2]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CLI startup benchmark")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh starts per command")
+    parser.add_argument("--checks", type=int, default=3, help="Sensor checks for the worker comparison")
+    parser.add_argument("--duration", type=float, default=0.5, help="Seconds per sensor check")
+    args = parser.parse_args()
+
+    py = sys.executable
+    with tempfile.TemporaryDirectory() as cache:
+        env = dict(os.environ, SCANNER_CACHE_DIR=cache, PYTHONPATH=str(ROOT))
+        bare = timed([py, "-c", "pass"], args.runs, env)
+        print(f"python -c pass: {bare * 1e3:.0f} ms (interpreter floor)")
+
+        cold = []
+        for _ in range(args.runs):
+            for f in Path(cache).glob("*"):
+                f.unlink()
+            cold.append(timed([py, "-m", "scanner"], 1, env))
+        warm = timed([py, "-m", "scanner"], args.runs, env)
+        backends = timed([py, "-m", "scanner", "backends"], args.runs, env)
+        print(f"python -m scanner: {sorted(cold)[len(cold) // 2] * 1e3:.0f} ms with detection, "
+              f"{warm * 1e3:.0f} ms cached; backends {backends * 1e3:.0f} ms")
+
+        print(f"{'command':12s} {'scanner':>9s} {'script':>9s}   (--help, median of {args.runs})")
+        for name, (script, *_) in COMMANDS.items():
+            new = timed([py, "-m", "scanner", name, "--help"], args.runs, env)
+            old = timed([py, str(TOOLS / script), "--help"], args.runs, env)
+            print(f"{name:12s} {new * 1e3:7.0f}ms {old * 1e3:7.0f}ms")
+
+        check = [py, "-m", "scanner", "check", "--mock", "--sensors", "imu,range", "--duration", str(args.duration)]
+        t0 = time.perf_counter()
+        for _ in range(args.checks):
+            timed(check, 1, env)
+        fresh = time.perf_counter() - t0
+        reused = timed(check + ["--repeat", str(args.checks)], 1, env)
+        sampling = args.checks * args.duration
+        print(f"{args.checks} checks of {args.duration} s: {fresh:.2f} s with a process per check, "
+              f"{reused:.2f} s on long-lived workers (overhead {(fresh - sampling) / args.checks * 1e3:.0f} "
+              f"vs {(reused - sampling) / args.checks * 1e3:.0f} ms per check)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""Benchmark the batched TF-Luna decoder against byte-at-a-time parsing.
+
+Feeds a synthetic (or recorded raw) UART byte stream with injected bit
+flips, dropped bytes and garbage bursts through both decoders and reports
+throughput and recovered frame counts.
+
+Usage:
+  python -m benchmarks.bench_tfluna_decoder --frames 200000 --corrupt 0.01
+  python -m benchmarks.bench_tfluna_decoder --input capture.bin
+"""
+import argparse
+import time
+
+import numpy as np
+
+from hal.mocks import MockSerial
+from hal.tfluna import FRAME_HEADER, FRAME_LENGTH, TFLunaDecoder, encode_frames
+
+
+def legacy_read_frame(port):
+    # Original tools/tfluna_read.py implementation, kept as the baseline.
+    while True:
+        first = port.read(1)
+        if not first:
+            return None
+        if first[0] != FRAME_HEADER:
+            continue
+        second = port.read(1)
+        if not second:
+            return None
+        if second[0] != FRAME_HEADER:
+            continue
+        rest = port.read(FRAME_LENGTH - 2)
+        if len(rest) != FRAME_LENGTH - 2:
+            return None
+        frame = bytes([FRAME_HEADER, FRAME_HEADER]) + rest
+        checksum = sum(frame[0:8]) & 0xFF
+        if checksum != frame[8]:
+            continue
+        return frame
+
+
+def synthetic_stream(n_frames, corrupt, seed=0):
+    rng = np.random.default_rng(seed)
+    dist = rng.integers(20, 800, n_frames)
+    strength = rng.integers(100, 5000, n_frames)
+    temp = rng.uniform(20.0, 60.0, n_frames)
+    raw = np.frombuffer(encode_frames(dist, strength, temp), dtype=np.uint8).copy()
+
+    n_bad = int(n_frames * corrupt)
+    # Bit flips anywhere in the stream.
+    flips = rng.integers(0, len(raw), n_bad)
+    raw[flips] ^= rng.integers(1, 256, n_bad).astype(np.uint8)
+    # Dropped bytes (UART overruns) and garbage bursts (line noise).
+    keep = np.ones(len(raw), dtype=bool)
+    keep[rng.integers(0, len(raw), n_bad)] = False
+    raw = raw[keep]
+    pieces = np.split(raw, np.sort(rng.integers(0, len(raw), n_bad)))
+    out = bytearray()
+    for piece in pieces:
+        out += piece.tobytes()
+        out += rng.integers(0, 256, rng.integers(1, 12)).astype(np.uint8).tobytes()
+    return bytes(out)
+
+
+def bench_legacy(data, chunk):
+    port = MockSerial(data, chunk=chunk)
+    frames = 0
+    t0 = time.perf_counter()
+    while legacy_read_frame(port) is not None:
+        frames += 1
+    return frames, time.perf_counter() - t0
+
+
+def bench_decoder(data, chunk):
+    port = MockSerial(data, chunk=chunk)
+    dec = TFLunaDecoder()
+    frames = 0
+    t0 = time.perf_counter()
+    while port.in_waiting:
+        frames += len(dec.drain(port))
+    return frames, time.perf_counter() - t0, dec
+
+
+def main():
+    parser = argparse.ArgumentParser(description="TF-Luna decoder benchmark")
+    parser.add_argument("--frames", type=int, default=100000, help="Synthetic frames to generate")
+    parser.add_argument("--corrupt", type=float, default=0.01, help="Corruption events per frame")
+    parser.add_argument("--chunk", type=int, default=256, help="Bytes available per port read")
+    parser.add_argument("--input", default=None, help="Raw recorded UART bytes instead of synthetic data")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.input:
+        with open(args.input, "rb") as fh:
+            data = fh.read()
+    else:
+        data = synthetic_stream(args.frames, args.corrupt, args.seed)
+    mb = len(data) / 1e6
+    print(f"stream: {len(data)} bytes")
+
+    n_old, t_old = bench_legacy(data, args.chunk)
+    print(f"legacy read_frame: {n_old} frames in {t_old:.3f}s ({n_old / t_old:,.0f} frames/s, {mb / t_old:.2f} MB/s)")
+
+    n_new, t_new, dec = bench_decoder(data, args.chunk)
+    print(f"TFLunaDecoder:     {n_new} frames in {t_new:.3f}s ({n_new / t_new:,.0f} frames/s, {mb / t_new:.2f} MB/s)")
+    print(
+        f"counters: bad_checksum={dec.bad_checksum} dropped={dec.dropped} "
+        f"skipped_bytes={dec.skipped_bytes}"
+    )
+    print(f"speedup: {t_old / t_new:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
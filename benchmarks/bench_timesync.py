@@ -0,0 +1,87 @@
+"""Time-sync accuracy and as-of join throughput.
+
+Reports:
+  - stamp error against true emission time for a simulated TF-Luna read
+    in bursts by a jittery host loop, stamped at read end and from the
+    frame counter through a ClockEstimator
+  - offline `asof_indices` throughput joining a range stream onto IMU times
+  - streaming `AsOfJoin` throughput with both streams pushed in chunks
+
+Usage:
+  python -m benchmarks.bench_timesync
+  python -m benchmarks.bench_timesync --samples 1000000 --chunk 256
+"""
+import argparse
+import time
+
+import numpy as np
+
+from scanner.timesync import AsOfJoin, SensorClockStamp, asof_indices
+
+
+def stamp_errors(n, rate, skew_ppm, baud, seed):
+    rng = np.random.default_rng(seed)
+    emitted = 10.0 + np.arange(n) / rate * (1 + skew_ppm * 1e-6)
+    transmit = 9 * 10 / baud
+    # The host drains the UART every 5-40 ms, sometimes much later.
+    gaps = rng.uniform(0.005, 0.040, n)
+    gaps[rng.random(n) < 0.01] += 0.1
+    read_at = emitted[0] + np.cumsum(gaps)
+    end = read_at[np.searchsorted(read_at, emitted + transmit)] + rng.uniform(0, 2e-4, n)
+    stamp = SensorClockStamp("frame_index", scale=1.0 / rate, latency=transmit)
+    t0 = time.perf_counter()
+    got = np.array([stamp({"frame_index": k}, e - 1e-4, e) for k, e in enumerate(end)])
+    cost = (time.perf_counter() - t0) / n
+    warm = n // 4
+    return np.abs(end[warm:] - emitted[warm:]), np.abs(got[warm:] - emitted[warm:]), cost, stamp.report()
+
+
+def streams(n, seed):
+    rng = np.random.default_rng(seed)
+    dt = np.dtype([("t", "<f8"), ("v", "<f4")])
+    primary = np.zeros(n, dt)
+    primary["t"] = np.cumsum(rng.uniform(0.003, 0.005, n))
+    other = np.zeros(n * 2 // 5, dt)
+    other["t"] = np.cumsum(rng.uniform(0.009, 0.011, len(other)))
+    return primary, other
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time sync benchmark")
+    parser.add_argument("--samples", type=int, default=1000000, help="Primary samples for the join benchmarks")
+    parser.add_argument("--frames", type=int, default=20000, help="TF-Luna frames for the stamp accuracy run")
+    parser.add_argument("--chunk", type=int, default=256, help="Rows per push in the streaming join")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    naive, synced, cost, report = stamp_errors(args.frames, 100.0, 30.0, 115200, args.seed)
+    print(f"TF-Luna stamps ({args.frames} frames, 100 Hz, 30 ppm skew)")
+    for name, err in (("read end", naive), ("frame counter", synced)):
+        print(f"  {name:14s} error p50 {np.percentile(err, 50) * 1e3:7.3f} ms   p99 {np.percentile(err, 99) * 1e3:7.3f} ms"
+              f"   max {err.max() * 1e3:7.3f} ms")
+    print(f"  estimated skew {report['skew_ppm']:.1f} ppm, {cost * 1e6:.1f} us/stamp")
+
+    primary, other = streams(args.samples, args.seed)
+    t0 = time.perf_counter()
+    idx = asof_indices(primary["t"], other["t"], 0.006, "nearest")
+    elapsed = time.perf_counter() - t0
+    print(f"asof_indices   {len(primary) / elapsed / 1e6:6.1f} M rows/s ({(idx >= 0).mean() * 100:.1f}% matched)")
+
+    join = AsOfJoin("range", ["imu"], tolerance=0.006, direction="nearest", capacity=16 * args.chunk)
+    step = args.chunk
+    other_step = max(1, step * 2 // 5)
+    emitted = 0
+    t0 = time.perf_counter()
+    for k in range(0, len(primary), step):
+        join.push("range", primary[k:k + step])
+        j = k * 2 // 5
+        join.push("imu", other[j:j + other_step])
+        emitted += len(join.pop()["primary"])
+    join.close()
+    emitted += len(join.pop()["primary"])
+    elapsed = time.perf_counter() - t0
+    print(f"AsOfJoin       {emitted / elapsed / 1e6:6.1f} M rows/s (chunks of {step}, dropped {join.dropped})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""Voxel stream throughput, wire size and latency over localhost.
+
+Builds a voxel map from the same mock range/IMU batches as bench_voxel and
+publishes after every batch to one fast client and, with `--slow-delay`,
+one client that sleeps per message. Reports encode cost, bytes per voxel
+with and without zlib, delivered voxels/s and MB/s, end-to-end update
+latency, and how often the backlog policy dropped or coarsened updates.
+
+Usage:
+  python -m benchmarks.bench_transport --samples 500000 --voxel 0.01
+  python -m benchmarks.bench_transport --udp --policy drop --slow-delay 0.005
+"""
+import argparse
+import threading
+import time
+
+import numpy as np
+
+from benchmarks.bench_voxel import mock_batches
+from scanner.projection import project
+from scanner.transport import PointCloudClient, PointCloudServer, changed_voxels, encode_update
+from scanner.voxel import VoxelMap
+
+
+def wire_size(vmap, compress):
+    ijk, occ, hits = changed_voxels(vmap)
+    t0 = time.perf_counter()
+    msgs = encode_update(ijk, occ, hits, vmap.tick, vmap.voxel_size, compress=compress)
+    return sum(len(m) for m in msgs) / max(1, len(ijk)), time.perf_counter() - t0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Voxel transport benchmark")
+    parser.add_argument("--samples", type=int, default=500000)
+    parser.add_argument("--batch", type=int, default=5000)
+    parser.add_argument("--voxel", type=float, default=0.01)
+    parser.add_argument("--udp", action="store_true")
+    parser.add_argument("--policy", choices=("coarsen", "drop"), default="coarsen")
+    parser.add_argument("--max-queue", type=int, default=8)
+    parser.add_argument("--slow-delay", type=float, default=0.002, help="Per-message sleep of the slow client (0 = none)")
+    args = parser.parse_args()
+
+    batches = [project(*b) for b in mock_batches(args.samples, args.batch)]
+    vmap = VoxelMap(voxel_size=args.voxel)
+    server = PointCloudServer(udp=args.udp, max_queue=args.max_queue, policy=args.policy,
+                              send_buffer=None if args.udp else 1 << 16).start()
+    clients = [PointCloudClient(*server.address, udp=args.udp)]
+    if args.slow_delay > 0:
+        clients.append(PointCloudClient(*server.address, udp=args.udp, delay=args.slow_delay,
+                                        recv_buffer=None if args.udp else 1 << 16))
+    while len(server.clients) < len(clients):
+        time.sleep(0.01)
+
+    stop = threading.Event()
+
+    def pump(c):
+        while not stop.is_set():
+            c.receive(timeout=0.1)
+
+    threads = [threading.Thread(target=pump, args=(c,), daemon=True) for c in clients]
+    for t in threads:
+        t.start()
+
+    publish_s = 0.0
+    t_start = time.perf_counter()
+    for pts in batches:
+        vmap.insert(pts)
+        t0 = time.perf_counter()
+        server.publish(vmap)
+        publish_s += time.perf_counter() - t0
+    # Let the fast client drain, then the slow one catch up.
+    deadline = time.monotonic() + 30.0
+    while time.monotonic() < deadline and any(c.version < vmap.tick for c in clients):
+        server.publish(vmap)
+        time.sleep(0.05)
+    elapsed = time.perf_counter() - t_start
+    stats = server.report()
+    stop.set()
+    for t in threads:
+        t.join()
+    for c in clients:
+        c.close()
+    server.stop()
+
+    raw, _ = wire_size(vmap, compress=False)
+    packed, encode_s = wire_size(vmap, compress=True)
+    print(f"{len(vmap)} voxels from {sum(len(b) for b in batches)} points in {len(batches)} updates "
+          f"({'udp' if args.udp else 'tcp'}, policy={args.policy})")
+    print(f"wire size: {raw:.2f} B/voxel raw, {packed:.2f} B/voxel zlib; "
+          f"full-map encode {encode_s * 1e3:.1f} ms ({len(vmap) / encode_s / 1e6:.2f} M voxels/s)")
+    print(f"publish: {publish_s / len(batches) * 1e3:.2f} ms per update on the producer thread")
+    for name, c, s in zip(("fast", "slow"), clients, stats.values()):
+        lat = np.array(c.latency) * 1e3
+        voxels = len(c.store)
+        print(f"{name} client: {c.updates} updates, {voxels} voxels, {c.bytes / 1e6:.2f} MB, "
+              f"{voxels / elapsed:.0f} voxels/s, {c.bytes / elapsed / 1e6:.2f} MB/s, "
+              f"latency p50 {np.percentile(lat, 50):.2f} ms p99 {np.percentile(lat, 99):.2f} ms, "
+              f"dropped {s['dropped']} coarsened {s['coarsened']}, "
+              f"{'in sync' if c.version >= vmap.tick and voxels == len(vmap) else 'NOT in sync'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Voxel map insert throughput and peak memory, driven by the HAL mocks.
+
+Seeded MockRangefinder/MockIMU readings are interleaved on a synthetic
+250 Hz clock, projected with `scanner.projection`, and inserted into a
+`VoxelMap` batch by batch. Only the insert calls are timed.
+
+Usage:
+  python -m benchmarks.bench_voxel --samples 1000000 --voxel 0.01 --max-voxels 500000
+"""
+import argparse
+import time
+import tracemalloc
+
+import numpy as np
+
+from hal.mocks import MockIMU, MockRangefinder
+from scanner.projection import project
+from scanner.voxel import VoxelMap
+
+
+def mock_batches(n_samples, batch, seed=0, range_hz=250.0, imu_hz=100.0):
+    rng = MockRangefinder(seed=seed, base=2.0)
+    imu = MockIMU(seed=seed)
+    ratio = range_hz / imu_hz
+    t_range = 0.0
+    t_imu = 0.0
+    imu_t = [t_imu]
+    quats = [imu.read()["quat"]]
+    for start in range(0, n_samples, batch):
+        n = min(batch, n_samples - start)
+        d = np.array([rng.distance()["distance_m"] for _ in range(n)])
+        rt = t_range + np.arange(1, n + 1) / range_hz
+        t_range = rt[-1]
+        while t_imu < t_range:
+            t_imu += 1.0 / imu_hz
+            imu_t.append(t_imu)
+            quats.append(imu.read()["quat"])
+        keep = int(np.ceil(n / ratio)) + 2
+        yield d, rt, np.array(quats[-keep:]), np.array(imu_t[-keep:])
+        imu_t = imu_t[-1:]
+        quats = quats[-1:]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Voxel map benchmark")
+    parser.add_argument("--samples", type=int, default=500000)
+    parser.add_argument("--batch", type=int, default=25000)
+    parser.add_argument("--voxel", type=float, default=0.01)
+    parser.add_argument("--max-voxels", type=int, default=None)
+    parser.add_argument("--free-space", action="store_true", help="Also apply ray miss updates")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    batches = [project(*b) for b in mock_batches(args.samples, args.batch, args.seed)]
+    n_points = sum(len(b) for b in batches)
+
+    tracemalloc.start()
+    vmap = VoxelMap(voxel_size=args.voxel, max_voxels=args.max_voxels)
+    elapsed = 0.0
+    for pts in batches:
+        t0 = time.perf_counter()
+        vmap.insert(pts, origin=(0.0, 0.0, 0.0), free_space=args.free_space)
+        elapsed += time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"points inserted: {n_points} in {elapsed:.2f}s ({n_points / elapsed / 1e6:.2f} Mpts/s)")
+    print(f"voxels: {len(vmap)} (evicted {vmap.evicted}), map {vmap.nbytes / 1e6:.1f} MB, peak traced {peak / 1e6:.1f} MB")
+    snap = vmap.snapshot()
+    print(f"snapshot: {len(snap['count'])} voxels, checksum {float(snap['centroid'].sum()):.4f}")
+
+
+if __name__ == "__main__":
+    main()
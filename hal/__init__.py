@@ -1,16 +1,78 @@
 """Hardware Abstraction Layer (HAL) package.
 
-Provides abstract interfaces and mock implementations for sensors so
-the rest of the pipeline can be developed without physical hardware.
+Provides abstract interfaces and mock implementations for sensors and
+the pan/tilt head so the rest of the pipeline can be developed without
+physical hardware.
+
+Names are imported from their modules on first use, so `import hal` (or
+`from hal.tfluna import ...`) does not pull in the simulator, replay and
+acquisition code along with it.
 """
-from .interfaces import Camera, IMU, Rangefinder
-from .mocks import MockCamera, MockIMU, MockRangefinder
+import importlib
+
+_EXPORTS = {
+    "Acquisition": "acquisition",
+    "RateController": "adaptive",
+    "ENCODER_SAMPLE": "interfaces",
+    "FRAME_SAMPLE": "interfaces",
+    "IMU_SAMPLE": "interfaces",
+    "RANGE_SAMPLE": "interfaces",
+    "Actuator": "interfaces",
+    "Camera": "interfaces",
+    "IMU": "interfaces",
+    "Rangefinder": "interfaces",
+    "MockActuator": "mocks",
+    "MockCamera": "mocks",
+    "MockIMU": "mocks",
+    "MockRangefinder": "mocks",
+    "MockSerial": "mocks",
+    "ReplayCamera": "replay",
+    "ReplayClock": "replay",
+    "ReplayIMU": "replay",
+    "ReplayRangefinder": "replay",
+    "SessionRecorder": "replay",
+    "ScanScheduler": "scheduler",
+    "Room": "simulator",
+    "ScanSimulator": "simulator",
+    "TFLunaDecoder": "tfluna",
+}
 
 __all__ = [
+    "Acquisition",
+    "Actuator",
     "Camera",
     "IMU",
     "Rangefinder",
+    "RateController",
+    "ENCODER_SAMPLE",
+    "FRAME_SAMPLE",
+    "IMU_SAMPLE",
+    "RANGE_SAMPLE",
+    "MockActuator",
     "MockCamera",
     "MockIMU",
     "MockRangefinder",
+    "MockSerial",
+    "ReplayCamera",
+    "ReplayClock",
+    "ReplayIMU",
+    "ReplayRangefinder",
+    "Room",
+    "ScanScheduler",
+    "ScanSimulator",
+    "SessionRecorder",
+    "TFLunaDecoder",
 ]
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
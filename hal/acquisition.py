@@ -0,0 +1,302 @@
+"""Concurrent multi-sensor acquisition.
+
+Each sensor runs on its own thread (the HAL reads are blocking I/O, which
+releases the GIL) and writes into a preallocated ring buffer stamped with
+`time.monotonic()`. Consumers subscribe to a sensor and poll for whatever
+arrived since their last poll.
+
+    acq = Acquisition()
+    acq.add("imu", MockIMU(rate=100), rate=100)
+    acq.add("range", MockRangefinder(rate=250))
+    with acq:
+        sub = acq.subscribe("range")
+        while ...:
+            samples = sub.poll()
+    print(acq.report())
+"""
+import threading
+import time
+
+import numpy as np
+
+from scanner import instrument
+from scanner.timesync import EndStamp, jitter_report
+
+from .interfaces import FRAME_SAMPLE, IMU_SAMPLE, RANGE_SAMPLE, Camera, IMU, Rangefinder
+
+
+# Rings hold the same rows as the HAL's read_batch.
+IMU_DTYPE = IMU_SAMPLE
+RANGE_DTYPE = RANGE_SAMPLE
+CAMERA_DTYPE = FRAME_SAMPLE
+
+
+def _imu_record(r):
+    return r["quat"], r["accel"], r["gyro"]
+
+
+def _range_record(r):
+    return r["distance_m"], r.get("strength", 0), r.get("temperature_c", 0.0)
+
+
+def _camera_record(r):
+    return r["frame_id"], r.get("data")
+
+
+def sensor_binding(sensor):
+    """Return (read_fn, dtype, to_record) for a HAL sensor instance."""
+    if isinstance(sensor, IMU):
+        return sensor.read, IMU_DTYPE, _imu_record
+    if isinstance(sensor, Rangefinder):
+        return sensor.distance, RANGE_DTYPE, _range_record
+    if isinstance(sensor, Camera):
+        return sensor.capture, CAMERA_DTYPE, _camera_record
+    raise TypeError(f"not a HAL sensor: {type(sensor).__name__}")
+
+
+class RingBuffer:
+    """Fixed-capacity structured array addressed by a running sequence number."""
+
+    def __init__(self, capacity, dtype):
+        self.capacity = int(capacity)
+        self.data = np.zeros(self.capacity, dtype=dtype)
+        self.seq = 0
+        self._cond = threading.Condition()
+
+    def append(self, record):
+        with self._cond:
+            self.data[self.seq % self.capacity] = record
+            self.seq += 1
+            self._cond.notify_all()
+
+    def read_since(self, cursor, max_n=None):
+        """Return (records, new_cursor, lost) for everything after `cursor`.
+
+        `lost` counts records that were overwritten before being read.
+        """
+        with self._cond:
+            seq = self.seq
+            lost = max(0, seq - cursor - self.capacity)
+            cursor += lost
+            end = seq if max_n is None else min(seq, cursor + max_n)
+            idx = np.arange(cursor, end) % self.capacity
+            return self.data[idx], end, lost
+
+    def latest(self, n=1):
+        with self._cond:
+            n = min(n, self.seq, self.capacity)
+            idx = np.arange(self.seq - n, self.seq) % self.capacity
+            return self.data[idx]
+
+    def wait(self, cursor, timeout=None):
+        """Block until a record past `cursor` exists; return True if one does."""
+        with self._cond:
+            return self._cond.wait_for(lambda: self.seq > cursor, timeout)
+
+
+class Subscription:
+    def __init__(self, ring):
+        self._ring = ring
+        self.cursor = ring.seq
+        self.lost = 0
+
+    def poll(self, max_n=None):
+        records, self.cursor, lost = self._ring.read_since(self.cursor, max_n)
+        self.lost += lost
+        return records
+
+    def wait(self, timeout=None):
+        return self._ring.wait(self.cursor, timeout)
+
+
+class _Stats:
+    """Latency/lateness/interval history in fixed-size arrays."""
+
+    def __init__(self, window=4096):
+        self.window = window
+        self.latency = np.zeros(window)
+        self.lateness = np.zeros(window)
+        self.interval = np.zeros(window)
+        self.count = 0
+
+    def add(self, latency, lateness, interval):
+        i = self.count % self.window
+        self.latency[i] = latency
+        self.lateness[i] = lateness
+        self.interval[i] = interval
+        self.count += 1
+
+
+class SensorTask:
+    """Reads one sensor on a background thread at a fixed or free-running rate.
+
+    With `rate` set, reads are scheduled on absolute monotonic deadlines
+    (t0 + k / rate) so sleep error never accumulates; slots that are missed
+    entirely are skipped and counted as overruns. With `rate=None` the
+    thread reads back-to-back and the sensor's own blocking paces it.
+
+    `sync` turns (reading, read start, read end) into the sample time
+    stored in the ring, on the monotonic clock; see `scanner.timesync`.
+    The default stamps the read end.
+    """
+
+    def __init__(self, name, sensor, rate=None, capacity=4096, sync=None):
+        self.name = name
+        self.sensor = sensor
+        self.rate = rate
+        self.sync = sync or EndStamp()
+        self._read, dtype, self._to_record = sensor_binding(sensor)
+        self.ring = RingBuffer(capacity, dtype)
+        self.stats = _Stats()
+        self.overruns = 0
+        self.errors = 0
+        self.last_error = None
+        self.started_at = None
+        self.stopped_at = None
+        self._stop = threading.Event()
+        self._thread = None
+        labels = {"sensor": name}
+        self._m_read = instrument.histogram("hal_read_seconds", "HAL sensor read latency", labels)
+        self._m_samples = instrument.counter("hal_samples_total", "Samples read from HAL sensors", labels)
+        self._m_errors = instrument.counter("hal_read_errors_total", "HAL reads that raised", labels)
+        self._m_overruns = instrument.counter("hal_overruns_total", "Scheduled reads skipped", labels)
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name=f"acq-{self.name}", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=2.0):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def set_rate(self, hz):
+        """Change the rate; returns the rate set, or None if it is fixed.
+
+        A scheduled task changes its schedule. A free-running one passes
+        the rate on to the sensor, which sets its own output rate.
+        """
+        if hz <= 0:
+            raise ValueError(f"rate must be positive, got {hz}")
+        if self.rate:
+            self.rate = float(hz)
+            return self.rate
+        return self.sensor.set_rate(hz)
+
+    def _run(self):
+        period = 1.0 / self.rate if self.rate else 0.0
+        clock = time.monotonic
+        t0 = self.started_at = clock()
+        prev = t0
+        k = 0
+        while not self._stop.is_set():
+            if period != (1.0 / self.rate if self.rate else 0.0):
+                # set_rate(): start a new schedule from now.
+                period = 1.0 / self.rate
+                t0, k = clock(), 0
+            deadline = t0 + k * period
+            if period:
+                now = clock()
+                if deadline > now:
+                    if self._stop.wait(deadline - now):
+                        break
+                elif now - deadline >= period:
+                    missed = int((now - deadline) / period)
+                    self.overruns += missed
+                    self._m_overruns.inc(missed)
+                    k += missed
+                    deadline = t0 + k * period
+            start = clock()
+            try:
+                reading = self._read()
+            except Exception as e:
+                self.errors += 1
+                self.last_error = repr(e)
+                self._m_errors.inc()
+                k += 1
+                if not period:
+                    self._stop.wait(0.01)
+                continue
+            end = clock()
+            self.ring.append((self.sync(reading, start, end),) + tuple(self._to_record(reading)))
+            self.stats.add(end - start, start - deadline if period else 0.0, end - prev)
+            self._m_read.record(end - start)
+            self._m_samples.inc()
+            prev = end
+            k += 1
+        self.stopped_at = clock()
+
+    def report(self):
+        s = self.stats
+        n = min(s.count, s.window)
+        elapsed = (self.stopped_at or time.monotonic()) - (self.started_at or time.monotonic())
+        out = {
+            "samples": s.count,
+            "achieved_hz": s.count / elapsed if elapsed > 0 else 0.0,
+            "target_hz": self.rate,
+            "overruns": self.overruns,
+            "errors": self.errors,
+        }
+        if self.last_error:
+            out["last_error"] = self.last_error
+        if n:
+            lat = s.latency[:n] * 1e3
+            # Skip the first interval, which spans thread start-up.
+            intervals = s.interval[1:n] if n == s.count else s.interval[:n]
+            nominal = 1.0 / self.rate if self.rate else (np.median(intervals) if len(intervals) else 0.0)
+            jitter = np.abs(intervals - nominal) * 1e3
+            out["latency_ms"] = {
+                "mean": float(lat.mean()),
+                "p50": float(np.percentile(lat, 50)),
+                "p99": float(np.percentile(lat, 99)),
+                "max": float(lat.max()),
+            }
+            if len(jitter):
+                out["jitter_ms"] = {
+                    "p50": float(np.percentile(jitter, 50)),
+                    "p99": float(np.percentile(jitter, 99)),
+                    "max": float(jitter.max()),
+                }
+        out["sync"] = self.sync.report()
+        stamps = jitter_report(self.ring.latest(self.ring.capacity)["t"], 1.0 / self.rate if self.rate else None)
+        if "jitter_ms" in stamps:
+            out["stamp_jitter_ms"] = stamps["jitter_ms"]
+        return out
+
+
+class Acquisition:
+    """Runs several SensorTasks together and hands out subscriptions."""
+
+    def __init__(self):
+        self.tasks = {}
+
+    def add(self, name, sensor, rate=None, capacity=4096, sync=None):
+        if name in self.tasks:
+            raise ValueError(f"sensor {name!r} already added")
+        task = SensorTask(name, sensor, rate=rate, capacity=capacity, sync=sync)
+        self.tasks[name] = task
+        return task
+
+    def subscribe(self, name):
+        return Subscription(self.tasks[name].ring)
+
+    def start(self):
+        for task in self.tasks.values():
+            task.start()
+
+    def stop(self):
+        for task in self.tasks.values():
+            task._stop.set()
+        for task in self.tasks.values():
+            task.stop()
+
+    def report(self):
+        return {name: task.report() for name, task in self.tasks.items()}
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
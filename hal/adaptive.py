@@ -0,0 +1,209 @@
+"""Adaptive sample rates driven by motion and signal strength.
+
+`RateController` watches IMU and range samples as they arrive and sets
+each sensor's rate to what the scene needs:
+
+  - range: fast enough that consecutive ranges are `resolution` radians
+    apart at the current rotation speed, within `range_rates`. Stationary,
+    or with weak returns (zero distance or strength below `min_strength`
+    for most of the last `window` seconds), it drops to the minimum.
+    Until IMU samples arrive the rotation speed is unknown, and the rate
+    is left where it is.
+  - IMU: fast enough that the orientation turns at most `imu_step`
+    radians between samples, within `imu_rates`, and the minimum when
+    stationary. Weak returns do not slow it; the pose is still needed.
+
+Rates are rounded up to a few levels (for the range, by default the
+TF-Luna's own, `hal.tfluna.RATES`). They go up as soon as they are
+needed. They come down only after the lower level has held for `hold`
+seconds, so a pause in a sweep does not cause a burst of rate commands.
+
+Anything with `set_rate(hz)` can be driven: a HAL sensor, or a
+`hal.acquisition.SensorTask`. Time comes from the sample timestamps, so
+the same controller runs on live, replayed or simulated data.
+
+    ctl = RateController(rangefinder=acq.tasks["range"], imu=acq.tasks["imu"])
+    while ...:
+        ctl.update(imu_sub.poll(), range_sub.poll())
+    print(ctl.report())
+
+A range sample counts as a useful point when it is a good return and
+the beam has turned at least `resolution` since the last useful point;
+repeats of the same spot are not. Rotation is integrated from the gyro,
+so translation without rotation is not seen.
+"""
+import math
+
+import numpy as np
+
+from .tfluna import RATES
+
+
+GRAVITY = 9.80665
+
+
+def _level(hz, levels):
+    if levels is None:
+        return float(hz)
+    for level in levels:
+        if level >= hz:
+            return float(level)
+    return float(levels[-1])
+
+
+class _Knob:
+    """One `set_rate` target with its current rate and hold-down timer."""
+
+    def __init__(self, target, rates, levels):
+        self.target = target
+        self.lo, self.hi = rates
+        self.levels = levels
+        self.rate = None
+        self.fixed = False
+        self.changes = 0
+        self.samples = 0
+        self._lower_since = None
+
+    def want(self, hz, now, hold, adapt):
+        hz = _level(min(max(hz, self.lo), self.hi), self.levels)
+        if not adapt or self.target is None or self.fixed or hz == self.rate:
+            self._lower_since = None
+            return
+        if self.rate is not None and hz < self.rate:
+            if self._lower_since is None:
+                self._lower_since = now
+            if now - self._lower_since < hold:
+                return
+        self._lower_since = None
+        got = self.target.set_rate(hz)
+        if got is None:
+            self.fixed = True
+            return
+        self.rate = float(got)
+        self.changes += 1
+
+
+class RateController:
+    """Sets range and IMU rates from motion and signal; see the module docstring.
+
+    With `adapt=False` it only measures, which gives the fixed-rate
+    baseline for the same report.
+    """
+
+    def __init__(self, rangefinder=None, imu=None, resolution=math.radians(0.5), imu_step=0.01,
+                 range_rates=(10.0, 250.0), imu_rates=(10.0, 100.0), range_levels=RATES,
+                 imu_levels=(10, 25, 50, 100),
+                 still_gyro=0.05, still_accel=0.3, still_time=1.0, min_strength=100, weak_fraction=0.5,
+                 window=0.25, hold=1.0, adapt=True):
+        self.range = _Knob(rangefinder, range_rates, range_levels)
+        self.imu = _Knob(imu, imu_rates, imu_levels)
+        self.resolution = resolution
+        self.imu_step = imu_step
+        self.still_gyro = still_gyro
+        self.still_accel = still_accel
+        self.still_time = still_time
+        self.min_strength = min_strength
+        self.weak_fraction = weak_fraction
+        self.window = window
+        self.hold = hold
+        self.adapt = adapt
+        self.state = "moving"
+        self.useful = 0
+        self.seconds = {"moving": 0.0, "still": 0.0, "weak": 0.0}
+        self._now = None
+        self._start = None
+        self._moved_at = -math.inf
+        self._imu_t = np.zeros(0)
+        self._omega = np.zeros(0)
+        self._turned = np.zeros(0)
+        self._range_t = np.zeros(0)
+        self._good = np.zeros(0, dtype=bool)
+        self._last_bin = -1
+
+    def _add_imu(self, imu):
+        t = np.asarray(imu["t"], dtype=np.float64)
+        omega = np.linalg.norm(np.asarray(imu["gyro"], dtype=np.float64), axis=1)
+        jolt = np.abs(np.linalg.norm(np.asarray(imu["accel"], dtype=np.float64), axis=1) - GRAVITY)
+        moving = (omega > self.still_gyro) | (jolt > self.still_accel)
+        if moving.any():
+            self._moved_at = max(self._moved_at, float(t[moving][-1]))
+        prev_t = self._imu_t[-1] if len(self._imu_t) else t[0]
+        prev_turned = self._turned[-1] if len(self._turned) else 0.0
+        dt = np.clip(np.diff(t, prepend=prev_t), 0.0, 0.1)
+        turned = prev_turned + np.cumsum(omega * dt)
+        keep = t[-1] - 2 * max(self.window, self.still_time)
+        i = np.searchsorted(self._imu_t, keep)
+        self._imu_t = np.r_[self._imu_t[i:], t]
+        self._omega = np.r_[self._omega[i:], omega]
+        self._turned = np.r_[self._turned[i:], turned]
+
+    def _turned_at(self, t):
+        if not len(self._imu_t):
+            return np.zeros(len(t))
+        # Past the last IMU sample, carry on at its rotation speed.
+        ahead = np.maximum(t - self._imu_t[-1], 0.0) * self._omega[-1]
+        return np.interp(t, self._imu_t, self._turned) + ahead
+
+    def _add_ranges(self, ranges):
+        t = np.asarray(ranges["t"], dtype=np.float64)
+        good = np.asarray(ranges["distance_m"]) > 0
+        if "strength" in ranges.dtype.names:
+            good &= np.asarray(ranges["strength"]) >= self.min_strength
+        bins = np.floor(self._turned_at(t[good]) / self.resolution).astype(np.int64)
+        fresh = np.unique(bins[bins > self._last_bin])
+        self.useful += len(fresh)
+        if len(fresh):
+            self._last_bin = int(fresh[-1])
+        i = np.searchsorted(self._range_t, t[-1] - self.window)
+        self._range_t = np.r_[self._range_t[i:], t]
+        self._good = np.r_[self._good[i:], good]
+
+    def update(self, imu=None, ranges=None):
+        """Take the samples that arrived since the last call; returns the state."""
+        stamps = []
+        if imu is not None and len(imu):
+            self._add_imu(imu)
+            self.imu.samples += len(imu)
+            stamps.append(float(imu["t"][-1]))
+        if ranges is not None and len(ranges):
+            self._add_ranges(ranges)
+            self.range.samples += len(ranges)
+            stamps.append(float(ranges["t"][-1]))
+        if not stamps:
+            return self.state
+        now = max(stamps)
+        if self._now is not None:
+            self.seconds[self.state] += max(0.0, now - self._now)
+        else:
+            self._start = now
+        self._now = now
+
+        recent = self._imu_t >= now - self.window
+        omega = float(self._omega[recent].max()) if recent.any() else 0.0
+        still = now - self._moved_at >= self.still_time and len(self._imu_t) > 0
+        weak = len(self._good) > 0 and 1.0 - self._good.mean() >= self.weak_fraction
+        self.state = "still" if still else "weak" if weak else "moving"
+        low = still or weak
+        if low:
+            self.range.want(self.range.lo, now, self.hold, self.adapt)
+        elif len(self._imu_t):
+            self.range.want(omega / self.resolution, now, self.hold, self.adapt)
+        if len(self._imu_t):
+            self.imu.want(self.imu.lo if still else omega / self.imu_step, now, self.hold, self.adapt)
+        return self.state
+
+    def report(self):
+        elapsed = (self._now - self._start) if self._now is not None else 0.0
+        total = self.range.samples + self.imu.samples
+        out = {"seconds": elapsed, "useful_points": self.useful, "state_seconds": dict(self.seconds)}
+        for name, knob in (("range", self.range), ("imu", self.imu)):
+            out[name] = {
+                "samples": knob.samples,
+                "mean_hz": knob.samples / elapsed if elapsed > 0 else 0.0,
+                "rate_hz": knob.rate,
+                "changes": knob.changes,
+                "fixed": knob.fixed,
+            }
+        out["samples_per_useful_point"] = total / self.useful if self.useful else math.inf
+        out["range_samples_per_useful_point"] = self.range.samples / self.useful if self.useful else math.inf
+        return out
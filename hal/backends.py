@@ -0,0 +1,107 @@
+"""Which optional libraries and devices this machine has.
+
+`detect()` reports, for each backend in `MODULES`, whether its module can
+be found on this interpreter, without importing it (so a broken or slow
+library costs nothing). The answer is cached in a JSON file under
+`$SCANNER_CACHE_DIR` (default `~/.cache/scanner`) for each interpreter.
+It is worked out again when Python changes or when a directory on
+`sys.path` changes, as it does when a package is installed or removed.
+Device nodes are cheap to check and come and go, so they are never
+cached.
+
+    found = detect()
+    if not found["modules"]["picamera2"]:
+        ...
+    missing(["numpy", "serial"])        # -> names of the backends not found
+"""
+import hashlib
+import importlib.util
+import json
+import os
+import sys
+from pathlib import Path
+
+
+# Backend name -> top-level module.
+MODULES = {
+    "numpy": "numpy",
+    "scipy": "scipy",
+    "opencv": "cv2",
+    "picamera2": "picamera2",
+    "serial": "serial",
+    "board": "board",
+    "busio": "busio",
+    "bno055": "adafruit_bno055",
+}
+# What to install for each, for error messages.
+INSTALL = {
+    "numpy": "pip install numpy",
+    "scipy": "pip install scipy",
+    "opencv": "sudo apt install -y python3-opencv (or pip install opencv-python)",
+    "picamera2": "sudo apt install -y python3-picamera2",
+    "serial": "pip install pyserial",
+    "board": "pip install adafruit-blinka",
+    "busio": "pip install adafruit-blinka",
+    "bno055": "pip install adafruit-circuitpython-bno055",
+}
+DEVICES = {
+    "serial0": "/dev/serial0",
+    "ttyUSB0": "/dev/ttyUSB0",
+    "i2c-1": "/dev/i2c-1",
+    "video0": "/dev/video0",
+}
+
+
+def cache_dir():
+    return Path(os.environ.get("SCANNER_CACHE_DIR") or Path.home() / ".cache" / "scanner")
+
+
+def _fingerprint():
+    """Changes whenever the set of importable modules might have."""
+    parts = [sys.executable, sys.version]
+    for entry in sys.path:
+        try:
+            parts.append(f"{entry}:{os.stat(entry or '.').st_mtime_ns}")
+        except OSError:
+            parts.append(f"{entry}:-")
+    return hashlib.sha1("\n".join(parts).encode()).hexdigest()
+
+
+def _find(module):
+    try:
+        spec = importlib.util.find_spec(module)
+    except (ImportError, ValueError):
+        return None
+    return None if spec is None else (spec.origin or "namespace")
+
+
+def detect(refresh=False):
+    """{"modules": {name: origin or None}, "devices": {name: bool}, "cached": bool}."""
+    path = cache_dir() / f"backends-{hashlib.sha1(sys.executable.encode()).hexdigest()[:12]}.json"
+    fingerprint = _fingerprint()
+    modules = None
+    if not refresh:
+        try:
+            cached = json.loads(path.read_text())
+            if cached.get("fingerprint") == fingerprint and set(cached["modules"]) == set(MODULES):
+                modules = cached["modules"]
+        except (OSError, ValueError, KeyError):
+            pass
+    cached = modules is not None
+    if modules is None:
+        modules = {name: _find(module) for name, module in MODULES.items()}
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_suffix(f".{os.getpid()}.tmp")
+            tmp.write_text(json.dumps({"fingerprint": fingerprint, "modules": modules}))
+            os.replace(tmp, path)
+        except OSError:
+            pass  # read-only home: detect again next time
+    devices = {name: os.path.exists(dev) for name, dev in DEVICES.items()}
+    return {"python": sys.executable, "modules": modules, "devices": devices, "cached": cached}
+
+
+def missing(names, refresh=False):
+    """The backends among `names` that this interpreter does not have."""
+    modules = detect(refresh)["modules"]
+    return [name for name in names if not modules.get(name)]
@@ -0,0 +1,204 @@
+"""HAL implementations for the physical sensors on the scanner.
+
+Hardware libraries are imported when a driver is constructed, so importing
+this module works on machines without them.
+"""
+import math
+import time
+
+import numpy as np
+
+from .interfaces import IMU_SAMPLE, RANGE_SAMPLE, Camera, IMU, Rangefinder, batch_buffer, imu_reading, range_reading
+from .tfluna import DEFAULT_RATE, TFLunaDecoder, frame_times, rate_command, supported_rate
+
+
+class TFLunaRangefinder(Rangefinder):
+    """TF-Luna over UART.
+
+    Readings come out oldest-first. A read blocks (up to the serial
+    timeout) until a frame arrives, so callers are paced by the sensor's
+    own output rate rather than a sleep. The newest frame decoded from one
+    serial read is stamped with the time of that read and the earlier ones
+    a frame period apart before it, at `rate` (the sensor's configured
+    output rate; `set_rate` keeps it current), but never before the
+    previous read's last frame. `port` is a device path or
+    an open pyserial-like object.
+    """
+
+    def __init__(self, port="/dev/serial0", baud=115200, timeout=1.0, rate=DEFAULT_RATE):
+        if isinstance(port, str):
+            import serial
+
+            port = serial.Serial(port, baud, timeout=timeout)
+        self._port = port
+        self.rate = float(rate)
+        self._last_t = None
+        self.decoder = TFLunaDecoder()
+        self._pending = np.empty(0, dtype=RANGE_SAMPLE)
+        self._pending_index = np.empty(0, dtype=np.int64)
+
+    def _fill(self):
+        frames = self.decoder.drain(self._port)
+        batch = np.empty(len(frames), dtype=RANGE_SAMPLE)
+        batch["t"] = frame_times(len(frames), time.time(), self.rate, after=self._last_t)
+        if len(frames):
+            self._last_t = float(batch["t"][-1])
+        batch["distance_m"] = frames["distance_cm"] / 100.0
+        batch["strength"] = frames["strength"]
+        batch["temperature_c"] = frames["temperature_c"]
+        # Frames the sensor has sent so far, lost ones included: its clock
+        # in frame periods, for scanner.timesync.
+        index = self.decoder.frames + self.decoder.dropped - len(frames) + np.arange(len(frames))
+        if len(self._pending):
+            batch = np.concatenate([self._pending, batch])
+            index = np.concatenate([self._pending_index, index])
+        self._pending, self._pending_index = batch, index
+
+    def read_batch(self, max_n=256, timeout=None, out=None):
+        buf = batch_buffer(RANGE_SAMPLE, max_n, out)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        if not len(self._pending):
+            self._fill()
+        while len(self._pending) < max_n and (deadline is None or time.monotonic() < deadline):
+            before = len(self._pending)
+            self._fill()
+            if len(self._pending) == before:
+                break  # serial timeout with nothing new
+        n = min(max_n, len(self._pending))
+        buf[:n] = self._pending[:n]
+        self.last_index = int(self._pending_index[n - 1]) if n else None
+        self._pending = self._pending[n:]
+        self._pending_index = self._pending_index[n:]
+        return buf[:n]
+
+    def set_rate(self, hz):
+        """Send the output-rate command; returns the supported rate chosen.
+
+        "frame_index" only measures time at a fixed rate, so stamp by read
+        end when the rate is being changed.
+        """
+        hz = supported_rate(hz)
+        self._port.write(rate_command(hz))
+        self.rate = hz
+        return hz
+
+    def distance(self):
+        """One reading; "frame_index" counts frames since the port opened."""
+        batch = self.read_batch(1)
+        if not len(batch):
+            raise TimeoutError("no TF-Luna frame before serial timeout")
+        reading = range_reading(batch)
+        reading["frame_index"] = self.last_index
+        return reading
+
+    def close(self):
+        self._port.close()
+
+
+# BNO055 data registers from ACC_DATA_X_LSB: accel, mag, gyro, euler and
+# quaternion as little-endian int16, 32 bytes in all.
+_BNO055_DATA = 0x08
+_BNO055_BLOCK = 32
+_BNO055_ACCEL = 1 / 100.0                   # m/s^2 per LSB
+_BNO055_GYRO = math.radians(1 / 16.0)       # rad/s per LSB (dps/16)
+_BNO055_QUAT = 1 / (1 << 14)
+
+
+class BNO055IMU(IMU):
+    """BNO055 over I2C using the Adafruit CircuitPython driver.
+
+    `read_batch` reads the whole data block in one I2C transaction per
+    sample and decodes the batch with NumPy. The driver properties need a
+    separate transaction for each of accel, gyro and quaternion. `rate`
+    paces batch reads. The BNO055 fuses at 100 Hz and has no FIFO, so
+    polling faster only returns repeated samples.
+    """
+
+    def __init__(self, address=0x28, rate=100.0):
+        import board
+        import busio
+        import adafruit_bno055
+
+        i2c = busio.I2C(board.SCL, board.SDA)
+        self._sensor = adafruit_bno055.BNO055_I2C(i2c, address=address)
+        self.rate = rate
+        self._raw = np.zeros((0, _BNO055_BLOCK), dtype=np.uint8)
+        self._register = bytes([_BNO055_DATA])
+
+    def read_batch(self, max_n=64, timeout=None, out=None):
+        buf = batch_buffer(IMU_SAMPLE, max_n, out)
+        if len(self._raw) < max_n:
+            self._raw = np.zeros((max_n, _BNO055_BLOCK), dtype=np.uint8)
+        period = 1.0 / self.rate if self.rate else 0.0
+        start = time.monotonic()
+        device = self._sensor.i2c_device
+        n = 0
+        while n < max_n:
+            if n:
+                due = start + n * period
+                now = time.monotonic()
+                if timeout is not None and max(due, now) - start >= timeout:
+                    break
+                if due > now:
+                    time.sleep(due - now)
+            with device as i2c:
+                i2c.write_then_readinto(self._register, memoryview(self._raw[n]))
+            buf["t"][n] = time.time()
+            n += 1
+        words = self._raw[:n].view("<i2")
+        buf["accel"][:n] = words[:, 0:3] * _BNO055_ACCEL
+        buf["gyro"][:n] = words[:, 6:9] * _BNO055_GYRO
+        buf["quat"][:n] = words[:, 12:16] * _BNO055_QUAT
+        return buf[:n]
+
+    def read(self):
+        return imu_reading(self.read_batch(1))
+
+    def set_rate(self, hz):
+        """Polling rate for batch reads, up to the 100 Hz fusion rate."""
+        self.rate = min(float(hz), 100.0)
+        return self.rate
+
+    def close(self):
+        pass
+
+
+class PiCamera(Camera):
+    """Pi Camera 3 through picamera2.
+
+    With `gray`, the camera is configured for YUV420 and `capture` returns
+    the Y plane, a zero-copy view that works directly as a grayscale
+    image for marker detection.
+    """
+
+    def __init__(self, size=(1280, 720), gray=False):
+        from picamera2 import Picamera2
+
+        self._camera = Picamera2()
+        main = {"size": tuple(size)}
+        if gray:
+            main["format"] = "YUV420"
+        config = self._camera.create_preview_configuration(main=main)
+        self._camera.configure(config)
+        self._camera.start()
+        self._gray_rows = size[1] if gray else None
+        self._counter = 0
+
+    def capture(self):
+        """One frame; "sensor_timestamp" is mid-exposure on the kernel clock (s)."""
+        request = self._camera.capture_request()
+        try:
+            frame = request.make_array("main")
+            metadata = request.get_metadata()
+        finally:
+            request.release()
+        if self._gray_rows:
+            frame = frame[:self._gray_rows]
+        self._counter += 1
+        out = {"timestamp": time.time(), "frame_id": self._counter, "data": frame}
+        if "SensorTimestamp" in metadata:
+            out["sensor_timestamp"] = (metadata["SensorTimestamp"] + 500 * metadata.get("ExposureTime", 0)) * 1e-9
+        return out
+
+    def close(self):
+        self._camera.stop()
@@ -1,5 +1,96 @@
+"""Abstract sensor interfaces.
+
+Each sensor has a single-sample method (`capture`, `read`, `distance`)
+that returns one dict, and `read_batch(max_n, timeout, out)`, which returns
+up to `max_n` samples as a structured array (`FRAME_SAMPLE`, `IMU_SAMPLE`,
+`RANGE_SAMPLE`). The defaults here build the batch from repeated single
+reads. Sensors that can do better override `read_batch` and implement
+the single read on top of it. `IMU_SAMPLE` and `RANGE_SAMPLE` have the
+same layout as the scan log records, so a batch can be appended to a
+`.scanlog` as it is.
+
+An `Actuator` is the pan/tilt head. `move_to` starts a move and returns
+at once. Its encoder readings come back as `ENCODER_SAMPLE` batches, so a
+scan can tag each range with the head angle at that range's timestamp.
+
+`read_batch` reads until it has `max_n` samples or `timeout` seconds
+have passed since the call, and may return zero rows when `timeout`
+expires (or a recorded or serial source is exhausted) before anything
+arrives. The default built from single reads blocks on its first
+sample. With `out`, samples are written into that preallocated array
+and a view of its first n rows is returned.
+
+`set_rate(hz)` changes how often a sensor produces samples and returns
+the rate it actually set, or None if the rate is fixed (the default).
+"""
+import time
 from abc import ABC, abstractmethod
 
+import numpy as np
+
+
+FRAME_SAMPLE = np.dtype([("t", "<f8"), ("frame_id", "<i8"), ("data", "O")])
+IMU_SAMPLE = np.dtype(
+    [
+        ("t", "<f8"),
+        ("quat", "<f4", (4,)),
+        ("accel", "<f4", (3,)),
+        ("gyro", "<f4", (3,)),
+    ]
+)
+RANGE_SAMPLE = np.dtype(
+    [
+        ("t", "<f8"),
+        ("distance_m", "<f4"),
+        ("strength", "<u2"),
+        ("temperature_c", "<f4"),
+    ]
+)
+ENCODER_SAMPLE = np.dtype([("t", "<f8"), ("pan", "<f4"), ("tilt", "<f4")])
+
+
+def batch_buffer(dtype, max_n, out=None):
+    """`out` checked against `dtype` and `max_n`, or a new array."""
+    if out is None:
+        return np.empty(max_n, dtype=dtype)
+    if out.dtype != dtype or len(out) < max_n:
+        raise ValueError(f"out must be a {dtype} array of at least {max_n} rows")
+    return out
+
+
+def _collect(read, to_row, dtype, max_n, timeout, out):
+    buf = batch_buffer(dtype, max_n, out)
+    deadline = None if timeout is None else time.monotonic() + timeout
+    n = 0
+    while n < max_n:
+        buf[n] = to_row(read())
+        n += 1
+        if deadline is not None and time.monotonic() >= deadline:
+            break
+    return buf[:n]
+
+
+def imu_reading(batch, i=0):
+    """Row `i` of an IMU_SAMPLE batch as a `read()` dict."""
+    return {
+        "timestamp": float(batch["t"][i]),
+        "accel": batch["accel"][i].tolist(),
+        "gyro": batch["gyro"][i].tolist(),
+        "quat": batch["quat"][i].tolist(),
+    }
+
+
+def encoder_reading(batch, i=0):
+    """Row `i` of an ENCODER_SAMPLE batch as a `position()` dict."""
+    t, pan, tilt = batch[i].item()
+    return {"timestamp": t, "pan": pan, "tilt": tilt}
+
+
+def range_reading(batch, i=0):
+    """Row `i` of a RANGE_SAMPLE batch as a `distance()` dict."""
+    t, distance_m, strength, temperature_c = batch[i].item()
+    return {"timestamp": t, "distance_m": distance_m, "strength": strength, "temperature_c": temperature_c}
+
 
 class Camera(ABC):
     """Abstract camera interface."""
@@ -11,6 +102,11 @@ class Camera(ABC):
         Returns a dict with at least a `timestamp` and `frame_id` or `data`.
         """
 
+    def read_batch(self, max_n=8, timeout=None, out=None):
+        """Up to `max_n` frames as a FRAME_SAMPLE array."""
+        return _collect(self.capture, lambda f: (f["timestamp"], f.get("frame_id", 0), f.get("data")),
+                        FRAME_SAMPLE, max_n, timeout, out)
+
 
 class IMU(ABC):
     """Abstract IMU interface."""
@@ -19,6 +115,15 @@ class IMU(ABC):
     def read(self):
         """Return a single IMU reading (accel, gyro, quat) as a dict."""
 
+    def read_batch(self, max_n=64, timeout=None, out=None):
+        """Up to `max_n` readings as an IMU_SAMPLE array."""
+        return _collect(self.read, lambda r: (r["timestamp"], r["quat"], r["accel"], r["gyro"]),
+                        IMU_SAMPLE, max_n, timeout, out)
+
+    def set_rate(self, hz):
+        """Set the sampling rate in Hz; returns the rate set, or None if fixed."""
+        return None
+
 
 class Rangefinder(ABC):
     """Abstract rangefinder/sonar interface."""
@@ -26,3 +131,46 @@ class Rangefinder(ABC):
     @abstractmethod
     def distance(self):
         """Return the latest distance reading (meters) as a dict."""
+
+    def read_batch(self, max_n=256, timeout=None, out=None):
+        """Up to `max_n` readings as a RANGE_SAMPLE array."""
+        return _collect(self.distance, lambda r: (r["timestamp"], r["distance_m"], r.get("strength", 0),
+                                                  r.get("temperature_c", 0.0)),
+                        RANGE_SAMPLE, max_n, timeout, out)
+
+    def set_rate(self, hz):
+        """Set the output rate in Hz; returns the rate set, or None if fixed."""
+        return None
+
+
+class Actuator(ABC):
+    """Abstract pan/tilt head interface. Angles are radians."""
+
+    @abstractmethod
+    def move_to(self, pan, tilt, speed=None, through=False):
+        """Start moving to (pan, tilt) at up to `speed` rad/s; returns at once.
+
+        A new move replaces the one in progress, starting from wherever
+        the head is. With `through`, the head does not brake for the
+        target: it passes it at `speed` and carries on in the same
+        direction until the next move, which must come in time. That is
+        how the waypoints of a continuous path are fed in.
+        """
+
+    @abstractmethod
+    def moving(self):
+        """True until the last commanded move has finished."""
+
+    @abstractmethod
+    def position(self):
+        """Return the latest encoder reading (timestamp, pan, tilt) as a dict."""
+
+    def stop(self):
+        """Stop where the head is now (it still decelerates)."""
+        p = self.position()
+        self.move_to(p["pan"], p["tilt"])
+
+    def read_batch(self, max_n=64, timeout=None, out=None):
+        """Up to `max_n` encoder readings as an ENCODER_SAMPLE array."""
+        return _collect(self.position, lambda r: (r["timestamp"], r["pan"], r["tilt"]),
+                        ENCODER_SAMPLE, max_n, timeout, out)
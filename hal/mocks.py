@@ -1,45 +1,616 @@
 """Mock sensor implementations for development without hardware."""
+import math
 import time
 import random
 
-from .interfaces import Camera, IMU, Rangefinder
+from .interfaces import (
+    ENCODER_SAMPLE,
+    IMU_SAMPLE,
+    RANGE_SAMPLE,
+    Actuator,
+    Camera,
+    IMU,
+    Rangefinder,
+    batch_buffer,
+    encoder_reading,
+    imu_reading,
+    range_reading,
+)
+
+
+def _np_rng(seed):
+    import numpy as np
+
+    return np.random.default_rng(seed)
+
+
+class _Pacer:
+    """Blocks each read until the next sample is due at `rate` Hz.
+
+    Deadlines are absolute (start + k * period) so the rate does not drift.
+    Like a sensor FIFO, at most `max_n` overdue samples are kept. If the
+    caller falls further behind, the oldest are skipped.
+    """
+
+    def __init__(self, rate=None):
+        self.period = 1.0 / rate if rate else 0.0
+        self._next = None
+
+    def wait(self):
+        self.take(1)
+
+    def take(self, max_n, timeout=None):
+        """Wait for up to `max_n` samples; return (n, due time of the first).
+
+        Returns once `max_n` samples are due or `timeout` seconds have
+        passed. Due times are time.monotonic() values, spaced one period
+        apart. Without a rate every sample is due at once (due time None).
+        """
+        if not self.period:
+            return max_n, None
+        now = time.monotonic()
+        if self._next is None:
+            self._next = now
+        elif now - self._next > max_n * self.period:
+            self._next = now - (max_n - 1) * self.period
+        stop = self._next + (max_n - 1) * self.period
+        if timeout is not None:
+            stop = min(stop, now + timeout)
+        if stop > now:
+            time.sleep(stop - now)
+        n = 0 if stop < self._next else min(max_n, int((stop - self._next) / self.period + 1e-9) + 1)
+        first = self._next
+        self._next += n * self.period
+        return n, first
+
+
+def _stamps(n, first, period):
+    """Wall-clock timestamps for `n` samples due from monotonic `first`."""
+    import numpy as np
+
+    now = time.time()
+    if first is None:
+        return np.full(n, now)
+    return now - (time.monotonic() - first) + np.arange(n) * period
 
 
 class MockCamera(Camera):
-    def __init__(self, seed=None):
+    """Mock Pi Camera.
+
+    By default frames are metadata-only placeholders. With `size=(w, h)`
+    each frame is a grayscale uint8 image containing real ArUco markers
+    (needs OpenCV) that drift around the frame, so detection can be
+    exercised and benchmarked without a camera. The true corner positions
+    are returned under "markers" as {id: (4, 2) corners}.
+    """
+
+    def __init__(self, seed=None, rate=None, size=None, marker_ids=(0, 1, 2, 3), marker_px=96,
+                 dictionary="DICT_4X4_50", motion_px=4.0):
         self._rand = random.Random(seed)
         self._counter = 0
+        self._pacer = _Pacer(rate)
+        self.size = tuple(size) if size else None
+        if self.size:
+            self._init_scene(marker_ids, marker_px, dictionary, motion_px)
+
+    def _init_scene(self, marker_ids, marker_px, dictionary, motion_px):
+        import cv2
+        import numpy as np
+
+        w, h = self.size
+        if w < 3 * marker_px or h < 3 * marker_px:
+            raise ValueError("frame too small for the requested marker size")
+        aruco = cv2.aruco.getPredefinedDictionary(getattr(cv2.aruco, dictionary))
+        self._markers = {i: cv2.aruco.generateImageMarker(aruco, i, marker_px) for i in marker_ids}
+        self.marker_px = marker_px
+        self.motion_px = motion_px
+        # Light, slightly uneven background with a white quiet zone implied.
+        ramp = np.linspace(170, 230, w, dtype=np.float32)
+        self._background = np.repeat(ramp[None, :], h, axis=0).astype(np.uint8)
+        # Each marker wanders on its own ellipse inside its own cell.
+        cols = int(np.ceil(np.sqrt(len(marker_ids))))
+        rows = int(np.ceil(len(marker_ids) / cols))
+        self._paths = []
+        for k, marker_id in enumerate(marker_ids):
+            cx = (k % cols + 0.5) * w / cols
+            cy = (k // cols + 0.5) * h / rows
+            rx = max(0.0, w / cols / 2 - marker_px)
+            ry = max(0.0, h / rows / 2 - marker_px)
+            phase = self._rand.uniform(0.0, 2.0 * np.pi)
+            self._paths.append((marker_id, cx, cy, rx, ry, phase))
+
+    def _render(self, k):
+        import numpy as np
+
+        image = self._background.copy()
+        truth = {}
+        side = self.marker_px
+        for marker_id, cx, cy, rx, ry, phase in self._paths:
+            radius = max(rx, ry, 1.0)
+            a = phase + k * self.motion_px / radius
+            x0 = int(round(cx + rx * np.cos(a) - side / 2))
+            y0 = int(round(cy + ry * np.sin(a) - side / 2))
+            image[y0:y0 + side, x0:x0 + side] = self._markers[marker_id]
+            x1 = x0 + side - 1
+            y1 = y0 + side - 1
+            truth[marker_id] = np.array([[x0, y0], [x1, y0], [x1, y1], [x0, y1]], dtype=np.float32)
+        return image, truth
 
     def capture(self):
-        """Return a tiny metadata-only frame placeholder."""
+        """Return a frame dict; `data` is an image when `size` is set."""
+        self._pacer.wait()
         self._counter += 1
-        return {
+        frame = {
             "timestamp": time.time(),
             "frame_id": self._counter,
             "data": f"mock-frame-{self._counter}",
         }
+        if self.size:
+            frame["data"], frame["markers"] = self._render(self._counter)
+        return frame
+
+
+def charuco_frames(board, camera_matrix, dist_coeffs, size=(800, 600), count=20, seed=0, distance=(0.45, 0.8),
+                   tilt_deg=35.0):
+    """Grayscale views of a `scanner.calibration.CharucoBoard` through a distorting lens.
+
+    Each view puts the board `distance` meters away, tilted up to
+    `tilt_deg` about each axis, and ray-traces every pixel through the
+    lens model onto it, so the frames calibrate back to `camera_matrix`
+    and `dist_coeffs`. Returns (frames, poses) with poses as (rvec, tvec)
+    of the board in the camera frame.
+    """
+    import cv2
+    import numpy as np
+
+    rng = _np_rng(seed)
+    w, h = size
+    k = np.asarray(camera_matrix, dtype=np.float64)
+    px = 120
+    margin = px // 2
+    flat = board.image(px, margin)
+    # Every output pixel's ray, undistorted once for all the views.
+    grid = np.stack(np.meshgrid(np.arange(w, dtype=np.float32), np.arange(h, dtype=np.float32)), axis=-1)
+    rays = cv2.undistortPoints(grid.reshape(-1, 1, 2), k, np.asarray(dist_coeffs, dtype=np.float64))
+    rays = np.concatenate([rays.reshape(-1, 2), np.ones((w * h, 1), dtype=np.float32)], axis=1).astype(np.float64)
+    cols, rows = board.squares
+    center = np.array([cols, rows, 0.0]) * board.square_length / 2.0
+    scale = px / board.square_length
+    frames, poses = [], []
+    for _ in range(count):
+        tilt = np.radians(rng.uniform(-tilt_deg, tilt_deg, 3)) * np.array([1.0, 1.0, 0.5])
+        rot, _ = cv2.Rodrigues(tilt)
+        z = rng.uniform(*distance)
+        t = np.array([rng.uniform(-0.35, 0.35) * z, rng.uniform(-0.25, 0.25) * z, z]) - rot @ center
+        # Where each ray meets the board plane, in board coordinates.
+        ray_b = rays @ rot
+        t_b = rot.T @ t
+        s = t_b[2] / ray_b[:, 2]
+        on_board = s[:, None] * ray_b[:, :2] - t_b[:2]
+        on_board[s <= 0] = -1.0
+        # Board image pixel i covers [i, i + 1), so its centre is at i + 0.5.
+        maps = (on_board * scale + margin - 0.5).astype(np.float32).reshape(h, w, 2)
+        frames.append(cv2.remap(flat, maps, None, cv2.INTER_LINEAR, borderMode=cv2.BORDER_CONSTANT, borderValue=180))
+        poses.append((cv2.Rodrigues(rot)[0].ravel(), t))
+    return frames, poses
+
+
+class ScriptedTrajectory:
+    """Ground-truth body pose as a function of time, for driving mocks.
+
+    position:    t -> (3,) world position in meters
+    orientation: t -> (4,) world-from-body quaternion (w, x, y, z)
+    """
+
+    def __init__(self, position, orientation):
+        self.position = position
+        self.orientation = orientation
+
+    @classmethod
+    def circle(cls, radius=1.0, period=10.0, height=1.2, center=(0.0, 0.0)):
+        """Walk a horizontal circle, facing along the direction of travel."""
+        import math
+
+        omega = 2.0 * math.pi / period
+
+        def position(t):
+            a = omega * t
+            return (center[0] + radius * math.cos(a), center[1] + radius * math.sin(a), height)
+
+        def orientation(t):
+            yaw = omega * t + math.pi / 2.0
+            return (math.cos(yaw / 2.0), 0.0, 0.0, math.sin(yaw / 2.0))
+
+        return cls(position, orientation)
+
+    def pose(self, t):
+        return self.position(t), self.orientation(t)
+
+    def acceleration(self, t, h=1e-3):
+        """World-frame acceleration by central difference."""
+        p0, p1, p2 = self.position(t - h), self.position(t), self.position(t + h)
+        return tuple((a - 2.0 * b + c) / (h * h) for a, b, c in zip(p0, p1, p2))
+
+
+def _quat_mul(a, b):
+    aw, ax, ay, az = a
+    bw, bx, by, bz = b
+    return (
+        aw * bw - ax * bx - ay * by - az * bz,
+        aw * bx + ax * bw + ay * bz - az * by,
+        aw * by - ax * bz + ay * bw + az * bx,
+        aw * bz + ax * by - ay * bx + az * bw,
+    )
+
+
+def _quat_rotate_inv(q, v):
+    """Rotate world vector `v` into the body frame of unit quaternion `q`."""
+    w, x, y, z = q
+    p = _quat_mul(_quat_mul((w, -x, -y, -z), (0.0,) + tuple(v)), q)
+    return p[1:]
 
 
 class MockIMU(IMU):
-    def __init__(self, seed=None):
+    """Mock BNO055.
+
+    By default readings are random. With a `trajectory`, readings follow it
+    the way a BNO055 would report them: `quat` is the true orientation with
+    a slowly growing yaw error (`yaw_drift` rad/s) plus noise, and `accel`
+    is the body-frame specific force (gravity included) plus noise.
+    Timestamps then run on simulated time, start + k / rate, and reads only
+    block when `realtime` is set.
+    """
+
+    GRAVITY = 9.80665
+
+    def __init__(self, seed=None, rate=None, trajectory=None, start=0.0, realtime=True, yaw_drift=0.0,
+                 accel_noise=0.0, quat_noise=0.0):
         self._rand = random.Random(seed)
+        self._pacer = _Pacer(rate if realtime or trajectory is None else None)
+        self.rate = rate
+        self.trajectory = trajectory
+        self.start = start
+        self.yaw_drift = yaw_drift
+        self.accel_noise = accel_noise
+        self.quat_noise = quat_noise
+        self._count = 0
+        self._np_rand = _np_rng(seed)
 
     def read(self):
-        return {
-            "timestamp": time.time(),
-            "accel": [self._rand.uniform(-1.0, 1.0) for _ in range(3)],
-            "gyro": [self._rand.uniform(-180.0, 180.0) for _ in range(3)],
-            "quat": [self._rand.uniform(-1.0, 1.0) for _ in range(4)],
-        }
+        return imu_reading(self.read_batch(1))
+
+    def read_batch(self, max_n=64, timeout=None, out=None):
+        import numpy as np
+
+        buf = batch_buffer(IMU_SAMPLE, max_n, out)
+        n, first = self._pacer.take(max_n, timeout)
+        if self.trajectory is not None:
+            for i in range(n):
+                r = self._read_trajectory()
+                buf[i] = (r["timestamp"], r["quat"], r["accel"], r["gyro"])
+            return buf[:n]
+        rng = self._np_rand
+        buf["t"][:n] = _stamps(n, first, self._pacer.period)
+        buf["accel"][:n] = rng.uniform(-1.0, 1.0, (n, 3))
+        buf["gyro"][:n] = rng.uniform(-180.0, 180.0, (n, 3))
+        buf["quat"][:n] = rng.uniform(-1.0, 1.0, (n, 4))
+        return buf[:n]
+
+    def set_rate(self, hz):
+        if self.trajectory is not None:
+            # Simulated time carries on from the next sample at the new spacing.
+            self.start += self._count / (self.rate or 100.0)
+            self._count = 0
+        if self._pacer.period or self.trajectory is None:
+            self._pacer = _Pacer(hz)
+        self.rate = hz
+        return hz
+
+    def _read_trajectory(self):
+        import math
+
+        t = self.start + self._count / (self.rate or 100.0)
+        self._count += 1
+        gauss = self._rand.gauss
+        q_true = self.trajectory.orientation(t)
+        half = 0.5 * self.yaw_drift * (t - self.start)
+        q = _quat_mul((math.cos(half), 0.0, 0.0, math.sin(half)), q_true)
+        q = [c + gauss(0.0, self.quat_noise) for c in q] if self.quat_noise else list(q)
+        acc = self.trajectory.acceleration(t)
+        specific = (acc[0], acc[1], acc[2] + self.GRAVITY)
+        accel = [c + gauss(0.0, self.accel_noise) if self.accel_noise else c
+                 for c in _quat_rotate_inv(q_true, specific)]
+        return {"timestamp": t, "accel": accel, "gyro": [0.0, 0.0, 0.0], "quat": q}
 
 
 class MockRangefinder(Rangefinder):
-    def __init__(self, seed=None, base=1.0):
-        self._rand = random.Random(seed)
+    """Mock TF-Luna: uniform noise of +-10 cm around `base` meters."""
+
+    def __init__(self, seed=None, base=1.0, rate=None):
+        self._rand = _np_rng(seed)
         self.base = base
+        self._pacer = _Pacer(rate)
 
     def distance(self):
-        return {
-            "timestamp": time.time(),
-            "distance_m": self.base + self._rand.uniform(-0.1, 0.1),
-        }
+        return range_reading(self.read_batch(1))
+
+    def read_batch(self, max_n=256, timeout=None, out=None):
+        buf = batch_buffer(RANGE_SAMPLE, max_n, out)
+        n, first = self._pacer.take(max_n, timeout)
+        buf["t"][:n] = _stamps(n, first, self._pacer.period)
+        buf["distance_m"][:n] = self.base + self._rand.uniform(-0.1, 0.1, n)
+        buf["strength"][:n] = 1200
+        buf["temperature_c"][:n] = 40.0
+        return buf[:n]
+
+    def set_rate(self, hz):
+        self._pacer = _Pacer(hz)
+        return hz
+
+
+def _plan(d, v0, vmax, accel, through=False):
+    """(duration, acceleration) pieces that go `d` from velocity `v0` to rest.
+
+    Trapezoidal: ramp to `vmax` (or as close as the distance allows),
+    cruise, ramp down. Reverses first if `v0` points away from the target
+    or is too fast to stop in time. With `through`, it only ramps to
+    `vmax` towards the target and leaves the cruise open-ended.
+    """
+    s = 1.0 if d > 0 or (d == 0 and v0 >= 0) else -1.0
+    u0, dist = v0 * s, abs(d)
+    if through:
+        return [(t, a) for t, a in [(abs(vmax - u0) / accel, accel * s if vmax >= u0 else -accel * s)] if t > 0]
+    if u0 < 0 or u0 * u0 / (2 * accel) > dist:
+        # Stop first, then come back from rest.
+        t_stop = abs(u0) / accel
+        moved = 0.5 * u0 * t_stop
+        return [(t_stop, -accel * s if u0 > 0 else accel * s)] + _plan(s * (dist - moved), 0.0, vmax, accel)
+    vc = min(vmax, math.sqrt(accel * dist + 0.5 * u0 * u0))
+    t_ramp = abs(vc - u0) / accel
+    d_ramp = abs(vc * vc - u0 * u0) / (2 * accel)
+    t_stop = vc / accel
+    cruise = max(0.0, dist - d_ramp - vc * vc / (2 * accel))
+    pieces = [(t_ramp, accel * s if vc >= u0 else -accel * s), (cruise / vc if vc > 0 else 0.0, 0.0),
+              (t_stop, -accel * s)]
+    return [(dt, a) for dt, a in pieces if dt > 0]
+
+
+class _Axis:
+    """One stepper axis as piecewise constant-acceleration knots.
+
+    Knot k holds (t, position, velocity, acceleration) from t until the
+    next knot. The last knot has no acceleration: at rest on the target,
+    or cruising after a `through` move. Knots live in growing arrays, and
+    a new move drops the ones after its start time.
+    """
+
+    def __init__(self, position=0.0):
+        import numpy as np
+
+        self._k = np.zeros((64, 4))
+        self._k[0] = (-np.inf, position, 0.0, 0.0)
+        self.n = 1
+
+    @property
+    def end(self):
+        """When the axis comes to rest (inf while cruising)."""
+        t, _, v, _ = self._k[self.n - 1]
+        return t if v == 0 else math.inf
+
+    def state(self, t):
+        """(position, velocity) at times `t`."""
+        import numpy as np
+
+        t = np.asarray(t, dtype=np.float64)
+        k = self._k[np.searchsorted(self._k[:self.n, 0], t, side="right") - 1]
+        dt = np.where(np.isfinite(k[..., 0]), t - k[..., 0], 0.0)
+        return k[..., 1] + k[..., 2] * dt + 0.5 * k[..., 3] * dt * dt, k[..., 2] + k[..., 3] * dt
+
+    def move(self, t0, target, vmax, accel, through=False):
+        import numpy as np
+
+        p, v = (float(x) for x in self.state(t0))
+        self.n = int(np.searchsorted(self._k[:self.n, 0], t0, side="right"))
+        pieces = _plan(target - p, v, vmax, accel, through)
+        if len(self._k) < self.n + len(pieces) + 1:
+            grown = np.zeros((2 * (self.n + len(pieces) + 1), 4))
+            grown[:self.n] = self._k[:self.n]
+            self._k = grown
+        t = t0
+        for dt, a in pieces:
+            self._k[self.n] = (t, p, v, a)
+            self.n += 1
+            p, v, t = p + v * dt + 0.5 * a * dt * dt, v + a * dt, t + dt
+        self._k[self.n] = (t, p, v, 0.0) if through else (t, target, 0.0, 0.0)
+        self.n += 1
+
+
+class MockActuator(Actuator):
+    """Mock stepper pan/tilt head.
+
+    Each axis follows a trapezoidal velocity profile with `max_speed`
+    (rad/s) and `accel` (rad/s^2), and its encoder reads whole steps of
+    2*pi / `steps_per_rev`. Both axes move at once, with their speeds in
+    proportion to the distance each has to go. A `through` move ramps to
+    speed and cruises until the next move replaces it.
+
+    The head runs on `clock()` seconds, time.time() by default, the same
+    clock the mock and TF-Luna ranges are stamped with. The encoder is
+    sampled at `rate` Hz. On the default clock, reads block like the
+    other mocks. With a `clock` of its own (a simulation), `read_batch`
+    returns the samples due by `clock()` at once, possibly none.
+    `angles(t)` gives the exact (unquantized) angles at any times, which
+    is what `hal.simulator.pan_tilt_rig` aims the simulated beam with.
+    """
+
+    def __init__(self, pan=0.0, tilt=0.0, max_speed=3.0, accel=20.0, steps_per_rev=3200, rate=1000.0,
+                 clock=None, tilt_limits=(-1.5, 1.5)):
+        self.max_speed = max_speed
+        self.accel = accel
+        self.step = 2.0 * math.pi / steps_per_rev
+        self.rate = rate
+        self.tilt_limits = tilt_limits
+        self._axes = (_Axis(pan), _Axis(tilt))
+        self._realtime = clock is None
+        self.clock = time.time if clock is None else clock
+        self._pacer = _Pacer(rate if self._realtime else None)
+        self._next = None
+
+    def angles(self, t):
+        """Exact (pan, tilt) at times `t`."""
+        return self._axes[0].state(t)[0], self._axes[1].state(t)[0]
+
+    def move_to(self, pan, tilt, speed=None, through=False):
+        lo, hi = self.tilt_limits
+        if not lo <= tilt <= hi:
+            raise ValueError(f"tilt {tilt:.3f} rad outside the head's limits {self.tilt_limits}")
+        speed = self.max_speed if speed is None else min(speed, self.max_speed)
+        t0 = self._now()
+        delta = [abs(target - float(ax.state(t0)[0])) for ax, target in zip(self._axes, (pan, tilt))]
+        span = max(math.hypot(*delta), 1e-12)
+        for ax, target, d in zip(self._axes, (pan, tilt), delta):
+            share = speed * d / span
+            if not through:
+                # A floor on the slower axis lets it still shed any velocity it has.
+                share = max(share, 0.1 * speed)
+            ax.move(t0, float(target), share, self.accel, through)
+
+    def _now(self):
+        now = self.clock()
+        if self._next is None:
+            # The encoder stream starts with the first thing asked of the head.
+            self._next = now
+        return now
+
+    def moving(self):
+        return self._now() < max(ax.end for ax in self._axes)
+
+    def position(self):
+        if self._realtime:
+            return encoder_reading(self.read_batch(1))
+        return encoder_reading(self._sample(self._now(), 1))
+
+    def _sample(self, t, max_n, out=None):
+        import numpy as np
+
+        buf = batch_buffer(ENCODER_SAMPLE, max_n, out)
+        n = len(t) if np.ndim(t) else 1
+        pan, tilt = self.angles(t)
+        buf["t"][:n] = t
+        buf["pan"][:n] = np.round(pan / self.step) * self.step
+        buf["tilt"][:n] = np.round(tilt / self.step) * self.step
+        return buf[:n]
+
+    def read_batch(self, max_n=64, timeout=None, out=None):
+        import numpy as np
+
+        if self._realtime:
+            n, first = self._pacer.take(max_n, timeout)
+            return self._sample(_stamps(n, first, self._pacer.period), max_n, out)
+        now = self._now()
+        n = max(0, min(max_n, int(np.floor((now - self._next) * self.rate + 1e-9)) + 1))
+        t = self._next + np.arange(n) / self.rate
+        self._next += n / self.rate
+        return self._sample(t, max_n, out)
+
+
+class MockSerial:
+    """Minimal pyserial stand-in that replays a fixed byte string.
+
+    `chunk` controls how many bytes become available per `read` call so
+    decoders see the same partial-frame boundaries a real UART produces.
+    """
+
+    def __init__(self, data, chunk=64):
+        self._data = bytes(data)
+        self._pos = 0
+        self.chunk = chunk
+
+    @property
+    def in_waiting(self):
+        return min(self.chunk, len(self._data) - self._pos)
+
+    def read(self, size=1):
+        size = min(size, self.in_waiting or size)
+        out = self._data[self._pos:self._pos + size]
+        self._pos += len(out)
+        return out
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class MockTFLunaSerial:
+    """pyserial stand-in for a live TF-Luna streaming at `rate` Hz.
+
+    Frames become readable on the wall clock as the sensor would emit
+    them, so tools read it exactly like the real UART. With
+    `corrupt_every=N`, every Nth frame has a bad checksum. Rate commands
+    written to it take effect at once.
+    """
+
+    def __init__(self, seed=None, rate=250.0, base=1.0, corrupt_every=0, timeout=1.0):
+        self._rand = random.Random(seed)
+        self.rate = rate
+        self.base = base
+        self.corrupt_every = corrupt_every
+        self.timeout = timeout
+        self._start = time.monotonic()
+        self._emitted = 0
+        self._pending = b""
+
+    def _due(self):
+        from .tfluna import FRAME_LENGTH, encode_frames
+
+        if not self.rate:
+            return
+        n = int((time.monotonic() - self._start) * self.rate) - self._emitted
+        if n > 0:
+            dist = [round(100 * (self.base + self._rand.uniform(-0.1, 0.1))) for _ in range(n)]
+            data = bytearray(encode_frames(dist, 1200, 40.0))
+            if self.corrupt_every:
+                for k in range(n):
+                    if (self._emitted + k + 1) % self.corrupt_every == 0:
+                        data[k * FRAME_LENGTH + FRAME_LENGTH - 1] ^= 0xFF
+            self._emitted += n
+            self._pending += bytes(data)
+
+    @property
+    def in_waiting(self):
+        self._due()
+        return len(self._pending)
+
+    def write(self, data):
+        """Accepts rate commands (`hal.tfluna.rate_command`) and echoes them back."""
+        from .tfluna import SET_RATE, parse_command
+
+        command = parse_command(data)
+        if command is not None and command[0] == SET_RATE:
+            self._due()
+            self.rate = float(int.from_bytes(command[1], "little"))
+            self._start = time.monotonic()
+            self._emitted = 0
+            self._pending += bytes(data)
+        return len(data)
+
+    def read(self, size=1):
+        deadline = time.monotonic() + self.timeout
+        while self.in_waiting < size and time.monotonic() < deadline:
+            time.sleep(min(1.0 / (self.rate or 100.0), max(0.0, deadline - time.monotonic())))
+        out, self._pending = self._pending[:size], self._pending[size:]
+        return out
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,368 @@
+"""Record live sensors and replay recorded sessions through the HAL interfaces.
+
+Replay sensors read a recording lazily, one line or one scan log chunk at
+a time, so a multi-GB session never has to fit in memory. Supported
+recordings:
+
+    ReplayRangefinder  tfluna_read text output, or the "range" stream of a .scanlog
+    ReplayIMU          bno055_quat_read text output, or the "imu" stream of a .scanlog
+    ReplayCamera       aruco_anchor_publisher JSONL, a SessionRecorder camera
+                       JSONL (with its raw frame file), or the "marker" stream
+                       of a .scanlog
+
+Playback speed comes from a ReplayClock. 1.0 is real time, N plays N times
+faster, and 0 plays as fast as the consumer reads. The recorded gaps
+between samples are kept at every non-zero speed. Sensors that share a
+clock stay in step with one another. Readings keep their recorded
+timestamps unless `retime` is set, which stamps them with the current
+time.time() instead, for consumers that expect live data.
+
+    clock = ReplayClock(speed=4.0)
+    imu = ReplayIMU("test_outputs/bno055_output.txt", clock=clock)
+    rng = ReplayRangefinder("scan.scanlog", clock=clock)
+
+    with SessionRecorder("session.scanlog") as rec:
+        imu = rec.wrap(BNO055IMU())          # still an IMU; every read is logged
+"""
+import json
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+from .interfaces import Camera, IMU, Rangefinder
+
+
+class ReplayClock:
+    """Maps recorded timestamps onto the wall clock.
+
+    The clock is anchored by the first sample any of its sensors plays.
+    After that, a sample recorded at `t` is released
+    `(t - t_first) / speed` seconds after the anchor.
+    """
+
+    def __init__(self, speed=1.0):
+        if speed is not None and speed < 0:
+            raise ValueError("speed must be >= 0")
+        self.speed = speed or 0.0
+        self._t0 = None
+        self._wall0 = None
+        self._lock = threading.Lock()
+
+    def wait(self, t):
+        if not self.speed:
+            return
+        with self._lock:
+            if self._t0 is None:
+                self._t0 = t
+                self._wall0 = time.monotonic()
+        delay = self._wall0 + (t - self._t0) / self.speed - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+    def reset(self):
+        with self._lock:
+            self._t0 = None
+            self._wall0 = None
+
+
+def _open_text(path):
+    from scanner.scanlog import parse_text_line
+
+    with open(path) as fh:
+        for line in fh:
+            parsed = parse_text_line(line)
+            if parsed is not None:
+                yield parsed
+
+
+def _scanlog_rows(path, stream):
+    from scanner.scanlog import ScanLogReader
+
+    log = ScanLogReader(path)
+    # Chunks are memory-mapped views; only the chunk being played is
+    # converted to Python values.
+    for cols in log.iter_chunks(stream):
+        names = list(cols)
+        for row in zip(*(cols[n].tolist() for n in names)):
+            yield dict(zip(names, row))
+
+
+def _is_scanlog(path):
+    from scanner.scanlog import is_scanlog
+
+    return is_scanlog(path)
+
+
+def _range_source(path):
+    if _is_scanlog(path):
+        for r in _scanlog_rows(path, "range"):
+            yield {"timestamp": r["t"], "distance_m": r["distance_m"], "strength": r["strength"],
+                   "temperature_c": r["temperature_c"]}
+        return
+    for ts, v in _open_text(path):
+        if "dist_cm" in v:
+            yield {"timestamp": ts, "distance_m": v["dist_cm"] / 100.0, "strength": v.get("strength", 0),
+                   "temperature_c": v.get("temp_c", 0.0)}
+
+
+def _imu_source(path):
+    if _is_scanlog(path):
+        for r in _scanlog_rows(path, "imu"):
+            yield {"timestamp": r["t"], "accel": r["accel"], "gyro": r["gyro"], "quat": r["quat"]}
+        return
+    for ts, v in _open_text(path):
+        if "qw" in v:
+            yield {"timestamp": ts, "accel": [0.0, 0.0, 0.0], "gyro": [0.0, 0.0, 0.0],
+                   "quat": [v["qw"], v["qx"], v["qy"], v["qz"]]}
+
+
+def _camera_source(path):
+    if _is_scanlog(path):
+        frame = None
+        for r in _scanlog_rows(path, "marker"):
+            if frame is None or r["t"] != frame["timestamp"]:
+                if frame is not None:
+                    yield frame
+                frame = {"timestamp": r["t"], "data": None, "markers": []}
+            m = {"id": r["id"]}
+            if r["has_pose"]:
+                m["tvec"] = r["tvec"]
+                m["rvec"] = r["rvec"]
+            else:
+                m["corners"] = r["corners"]
+            frame["markers"].append(m)
+        if frame is not None:
+            yield frame
+        return
+    images = None
+    with open(path) as fh:
+        for line in fh:
+            line = line.strip()
+            if not line:
+                continue
+            rec = json.loads(line)
+            frame = {"timestamp": rec["timestamp"], "data": None}
+            if "frame_id" in rec:
+                frame["frame_id"] = rec["frame_id"]
+            if "markers" in rec:
+                frame["markers"] = rec["markers"]
+            if "offset" in rec:
+                if images is None:
+                    images = np.memmap(_frames_path(path), dtype=np.uint8, mode="r")
+                dtype = np.dtype(rec["dtype"])
+                count = int(np.prod(rec["shape"]))
+                frame["data"] = np.frombuffer(images, dtype=dtype, count=count,
+                                              offset=rec["offset"]).reshape(rec["shape"])
+            yield frame
+
+
+def _frames_path(camera_path):
+    return Path(camera_path).with_suffix(".frames")
+
+
+class _ReplaySensor:
+    def __init__(self, source, clock=None, speed=1.0, retime=False):
+        self._source = source
+        self.clock = clock if clock is not None else ReplayClock(speed)
+        self.retime = retime
+        self.samples = 0
+        self.exhausted = False
+
+    def _next(self):
+        try:
+            reading = next(self._source)
+        except StopIteration:
+            self.exhausted = True
+            raise EOFError("recording exhausted") from None
+        self.clock.wait(reading["timestamp"])
+        self.samples += 1
+        if self.retime:
+            reading["recorded_timestamp"] = reading["timestamp"]
+            reading["timestamp"] = time.time()
+        return reading
+
+    def __iter__(self):
+        while True:
+            try:
+                yield self._next()
+            except EOFError:
+                return
+
+    def close(self):
+        close = getattr(self._source, "close", None)
+        if close:
+            close()
+
+
+class ReplayRangefinder(_ReplaySensor, Rangefinder):
+    """Plays back recorded range samples; raises EOFError at the end."""
+
+    def __init__(self, path, clock=None, speed=1.0, retime=False):
+        super().__init__(_range_source(str(path)), clock, speed, retime)
+
+    def distance(self):
+        return self._next()
+
+
+class ReplayIMU(_ReplaySensor, IMU):
+    """Plays back recorded IMU samples; raises EOFError at the end."""
+
+    def __init__(self, path, clock=None, speed=1.0, retime=False):
+        super().__init__(_imu_source(str(path)), clock, speed, retime)
+
+    def read(self):
+        return self._next()
+
+
+class ReplayCamera(_ReplaySensor, Camera):
+    """Plays back recorded frames; raises EOFError at the end.
+
+    `data` holds the recorded image when the session has one (a read-only
+    view of the raw frame file), otherwise None. Recorded marker
+    detections are returned under "markers".
+    """
+
+    def __init__(self, path, clock=None, speed=1.0, retime=False):
+        super().__init__(_camera_source(str(path)), clock, speed, retime)
+        self._counter = 0
+
+    def capture(self):
+        frame = self._next()
+        self._counter += 1
+        frame.setdefault("frame_id", self._counter)
+        return frame
+
+
+class SessionRecorder:
+    """Records live HAL sensors into one session.
+
+    Range and IMU readings go to a scan log at `path`. Camera frames go to
+    `<path stem>.camera.jsonl`, and with `images=True` the raw image
+    arrays are appended to `<path stem>.camera.frames`. ReplayRangefinder
+    and ReplayIMU read the scan log, and ReplayCamera reads the JSONL.
+    The proxies from `wrap` record single reads and `read_batch` batches
+    alike, and pass `set_rate` through to the sensor.
+    """
+
+    def __init__(self, path, images=True, metadata=None):
+        from scanner.scanlog import ScanLogWriter
+
+        self.path = Path(path)
+        self.camera_path = self.path.with_suffix(".camera.jsonl")
+        self.images = images
+        self._log = ScanLogWriter(self.path, metadata={"clock": "time.time", **(metadata or {})})
+        self._camera_fh = None
+        self._frames_fh = None
+        self._lock = threading.Lock()
+
+    def wrap(self, sensor):
+        """Return a recording proxy implementing the same HAL interface."""
+        if isinstance(sensor, IMU):
+            return _RecordingIMU(sensor, self)
+        if isinstance(sensor, Rangefinder):
+            return _RecordingRangefinder(sensor, self)
+        if isinstance(sensor, Camera):
+            return _RecordingCamera(sensor, self)
+        raise TypeError(f"not a HAL sensor: {type(sensor).__name__}")
+
+    def _range(self, r):
+        with self._lock:
+            self._log.append_one("range", (r["timestamp"], r["distance_m"], r.get("strength", 0),
+                                           r.get("temperature_c", 0.0)))
+
+    def _imu(self, r):
+        with self._lock:
+            self._log.append_one("imu", (r["timestamp"], r["quat"], r["accel"], r["gyro"]))
+
+    def _batch(self, stream, batch):
+        # RANGE_SAMPLE and IMU_SAMPLE share their field names with the log records.
+        if len(batch):
+            with self._lock:
+                self._log.append(stream, batch)
+
+    def _camera(self, frame):
+        rec = {"timestamp": frame["timestamp"], "frame_id": frame.get("frame_id")}
+        markers = frame.get("markers")
+        if isinstance(markers, dict):  # MockCamera ground truth: {id: corners}
+            rec["markers"] = [{"id": int(k), "corners": np.asarray(v).tolist()} for k, v in markers.items()]
+        elif markers is not None:
+            rec["markers"] = markers
+        data = frame.get("data")
+        with self._lock:
+            if self._camera_fh is None:
+                self._camera_fh = open(self.camera_path, "w")
+            if self.images and isinstance(data, np.ndarray):
+                if self._frames_fh is None:
+                    self._frames_fh = open(_frames_path(self.camera_path), "wb")
+                rec["offset"] = self._frames_fh.tell()
+                rec["shape"] = list(data.shape)
+                rec["dtype"] = data.dtype.str
+                self._frames_fh.write(np.ascontiguousarray(data).tobytes())
+            self._camera_fh.write(json.dumps(rec) + "\n")
+
+    def close(self):
+        with self._lock:
+            self._log.close()
+            for fh in (self._camera_fh, self._frames_fh):
+                if fh is not None:
+                    fh.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class _Recording:
+    def __init__(self, sensor, recorder):
+        self.sensor = sensor
+        self.recorder = recorder
+
+    def set_rate(self, hz):
+        set_rate = getattr(self.sensor, "set_rate", None)
+        return set_rate(hz) if set_rate else None
+
+    def close(self):
+        close = getattr(self.sensor, "close", None)
+        if close:
+            close()
+
+
+class _RecordingRangefinder(_Recording, Rangefinder):
+    def distance(self):
+        r = self.sensor.distance()
+        self.recorder._range(r)
+        return r
+
+    def read_batch(self, max_n=256, timeout=None, out=None):
+        batch = self.sensor.read_batch(max_n, timeout=timeout, out=out)
+        self.recorder._batch("range", batch)
+        return batch
+
+
+class _RecordingIMU(_Recording, IMU):
+    def read(self):
+        r = self.sensor.read()
+        self.recorder._imu(r)
+        return r
+
+    def read_batch(self, max_n=64, timeout=None, out=None):
+        batch = self.sensor.read_batch(max_n, timeout=timeout, out=out)
+        self.recorder._batch("imu", batch)
+        return batch
+
+
+class _RecordingCamera(_Recording, Camera):
+    def capture(self):
+        frame = self.sensor.capture()
+        self.recorder._camera(frame)
+        return frame
+
+    def read_batch(self, max_n=8, timeout=None, out=None):
+        batch = self.sensor.read_batch(max_n, timeout=timeout, out=out)
+        for t, frame_id, data in batch.tolist():
+            self.recorder._camera({"timestamp": t, "frame_id": frame_id, "data": data})
+        return batch
@@ -0,0 +1,209 @@
+"""Pan/tilt scan scheduling with on-the-fly range acquisition.
+
+A scan path is an array of `PATH_POINT` waypoints (pan, tilt, sweep). The
+head moves through them without stopping to read. The rangefinder streams
+the whole time, and each range is tagged with the head angle at its
+timestamp, interpolated between encoder samples.
+
+Moves into a `sweep` waypoint collect the scan. Their speed is set so
+consecutive ranges land `resolution` radians apart on the sphere, at the
+sensor's measured throughput. Throughput is re-measured every poll, and
+the move is re-issued at the new speed when the estimate moves by more
+than `retune`. Other moves (raster row changes) run at full speed.
+Sweep moves that lead into another sweep move pass through their
+waypoint without braking, and the next waypoint is sent just before it
+is reached, so a spiral is one continuous motion.
+
+    head, rng, sim = pan_tilt_rig(Room.default())
+    scheduler = ScanScheduler(head, rng, resolution=math.radians(0.5))
+    scan, report = scheduler.run(raster((-math.pi, math.pi), (-0.6, 0.9), scheduler.resolution))
+    points = scan_points(scan, origin=(0.0, 0.0, 1.2))
+"""
+import math
+
+import numpy as np
+
+from .interfaces import ENCODER_SAMPLE
+
+PATH_POINT = np.dtype([("pan", "<f8"), ("tilt", "<f8"), ("sweep", "?")])
+SCAN_POINT = np.dtype(
+    [
+        ("t", "<f8"),
+        ("pan", "<f4"),
+        ("tilt", "<f4"),
+        ("distance_m", "<f4"),
+        ("strength", "<u2"),
+        ("segment", "<i4"),
+    ]
+)
+# Range timestamps kept for the throughput estimate.
+_RATE_WINDOW = 64
+
+
+def raster(pan, tilt, step):
+    """Boustrophedon rows `step` apart covering pan x tilt ((lo, hi) each)."""
+    rows = np.arange(tilt[0], tilt[1] + step / 2, step)
+    path = np.zeros(2 * len(rows), dtype=PATH_POINT)
+    ends = np.array([pan, pan[::-1]], dtype=np.float64)[np.arange(len(rows)) % 2]
+    path["pan"][0::2], path["pan"][1::2] = ends[:, 0], ends[:, 1]
+    path["tilt"] = np.repeat(rows, 2)
+    path["sweep"][1::2] = True
+    return path
+
+
+def spiral(center, radius, step, segment=None):
+    """Archimedean spiral out from `center` to `radius`, turns `step` apart.
+
+    Waypoints are about `segment` radians apart along the curve (default
+    four steps).
+    """
+    segment = segment or 4 * step
+    b = step / (2 * math.pi)
+    # Arc length of r = b * theta is close to b * theta**2 / 2.
+    length = radius * radius / (2 * b)
+    theta = np.sqrt(2 * np.arange(0.0, length + segment, segment) / b)
+    theta = np.minimum(theta, radius / b)
+    path = np.zeros(len(theta), dtype=PATH_POINT)
+    path["pan"] = center[0] + b * theta * np.cos(theta)
+    path["tilt"] = center[1] + b * theta * np.sin(theta)
+    path["sweep"][1:] = True
+    return path
+
+
+def _arc(pan0, tilt0, pan1, tilt1):
+    """Angle on the sphere for small pan/tilt steps."""
+    return np.hypot((pan1 - pan0) * np.cos(0.5 * (tilt0 + tilt1)), tilt1 - tilt0)
+
+
+def scan_points(scan, origin=(0.0, 0.0, 0.0)):
+    """(N, 3) world points for the valid (non-zero) ranges of a scan."""
+    ok = scan[scan["distance_m"] > 0]
+    pan, tilt, d = (ok[f].astype(np.float64) for f in ("pan", "tilt", "distance_m"))
+    dirs = np.stack([np.cos(tilt) * np.cos(pan), np.cos(tilt) * np.sin(pan), np.sin(tilt)], axis=1)
+    return np.asarray(origin, dtype=np.float64) + d[:, None] * dirs
+
+
+class ScanScheduler:
+    """Drives an `Actuator` along a path while streaming a `Rangefinder`.
+
+    `sensor_rate` is the rangefinder's nominal rate in Hz. It seeds the
+    throughput estimate and sets the theoretical maximum in the report.
+    `max_speed` and `accel` default to the actuator's own, if it has them.
+    """
+
+    def __init__(self, actuator, rangefinder, resolution=0.01, sensor_rate=250.0, max_speed=None, accel=None,
+                 poll=0.02, retune=0.2):
+        self.actuator = actuator
+        self.rangefinder = rangefinder
+        self.resolution = resolution
+        self.sensor_rate = sensor_rate
+        self.max_speed = max_speed or getattr(actuator, "max_speed", 3.0)
+        self.accel = accel or getattr(actuator, "accel", 20.0)
+        self.poll = poll
+        self.retune = retune
+
+    def _speed(self, pan0, tilt0, pan1, tilt1, sweep):
+        """Pan/tilt speed for a move, and the throughput it was set for."""
+        if not sweep:
+            return self.max_speed, self.rate
+        arc = _arc(pan0, tilt0, pan1, tilt1)
+        stretch = math.hypot(pan1 - pan0, tilt1 - tilt0) / arc if arc > 0 else 1.0
+        return min(self.max_speed, self.resolution * self.rate * stretch), self.rate
+
+    def _poll(self):
+        """Read what the rangefinder and encoder have; returns the seconds of ranges read."""
+        got = self.rangefinder.read_batch(max(1, int(2 * self.poll * self.rate)), timeout=self.poll)
+        enc = self.actuator.read_batch(4096, timeout=0)
+        if len(enc):
+            self._encoder.append(enc.copy())
+            self._last = enc[-1]
+        if not len(got):
+            return 0.0
+        self._ranges.append(got.copy())
+        self._recent = np.r_[self._recent, got["t"]][-_RATE_WINDOW:]
+        span = self._recent[-1] - self._recent[0]
+        if len(self._recent) >= 16 and span > 0:
+            self.rate = (len(self._recent) - 1) / span
+        return len(got) / self.rate
+
+    def _left(self, start, wp):
+        """Distance still to go along the move from `start` to `wp`."""
+        d = np.array([wp["pan"] - start[0], wp["tilt"] - start[1]])
+        length = math.hypot(*d)
+        if length == 0:
+            return 0.0
+        here = np.array([self._last["pan"] - start[0], self._last["tilt"] - start[1]])
+        return length - float(here @ d) / length
+
+    def run(self, path):
+        """Scan along `path`; returns (SCAN_POINT array, report)."""
+        path = np.asarray(path, dtype=PATH_POINT)
+        self.rate = float(self.sensor_rate)
+        p = self.actuator.position()
+        self._last = np.array((p["timestamp"], p["pan"], p["tilt"]), dtype=ENCODER_SAMPLE)
+        self._ranges, self._encoder, self._recent = [], [self._last[None]], np.zeros(0)
+        starts, commands = [], 0
+        i, reach = 0, 0.0
+        while i < len(path):
+            start = (float(self._last["pan"]), float(self._last["tilt"]))
+            # Sweep moves that lead into another sweep move run through their
+            # waypoint, and the next one is sent a poll before it is reached.
+            # Waypoints closer than that are skipped over.
+            while (path["sweep"][i] and i + 1 < len(path) and path["sweep"][i + 1]
+                   and math.hypot(path["pan"][i] - start[0], path["tilt"][i] - start[1]) < reach):
+                i += 1
+            wp = path[i]
+            flowing = bool(wp["sweep"] and i + 1 < len(path) and path[i + 1]["sweep"])
+            speed, tuned = self._speed(*start, wp["pan"], wp["tilt"], wp["sweep"])
+            self.actuator.move_to(wp["pan"], wp["tilt"], speed, through=flowing)
+            starts.append(float(self._last["t"]))
+            commands += 1
+            reach = 0.0
+            while self.actuator.moving():
+                reach = speed * max(self._poll(), self.poll)
+                if flowing and self._left(start, wp) < reach:
+                    break
+                if wp["sweep"] and abs(self.rate - tuned) > self.retune * tuned:
+                    here = (float(self._last["pan"]), float(self._last["tilt"]))
+                    speed, tuned = self._speed(*here, wp["pan"], wp["tilt"], True)
+                    self.actuator.move_to(wp["pan"], wp["tilt"], speed, through=flowing)
+                    commands += 1
+            i += 1
+        self._poll()
+        return self._tag(path, np.array(starts), commands)
+
+    def _tag(self, path, starts, commands):
+        ranges = np.concatenate(self._ranges) if self._ranges else np.zeros(0, dtype=SCAN_POINT)
+        enc = np.concatenate(self._encoder)
+        scan = np.zeros(len(ranges), dtype=SCAN_POINT)
+        scan["t"] = ranges["t"]
+        scan["pan"] = np.interp(ranges["t"], enc["t"], enc["pan"])
+        scan["tilt"] = np.interp(ranges["t"], enc["t"], enc["tilt"])
+        scan["distance_m"] = ranges["distance_m"]
+        scan["strength"] = ranges["strength"]
+        scan["segment"] = np.maximum(np.searchsorted(starts, scan["t"], side="right") - 1, 0)
+
+        sweep = path["sweep"][scan["segment"]]
+        prev = path[np.maximum(np.arange(len(path)) - 1, 0)]
+        length = _arc(prev["pan"], prev["tilt"], path["pan"], path["tilt"])[path["sweep"]].sum()
+        seconds = float(scan["t"][-1] - scan["t"][0]) if len(scan) > 1 else 0.0
+        valid = int((scan["distance_m"] > 0).sum())
+        # The sensor at its nominal rate, or the head at full speed, whichever
+        # is slower, with no time lost at the ends of sweeps.
+        best = min(self.sensor_rate, self.max_speed / self.resolution)
+        same = sweep[1:] & (scan["segment"][1:] == scan["segment"][:-1])
+        step = _arc(scan["pan"][:-1], scan["tilt"][:-1], scan["pan"][1:], scan["tilt"][1:])[same]
+        achieved = valid / seconds if seconds else 0.0
+        return scan, {
+            "samples": len(scan),
+            "points": valid,
+            "seconds": seconds,
+            "sensor_rate": len(scan) / seconds if seconds else 0.0,
+            "points_per_s": achieved,
+            "max_points_per_s": float(self.sensor_rate),
+            "full_sweep_s": float(length / self.resolution / best),
+            "efficiency": float(length / self.resolution / best / seconds) if seconds else 0.0,
+            "sweep_fraction": float(sweep.mean()) if len(scan) else 0.0,
+            "spacing": float(step.mean()) if len(step) else 0.0,
+            "commands": commands,
+        }
@@ -0,0 +1,588 @@
+"""Physically consistent synthetic scans for load testing.
+
+A `Room` is a set of boxes and planes loaded from a JSON file. A
+trajectory moves the scanner through the room. `ScanSimulator` ray-casts
+the TF-Luna beam against the room for whole arrays of timestamps at once,
+and derives matching BNO055 readings and ArUco detections of the room's
+anchors from the same poses. Every sample is consistent with one ground
+truth, so downstream stages (filters, projection, fusion, alignment,
+voxel map) can be stress-tested at realistic scale.
+
+Room file (meters; "shell" is the room itself, seen from inside):
+
+    {"shell": {"min": [-2.5, -2.0, 0.0], "max": [2.5, 2.0, 2.6]},
+     "boxes": [{"min": [...], "max": [...], "reflectivity": 0.5}],
+     "planes": [{"point": [...], "normal": [...]}],
+     "anchors": {"0": {"position": [x, y, z], "normal": [nx, ny, nz]}}}
+
+Output arrays use the scan log record dtypes (RANGE_RECORD, IMU_RECORD,
+MARKER_RECORD), so they can be written to a .scanlog and replayed.
+
+    sim = ScanSimulator(Room.load("room.json"), HandheldTrajectory())
+    data = sim.generate(duration=60.0)          # {"range": ..., "imu": ..., "marker": ...}
+    rng, imu, cam = sim.sensors()               # HAL sensors on simulated time
+    head, rng, sim = pan_tilt_rig(Room.default())   # tripod head that steers the beam
+"""
+import json
+import math
+
+import numpy as np
+
+from scanner import quaternion
+from scanner.scanlog import IMU_RECORD, MARKER_RECORD, RANGE_RECORD, ScanLogWriter
+
+from .interfaces import IMU_SAMPLE, RANGE_SAMPLE, Camera, IMU, Rangefinder, batch_buffer, imu_reading, range_reading
+from .mocks import MockActuator, _Pacer
+
+
+GRAVITY = 9.80665
+# Camera axes (x right, y down, z forward) in the body frame (x forward,
+# y left, z up): the camera looks along the TF-Luna beam.
+ROT_BODY_CAMERA = np.array([[0.0, 0.0, 1.0], [-1.0, 0.0, 0.0], [0.0, -1.0, 0.0]])
+_CAST_BLOCK = 65536
+
+
+def _frame_from_normal(normal):
+    """World-from-marker rotation with the marker's +z along `normal`."""
+    z = np.asarray(normal, dtype=np.float64)
+    z = z / np.linalg.norm(z)
+    up = np.array([0.0, 0.0, 1.0]) if abs(z[2]) < 0.9 else np.array([1.0, 0.0, 0.0])
+    x = np.cross(up, z)
+    x /= np.linalg.norm(x)
+    return np.stack([x, np.cross(z, x), z], axis=1)
+
+
+class Room:
+    """Axis-aligned boxes and infinite planes, plus marker anchors."""
+
+    def __init__(self, boxes=(), planes=(), anchors=None):
+        boxes = list(boxes)
+        planes = list(planes)
+        self.box_min = np.array([b["min"] for b in boxes], dtype=np.float64).reshape(-1, 3)
+        self.box_max = np.array([b["max"] for b in boxes], dtype=np.float64).reshape(-1, 3)
+        self.plane_point = np.array([p["point"] for p in planes], dtype=np.float64).reshape(-1, 3)
+        normals = np.array([p["normal"] for p in planes], dtype=np.float64).reshape(-1, 3)
+        self.plane_normal = normals / np.maximum(np.linalg.norm(normals, axis=1, keepdims=True), 1e-12)
+        self.reflectivity = np.array([s.get("reflectivity", 0.8) for s in boxes + planes], dtype=np.float64)
+        self.anchors = {}
+        for key, a in (anchors or {}).items():
+            if not isinstance(a, dict):
+                a = {"position": a}
+            self.anchors[int(key)] = (np.asarray(a["position"], dtype=np.float64), a.get("normal"))
+
+    @classmethod
+    def from_dict(cls, spec):
+        boxes = list(spec.get("boxes", []))
+        if "shell" in spec:
+            boxes.insert(0, spec["shell"])
+        return cls(boxes, spec.get("planes", []), spec.get("anchors"))
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as fh:
+            return cls.from_dict(json.load(fh))
+
+    @classmethod
+    def default(cls):
+        """5 x 4 x 2.6 m room with a table, a cabinet and six wall anchors."""
+        return cls.from_dict({
+            "shell": {"min": [-2.5, -2.0, 0.0], "max": [2.5, 2.0, 2.6]},
+            "boxes": [
+                {"min": [0.8, -0.6, 0.0], "max": [1.8, 0.6, 0.75], "reflectivity": 0.5},
+                {"min": [-2.5, 1.4, 0.0], "max": [-1.7, 2.0, 1.9], "reflectivity": 0.6},
+            ],
+            "anchors": {
+                "0": {"position": [2.5, 0.0, 1.5], "normal": [-1.0, 0.0, 0.0]},
+                "1": {"position": [0.0, 2.0, 1.5], "normal": [0.0, -1.0, 0.0]},
+                "2": {"position": [-2.5, -0.5, 1.4], "normal": [1.0, 0.0, 0.0]},
+                "3": {"position": [0.5, -2.0, 1.6], "normal": [0.0, 1.0, 0.0]},
+                "4": {"position": [2.5, -1.2, 1.1], "normal": [-1.0, 0.0, 0.0]},
+                "5": {"position": [-1.0, 2.0, 1.2], "normal": [0.0, -1.0, 0.0]},
+            },
+        })
+
+    def known_anchors(self):
+        """{id: [x, y, z]} in the format tools/anchor_alignment.py reads."""
+        return {str(i): pos.tolist() for i, (pos, _) in sorted(self.anchors.items())}
+
+    def cast(self, origins, dirs, max_range=np.inf):
+        """First hit along each ray.
+
+        origins, dirs: (N, 3); dirs must be unit vectors
+        Returns (distance (N,), inf where nothing is hit; cos_incidence (N,);
+        surface index (N,), -1 for no hit).
+        """
+        origins = np.asarray(origins, dtype=np.float64).reshape(-1, 3)
+        dirs = np.asarray(dirs, dtype=np.float64).reshape(-1, 3)
+        n = len(origins)
+        dist = np.full(n, np.inf)
+        cos = np.zeros(n)
+        surface = np.full(n, -1, dtype=np.int64)
+        for a in range(0, n, _CAST_BLOCK):
+            sl = slice(a, a + _CAST_BLOCK)
+            self._cast_block(origins[sl], dirs[sl], dist[sl], cos[sl], surface[sl])
+        dist[dist > max_range] = np.inf
+        surface[~np.isfinite(dist)] = -1
+        return dist, cos, surface
+
+    def _cast_block(self, o, d, dist, cos, surface):
+        eps = 1e-9
+        if len(self.box_min):
+            with np.errstate(divide="ignore", invalid="ignore"):
+                inv = 1.0 / d
+                t1 = (self.box_min[None] - o[:, None]) * inv[:, None]  # (n, B, 3)
+                t2 = (self.box_max[None] - o[:, None]) * inv[:, None]
+            near = np.fmin(t1, t2)
+            far = np.fmax(t1, t2)
+            t_in = near.max(axis=2)
+            t_out = far.min(axis=2)
+            # Outside a box the ray enters it; inside (the room shell) it exits.
+            inside = t_in <= eps
+            t = np.where(inside, t_out, t_in)
+            t[(t_out < np.maximum(t_in, 0.0)) | (t <= eps) | np.isnan(t)] = np.inf
+            k = t.argmin(axis=1)
+            rows = np.arange(len(o))
+            best = t[rows, k]
+            # The face hit is the axis that set t_in (entering) or t_out (exiting).
+            axis = np.where(inside[rows, k], far[rows, k].argmin(axis=1), near[rows, k].argmax(axis=1))
+            hit = best < dist
+            dist[hit] = best[hit]
+            cos[hit] = np.abs(d[hit, axis[hit]])
+            surface[hit] = k[hit]
+        if len(self.plane_point):
+            dn = d @ self.plane_normal.T  # (n, P)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                t = ((self.plane_point[None] - o[:, None]) * self.plane_normal[None]).sum(axis=2) / dn
+            t[~(t > eps)] = np.inf
+            k = t.argmin(axis=1)
+            rows = np.arange(len(o))
+            best = t[rows, k]
+            hit = best < dist
+            dist[hit] = best[hit]
+            cos[hit] = np.abs(dn[rows, k][hit])
+            surface[hit] = len(self.box_min) + k[hit]
+
+
+class _Trajectory:
+    """Vectorized ground-truth pose: position(t) (N, 3), orientation(t) (N, 4).
+
+    Scalar times give (3,) and (4,) results, so a trajectory can also drive
+    `hal.mocks.MockIMU`.
+    """
+
+    def pose(self, t):
+        return self.position(t), self.orientation(t)
+
+    def acceleration(self, t, h=1e-3):
+        t = np.asarray(t, dtype=np.float64)
+        return (self.position(t - h) - 2.0 * self.position(t) + self.position(t + h)) / (h * h)
+
+    def angular_velocity(self, t, h=1e-3):
+        """Body-frame angular velocity in rad/s, from q(t-h)* q(t+h)."""
+        t = np.asarray(t, dtype=np.float64)
+        dq = quaternion.multiply(quaternion.conjugate(self.orientation(t - h)), self.orientation(t + h))
+        dq = quaternion.canonical(dq)
+        return quaternion.to_rvec(dq) / (2.0 * h)
+
+
+def _ypr_quat(yaw, pitch, roll=0.0):
+    """World-from-body quaternion for yaw about z, then pitch (nose up), then roll.
+
+    Closed form of q_z(yaw) * q_y(-pitch) * q_x(roll); positive pitch
+    raises the +x nose, which is a negative rotation about +y.
+    """
+    yaw, pitch, roll = np.broadcast_arrays(*(0.5 * np.asarray(x, dtype=np.float64) for x in (yaw, pitch, roll)))
+    cz, sz = np.cos(yaw), np.sin(yaw)
+    cp, sp = np.cos(pitch), np.sin(pitch)
+    cr, sr = np.cos(roll), np.sin(roll)
+    w, x, y, z = cz * cp, sz * sp, -cz * sp, sz * cp
+    return np.stack([w * cr - x * sr, w * sr + x * cr, y * cr + z * sr, z * cr - y * sr], axis=-1)
+
+
+class HandheldTrajectory(_Trajectory):
+    """Walk a loop around the room while sweeping the scanner side to side and up and down."""
+
+    def __init__(self, center=(0.0, 0.0), radius=1.0, period=20.0, height=1.2, sweep=0.9, sweep_hz=0.4,
+                 pitch=0.5, pitch_hz=0.13, bob=0.03):
+        self.center = np.asarray(center, dtype=np.float64)
+        self.radius = radius
+        self.omega = 2.0 * math.pi / period
+        self.height = height
+        self.sweep = sweep
+        self.sweep_w = 2.0 * math.pi * sweep_hz
+        self.pitch = pitch
+        self.pitch_w = 2.0 * math.pi * pitch_hz
+        self.bob = bob
+
+    def position(self, t):
+        t = np.asarray(t, dtype=np.float64)
+        a = self.omega * t
+        return np.stack([
+            self.center[0] + self.radius * np.cos(a),
+            self.center[1] + self.radius * np.sin(a),
+            self.height + self.bob * np.sin(4.0 * a),
+        ], axis=-1)
+
+    def orientation(self, t):
+        t = np.asarray(t, dtype=np.float64)
+        # Face outwards, towards the walls, and sweep around that heading.
+        yaw = self.omega * t + self.sweep * np.sin(self.sweep_w * t)
+        pitch = self.pitch * np.sin(self.pitch_w * t)
+        return _ypr_quat(yaw, pitch)
+
+
+class StepperTrajectory(_Trajectory):
+    """Pan/tilt head on a tripod: one full pan per tilt step, then the next tilt."""
+
+    def __init__(self, position=(0.0, 0.0, 1.2), pan_period=4.0, tilt_min=-0.6, tilt_max=0.9, tilt_steps=12):
+        self._position = np.asarray(position, dtype=np.float64)
+        self.pan_period = pan_period
+        self.tilts = np.linspace(tilt_min, tilt_max, tilt_steps)
+
+    @property
+    def duration(self):
+        return self.pan_period * len(self.tilts)
+
+    def position(self, t):
+        t = np.asarray(t, dtype=np.float64)
+        return np.broadcast_to(self._position, t.shape + (3,)).copy()
+
+    def orientation(self, t):
+        t = np.asarray(t, dtype=np.float64)
+        step = np.floor(t / self.pan_period).astype(np.int64) % len(self.tilts)
+        yaw = 2.0 * math.pi * (t / self.pan_period)
+        return _ypr_quat(yaw, self.tilts[step])
+
+
+class PanTiltTrajectory(_Trajectory):
+    """Fixed pan/tilt head aimed by an actuator model (e.g. `hal.mocks.MockActuator`).
+
+    The beam follows `actuator.angles(t)`: pan is yaw, tilt is pitch.
+    """
+
+    def __init__(self, actuator, position=(0.0, 0.0, 1.2)):
+        self.actuator = actuator
+        self._position = np.asarray(position, dtype=np.float64)
+
+    def position(self, t):
+        t = np.asarray(t, dtype=np.float64)
+        return np.broadcast_to(self._position, t.shape + (3,)).copy()
+
+    def orientation(self, t):
+        return _ypr_quat(*self.actuator.angles(t))
+
+
+class ScanSimulator:
+    """TF-Luna, BNO055 and camera samples from one trajectory in one room.
+
+    Range model (TF-Luna): valid 0.2-8 m; Gaussian noise of max(2 cm,
+    0.7% of distance); centimetre resolution; strength falls off with
+    distance squared, incidence and reflectivity. Readings with strength
+    below 100, out of range, or hit by random `dropout` report 0 m, as
+    the sensor does.
+
+    IMU model (BNO055): unit quaternions quantized to 2**-14, with an
+    optional yaw drift and noise; body-frame specific force and angular
+    velocity with noise.
+
+    Mount: the beam leaves from `beam_origin` (body frame) along `beam`,
+    and the camera sits at the body origin, rotated by `body_camera`
+    (camera-to-body, default `ROT_BODY_CAMERA`). Setting them off their
+    defaults gives a rig with known mounting errors to calibrate.
+
+    Camera model: pinhole `camera_matrix` looking along the beam. An
+    anchor is detected when it is in front of the camera, inside the
+    image, within `marker_range`, faces the camera within 70 degrees and
+    is not occluded. Corners get `pixel_noise` px and poses get noise
+    proportional to distance.
+    """
+
+    def __init__(self, room, trajectory, seed=0, beam=(1.0, 0.0, 0.0), min_range=0.2, max_range=8.0,
+                 dropout=0.002, yaw_drift=0.0, quat_noise=0.0, accel_noise=0.05, gyro_noise=0.005,
+                 camera_matrix=None, image_size=(1280, 720), marker_length=0.15, marker_range=4.0,
+                 pixel_noise=0.5, marker_dropout=0.05, beam_origin=(0.0, 0.0, 0.0), body_camera=None):
+        self.room = room
+        self.trajectory = trajectory
+        self.rng = np.random.default_rng(seed)
+        self.beam = np.asarray(beam, dtype=np.float64) / np.linalg.norm(beam)
+        self.beam_origin = np.asarray(beam_origin, dtype=np.float64)
+        self.body_camera = ROT_BODY_CAMERA if body_camera is None else np.asarray(body_camera, dtype=np.float64)
+        self.min_range = min_range
+        self.max_range = max_range
+        self.dropout = dropout
+        self.yaw_drift = yaw_drift
+        self.quat_noise = quat_noise
+        self.accel_noise = accel_noise
+        self.gyro_noise = gyro_noise
+        w, h = image_size
+        self.image_size = (w, h)
+        if camera_matrix is None:
+            camera_matrix = [[1000.0, 0.0, w / 2.0], [0.0, 1000.0, h / 2.0], [0.0, 0.0, 1.0]]
+        self.camera_matrix = np.asarray(camera_matrix, dtype=np.float64)
+        self.marker_length = marker_length
+        self.marker_range = marker_range
+        self.pixel_noise = pixel_noise
+        self.marker_dropout = marker_dropout
+        ids = sorted(room.anchors)
+        self._anchor_ids = np.array(ids, dtype=np.int32)
+        self._anchor_pos = np.array([room.anchors[i][0] for i in ids]).reshape(-1, 3)
+        normals = [room.anchors[i][1] for i in ids]
+        self._anchor_normal = np.array([n if n is not None else [np.nan] * 3 for n in normals]).reshape(-1, 3)
+        self._anchor_rot = np.array([_frame_from_normal(n) if n is not None else np.eye(3) for n in normals])
+        h = marker_length / 2.0
+        self._corners = np.array([[-h, h, 0.0], [h, h, 0.0], [h, -h, 0.0], [-h, -h, 0.0]])
+
+    # -- TF-Luna -----------------------------------------------------------
+
+    def ranges(self, t, return_truth=False):
+        """RANGE_RECORD rows for timestamps `t`; with `return_truth`, also the exact distances."""
+        t = np.asarray(t, dtype=np.float64).reshape(-1)
+        pos, q = self.trajectory.pose(t)
+        dirs = quaternion.rotate(q, self.beam)
+        if self.beam_origin.any():
+            pos = pos + quaternion.rotate(q, self.beam_origin)
+        dist, cos, surface = self.room.cast(pos, dirs, self.max_range)
+        refl = np.where(surface >= 0, self.room.reflectivity[np.maximum(surface, 0)], 0.0)
+        n = len(t)
+        rng = self.rng
+        with np.errstate(divide="ignore"):
+            strength = np.clip(8000.0 * refl * cos / np.square(dist) * rng.normal(1.0, 0.05, n), 0, 65535)
+        noisy = dist + rng.normal(0.0, 1.0, n) * np.maximum(0.02, 0.007 * dist)
+        measured = np.round(noisy * 100.0) / 100.0
+        bad = ~np.isfinite(dist) | (dist < self.min_range) | (strength < 100) | (rng.random(n) < self.dropout)
+        measured[bad] = 0.0
+        out = np.empty(n, dtype=RANGE_RECORD)
+        out["t"] = t
+        out["distance_m"] = measured
+        out["strength"] = np.where(np.isfinite(strength), strength, 0).astype(np.uint16)
+        out["temperature_c"] = 40.0 + 0.05 * np.round(rng.normal(0.0, 4.0, n))
+        if return_truth:
+            return out, dist
+        return out
+
+    # -- BNO055 ------------------------------------------------------------
+
+    def imu(self, t):
+        t = np.asarray(t, dtype=np.float64).reshape(-1)
+        n = len(t)
+        rng = self.rng
+        q_true = self.trajectory.orientation(t)
+        q = q_true
+        if self.yaw_drift:
+            half = 0.5 * self.yaw_drift * t
+            drift = np.stack([np.cos(half), 0 * half, 0 * half, np.sin(half)], axis=-1)
+            q = quaternion.multiply(drift, q)
+        if self.quat_noise:
+            q = q + rng.normal(0.0, self.quat_noise, q.shape)
+        q, _ = quaternion.normalize(q)
+        q = np.round(q * 16384.0) / 16384.0
+        specific = self.trajectory.acceleration(t) + np.array([0.0, 0.0, GRAVITY])
+        accel = quaternion.rotate(quaternion.conjugate(q_true), specific)
+        gyro = self.trajectory.angular_velocity(t)
+        out = np.empty(n, dtype=IMU_RECORD)
+        out["t"] = t
+        out["quat"] = q
+        out["accel"] = accel + rng.normal(0.0, self.accel_noise, (n, 3))
+        out["gyro"] = gyro + rng.normal(0.0, self.gyro_noise, (n, 3))
+        return out
+
+    # -- Camera ------------------------------------------------------------
+
+    def camera_poses(self, t):
+        """World-from-camera rotations (N, 3, 3) and camera positions (N, 3)."""
+        pos, q = self.trajectory.pose(np.asarray(t, dtype=np.float64).reshape(-1))
+        return quaternion.to_matrix(q) @ self.body_camera, pos
+
+    def markers(self, t):
+        """MARKER_RECORD rows for every anchor detected in frames at times `t`."""
+        t = np.asarray(t, dtype=np.float64).reshape(-1)
+        if not len(self._anchor_ids) or not len(t):
+            return np.empty(0, dtype=MARKER_RECORD)
+        rot_wc, cam = self.camera_poses(t)
+        rel = self._anchor_pos[None] - cam[:, None]  # (M, A, 3) world
+        p_c = np.einsum("mji,maj->mai", rot_wc, rel)  # camera frame
+        dist = np.linalg.norm(rel, axis=2)
+        z = p_c[..., 2]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            uv = (p_c[..., :2] / z[..., None]) * np.diag(self.camera_matrix)[:2] + self.camera_matrix[:2, 2]
+            facing = np.einsum("aj,maj->ma", self._anchor_normal, -rel) / dist
+        w, h = self.image_size
+        m = 40.0
+        ok = (z > 0.1) & (dist < self.marker_range)
+        ok &= (uv[..., 0] > m) & (uv[..., 0] < w - m) & (uv[..., 1] > m) & (uv[..., 1] < h - m)
+        ok &= ~(facing < math.cos(math.radians(70.0)))  # NaN normal: always facing
+        ok &= self.rng.random(ok.shape) >= self.marker_dropout
+        fi, ai = np.nonzero(ok)
+        if len(fi):
+            # Occlusion: the first surface along the sight line must be the anchor's own wall.
+            d = rel[fi, ai] / dist[fi, ai, None]
+            hit, _, _ = self.room.cast(cam[fi], d)
+            visible = hit >= dist[fi, ai] - 0.05
+            fi, ai = fi[visible], ai[visible]
+        n = len(fi)
+        out = np.zeros(n, dtype=MARKER_RECORD)
+        if not n:
+            return out
+        rng = self.rng
+        r_cw = np.transpose(rot_wc[fi], (0, 2, 1))
+        r_cm = r_cw @ self._anchor_rot[ai]
+        corners_w = self._anchor_pos[ai, None] + np.einsum("nij,kj->nki", self._anchor_rot[ai], self._corners)
+        corners_c = np.einsum("nij,nkj->nki", r_cw, corners_w - cam[fi, None])
+        px = corners_c[..., :2] / corners_c[..., 2:3] * np.diag(self.camera_matrix)[:2] + self.camera_matrix[:2, 2]
+        tvec = p_c[fi, ai] + rng.normal(0.0, 1.0, (n, 3)) * (0.005 * dist[fi, ai])[:, None]
+        out["t"] = t[fi]
+        out["id"] = self._anchor_ids[ai]
+        out["has_pose"] = 1
+        out["tvec"] = tvec
+        out["rvec"] = quaternion.to_rvec(quaternion.from_matrix(r_cm))
+        out["corners"] = px + rng.normal(0.0, self.pixel_noise, px.shape)
+        return out
+
+    # -- bulk generation ---------------------------------------------------
+
+    def generate(self, duration, range_rate=250.0, imu_rate=100.0, camera_rate=15.0, start=0.0):
+        """All three streams for [start, start + duration) as structured arrays."""
+        out = {}
+        for name, rate, fn in (("range", range_rate, self.ranges), ("imu", imu_rate, self.imu),
+                               ("marker", camera_rate, self.markers)):
+            if rate:
+                out[name] = fn(start + np.arange(int(round(duration * rate))) / rate)
+        return out
+
+    def write(self, path, duration, range_rate=250.0, imu_rate=100.0, camera_rate=15.0, block=60.0,
+              metadata=None):
+        """Stream a session to a .scanlog, `block` seconds at a time; returns record counts."""
+        counts = {"range": 0, "imu": 0, "marker": 0}
+        meta = {"clock": "simulated", "source": "hal.simulator", **(metadata or {})}
+        with ScanLogWriter(path, metadata=meta) as log:
+            t = 0.0
+            while t < duration:
+                span = min(block, duration - t)
+                for name, rec in self.generate(span, range_rate, imu_rate, camera_rate, start=t).items():
+                    log.append(name, rec)
+                    counts[name] += len(rec)
+                t += span
+        return counts
+
+    def sensors(self, range_rate=250.0, imu_rate=100.0, camera_rate=15.0, realtime=False, start=0.0):
+        """HAL sensors reading this simulation on simulated time."""
+        return (SimRangefinder(self, range_rate, start, realtime), SimIMU(self, imu_rate, start, realtime),
+                SimCamera(self, camera_rate, start, realtime))
+
+
+def pan_tilt_rig(room, position=(0.0, 0.0, 1.2), range_rate=250.0, encoder_rate=1000.0, seed=0, **actuator):
+    """(actuator, rangefinder, simulator) for a pan/tilt head in `room`, on simulated time.
+
+    The actuator is a `MockActuator` running on the rangefinder's clock,
+    and ranges are cast along wherever the head points at each sample
+    time. Ranges are generated as they are read, so a move commanded
+    between reads shows up in the very next one.
+    """
+    rangefinder = None
+    head = MockActuator(rate=encoder_rate, clock=lambda: rangefinder.now, **actuator)
+    sim = ScanSimulator(room, PanTiltTrajectory(head, position), seed=seed)
+    rangefinder = SimRangefinder(sim, range_rate)
+    rangefinder.block = None
+    return head, rangefinder, sim
+
+
+class _SimSensor:
+    """Generates `block` samples at a time (or just those asked for, if
+    `block` is None) and hands them out in order."""
+
+    block = 1024
+
+    def __init__(self, sim, rate, start=0.0, realtime=False):
+        self.sim = sim
+        self.rate = rate
+        self.start = start
+        self._pacer = _Pacer(rate if realtime else None)
+        self._k = 0
+        self._buf = []
+        self._block = None
+        self._pos = 0
+
+    @property
+    def now(self):
+        """Simulated time of the next sample to be read."""
+        ahead = len(self._block) - self._pos if self._block is not None else 0
+        return self.start + (self._k - ahead) / self.rate
+
+    def set_rate(self, hz):
+        """Carry on from the next unread sample at the new rate."""
+        self.start, self._k = self.now, 0
+        self._block, self._pos = None, 0
+        self._buf = []
+        self.rate = hz
+        self._pacer = _Pacer(hz if self._pacer.period else None)
+        return hz
+
+    def _times(self, n):
+        t = self.start + (self._k + np.arange(n)) / self.rate
+        self._k += n
+        return t
+
+    def _next(self):
+        self._pacer.wait()
+        if not self._buf:
+            self._buf = self._fill()
+            self._buf.reverse()
+        return self._buf.pop()
+
+    def _take(self, max_n, timeout, out):
+        buf = batch_buffer(self._dtype, max_n, out)
+        n, _ = self._pacer.take(max_n, timeout)
+        done = 0
+        while done < n:
+            if self._block is None or self._pos == len(self._block):
+                self._block = self._generate(self._times(self.block or n - done))
+                self._pos = 0
+            k = min(n - done, len(self._block) - self._pos)
+            buf[done:done + k] = self._block[self._pos:self._pos + k]
+            self._pos += k
+            done += k
+        return buf[:n]
+
+
+class SimRangefinder(_SimSensor, Rangefinder):
+    _dtype = RANGE_SAMPLE
+
+    def _generate(self, t):
+        return self.sim.ranges(t)
+
+    def distance(self):
+        return range_reading(self.read_batch(1))
+
+    def read_batch(self, max_n=256, timeout=None, out=None):
+        return self._take(max_n, timeout, out)
+
+
+class SimIMU(_SimSensor, IMU):
+    _dtype = IMU_SAMPLE
+
+    def _generate(self, t):
+        return self.sim.imu(t)
+
+    def read(self):
+        return imu_reading(self.read_batch(1))
+
+    def read_batch(self, max_n=64, timeout=None, out=None):
+        return self._take(max_n, timeout, out)
+
+
+class SimCamera(_SimSensor, Camera):
+    """Frames carry no image; "markers" holds the frame's MARKER_RECORD detections."""
+
+    block = 64
+
+    def _fill(self):
+        t = self._times(self.block)
+        rec = self.sim.markers(t)
+        first = self._k - self.block
+        bounds = np.searchsorted(rec["t"], t, side="left").tolist() + [len(rec)]
+        return [{"timestamp": float(ti), "frame_id": first + i + 1, "data": None,
+                 "markers": rec[bounds[i]:bounds[i + 1]]}
+                for i, ti in enumerate(t.tolist())]
+
+    def capture(self):
+        return self._next()
@@ -0,0 +1,270 @@
+"""Streaming TF-Luna UART frame decoder.
+
+The TF-Luna emits 9-byte frames: two ``0x59`` header bytes, little-endian
+distance (cm), strength and raw temperature, then an 8-bit checksum of the
+first eight bytes. :class:`TFLunaDecoder` drains whatever the serial port has
+buffered into one reusable bytearray and decodes every complete frame in it
+with NumPy, so the per-frame cost stays off the Python interpreter.
+
+Commands go the other way as ``0x5A``, length, id, payload, checksum
+frames. :func:`rate_command` builds the one that sets the output rate.
+The sensor echoes it back, and the decoder skips the echo as junk.
+"""
+from time import perf_counter as _clock
+
+import numpy as np
+
+from scanner import instrument
+
+
+FRAME_HEADER = 0x59
+FRAME_LENGTH = 9
+
+_OFFSETS = np.arange(FRAME_LENGTH)
+
+COMMAND_HEADER = 0x5A
+SET_RATE = 0x03
+# Output rates the TF-Luna produces evenly: whole divisors of its 500 Hz base.
+RATES = (1, 2, 4, 5, 10, 20, 25, 50, 100, 125, 250)
+DEFAULT_RATE = 100.0
+
+FRAME_DTYPE = np.dtype(
+    [
+        ("distance_cm", "<u2"),
+        ("strength", "<u2"),
+        ("temperature_c", "<f4"),
+    ]
+)
+
+
+_M_DECODE = instrument.histogram("tfluna_decode_seconds", "TF-Luna decode time per feed() call")
+_M_FRAMES = instrument.counter("tfluna_frames_total", "TF-Luna frames decoded")
+_M_BAD = instrument.counter("tfluna_bad_checksum_total", "TF-Luna frames with a bad checksum")
+_M_DROPPED = instrument.counter("tfluna_dropped_total", "TF-Luna frames estimated lost to corruption")
+
+
+def parse_frames(frames):
+    """Decode an (N, 9) uint8 array of checksummed frames into FRAME_DTYPE."""
+    frames = np.asarray(frames, dtype=np.uint8).reshape(-1, FRAME_LENGTH)
+    payload = np.ascontiguousarray(frames[:, 2:8]).view("<u2")
+    out = np.empty(len(frames), dtype=FRAME_DTYPE)
+    out["distance_cm"] = payload[:, 0]
+    out["strength"] = payload[:, 1]
+    out["temperature_c"] = payload[:, 2] / 8.0 - 256.0
+    return out
+
+
+def supported_rate(hz):
+    """The lowest supported output rate of at least `hz` (250 at most)."""
+    for rate in RATES:
+        if rate >= hz:
+            return float(rate)
+    return float(RATES[-1])
+
+
+def frame_times(n, end, rate, after=None):
+    """Timestamps for `n` frames read together, the last one arriving at `end`.
+
+    A read returns every frame buffered since the last one, so earlier
+    frames are back-dated by whole frame periods at `rate` Hz. `after` is
+    the previous read's last stamp; the frames start no earlier than one
+    period past it, so stamps keep increasing across reads.
+    """
+    start = end - (n - 1) / rate
+    if after is not None:
+        start = max(start, after + 1.0 / rate)
+    return start + np.arange(n) / rate
+
+
+def rate_command(hz):
+    """Command frame that sets the output rate to `hz` Hz (0 stops the stream)."""
+    hz = int(round(hz))
+    frame = bytes([COMMAND_HEADER, 6, SET_RATE, hz & 0xFF, hz >> 8])
+    return frame + bytes([sum(frame) & 0xFF])
+
+
+def parse_command(data):
+    """(id, payload) of one command frame, or None if it is not a valid one."""
+    data = bytes(data)
+    if len(data) < 4 or data[0] != COMMAND_HEADER or data[1] != len(data) or sum(data[:-1]) & 0xFF != data[-1]:
+        return None
+    return data[2], data[3:-1]
+
+
+def encode_frames(distance_cm, strength, temperature_c):
+    """Build raw frame bytes for the given readings (inverse of parse_frames)."""
+    distance_cm = np.asarray(distance_cm, dtype=np.uint16)
+    n = distance_cm.size
+    strength = np.broadcast_to(np.asarray(strength, dtype=np.uint16), (n,))
+    temp_raw = np.round((np.asarray(temperature_c, dtype=np.float64) + 256.0) * 8.0)
+    temp_raw = np.broadcast_to(temp_raw.astype(np.uint16), (n,))
+
+    frames = np.empty((n, FRAME_LENGTH), dtype=np.uint8)
+    frames[:, 0:2] = FRAME_HEADER
+    payload = np.stack([distance_cm.ravel(), strength, temp_raw], axis=1).astype("<u2")
+    frames[:, 2:8] = payload.view(np.uint8).reshape(n, 6)
+    frames[:, 8] = frames[:, :8].sum(axis=1, dtype=np.uint32) & 0xFF
+    return frames.tobytes()
+
+
+def _non_overlapping(starts):
+    # Rare path: a header pattern inside a real frame also passed its
+    # checksum. Keep the earliest frame of every overlapping run.
+    keep = []
+    end = -1
+    for s in starts.tolist():
+        if s >= end:
+            keep.append(s)
+            end = s + FRAME_LENGTH
+    return np.asarray(keep, dtype=starts.dtype)
+
+
+class TFLunaDecoder:
+    """Incremental decoder over a fixed-capacity byte buffer.
+
+    Counters:
+      frames        frames decoded successfully
+      bad_checksum  header-aligned frames whose checksum did not match
+      dropped       estimated frames lost to corruption or desync
+      skipped_bytes bytes discarded because they were not part of a frame
+    """
+
+    def __init__(self, capacity=4096):
+        if capacity < FRAME_LENGTH * 2:
+            raise ValueError("capacity must hold at least two frames")
+        self._buf = bytearray(capacity)
+        self._len = 0
+        self._gap = 0
+        self.frames = 0
+        self.bad_checksum = 0
+        self.dropped = 0
+        self.skipped_bytes = 0
+
+    @property
+    def buffered(self):
+        """Number of bytes waiting for the rest of a frame."""
+        return self._len
+
+    def reset(self):
+        self._len = 0
+        self._gap = 0
+
+    def feed(self, data):
+        """Append raw bytes and return every frame they complete."""
+        t0 = _clock()
+        mv = memoryview(data).cast("B")
+        batches = []
+        capacity = len(self._buf)
+        while len(mv):
+            take = min(len(mv), capacity - self._len)
+            self._buf[self._len:self._len + take] = mv[:take]
+            self._len += take
+            mv = mv[take:]
+            batches.append(self._decode())
+        if not batches:
+            out = np.empty(0, dtype=FRAME_DTYPE)
+        elif len(batches) == 1:
+            out = batches[0]
+        else:
+            out = np.concatenate(batches)
+        _M_DECODE.record(_clock() - t0)
+        return out
+
+    def drain(self, port):
+        """Read everything the port has buffered and decode it.
+
+        Blocks for at most the port timeout when nothing is waiting, so this
+        can be called in a tight loop without spinning.
+        """
+        waiting = getattr(port, "in_waiting", 0)
+        data = port.read(max(1, waiting))
+        if not data:
+            return np.empty(0, dtype=FRAME_DTYPE)
+        return self.feed(data)
+
+    def iter_batches(self, port):
+        """Yield non-empty frame batches from ``port`` forever."""
+        while True:
+            batch = self.drain(port)
+            if len(batch):
+                yield batch
+
+    def _decode(self):
+        n = self._len
+        if n < FRAME_LENGTH:
+            return np.empty(0, dtype=FRAME_DTYPE)
+
+        view = np.frombuffer(self._buf, dtype=np.uint8, count=n)
+        frames, consumed = self._decode_aligned(view)
+        if frames is None:
+            frames, consumed = self._decode_search(view)
+
+        # Bytes that could still start a frame once more data arrives are
+        # kept; anything before them has already been ruled out.
+        keep_from = max(consumed, n - FRAME_LENGTH + 1)
+        discarded = keep_from - consumed
+        self._gap += discarded
+        self.skipped_bytes += discarded
+
+        out = parse_frames(frames)
+        del view, frames
+        rest = n - keep_from
+        self._buf[:rest] = bytes(self._buf[keep_from:n])
+        self._len = rest
+        return out
+
+    def _decode_aligned(self, view):
+        # Fast path for an in-sync stream: the buffer is whole frames back
+        # to back, so a reshaped (k, 9) view covers them without copying.
+        k = len(view) // FRAME_LENGTH
+        frames = view[:k * FRAME_LENGTH].reshape(k, FRAME_LENGTH)
+        if not (
+            (frames[:, 0] == FRAME_HEADER).all()
+            and (frames[:, 1] == FRAME_HEADER).all()
+            and ((frames[:, :8].sum(axis=1, dtype=np.uint32) & 0xFF) == frames[:, 8]).all()
+        ):
+            return None, 0
+        if self._gap:
+            lost = (self._gap + FRAME_LENGTH // 2) // FRAME_LENGTH
+            self.dropped += lost
+            _M_DROPPED.inc(lost)
+            self._gap = 0
+        self.frames += k
+        _M_FRAMES.inc(k)
+        return frames, k * FRAME_LENGTH
+
+    def _decode_search(self, view):
+        n = len(view)
+        last = n - FRAME_LENGTH
+        heads = np.flatnonzero((view[:last + 1] == FRAME_HEADER) & (view[1:last + 2] == FRAME_HEADER))
+
+        frames = view[heads[:, None] + _OFFSETS]
+        ok = (frames[:, :8].sum(axis=1, dtype=np.uint32) & 0xFF) == frames[:, 8]
+        starts = heads[ok]
+        frames = frames[ok]
+        if len(starts) > 1 and (np.diff(starts) < FRAME_LENGTH).any():
+            starts = _non_overlapping(starts)
+            frames = view[starts[:, None] + _OFFSETS]
+
+        bad = heads[~ok]
+        if len(bad) and len(starts):
+            # Ignore failed headers that are just bytes inside a good frame.
+            idx = np.searchsorted(starts, bad, side="right") - 1
+            inside = (idx >= 0) & (bad < starts[np.maximum(idx, 0)] + FRAME_LENGTH)
+            bad = bad[~inside]
+        self.bad_checksum += len(bad)
+        _M_BAD.inc(len(bad))
+
+        if not len(starts):
+            return frames, 0
+        gaps = np.empty(len(starts), dtype=np.int64)
+        gaps[0] = starts[0] + self._gap
+        gaps[1:] = np.diff(starts) - FRAME_LENGTH
+        self.skipped_bytes += int(gaps.sum()) - self._gap
+        lost = int(((gaps + FRAME_LENGTH // 2) // FRAME_LENGTH).sum())
+        self.dropped += lost
+        self.frames += len(starts)
+        _M_DROPPED.inc(lost)
+        _M_FRAMES.inc(len(starts))
+        self._gap = 0
+        return frames, int(starts[-1]) + FRAME_LENGTH
@@ -0,0 +1,216 @@
+"""Long-lived sensor worker processes.
+
+A `SensorWorker` opens one sensor in a process of its own and keeps it
+open between requests. Each request runs the sensor through a
+`hal.acquisition.SensorTask` for a while and sends back the task's
+report. Checking a sensor again, or checking it from several commands in
+turn, does not pay for a new interpreter, the imports or opening the
+device each time. Workers for different sensors run side by side.
+
+    with WorkerPool(mock=True) as pool:
+        for _ in range(3):
+            print(pool.sample(["imu", "range"], seconds=2.0))
+
+Kinds are "imu", "range" and "camera". `options` go to the sensor:
+`address` for the BNO055, `port` and `baud` for the TF-Luna, `size` for
+the camera.
+"""
+import multiprocessing
+import time
+
+
+KINDS = ("imu", "range", "camera")
+# Polling rate per kind (None: the sensor paces its own reads).
+RATES = {"imu": 100.0, "range": None, "camera": 30.0}
+# Backends each kind needs on hardware (see hal.backends).
+NEEDS = {"imu": ("board", "busio", "bno055"), "range": ("serial",), "camera": ("picamera2",)}
+
+
+def open_sensor(kind, mock=False, **options):
+    """A HAL sensor of `kind`: the `hal.mocks` one, or the hardware driver."""
+    if kind not in KINDS:
+        raise ValueError(f"unknown sensor kind {kind!r}")
+    if mock:
+        from .mocks import MockCamera, MockIMU, MockRangefinder
+
+        if kind == "imu":
+            return MockIMU(seed=0)
+        if kind == "range":
+            return MockRangefinder(seed=0, rate=options.get("rate", 250.0))
+        return MockCamera(seed=0, rate=options.get("rate", 30.0))
+    from .drivers import BNO055IMU, PiCamera, TFLunaRangefinder
+    from .tfluna import DEFAULT_RATE
+
+    if kind == "imu":
+        return BNO055IMU(options.get("address", 0x28), rate=options.get("rate", 100.0))
+    if kind == "range":
+        return TFLunaRangefinder(options.get("port", "/dev/serial0"), options.get("baud", 115200),
+                                 rate=options.get("rate", DEFAULT_RATE))
+    return PiCamera(options.get("size", (1280, 720)))
+
+
+def _serve(conn, kind, mock, rate, options):
+    t0 = time.monotonic()
+    try:
+        sensor = open_sensor(kind, mock, **options)
+    except Exception as e:
+        conn.send(("error", repr(e)))
+        return
+    from .acquisition import SensorTask
+
+    conn.send(("ready", {"open_s": time.monotonic() - t0}))
+    try:
+        while True:
+            request = conn.recv()
+            if request[0] == "stop":
+                break
+            task = SensorTask(kind, sensor, rate=rate)
+            try:
+                task.start()
+                time.sleep(request[1])
+                task.stop()
+                conn.send(("ok", task.report()))
+            except Exception as e:
+                task.stop()
+                conn.send(("error", repr(e)))
+    except (EOFError, KeyboardInterrupt):
+        pass
+    finally:
+        close = getattr(sensor, "close", None)
+        if close:
+            close()
+
+
+class SensorWorker:
+    """One sensor, opened once, in its own process.
+
+    `rate` defaults to `RATES[kind]`. `start()` waits until the sensor is
+    open and raises RuntimeError if it could not be.
+    """
+
+    def __init__(self, kind, mock=False, rate=None, timeout=10.0, **options):
+        if kind not in KINDS:
+            raise ValueError(f"unknown sensor kind {kind!r}")
+        self.kind = kind
+        self.mock = mock
+        self.rate = RATES[kind] if rate is None else rate
+        self.timeout = timeout
+        self.options = options
+        self.requests = 0
+        self._pending = 0.0
+        self.start_s = None
+        self.open_s = None
+        self._proc = None
+        self._conn = None
+
+    def start(self):
+        t0 = time.monotonic()
+        self._conn, child = multiprocessing.Pipe()
+        self._proc = multiprocessing.Process(target=_serve, args=(child, self.kind, self.mock, self.rate, self.options),
+                                             name=f"worker-{self.kind}", daemon=True)
+        self._proc.start()
+        child.close()
+        ready = self._reply(self.timeout)
+        self.open_s = ready["open_s"]
+        self.start_s = time.monotonic() - t0
+        return self
+
+    @property
+    def alive(self):
+        return self._proc is not None and self._proc.is_alive()
+
+    def _reply(self, timeout):
+        if not self._conn.poll(timeout):
+            self.close()
+            raise RuntimeError(f"{self.kind} worker did not answer within {timeout:.1f} s")
+        try:
+            status, value = self._conn.recv()
+        except EOFError:
+            self.close()
+            raise RuntimeError(f"{self.kind} worker exited") from None
+        if status == "error":
+            if not self.alive:
+                self.close()
+            raise RuntimeError(f"{self.kind}: {value}")
+        return value
+
+    def request(self, seconds):
+        """Start sampling for `seconds`; collect the report with `result()`."""
+        if not self.alive:
+            self.start()
+        self._conn.send(("sample", float(seconds)))
+        self._pending = seconds
+        self.requests += 1
+
+    def result(self):
+        return self._reply(self._pending + self.timeout)
+
+    def sample(self, seconds):
+        """Sample for `seconds`; returns the SensorTask report."""
+        self.request(seconds)
+        return self.result()
+
+    def close(self):
+        if self._proc is None:
+            return
+        try:
+            self._conn.send(("stop",))
+        except (OSError, ValueError):
+            pass
+        self._proc.join(2.0)
+        if self._proc.is_alive():
+            self._proc.terminate()
+            self._proc.join(2.0)
+        self._conn.close()
+        self._proc = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class WorkerPool:
+    """One `SensorWorker` per kind, started on first use and kept until `close()`."""
+
+    def __init__(self, mock=False, timeout=10.0, options=None):
+        self.mock = mock
+        self.timeout = timeout
+        self.options = options or {}
+        self.workers = {}
+
+    def get(self, kind):
+        worker = self.workers.get(kind)
+        if worker is None:
+            worker = SensorWorker(kind, self.mock, timeout=self.timeout, **self.options.get(kind, {}))
+            self.workers[kind] = worker
+        if not worker.alive:
+            worker.start()
+        return worker
+
+    def sample(self, kinds, seconds):
+        """Sample every kind at once; {kind: report, or {"error": ...}}."""
+        out, started = {}, []
+        for kind in kinds:
+            try:
+                self.get(kind).request(seconds)
+                started.append(kind)
+            except RuntimeError as e:
+                out[kind] = {"error": str(e)}
+        for kind in started:
+            try:
+                out[kind] = self.workers[kind].result()
+            except RuntimeError as e:
+                out[kind] = {"error": str(e)}
+        return out
+
+    def close(self):
+        for worker in self.workers.values():
+            worker.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
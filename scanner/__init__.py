@@ -0,0 +1,34 @@
+"""Scanner processing pipeline.
+
+Turns HAL sensor streams into 3D points and maps. Nothing here talks to
+hardware directly; see the `hal` package for that. Names are imported
+from their modules on first use, as in `hal`.
+"""
+import importlib
+
+_EXPORTS = {
+    "Extrinsics": "projection",
+    "VoxelMap": "voxel",
+    "project": "projection",
+    "project_readings": "projection",
+}
+
+__all__ = [
+    "Extrinsics",
+    "VoxelMap",
+    "project",
+    "project_readings",
+]
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
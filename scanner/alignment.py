@@ -0,0 +1,279 @@
+"""Camera-to-world alignment from ArUco anchors with known world positions.
+
+`umeyama` is the one-shot rigid fit used by `tools/anchor_alignment.py`.
+`OnlineAligner` keeps it up to date while marker observations stream in:
+
+    aligner = OnlineAligner({0: [0, 0, 0], 1: [1, 0, 0], 2: [0, 1, 0]}, window=0.5)
+    for frame in pipeline_results:
+        fit = aligner.observe(frame["markers"])
+        if fit:
+            publish(fit["R"], fit["t"], fit["rms"])
+
+Every observation inside the time window is one correspondence
+(camera-frame tvec -> anchor world position). The aligner stores running
+sums per anchor (count and tvec sum) instead of the observations
+themselves. Adding or expiring an observation is O(1). Re-solving takes
+one 3x3 SVD over the current inlier anchors, and RANSAC over anchor
+triples only runs when that inlier set stops reproducing itself. Neither
+depends on how many observations the window holds.
+
+The window should be short compared with how fast the camera moves, since
+every observation in it is treated as coming from one camera pose.
+"""
+import collections
+import itertools
+
+import numpy as np
+
+from . import instrument
+
+
+_M_SOLVE = instrument.histogram("alignment_solve_seconds", "OnlineAligner.solve time")
+_M_RANSAC = instrument.counter("alignment_ransac_total", "RANSAC runs in OnlineAligner")
+_M_RMS = instrument.gauge("alignment_rms_m", "Inlier RMS of the latest alignment fit")
+
+
+def umeyama(src, dst):
+    """Rigid transform (R, t) minimizing |R @ src_i + t - dst_i|^2.
+
+    src, dst: (N, 3), or (M, N, 3) to solve M problems at once.
+    """
+    src = np.asarray(src, dtype=np.float64)
+    dst = np.asarray(dst, dtype=np.float64)
+    if src.shape != dst.shape:
+        raise ValueError("src and dst must have the same shape")
+    mu_src = src.mean(axis=-2)
+    mu_dst = dst.mean(axis=-2)
+    cov = np.swapaxes(src - mu_src[..., None, :], -1, -2) @ (dst - mu_dst[..., None, :]) / src.shape[-2]
+    return _rotation_from_cov(cov, mu_src, mu_dst)
+
+
+def _rotation_from_cov(cov, mu_src, mu_dst):
+    # cov = E[(src - mu_src)(dst - mu_dst)^T]; R = V diag(1, 1, d) U^T.
+    u, _, vt = np.linalg.svd(cov)
+    v = np.swapaxes(vt, -1, -2)
+    ut = np.swapaxes(u, -1, -2)
+    d = np.sign(np.linalg.det(v @ ut))
+    d = np.where(d == 0, 1.0, d)
+    v = v.copy()
+    v[..., :, 2] *= d[..., None]
+    rot = v @ ut
+    t = mu_dst - (rot @ mu_src[..., None])[..., 0]
+    return rot, t
+
+
+class OnlineAligner:
+    """Sliding-window camera-to-world alignment with RANSAC over anchors.
+
+    known:             {marker id: (x, y, z)} world anchor positions
+    window:            seconds of observations that contribute to the fit
+    inlier_threshold:  anchor residual (m) under which it counts as an inlier
+    ransac_iters:      cap on 3-anchor hypotheses; all triples are tried
+                       when there are fewer
+    ransac_every:      re-run RANSAC at least this often (solves); in
+                       between, the previous inlier set is kept for as long
+                       as it reproduces itself
+    min_anchors:       distinct anchors needed before a fit is published
+    """
+
+    def __init__(self, known, window=1.0, inlier_threshold=0.05, ransac_iters=64, ransac_every=30, min_anchors=3,
+                 seed=0):
+        ids = sorted(int(k) for k in known)
+        self.ids = np.array(ids, dtype=np.int64)
+        self._slot = {mid: i for i, mid in enumerate(ids)}
+        self.world = np.array([known.get(mid, known.get(str(mid))) for mid in ids], dtype=np.float64)
+        self.window = window
+        self.inlier_threshold = inlier_threshold
+        self.ransac_iters = ransac_iters
+        self.ransac_every = ransac_every
+        self.min_anchors = max(3, min_anchors)
+        self._rng = np.random.default_rng(seed)
+        k = len(ids)
+        self.count = np.zeros(k, dtype=np.int64)
+        self.sum = np.zeros((k, 3))
+        self._obs = collections.deque()
+        self._removed = 0
+        self.now = -np.inf
+        self.observations = 0
+        self.ignored = 0
+        self.expired = 0
+        self.ransac_runs = 0
+        self._inliers = np.zeros(k, dtype=bool)
+        self._since_ransac = 0
+        self.last = None
+
+    def __len__(self):
+        return len(self._obs)
+
+    def add(self, t, marker_id, tvec):
+        """Add one camera-frame marker position; unknown ids are ignored."""
+        slot = self._slot.get(int(marker_id))
+        if slot is None:
+            self.ignored += 1
+            return False
+        v = np.asarray(tvec, dtype=np.float64)
+        self.count[slot] += 1
+        self.sum[slot] += v
+        self._obs.append((t, slot, v))
+        self.observations += 1
+        if t > self.now:
+            self.now = t
+        return True
+
+    def add_records(self, records):
+        """Add MARKER_RECORD rows (only those with a pose)."""
+        records = records[records["has_pose"] != 0]
+        if not len(records):
+            return
+        slots = np.array([self._slot.get(int(m), -1) for m in records["id"].tolist()], dtype=np.int64)
+        known = slots >= 0
+        self.ignored += int((~known).sum())
+        slots = slots[known]
+        tvecs = records["tvec"][known].astype(np.float64)
+        ts = records["t"][known].tolist()
+        np.add.at(self.count, slots, 1)
+        np.add.at(self.sum, slots, tvecs)
+        self._obs.extend(zip(ts, slots.tolist(), tvecs))
+        self.observations += len(slots)
+        if ts:
+            self.now = max(self.now, max(ts))
+
+    def expire(self, now=None):
+        """Drop observations older than `window` seconds before `now`."""
+        if now is not None:
+            self.now = max(self.now, now)
+        cutoff = self.now - self.window
+        obs = self._obs
+        while obs and obs[0][0] < cutoff:
+            _, slot, v = obs.popleft()
+            self.count[slot] -= 1
+            self.sum[slot] -= v
+            self.expired += 1
+            self._removed += 1
+        if self._removed > 100_000:
+            self._resum()
+
+    def _resum(self):
+        # Subtracting expired samples accumulates rounding; rebuild now and then.
+        self.count[:] = 0
+        self.sum[:] = 0.0
+        for _, slot, v in self._obs:
+            self.count[slot] += 1
+            self.sum[slot] += v
+        self._removed = 0
+
+    def _solve(self, sel):
+        """Weighted Umeyama over the anchors in `sel` from the running sums."""
+        n = self.count[sel].astype(np.float64)
+        s = self.sum[sel]
+        w = self.world[sel]
+        total = n.sum()
+        mu_src = s.sum(axis=0) / total
+        mu_dst = (n[:, None] * w).sum(axis=0) / total
+        # Observations of one anchor all pair with the same world point, so
+        # sum_j v_j w^T collapses to (tvec sum) w^T.
+        cov = s.T @ w / total - np.outer(mu_src, mu_dst)
+        return _rotation_from_cov(cov, mu_src, mu_dst)
+
+    def _hypotheses(self, k):
+        n_triples = k * (k - 1) * (k - 2) // 6
+        if n_triples <= self.ransac_iters:
+            return np.array(list(itertools.combinations(range(k), 3)), dtype=np.int64)
+        picks = np.argsort(self._rng.random((self.ransac_iters, k)), axis=1)[:, :3]
+        return picks
+
+    def _consensus(self, seen, means, world):
+        """Refit on the previous inliers; None if that set is no longer stable."""
+        prev = self._inliers[seen]
+        self._since_ransac += 1
+        if prev.sum() < 3 or self._since_ransac >= self.ransac_every:
+            return None
+        rot, t = self._solve(seen[prev])
+        ok = np.linalg.norm(means @ rot.T + t - world, axis=1) < self.inlier_threshold
+        if not np.array_equal(ok, prev):
+            return None
+        return prev, rot, t
+
+    def _ransac(self, means, world):
+        self.ransac_runs += 1
+        _M_RANSAC.inc()
+        self._since_ransac = 0
+        inliers = np.ones(len(means), dtype=bool)
+        if len(means) > 3:
+            # Score every 3-anchor hypothesis at once with batched SVDs.
+            triples = self._hypotheses(len(means))
+            rots, ts = umeyama(means[triples], world[triples])
+            pred = np.einsum("mij,kj->mki", rots, means) + ts[:, None, :]
+            err = np.linalg.norm(pred - world[None], axis=2)
+            ok = err < self.inlier_threshold
+            score = ok.sum(axis=1)
+            # Most inliers wins; ties go to the lower inlier error.
+            cost = np.where(ok, err, 0.0).sum(axis=1)
+            best = np.lexsort((cost, -score))[0]
+            if score[best] >= 3:
+                inliers = ok[best]
+        return inliers
+
+    def solve(self):
+        """Fit the current window; returns a dict or None if under-constrained."""
+        with _M_SOLVE.time():
+            fit = self._fit()
+        if fit is not None:
+            _M_RMS.set(fit["rms"])
+        return fit
+
+    def _fit(self):
+        self.expire()
+        seen = np.flatnonzero(self.count > 0)
+        if len(seen) < self.min_anchors:
+            return None
+        means = self.sum[seen] / self.count[seen, None]
+        world = self.world[seen]
+
+        fit = self._consensus(seen, means, world)
+        if fit is None:
+            inliers = self._ransac(means, world)
+            rot, t = self._solve(seen[inliers])
+        else:
+            inliers, rot, t = fit
+        self._inliers[:] = False
+        self._inliers[seen[inliers]] = True
+        residuals = np.linalg.norm(means @ rot.T + t - world, axis=1)
+        inlier_res = residuals[inliers]
+        self.last = {
+            "timestamp": float(self.now),
+            "R": rot,
+            "t": t,
+            "ids": self.ids[seen].tolist(),
+            "inliers": self.ids[seen[inliers]].tolist(),
+            "residuals": residuals,
+            "rms": float(np.sqrt(np.mean(inlier_res ** 2))),
+            "observations": int(self.count[seen[inliers]].sum()),
+        }
+        return self.last
+
+    def observe(self, records):
+        """Add one frame of MARKER_RECORD rows and re-solve."""
+        self.add_records(records)
+        return self.solve()
+
+    def stream(self, records):
+        """Yield a fit per distinct timestamp of a MARKER_RECORD array."""
+        t = records["t"]
+        if not len(t):
+            return
+        starts = np.flatnonzero(np.r_[True, t[1:] != t[:-1]])
+        ends = np.r_[starts[1:], len(t)]
+        for a, b in zip(starts.tolist(), ends.tolist()):
+            fit = self.observe(records[a:b])
+            if fit is not None:
+                yield fit
+
+
+def fit_to_json(fit):
+    """JSON-friendly copy of a fit dict."""
+    out = dict(fit)
+    out["R"] = fit["R"].tolist()
+    out["t"] = fit["t"].tolist()
+    out["residuals"] = fit["residuals"].tolist()
+    return out
@@ -0,0 +1,674 @@
+"""Camera intrinsics, sensor mounting extrinsics and a calibration store.
+
+Intrinsics come from a recorded set of ChArUco board frames. Corner
+detection is the slow part and every frame is independent, so
+`detect_frames` spreads it over a process pool (frames given as image
+paths are read by the workers themselves). One `cv2.calibrateCamera` call
+then fits the camera matrix and distortion to all the views.
+
+Extrinsics come from recorded sessions (scan logs, or
+`hal.simulator.ScanSimulator.generate` output) in which the camera sees
+wall anchors while the rangefinder sweeps the same walls. Both solves are
+batched linear least squares over every observation at once:
+
+  - camera-to-body rotation (`solve_body_camera`): hand-eye AX = XB.
+    Between two sightings of the same marker, the body rotation measured
+    by the IMU and the marker's rotation seen by the camera are the same
+    motion in two frames. Each pair of sightings gives four linear
+    equations in the quaternion of X, and the smallest singular vector
+    of the stacked system is the fit.
+  - rangefinder mount (`solve_range_mount`): the marker pose gives its
+    wall as a plane in the camera frame. A range sample taken within
+    `max_dt` of that frame must land on that plane, so
+    n . origin + d * (n . beam) = h, which is linear in (origin, beam).
+    Samples that hit some other surface are gated out against the
+    current estimate, and the fit is refined over a few rounds.
+
+Results are `Calibration` objects, saved as .npz files that still hold
+`camera_matrix` and `dist_coeffs` for the older `--calib` loaders.
+`CalibrationStore` keeps them under `<cache>/calibration/<serial>/`.
+Each save writes a new numbered version and never overwrites an older
+one, so a bad calibration can be rolled back by loading an older
+version. Undistortion maps are computed once per calibration and image
+size and kept next to the file, so a tool maps each frame with one
+`cv2.remap`.
+
+    board = CharucoBoard(squares=(7, 5), square_length=0.04, marker_length=0.03)
+    calib, report = calibrate_intrinsics(detect_frames(paths, board, workers=4), board)
+    store = CalibrationStore()
+    store.save(calib, serial=device_serial())
+    calib = store.load(device_serial())
+    frame = calib.undistort(frame)
+
+Frames: body x forward, y left, z up; camera x right, y down, z forward
+(OpenCV). `rot_bc`, `t_bc` are the camera's rotation and position in the
+body frame, as `scanner.fusion.body_fix_from_camera` takes them.
+"""
+import json
+import math
+import os
+import platform
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+from . import quaternion
+from .projection import Extrinsics, orientation_at
+
+
+# Bump when the file layout changes; older files stay readable.
+FORMAT = 1
+
+_ARRAYS = ("camera_matrix", "dist_coeffs", "image_size", "rot_bc", "t_bc", "range_origin", "range_beam")
+
+
+def _cv2():
+    import cv2
+
+    return cv2
+
+
+def device_serial():
+    """Serial number of this board (the Pi's SoC serial), or the host name."""
+    for path in ("/proc/device-tree/serial-number", "/sys/firmware/devicetree/base/serial-number"):
+        try:
+            serial = Path(path).read_bytes().strip(b"\0\n ").decode()
+            if serial:
+                return serial
+        except (OSError, UnicodeDecodeError):
+            pass
+    try:
+        for line in Path("/proc/cpuinfo").read_text().splitlines():
+            if line.startswith("Serial"):
+                return line.split(":", 1)[1].strip()
+    except OSError:
+        pass
+    return platform.node() or "unknown"
+
+
+# -- ChArUco intrinsics -------------------------------------------------
+
+
+class CharucoBoard:
+    """ChArUco board geometry: `squares` (columns, rows), lengths in meters."""
+
+    def __init__(self, squares=(7, 5), square_length=0.04, marker_length=0.03, dictionary="DICT_4X4_50"):
+        if marker_length >= square_length:
+            raise ValueError("marker_length must be smaller than square_length")
+        self.squares = (int(squares[0]), int(squares[1]))
+        self.square_length = float(square_length)
+        self.marker_length = float(marker_length)
+        self.dictionary = dictionary
+        self._board = None
+
+    @property
+    def spec(self):
+        return (self.squares, self.square_length, self.marker_length, self.dictionary)
+
+    def __reduce__(self):
+        # OpenCV objects do not pickle; workers rebuild the board from its spec.
+        return (CharucoBoard, self.spec)
+
+    def __eq__(self, other):
+        return isinstance(other, CharucoBoard) and self.spec == other.spec
+
+    def __hash__(self):
+        return hash(self.spec)
+
+    @property
+    def board(self):
+        if self._board is None:
+            cv2 = _cv2()
+            aruco = cv2.aruco.getPredefinedDictionary(getattr(cv2.aruco, self.dictionary))
+            self._board = cv2.aruco.CharucoBoard(self.squares, self.square_length, self.marker_length, aruco)
+        return self._board
+
+    @property
+    def object_points(self):
+        """(N, 3) inner chessboard corners in the board frame, indexed by corner id."""
+        return np.asarray(self.board.getChessboardCorners(), dtype=np.float32).reshape(-1, 3)
+
+    def image(self, px_per_square=100, margin=None):
+        """The board as a uint8 image, with `margin` px of white around it, for printing."""
+        margin = px_per_square // 2 if margin is None else margin
+        w, h = self.squares
+        size = (w * px_per_square + 2 * margin, h * px_per_square + 2 * margin)
+        return self.board.generateImage(size, marginSize=margin)
+
+    def detect(self, gray):
+        """(ids (K,), corners (K, 2)) of the inner corners found in one grayscale frame."""
+        ids, corners = _detector(self).detectBoard(gray)[1::-1]
+        if ids is None or not len(ids):
+            return np.zeros(0, dtype=np.int32), np.zeros((0, 2), dtype=np.float32)
+        return ids.reshape(-1).astype(np.int32), corners.reshape(-1, 2).astype(np.float32)
+
+
+# One detector per board per process, as workers see the same board many times.
+_DETECTORS = {}
+
+
+def _detector(board):
+    det = _DETECTORS.get(board.spec)
+    if det is None:
+        det = _DETECTORS[board.spec] = _cv2().aruco.CharucoDetector(board.board)
+    return det
+
+
+def _detect_task(task):
+    board, frame = task
+    if isinstance(frame, (str, os.PathLike)):
+        cv2 = _cv2()
+        image = cv2.imread(str(frame), cv2.IMREAD_GRAYSCALE)
+        if image is None:
+            raise OSError(f"cannot read image {frame}")
+    else:
+        image = np.asarray(frame)
+        if image.ndim == 3:
+            cv2 = _cv2()
+            image = cv2.cvtColor(image, cv2.COLOR_BGRA2GRAY if image.shape[2] == 4 else cv2.COLOR_BGR2GRAY)
+    ids, corners = board.detect(image)
+    return {"ids": ids, "corners": corners, "size": (image.shape[1], image.shape[0])}
+
+
+def detect_frames(frames, board, workers=None):
+    """Board corners in every frame: [{"ids", "corners", "size"}] in frame order.
+
+    `frames` are image paths or arrays. `workers=None` uses every core;
+    `workers=1` runs in this process. Paths are cheaper to hand to
+    workers than arrays, which are pickled.
+    """
+    tasks = [(board, frame) for frame in frames]
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(tasks) < 2:
+        return [_detect_task(task) for task in tasks]
+    with ProcessPoolExecutor(min(workers, len(tasks))) as pool:
+        return list(pool.map(_detect_task, tasks, chunksize=max(1, len(tasks) // (workers * 4))))
+
+
+def calibrate_intrinsics(detections, board, image_size=None, min_corners=8, flags=0):
+    """Camera matrix and distortion from `detect_frames` output.
+
+    Frames with fewer than `min_corners` corners are skipped. Returns
+    (Calibration, report); the report has the RMS reprojection error in
+    pixels overall and per used frame.
+    """
+    cv2 = _cv2()
+    t0 = time.perf_counter()
+    grid = board.object_points
+    used = [i for i, d in enumerate(detections) if len(d["ids"]) >= min_corners]
+    if len(used) < 3:
+        raise ValueError(f"only {len(used)} frames show at least {min_corners} board corners; need 3 or more")
+    if image_size is None:
+        image_size = detections[used[0]]["size"]
+    obj = [grid[detections[i]["ids"]] for i in used]
+    img = [detections[i]["corners"] for i in used]
+    rms, mtx, dist, rvecs, tvecs = cv2.calibrateCamera(obj, img, tuple(image_size), None, None, flags=flags)
+    per_view = []
+    for o, p, r, t in zip(obj, img, rvecs, tvecs):
+        proj, _ = cv2.projectPoints(o, r, t, mtx, dist)
+        per_view.append(float(np.sqrt(np.mean(np.sum((proj.reshape(-1, 2) - p) ** 2, axis=1)))))
+    report = {
+        "frames": len(detections),
+        "used": len(used),
+        "corners": int(sum(len(p) for p in img)),
+        "rms_px": float(rms),
+        "frame_rms_px": dict(zip(used, per_view)),
+        "solve_s": time.perf_counter() - t0,
+    }
+    calib = Calibration(camera_matrix=mtx, dist_coeffs=dist.reshape(-1), image_size=image_size,
+                        metadata={"intrinsics": {"board": list(board.spec), "rms_px": float(rms),
+                                                 "frames": len(used)}})
+    return calib, report
+
+
+# -- extrinsics ---------------------------------------------------------
+
+
+def _left(q):
+    w, x, y, z = np.moveaxis(q, -1, 0)
+    return np.stack([np.stack([w, -x, -y, -z], -1), np.stack([x, w, -z, y], -1),
+                     np.stack([y, z, w, -x], -1), np.stack([z, -y, x, w], -1)], -2)
+
+
+def _right(q):
+    w, x, y, z = np.moveaxis(q, -1, 0)
+    return np.stack([np.stack([w, -x, -y, -z], -1), np.stack([x, w, z, -y], -1),
+                     np.stack([y, -z, w, x], -1), np.stack([z, y, -x, w], -1)], -2)
+
+
+def _posed(session):
+    markers = session["marker"]
+    keep = np.asarray(markers["has_pose"]).astype(bool)
+    return {name: np.asarray(markers[name])[keep] for name in ("t", "id", "rvec", "tvec")}
+
+
+def _body_quats(session, t):
+    imu = session["imu"]
+    q, valid = orientation_at(t, imu["t"], imu["quat"])
+    return q, valid
+
+
+def _sighting_pairs(markers, lags):
+    """(i, j) index pairs of sightings of the same marker, `lag` sightings apart."""
+    order = np.lexsort((markers["t"], markers["id"]))
+    ids = markers["id"][order]
+    pairs = []
+    for lag in lags:
+        if lag >= len(order):
+            break
+        same = ids[lag:] == ids[:-lag]
+        pairs.append(np.stack([order[:-lag][same], order[lag:][same]], axis=1))
+    return np.concatenate(pairs) if pairs else np.zeros((0, 2), dtype=np.int64)
+
+
+def solve_body_camera(sessions, min_angle=math.radians(5.0), threshold=math.radians(1.0), lags=(1, 2, 4, 8, 16),
+                      rounds=3):
+    """Camera-to-body rotation `rot_bc` from IMU orientation and marker poses.
+
+    Pairs of sightings of one marker whose body orientations differ by at
+    least `min_angle` each give a hand-eye equation; pairs whose residual
+    exceeds `threshold` (after the first round) are dropped. Returns
+    (rot_bc, report).
+    """
+    blocks = []
+    for session in sessions:
+        m = _posed(session)
+        if not len(m["t"]):
+            continue
+        q_b, valid = _body_quats(session, m["t"])
+        q_c = quaternion.from_rvec(m["rvec"].astype(np.float64))
+        pairs = _sighting_pairs(m, lags)
+        pairs = pairs[valid[pairs[:, 0]] & valid[pairs[:, 1]]]
+        i, j = pairs[:, 0], pairs[:, 1]
+        # A = R_b(j)^T R_b(i) and B = R_cm(j) R_cm(i)^T, so that A X = X B.
+        a = quaternion.multiply(quaternion.conjugate(q_b[j]), q_b[i])
+        b = quaternion.multiply(q_c[j], quaternion.conjugate(q_c[i]))
+        # X B X^-1 = A needs matching scalar parts; q and -q are the same rotation.
+        b *= np.where(a[:, :1] * b[:, :1] < 0, -1.0, 1.0)
+        keep = quaternion.angle(a) >= min_angle
+        blocks.append((a[keep], b[keep]))
+    a = np.concatenate([blk[0] for blk in blocks]) if blocks else np.zeros((0, 4))
+    b = np.concatenate([blk[1] for blk in blocks]) if blocks else np.zeros((0, 4))
+    if len(a) < 3:
+        raise ValueError(f"{len(a)} usable marker pairs; turn the scanner more while it sees the anchors")
+    system = _left(a) - _right(b)
+    inliers = np.ones(len(a), dtype=bool)
+    for _ in range(rounds):
+        _, sv, vt = np.linalg.svd(system[inliers].reshape(-1, 4), full_matrices=False)
+        q = vt[-1]
+        predicted = quaternion.multiply(quaternion.multiply(q, b), quaternion.conjugate(q))
+        residual = quaternion.angle(a, predicted)
+        fresh = residual <= threshold
+        if fresh.sum() < 3 or (fresh == inliers).all():
+            break
+        inliers = fresh
+    rot = quaternion.to_matrix(quaternion.canonical(q))
+    report = {
+        "pairs": len(a),
+        "inliers": int(inliers.sum()),
+        "rms_deg": float(np.degrees(np.sqrt(np.mean(residual[inliers] ** 2)))),
+        # Near 0 when every turn was about one axis, which leaves X unsolved.
+        "conditioning": float(sv[-2] / sv[0]),
+    }
+    return rot, report
+
+
+def _range_planes(session, rot_bc, t_bc, max_dt):
+    """Per range sample near a marker frame: body-frame plane (n, h) and distance."""
+    m = _posed(session)
+    rng = session["range"]
+    t_r = np.asarray(rng["t"], dtype=np.float64)
+    d = np.asarray(rng["distance_m"], dtype=np.float64)
+    good = d > 0
+    t_r, d = t_r[good], d[good]
+    if not len(m["t"]) or not len(t_r):
+        return np.zeros((0, 3)), np.zeros(0), np.zeros(0)
+    # The marker's +z is its wall's normal; tvec is a point on the wall.
+    r_cm = quaternion.to_matrix(quaternion.from_rvec(m["rvec"].astype(np.float64)))
+    n_b = r_cm[:, :, 2] @ rot_bc.T
+    h = np.einsum("ij,ij->i", n_b, m["tvec"].astype(np.float64) @ rot_bc.T + t_bc)
+    lo = np.searchsorted(t_r, m["t"] - max_dt)
+    hi = np.searchsorted(t_r, m["t"] + max_dt, side="right")
+    count = hi - lo
+    k = np.repeat(np.arange(len(lo)), count)
+    r = np.repeat(lo - np.r_[0, np.cumsum(count)[:-1]], count) + np.arange(count.sum())
+    # Carry the plane from the frame time to the range sample by the body
+    # rotation in between; the body barely moves within max_dt.
+    q_f, ok_f = _body_quats(session, m["t"][k])
+    q_r, ok_r = _body_quats(session, t_r[r])
+    ok = ok_f & ok_r
+    rel = quaternion.multiply(quaternion.conjugate(q_r[ok]), q_f[ok])
+    return quaternion.rotate(rel, n_b[k[ok]]), h[k[ok]], d[r[ok]]
+
+
+def solve_range_mount(sessions, rot_bc, t_bc=(0.0, 0.0, 0.0), origin=(0.0, 0.0, 0.0), beam=(1.0, 0.0, 0.0),
+                      max_dt=0.01, gate=0.1, min_gate=0.01, rounds=4):
+    """Rangefinder origin and beam direction in the body frame.
+
+    `origin` and `beam` are the starting guess (the nominal mount); range
+    samples whose distance is more than `gate` (plus 5%) off the plane
+    predicted from it are left out of the first round. Later rounds keep
+    samples within three robust standard deviations of the fit, and at
+    least `min_gate`. Returns (origin, beam, report).
+    """
+    rot_bc = np.asarray(rot_bc, dtype=np.float64)
+    t_bc = np.asarray(t_bc, dtype=np.float64)
+    parts = [_range_planes(s, rot_bc, t_bc, max_dt) for s in sessions]
+    n = np.concatenate([p[0] for p in parts])
+    h = np.concatenate([p[1] for p in parts])
+    d = np.concatenate([p[2] for p in parts])
+    o = np.asarray(origin, dtype=np.float64)
+    u = np.asarray(beam, dtype=np.float64) / np.linalg.norm(beam)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        along = n @ u
+        predicted = (h - n @ o) / along
+        inliers = (np.abs(along) > 0.2) & (np.abs(d - predicted) < gate + 0.05 * d)
+    if inliers.sum() < 6:
+        raise ValueError(f"{int(inliers.sum())} range samples hit a marker's wall; need more sweeps over the anchors")
+    scale = 1.0
+    for _ in range(rounds):
+        a = np.hstack([n[inliers], d[inliers, None] * n[inliers]])
+        x, *_ = np.linalg.lstsq(a, h[inliers], rcond=None)
+        scale = float(np.linalg.norm(x[3:]))
+        u = x[3:] / scale
+        # With the beam a unit vector again, re-fit the origin alone.
+        o, *_ = np.linalg.lstsq(n[inliers], h[inliers] - d[inliers] * (n[inliers] @ u), rcond=None)
+        residual = n @ o + d * (n @ u) - h
+        sigma = 1.4826 * np.median(np.abs(residual[inliers]))
+        fresh = (np.abs(residual) <= max(3.0 * sigma, min_gate)) & (np.abs(n @ u) > 0.2)
+        if fresh.sum() < 6 or (fresh == inliers).all():
+            break
+        inliers = fresh
+    sv = np.linalg.svd(np.hstack([n[inliers], d[inliers, None] * n[inliers]]), compute_uv=False)
+    report = {
+        "samples": len(d),
+        "inliers": int(inliers.sum()),
+        "rms_m": float(np.sqrt(np.mean(residual[inliers] ** 2))),
+        # |fitted beam| before normalizing: the range scale error, 1.0 if none.
+        "range_scale": scale,
+        # Near 0 when the hit walls were too alike in direction to pin down all six unknowns.
+        "conditioning": float(sv[-1] / sv[0]),
+    }
+    return o, u, report
+
+
+def load_sessions(paths):
+    """Marker, range and IMU columns of each .scanlog, for the extrinsics solvers."""
+    from .scanlog import ScanLogReader
+
+    sessions = []
+    for path in paths:
+        log = ScanLogReader(path)
+        missing = {"marker", "range", "imu"} - set(log.streams)
+        if missing:
+            raise ValueError(f"{path} has no {', '.join(sorted(missing))} stream")
+        sessions.append({name: log.read(name) for name in ("marker", "range", "imu")})
+    return sessions
+
+
+def calibrate_extrinsics(sessions, rot_bc=None, t_bc=(0.0, 0.0, 0.0), origin=(0.0, 0.0, 0.0),
+                         beam=(1.0, 0.0, 0.0), **options):
+    """Camera rotation and rangefinder mount from recorded sessions.
+
+    `sessions` are .scanlog paths or {"marker", "range", "imu"} dicts.
+    With `rot_bc` given, the camera rotation is kept and only the
+    rangefinder is solved. `t_bc` is not observable from these data and
+    is taken as measured. Returns (Calibration, report).
+    """
+    sessions = list(sessions)
+    if sessions and not isinstance(sessions[0], dict):
+        sessions = load_sessions(sessions)
+    t0 = time.perf_counter()
+    report = {"sessions": len(sessions)}
+    if rot_bc is None:
+        rot_bc, report["camera"] = solve_body_camera(sessions, **{k: v for k, v in options.items()
+                                                                  if k in ("min_angle", "threshold", "lags")})
+    t1 = time.perf_counter()
+    o, u, report["range"] = solve_range_mount(sessions, rot_bc, t_bc, origin, beam,
+                                              **{k: v for k, v in options.items()
+                                                 if k in ("max_dt", "gate", "min_gate", "rounds")})
+    t2 = time.perf_counter()
+    report["camera_s"] = t1 - t0
+    report["range_s"] = t2 - t1
+    calib = Calibration(rot_bc=rot_bc, t_bc=t_bc, range_origin=o, range_beam=u,
+                        metadata={"extrinsics": {k: v for k, v in report.items() if k in ("camera", "range")}})
+    return calib, report
+
+
+# -- results and store --------------------------------------------------
+
+
+class Calibration:
+    """Everything known about one rig; any part may be missing (None).
+
+    camera_matrix, dist_coeffs, image_size (w, h): camera intrinsics
+    rot_bc, t_bc: camera rotation and position in the body frame
+    range_origin, range_beam: rangefinder origin and unit beam in the body frame
+    """
+
+    def __init__(self, camera_matrix=None, dist_coeffs=None, image_size=None, rot_bc=None, t_bc=None,
+                 range_origin=None, range_beam=None, serial=None, metadata=None):
+        def arr(x):
+            return None if x is None else np.asarray(x, dtype=np.float64)
+
+        self.camera_matrix = arr(camera_matrix)
+        self.dist_coeffs = arr(dist_coeffs)
+        self.image_size = None if image_size is None else (int(image_size[0]), int(image_size[1]))
+        self.rot_bc = arr(rot_bc)
+        self.t_bc = arr(t_bc)
+        self.range_origin = arr(range_origin)
+        self.range_beam = arr(range_beam)
+        self.serial = serial
+        self.metadata = dict(metadata or {})
+        self.version = None
+        self.path = None
+        self._maps = {}
+
+    @property
+    def has_intrinsics(self):
+        return self.camera_matrix is not None and self.dist_coeffs is not None
+
+    @property
+    def has_extrinsics(self):
+        return self.range_beam is not None
+
+    def merged(self, other):
+        """A copy with every part `other` has replaced by `other`'s."""
+        out = Calibration(serial=other.serial or self.serial, metadata={**self.metadata, **other.metadata})
+        for name in _ARRAYS:
+            value = getattr(other, name)
+            setattr(out, name, getattr(self, name) if value is None else value)
+        return out
+
+    def range_extrinsics(self):
+        """The rangefinder mount as a `scanner.projection.Extrinsics`."""
+        if not self.has_extrinsics:
+            raise ValueError("calibration has no rangefinder extrinsics; run tools/calibrate.py extrinsics")
+        return Extrinsics(translation=self.range_origin, beam=self.range_beam)
+
+    def matrix_for(self, size):
+        """Camera matrix for frames of `size` (w, h), scaled from the calibrated size."""
+        if self.image_size is None or tuple(size) == self.image_size:
+            return self.camera_matrix
+        sx, sy = size[0] / self.image_size[0], size[1] / self.image_size[1]
+        return np.diag([sx, sy, 1.0]) @ self.camera_matrix
+
+    def undistort_maps(self, size=None):
+        """cv2.remap maps for frames of `size`, computed once.
+
+        A calibration loaded from a file keeps its maps in a sidecar file
+        next to it, so later runs load them instead of computing them.
+        """
+        if not self.has_intrinsics:
+            raise ValueError("calibration has no camera intrinsics; run tools/calibrate.py intrinsics")
+        size = tuple(size or self.image_size)
+        maps = self._maps.get(size)
+        if maps is not None:
+            return maps
+        sidecar = None if self.path is None else self.path.with_name(f"{self.path.stem}.maps-{size[0]}x{size[1]}.npz")
+        if sidecar is not None and sidecar.exists():
+            with np.load(sidecar) as data:
+                maps = (data["map1"], data["map2"])
+        else:
+            cv2 = _cv2()
+            k = self.matrix_for(size)
+            maps = cv2.initUndistortRectifyMap(k, self.dist_coeffs, None, k, size, cv2.CV_16SC2)
+            if sidecar is not None:
+                try:
+                    _write_npz(sidecar, map1=maps[0], map2=maps[1])
+                except OSError:
+                    pass  # read-only: compute again next run
+        self._maps[size] = maps
+        return maps
+
+    def undistort(self, image, out=None):
+        """`image` with lens distortion removed, keeping the same camera matrix."""
+        map1, map2 = self.undistort_maps((image.shape[1], image.shape[0]))
+        cv2 = _cv2()
+        return cv2.remap(image, map1, map2, cv2.INTER_LINEAR, dst=out)
+
+    def to_arrays(self):
+        out = {"format": np.int32(FORMAT), "metadata": np.array(json.dumps(self.metadata))}
+        if self.serial is not None:
+            out["serial"] = np.array(self.serial)
+        for name in _ARRAYS:
+            value = getattr(self, name)
+            if value is not None:
+                out[name] = np.asarray(value)
+        return out
+
+    def save(self, path):
+        _write_npz(Path(path), **self.to_arrays())
+
+    @classmethod
+    def load(cls, path):
+        """Read a calibration .npz; also takes a bare camera_matrix/dist_coeffs file."""
+        path = Path(path)
+        with np.load(path) as data:
+            fmt = int(data["format"]) if "format" in data else 0
+            if fmt > FORMAT:
+                raise ValueError(f"{path} has calibration format {fmt}; this version reads up to {FORMAT}")
+            values = {name: data[name] for name in _ARRAYS if name in data}
+            if "camera_matrix" in values and "dist_coeffs" not in values:
+                raise ValueError(f"{path} has camera_matrix but no dist_coeffs")
+            serial = str(data["serial"]) if "serial" in data else None
+            metadata = json.loads(str(data["metadata"])) if "metadata" in data else {}
+        if "image_size" in values:
+            values["image_size"] = values["image_size"].astype(int).tolist()
+        calib = cls(serial=serial, metadata=metadata, **values)
+        calib.path = path
+        return calib
+
+
+def _write_npz(path, **arrays):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    with open(tmp, "wb") as fh:
+        np.savez(fh, **arrays)
+    os.replace(tmp, path)
+
+
+def _safe(serial):
+    return re.sub(r"[^A-Za-z0-9._-]", "_", str(serial)) or "_"
+
+
+class CalibrationStore:
+    """Versioned calibrations per device serial under `root`.
+
+    `root` defaults to `calibration/` in `hal.backends.cache_dir()`. Every
+    `save` writes `<serial>/v<N>.npz` with N one past the latest. The new
+    version starts from the latest one, so saving intrinsics and then
+    extrinsics leaves one version that has both.
+    """
+
+    def __init__(self, root=None):
+        if root is None:
+            from hal.backends import cache_dir
+
+            root = cache_dir() / "calibration"
+        self.root = Path(root)
+
+    def _dir(self, serial):
+        return self.root / _safe(serial)
+
+    def path(self, serial, version):
+        return self._dir(serial) / f"v{int(version):04d}.npz"
+
+    def serials(self):
+        return sorted(p.name for p in self.root.iterdir() if p.is_dir()) if self.root.is_dir() else []
+
+    def versions(self, serial):
+        found = []
+        for p in self._dir(serial).glob("v*.npz"):
+            m = re.fullmatch(r"v(\d+)\.npz", p.name)
+            if m:
+                found.append(int(m.group(1)))
+        return sorted(found)
+
+    def load(self, serial, version=None):
+        """The latest (or the given) version; FileNotFoundError if there is none."""
+        versions = self.versions(serial)
+        if version is None:
+            if not versions:
+                raise FileNotFoundError(f"no calibration for device {serial!r} in {self.root}; "
+                                        "run tools/calibrate.py")
+            version = versions[-1]
+        path = self.path(serial, version)
+        if not path.exists():
+            raise FileNotFoundError(f"no calibration version {version} for device {serial!r} in {self.root}")
+        calib = Calibration.load(path)
+        calib.version = int(version)
+        calib.serial = calib.serial or str(serial)
+        return calib
+
+    def find(self, serial):
+        """The latest version, or None if the device has not been calibrated."""
+        try:
+            return self.load(serial)
+        except FileNotFoundError:
+            return None
+
+    def save(self, calibration, serial=None):
+        """Write `calibration` over the latest version as a new one; returns the new version."""
+        serial = serial or calibration.serial
+        if serial is None:
+            raise ValueError("a serial is needed to store a calibration")
+        latest = self.find(serial)
+        merged = latest.merged(calibration) if latest is not None else calibration.merged(calibration)
+        merged.serial = str(serial)
+        merged.metadata["saved"] = time.strftime("%Y-%m-%dT%H:%M:%S")
+        version = (latest.version if latest is not None else 0) + 1
+        merged.metadata["version"] = version
+        while True:
+            path = self.path(serial, version)
+            try:
+                # O_EXCL: two saves at once cannot both take the same number.
+                fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+            except FileExistsError:
+                version += 1
+                merged.metadata["version"] = version
+                continue
+            except FileNotFoundError:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                continue
+            os.close(fd)
+            break
+        merged.save(path)
+        calibration.version = version
+        return version
+
+
+def load_calibration(path=None, serial=None, store=None):
+    """The calibration a tool should use.
+
+    That is the .npz at `path`, else the latest stored version for
+    `serial`, else None (uncalibrated).
+    """
+    if path:
+        return Calibration.load(path)
+    if serial:
+        return CalibrationStore(store).find(serial)
+    return None
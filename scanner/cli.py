@@ -0,0 +1,192 @@
+"""`python -m scanner`: one entry point for the tools/ scripts.
+
+    python -m scanner                       # list the commands and what each is missing
+    python -m scanner acquire --mock --duration 5
+    python -m scanner backends [--refresh]
+    python -m scanner check --mock --repeat 3
+
+Each tool command loads the matching script in `tools/` and calls its
+`main()` with the rest of the command line, in this interpreter. Nothing
+heavy is imported before the script itself asks for it, and `hal` and
+`scanner` import their modules on first use. Before a script is run, its
+backends are checked against `hal.backends.detect()`, which is cached.
+A missing library then gives a one-line message with the install
+command, not a traceback part way into the run. Hardware backends are
+not needed with `--mock` or `--replay`.
+
+`check` samples sensors through `hal.workers`: one long-lived process per
+sensor, reused for every `--repeat`.
+"""
+import argparse
+import importlib.util
+import json
+import sys
+import time
+from pathlib import Path
+
+
+TOOLS = Path(__file__).resolve().parent.parent / "tools"
+
+# name: (script, backends always needed, backends needed on hardware, help)
+COMMANDS = {
+    "acquire": ("acquire.py", ("numpy",), ("serial", "board", "busio", "bno055"),
+                "Capture all sensors concurrently"),
+    "tfluna": ("tfluna_read.py", ("numpy",), ("serial",), "Print TF-Luna frames"),
+    "bno055": ("bno055_quat_read.py", (), ("board", "busio", "bno055"), "Print BNO055 quaternions"),
+    "camera": ("camera_test.py", ("numpy",), (), "Capture a test image"),
+    "aruco": ("aruco_pose_demo.py", ("numpy", "opencv"), ("picamera2",), "Print ArUco detections and poses"),
+    "anchors": ("aruco_anchor_publisher.py", ("numpy", "opencv"), ("picamera2",), "Log ArUco anchors to JSONL"),
+    "calibrate": ("calibrate.py", ("numpy", "opencv"), (), "Calibrate the camera and the sensor mounting"),
+    "align": ("anchor_alignment.py", ("numpy",), (), "Fit camera-to-world from anchors"),
+    "simulate": ("simulate_scan.py", ("numpy",), (), "Write a simulated scan log"),
+    "reconstruct": ("reconstruct.py", ("numpy",), (), "Rebuild a voxel map from scan logs"),
+    "scanlog": ("scanlog_convert.py", ("numpy",), (), "Convert to and from .scanlog"),
+    "stream": ("pointcloud_stream.py", ("numpy",), (), "Stream a point cloud to Godot"),
+    "test": ("run_all_tests.py", (), (), "Run the sensor test scripts"),
+}
+BUILTINS = {
+    "backends": "Show which libraries and devices are available",
+    "check": "Sample sensors through long-lived worker processes",
+}
+# Flags that mean no hardware is touched.
+_OFFLINE = {"--mock", "--replay", "-h", "--help"}
+
+
+def _lacking(needs):
+    from hal.backends import missing
+
+    return missing(needs) if needs else []
+
+
+def usage():
+    from hal.backends import detect
+
+    modules = detect()["modules"]
+    lines = ["usage: python -m scanner <command> [args...]", "", "commands:"]
+    for name, (_, needs, hardware, text) in COMMANDS.items():
+        gone = [b for b in needs if not modules.get(b)]
+        offline = [b for b in hardware if not modules.get(b)]
+        note = f"  [needs {', '.join(gone)}]" if gone else f"  [--mock only: no {', '.join(offline)}]" if offline else ""
+        lines.append(f"  {name:12s} {text}{note}")
+    for name, text in BUILTINS.items():
+        lines.append(f"  {name:12s} {text}")
+    lines.append("")
+    lines.append("python -m scanner <command> --help for a command's options.")
+    return "\n".join(lines)
+
+
+def run_tool(name, argv):
+    script, needs, hardware, _ = COMMANDS[name]
+    wanted = list(needs) if _OFFLINE & set(argv) else list(needs) + list(hardware)
+    if not {"-h", "--help"} & set(argv):
+        lacking = _lacking(wanted)
+        if lacking:
+            from hal.backends import INSTALL
+
+            for backend in lacking:
+                print(f"scanner {name}: {backend} is not available to {sys.executable}; "
+                      f"install with: {INSTALL[backend]}", file=sys.stderr)
+            if set(lacking) <= set(hardware) - set(needs):
+                print(f"scanner {name}: or run with --mock", file=sys.stderr)
+            return 2
+    spec = importlib.util.spec_from_file_location(f"scanner_tools.{Path(script).stem}", TOOLS / script)
+    module = importlib.util.module_from_spec(spec)
+    sys.argv = [f"scanner {name}", *argv]
+    try:
+        spec.loader.exec_module(module)
+        module.main()
+    except SystemExit as e:
+        return e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+    return 0
+
+
+def backends(argv):
+    from hal.backends import DEVICES, detect
+
+    parser = argparse.ArgumentParser(prog="scanner backends", description=BUILTINS["backends"])
+    parser.add_argument("--refresh", action="store_true", help="Look again instead of using the cache")
+    parser.add_argument("--json", action="store_true", help="Print JSON")
+    args = parser.parse_args(argv)
+    t0 = time.perf_counter()
+    found = detect(refresh=args.refresh)
+    found["detect_ms"] = (time.perf_counter() - t0) * 1e3
+    if args.json:
+        print(json.dumps(found, indent=2))
+        return 0
+    print(f"{found['python']} ({'cached' if found['cached'] else 'detected'} in {found['detect_ms']:.1f} ms)")
+    for name, origin in found["modules"].items():
+        print(f"  {'yes' if origin else 'no ':3s}  {name:10s} {origin or ''}")
+    for name, present in found["devices"].items():
+        print(f"  {'yes' if present else 'no ':3s}  {name:10s} {DEVICES[name]}")
+    return 0
+
+
+def check(argv):
+    parser = argparse.ArgumentParser(prog="scanner check", description=BUILTINS["check"])
+    parser.add_argument("--sensors", default="imu,range", help="Comma-separated: imu, range, camera")
+    parser.add_argument("--mock", action="store_true", help="Use hal.mocks sensors")
+    parser.add_argument("--duration", type=float, default=2.0, help="Seconds per run")
+    parser.add_argument("--repeat", type=int, default=1, help="Runs, all on the same workers")
+    parser.add_argument("--port", default="/dev/serial0", help="TF-Luna serial port")
+    parser.add_argument("--baud", type=int, default=115200)
+    parser.add_argument("--address", type=lambda x: int(x, 16), default=0x28, help="BNO055 I2C address")
+    parser.add_argument("--report", default=None, help="Also write the JSON report to this path")
+    args = parser.parse_args(argv)
+    kinds = [k.strip() for k in args.sensors.split(",") if k.strip()]
+
+    from hal.workers import KINDS, NEEDS, WorkerPool
+
+    unknown = [k for k in kinds if k not in KINDS]
+    if unknown:
+        parser.error(f"unknown sensors: {', '.join(unknown)} (choose from {', '.join(KINDS)})")
+    if not args.mock:
+        from hal.backends import INSTALL
+
+        lacking = sorted({b for k in kinds for b in _lacking(NEEDS[k])})
+        if lacking:
+            for backend in lacking:
+                print(f"scanner check: {backend} is not available; install with: {INSTALL[backend]}", file=sys.stderr)
+            return 2
+    options = {"imu": {"address": args.address}, "range": {"port": args.port, "baud": args.baud}}
+    report = {"runs": [], "workers": {}}
+    with WorkerPool(mock=args.mock, options=options) as pool:
+        for i in range(args.repeat):
+            t0 = time.monotonic()
+            run = pool.sample(kinds, args.duration)
+            report["runs"].append({"wall_s": time.monotonic() - t0, "sensors": run})
+            for kind in kinds:
+                r = run[kind]
+                if "error" in r:
+                    print(f"FAIL {kind} run {i + 1}: {r['error']}")
+                    continue
+                jitter = r.get("jitter_ms", {}).get("p99")
+                print(f"OK   {kind} run {i + 1}: {r['samples']} samples, {r['achieved_hz']:.1f} Hz, "
+                      f"latency p99 {r.get('latency_ms', {}).get('p99', 0.0):.2f} ms"
+                      + (f", jitter p99 {jitter:.2f} ms" if jitter is not None else ""))
+        for kind, worker in pool.workers.items():
+            report["workers"][kind] = {"start_s": worker.start_s, "open_s": worker.open_s,
+                                       "requests": worker.requests}
+    for kind, w in report["workers"].items():
+        if w["start_s"] is not None:
+            print(f"     {kind} worker: started in {w['start_s']:.2f} s (sensor open {w['open_s']:.2f} s), "
+                  f"{w['requests']} runs")
+    if args.report:
+        Path(args.report).write_text(json.dumps(report, indent=2) + "\n")
+    ok = all("error" not in r for run in report["runs"] for r in run["sensors"].values())
+    return 0 if ok else 1
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if not argv or argv[0] in ("-h", "--help", "help"):
+        print(usage())
+        return 0
+    name, rest = argv[0], argv[1:]
+    if name in COMMANDS:
+        return run_tool(name, rest)
+    if name == "backends":
+        return backends(rest)
+    if name == "check":
+        return check(rest)
+    print(f"scanner: unknown command {name!r}\n\n{usage()}", file=sys.stderr)
+    return 2
@@ -0,0 +1,358 @@
+"""Streaming noise and outlier filters for TF-Luna distances.
+
+Every stage keeps its own state and can be driven either a batch at a time
+(`process`, vectorized) or a sample at a time (`update`); feeding the same
+samples through either path gives the same output, so a chain can switch
+between them mid-stream.
+
+    chain = FilterChain(
+        RangeGate(min_strength=100),
+        [RollingMedian(5), HampelFilter(9, 3.0), Kalman1D(q=1e-4, r=4e-4)],
+    )
+    filtered, accepted = chain.process(distance_m, strength, temperature_c)
+    print(chain.timings(rate_hz=250))
+
+Filters assume distances in meters and samples in arrival order.
+"""
+import collections
+import heapq
+import time
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from scipy.signal import lfilter
+
+
+class RangeGate:
+    """Reject samples the TF-Luna itself flags as unreliable.
+
+    The datasheet treats strength below 100 or at 65535 (saturation) as
+    invalid, and the sensor is only specified from -10 to 60 C.
+    """
+
+    name = "gate"
+
+    def __init__(self, min_strength=100, max_strength=65534, min_distance=0.2, max_distance=8.0,
+                 min_temperature=-10.0, max_temperature=60.0):
+        self.min_strength = min_strength
+        self.max_strength = max_strength
+        self.min_distance = min_distance
+        self.max_distance = max_distance
+        self.min_temperature = min_temperature
+        self.max_temperature = max_temperature
+
+    def mask(self, distance, strength=None, temperature=None):
+        d = np.asarray(distance, dtype=np.float64)
+        ok = np.isfinite(d) & (d >= self.min_distance) & (d <= self.max_distance)
+        if strength is not None:
+            s = np.asarray(strength)
+            ok &= (s >= self.min_strength) & (s <= self.max_strength)
+        if temperature is not None:
+            tc = np.asarray(temperature)
+            ok &= (tc >= self.min_temperature) & (tc <= self.max_temperature)
+        return ok
+
+    def accept(self, distance, strength=None, temperature=None):
+        if not (self.min_distance <= distance <= self.max_distance):
+            return False
+        if strength is not None and not (self.min_strength <= strength <= self.max_strength):
+            return False
+        if temperature is not None and not (self.min_temperature <= temperature <= self.max_temperature):
+            return False
+        return True
+
+
+class _SlidingMedian:
+    """Median of a sliding window in O(log w) per step.
+
+    Two heaps split the window at the median; values leaving the window are
+    deleted lazily when they surface at a heap top.
+    """
+
+    def __init__(self):
+        self._lo = []  # max-heap (negated)
+        self._hi = []  # min-heap
+        self._lo_n = 0
+        self._hi_n = 0
+        self._delayed = collections.Counter()
+
+    def _prune(self, heap, sign):
+        while heap and self._delayed[sign * heap[0]]:
+            self._delayed[sign * heap[0]] -= 1
+            heapq.heappop(heap)
+
+    def _balance(self):
+        if self._lo_n > self._hi_n + 1:
+            heapq.heappush(self._hi, -heapq.heappop(self._lo))
+            self._lo_n -= 1
+            self._hi_n += 1
+            self._prune(self._lo, -1)
+        elif self._lo_n < self._hi_n:
+            heapq.heappush(self._lo, -heapq.heappop(self._hi))
+            self._hi_n -= 1
+            self._lo_n += 1
+            self._prune(self._hi, 1)
+
+    def add(self, x):
+        if not self._lo or x <= -self._lo[0]:
+            heapq.heappush(self._lo, -x)
+            self._lo_n += 1
+        else:
+            heapq.heappush(self._hi, x)
+            self._hi_n += 1
+        self._balance()
+
+    def remove(self, x):
+        self._delayed[x] += 1
+        if x <= -self._lo[0]:
+            self._lo_n -= 1
+            if x == -self._lo[0]:
+                self._prune(self._lo, -1)
+        else:
+            self._hi_n -= 1
+            if self._hi and x == self._hi[0]:
+                self._prune(self._hi, 1)
+        self._balance()
+
+    def median(self):
+        if self._lo_n > self._hi_n:
+            return -self._lo[0]
+        return (-self._lo[0] + self._hi[0]) / 2.0
+
+
+def _window_medians(history, x, w):
+    """Median of the w values ending at each element of x (partial at start)."""
+    full = np.concatenate([history, x])
+    out = np.empty(len(x))
+    n_partial = max(0, min(len(x), w - 1 - len(history)))
+    for i in range(n_partial):
+        out[i] = np.median(full[:len(history) + i + 1])
+    if len(x) > n_partial:
+        windows = sliding_window_view(full, w)
+        out[n_partial:] = np.median(windows[len(windows) - (len(x) - n_partial):], axis=1)
+    return out
+
+
+class RollingMedian:
+    """Trailing median over the last `window` samples."""
+
+    name = "median"
+
+    def __init__(self, window=5):
+        self.window = window
+        self._hist = collections.deque(maxlen=window)
+        self._med = None
+
+    def _engine(self):
+        # Built lazily so batch-only use never pays for the heaps.
+        if self._med is None:
+            self._med = _SlidingMedian()
+            for v in self._hist:
+                self._med.add(v)
+        return self._med
+
+    def update(self, x):
+        x = float(x)
+        med = self._engine()
+        if len(self._hist) == self.window:
+            med.remove(self._hist[0])
+        self._hist.append(x)
+        med.add(x)
+        return med.median()
+
+    def process(self, x):
+        x = np.asarray(x, dtype=np.float64)
+        if not len(x):
+            return x.copy()
+        out = _window_medians(np.asarray(self._hist, dtype=np.float64), x, self.window)
+        self._hist.extend(x.tolist())
+        self._med = None
+        return out
+
+
+class HampelFilter:
+    """Causal Hampel identifier.
+
+    Each sample is compared with the median and MAD of the `window` samples
+    before it; if it is more than `n_sigma` scaled MADs away it is replaced
+    by that median. Windows always hold the raw inputs, not replacements.
+    """
+
+    name = "hampel"
+    _K = 1.4826  # MAD -> standard deviation for Gaussian noise
+
+    def __init__(self, window=9, n_sigma=3.0, min_samples=3):
+        self.window = window
+        self.n_sigma = n_sigma
+        self.min_samples = min_samples
+        self._hist = collections.deque(maxlen=window)
+        self.replaced = 0
+
+    def update(self, x):
+        x = float(x)
+        out = x
+        if len(self._hist) >= self.min_samples:
+            prev = np.fromiter(self._hist, dtype=np.float64, count=len(self._hist))
+            med = np.median(prev)
+            mad = np.median(np.abs(prev - med))
+            if abs(x - med) > self.n_sigma * self._K * mad:
+                out = float(med)
+                self.replaced += 1
+        self._hist.append(x)
+        return out
+
+    def process(self, x):
+        x = np.asarray(x, dtype=np.float64)
+        n = len(x)
+        out = x.copy()
+        if not n:
+            return out
+        full = np.concatenate([np.asarray(self._hist, dtype=np.float64), x])
+        h = len(self._hist)
+        w = self.window
+        # Samples whose preceding window is still partial (stream start).
+        first_full = max(0, w - h)
+        for i in range(min(n, first_full)):
+            prev = full[max(0, h + i - w):h + i]
+            if len(prev) >= self.min_samples:
+                out[i] = self._hampel_one(x[i], prev)
+        if n > first_full:
+            # Window for x[i] is full[h+i-w : h+i].
+            windows = sliding_window_view(full[:-1], w)[h + first_full - w:]
+            med = np.median(windows, axis=1)
+            mad = np.median(np.abs(windows - med[:, None]), axis=1)
+            xs = x[first_full:]
+            bad = np.abs(xs - med) > self.n_sigma * self._K * mad
+            out[first_full:][bad] = med[bad]
+            self.replaced += int(bad.sum())
+        self._hist.extend(x.tolist())
+        return out
+
+    def _hampel_one(self, x, prev):
+        med = np.median(prev)
+        mad = np.median(np.abs(prev - med))
+        if abs(x - med) > self.n_sigma * self._K * mad:
+            self.replaced += 1
+            return med
+        return x
+
+
+class Kalman1D:
+    """Constant-position Kalman filter with process noise `q`, measurement noise `r`.
+
+    The gain sequence does not depend on the data, so once it settles the
+    filter is the fixed IIR y[k] = K z[k] + (1 - K) y[k-1]; batch mode runs
+    that through `lfilter`. The per-sample path uses the same expression so
+    both agree bit for bit.
+    """
+
+    name = "kalman"
+
+    def __init__(self, q=1e-4, r=4e-4):
+        self.q = q
+        self.r = r
+        self.x = None
+        self.p = None
+        self._steady = False
+
+    def _gain(self):
+        if self._steady:
+            return self._k
+        p_pred = self.p + self.q
+        k = p_pred / (p_pred + self.r)
+        p = (1.0 - k) * p_pred
+        if abs(p - self.p) <= 1e-12 * p:
+            self._steady = True
+            self._k = k
+        self.p = p
+        return k
+
+    def update(self, z):
+        z = float(z)
+        if self.x is None:
+            self.x = z
+            self.p = self.r
+            return z
+        k = self._gain()
+        self.x = k * z + (1.0 - k) * self.x
+        return self.x
+
+    def process(self, z):
+        z = np.asarray(z, dtype=np.float64)
+        out = np.empty(len(z))
+        i = 0
+        while i < len(z) and not self._steady:
+            out[i] = self.update(z[i])
+            i += 1
+        if i < len(z):
+            k = self._k
+            out[i:], _ = lfilter([k], [1.0, k - 1.0], z[i:], zi=[(1.0 - k) * self.x])
+            self.x = float(out[-1])
+        return out
+
+
+class FilterChain:
+    """Gate followed by value filters, with per-stage timing."""
+
+    def __init__(self, gate=None, stages=()):
+        self.gate = gate
+        self.stages = list(stages)
+        names = (["gate"] if gate else []) + [s.name for s in self.stages]
+        self._seconds = dict.fromkeys(names, 0.0)
+        self._samples = dict.fromkeys(names, 0)
+
+    def process(self, distance, strength=None, temperature=None):
+        """Filter a batch; returns (filtered accepted values, acceptance mask)."""
+        clock = time.perf_counter
+        d = np.asarray(distance, dtype=np.float64)
+        if self.gate is not None:
+            t0 = clock()
+            mask = self.gate.mask(d, strength, temperature)
+            x = d[mask]
+            self._seconds["gate"] += clock() - t0
+            self._samples["gate"] += len(d)
+        else:
+            mask = np.ones(len(d), dtype=bool)
+            x = d
+        for stage in self.stages:
+            t0 = clock()
+            x = stage.process(x)
+            self._seconds[stage.name] += clock() - t0
+            self._samples[stage.name] += len(x)
+        return x, mask
+
+    def process_frames(self, frames):
+        """`process` over a TFLunaDecoder batch (distance in cm)."""
+        return self.process(frames["distance_cm"] / 100.0, frames["strength"], frames["temperature_c"])
+
+    def update(self, distance, strength=None, temperature=None):
+        """Filter one sample; returns the filtered value or None if gated out."""
+        clock = time.perf_counter
+        if self.gate is not None:
+            t0 = clock()
+            ok = self.gate.accept(distance, strength, temperature)
+            self._seconds["gate"] += clock() - t0
+            self._samples["gate"] += 1
+            if not ok:
+                return None
+        x = distance
+        for stage in self.stages:
+            t0 = clock()
+            x = stage.update(x)
+            self._seconds[stage.name] += clock() - t0
+            self._samples[stage.name] += 1
+        return x
+
+    def timings(self, rate_hz=None):
+        """Per-stage cost; with `rate_hz`, the share of the real-time budget used."""
+        out = {}
+        total = 0.0
+        for name, secs in self._seconds.items():
+            n = self._samples[name]
+            per = secs / n if n else 0.0
+            total += per
+            out[name] = {"samples": n, "seconds": secs, "us_per_sample": per * 1e6}
+        out["total_us_per_sample"] = total * 1e6
+        if rate_hz:
+            out["realtime_load"] = total * rate_hz
+        return out
@@ -0,0 +1,383 @@
+"""Fuse BNO055 orientation/acceleration with ArUco marker pose fixes.
+
+`PoseFilter` is an error-state Kalman filter over position, velocity and
+an orientation correction:
+
+    q_body = q_corr (x) q_imu
+
+The BNO055's own fused quaternion `q_imu` is trusted over short spans, but
+its heading slowly drifts. `q_corr` absorbs that drift and is only moved by
+marker fixes. Acceleration, rotated into the world with `q_body` and with
+gravity removed, drives position and velocity between fixes.
+
+Error state (9): position (3), velocity (3), world-frame rotation error (3).
+
+    fusion = PoseFilter()
+    for sample in imu:                          # ~100 Hz
+        pose = fusion.predict(sample["timestamp"], sample["quat"], sample["accel"])
+    fusion.correct(t_fix, position, quat)      # 5-30 Hz, may arrive late
+
+Fixes usually arrive after later IMU samples have been processed. The
+filter keeps a short ring of past states and IMU inputs. A late fix
+rewinds to the state just before its timestamp, is applied there, and the
+stored IMU samples are replayed on top, re-applying any later fixes on the
+way. Fixes newer than the latest IMU sample wait until the IMU catches up.
+Fixes older than the history ring are dropped and counted.
+
+The per-sample `predict` and the fix update work in preallocated buffers
+and create no arrays per sample.
+"""
+import bisect
+import math
+
+import numpy as np
+
+from . import quaternion
+
+
+POSE_DTYPE = np.dtype(
+    [
+        ("t", "<f8"),
+        ("position", "<f8", (3,)),
+        ("velocity", "<f8", (3,)),
+        ("quat", "<f8", (4,)),
+        ("pos_std", "<f4", (3,)),
+        ("ang_std", "<f4", (3,)),
+    ]
+)
+
+_OBS = np.array([0, 1, 2, 6, 7, 8])  # error-state rows a pose fix observes
+
+
+def _qmul(a, b):
+    aw, ax, ay, az = a
+    bw, bx, by, bz = b
+    return (
+        aw * bw - ax * bx - ay * by - az * bz,
+        aw * bx + ax * bw + ay * bz - az * by,
+        aw * by - ax * bz + ay * bw + az * bx,
+        aw * bz + ax * by - ay * bx + az * bw,
+    )
+
+
+def _qnormalize(q):
+    n = math.sqrt(q[0] * q[0] + q[1] * q[1] + q[2] * q[2] + q[3] * q[3])
+    if not n > 1e-9:
+        return None
+    return (q[0] / n, q[1] / n, q[2] / n, q[3] / n)
+
+
+def _qexp(rx, ry, rz):
+    """Quaternion for rotation vector (rx, ry, rz)."""
+    theta = math.sqrt(rx * rx + ry * ry + rz * rz)
+    k = math.sin(0.5 * theta) / theta if theta > 1e-12 else 0.5
+    return (math.cos(0.5 * theta), rx * k, ry * k, rz * k)
+
+
+def _matrix_into(q, out):
+    w, x, y, z = q
+    out[0, 0] = 1.0 - 2.0 * (y * y + z * z)
+    out[0, 1] = 2.0 * (x * y - w * z)
+    out[0, 2] = 2.0 * (x * z + w * y)
+    out[1, 0] = 2.0 * (x * y + w * z)
+    out[1, 1] = 1.0 - 2.0 * (x * x + z * z)
+    out[1, 2] = 2.0 * (y * z - w * x)
+    out[2, 0] = 2.0 * (x * z - w * y)
+    out[2, 1] = 2.0 * (y * z + w * x)
+    out[2, 2] = 1.0 - 2.0 * (x * x + y * y)
+
+
+class PoseFilter:
+    """Error-state Kalman filter for IMU + marker fixes.
+
+    accel_noise: accelerometer white noise (m/s^2 per sqrt(Hz))
+    drift_noise: heading drift random walk (rad per sqrt(s))
+    pos_std / ang_std: default fix uncertainty (m, rad)
+    history: IMU samples kept for replaying late fixes (256 = 2.5 s at 100 Hz)
+    gravity: subtracted from the rotated accelerometer reading; set 0 when
+             feeding gravity-free linear acceleration
+    """
+
+    def __init__(self, accel_noise=0.3, drift_noise=1e-2, pos_std=0.02, ang_std=0.02, history=256,
+                 gravity=9.80665, initial_pos_std=10.0, initial_ang_std=0.5):
+        self.accel_var = accel_noise ** 2
+        self.drift_var = drift_noise ** 2
+        self.pos_var = pos_std ** 2
+        self.ang_var = ang_std ** 2
+        self.gravity = gravity
+        self.initial_pos_var = initial_pos_std ** 2
+        self.initial_ang_var = initial_ang_std ** 2
+
+        # Live state.
+        self.t = None
+        self.p = np.zeros(3)
+        self.v = np.zeros(3)
+        self.q_corr = (1.0, 0.0, 0.0, 0.0)
+        self.q_imu = (1.0, 0.0, 0.0, 0.0)
+        self.P = np.zeros((9, 9))
+
+        # Work buffers, reused on every step.
+        self._F = np.eye(9)
+        self._Ft = np.eye(9)  # kept contiguous; matmul would copy F.T
+        self._T = np.zeros((9, 9))
+        self._R = np.eye(3)
+        self._acc = np.zeros(3)
+        self._acc_w = np.zeros(3)
+        self._tmp3 = np.zeros(3)
+        self._P_diag = self.P.reshape(81)[::10]
+        self._HP = np.zeros((6, 9))
+        self._aug = np.zeros((6, 15))
+        self._col = np.zeros(6)
+        self._outer = np.zeros((6, 15))
+        self._r = np.zeros(6)
+        self._dx = np.zeros(9)
+        self._KHP = np.zeros((9, 9))
+
+        # History ring: state after each IMU sample, plus its inputs.
+        self.history = history
+        self._h_t = np.full(history, -np.inf)
+        self._h_p = np.zeros((history, 3))
+        self._h_v = np.zeros((history, 3))
+        self._h_qc = np.zeros((history, 4))
+        self._h_P = np.zeros((history, 9, 9))
+        self._h_qi = np.zeros((history, 4))
+        self._h_acc = np.zeros((history, 3))
+        self._head = -1  # index of the newest entry
+        self._size = 0
+
+        self._fixes = []  # sorted (t, seq, position, quat, pos_var, ang_var)
+        self._fix_seq = 0
+        self.pose = np.zeros((), dtype=POSE_DTYPE)
+        self.samples = 0
+        self.updates = 0
+        self.fixes_late = 0
+        self.fixes_dropped = 0
+        self.replayed = 0
+
+    # -- propagation -------------------------------------------------------
+
+    def _initialize(self, t, q_imu):
+        self.t = t
+        self.q_imu = q_imu
+        self.P[:] = 0.0
+        self._P_diag[0:6] = self.initial_pos_var
+        self._P_diag[6:9] = self.initial_ang_var
+
+    def _advance(self, t, q_imu, accel):
+        """Propagate the live state to time `t` holding this IMU input."""
+        dt = t - self.t
+        self.q_imu = q_imu
+        if dt <= 0.0:
+            return
+        _matrix_into(_qmul(self.q_corr, q_imu), self._R)
+        np.matmul(self._R, accel, out=self._acc_w)
+        self._acc_w[2] -= self.gravity
+
+        # p += v dt + a dt^2 / 2; v += a dt
+        np.multiply(self.v, dt, out=self._tmp3)
+        self.p += self._tmp3
+        np.multiply(self._acc_w, 0.5 * dt * dt, out=self._tmp3)
+        self.p += self._tmp3
+        np.multiply(self._acc_w, dt, out=self._tmp3)
+        self.v += self._tmp3
+
+        # F = I + [[0, I dt, 0], [0, 0, -[a]x dt], [0, 0, 0]]
+        F = self._F
+        Ft = self._Ft
+        F[0, 3] = F[1, 4] = F[2, 5] = Ft[3, 0] = Ft[4, 1] = Ft[5, 2] = dt
+        ax, ay, az = self._acc_w[0] * dt, self._acc_w[1] * dt, (self._acc_w[2] + self.gravity) * dt
+        F[3, 7] = Ft[7, 3] = az
+        F[3, 8] = Ft[8, 3] = -ay
+        F[4, 6] = Ft[6, 4] = -az
+        F[4, 8] = Ft[8, 4] = ax
+        F[5, 6] = Ft[6, 5] = ay
+        F[5, 7] = Ft[7, 5] = -ax
+        np.matmul(F, self.P, out=self._T)
+        np.matmul(self._T, Ft, out=self.P)
+        self._P_diag[3:6] += self.accel_var * dt
+        self._P_diag[6:9] += self.drift_var * dt
+        self.t = t
+
+    def _store(self):
+        i = self._head = (self._head + 1) % self.history
+        self._h_t[i] = self.t
+        self._h_p[i] = self.p
+        self._h_v[i] = self.v
+        self._h_qc[i] = self.q_corr
+        self._h_P[i] = self.P
+        self._size = min(self._size + 1, self.history)
+
+    def _restore(self, i):
+        self.t = float(self._h_t[i])
+        self.p[:] = self._h_p[i]
+        self.v[:] = self._h_v[i]
+        self.q_corr = tuple(self._h_qc[i].tolist())
+        self.q_imu = tuple(self._h_qi[i].tolist())
+        self.P[:] = self._h_P[i]
+
+    def _step(self, t, q_imu, accel):
+        """Advance to `t`, applying any fixes that fall in (self.t, t]."""
+        fixes = self._fixes
+        k = bisect.bisect_right(fixes, (self.t, math.inf))
+        while k < len(fixes) and fixes[k][0] <= t:
+            fix = fixes[k]
+            self._advance(fix[0], q_imu, accel)
+            self._update(*fix[2:])
+            k += 1
+        self._advance(t, q_imu, accel)
+
+    def predict(self, t, quat, accel):
+        """Process one IMU sample; returns the pose record (reused buffer).
+
+        Zero quaternions (BNO055 start-up) keep the previous orientation.
+        """
+        q_imu = _qnormalize(quat)
+        self._acc[0], self._acc[1], self._acc[2] = accel
+        if self.t is None:
+            if q_imu is None:
+                return None
+            self._initialize(t, q_imu)
+        elif q_imu is None:
+            q_imu = self.q_imu
+        if t < self.t:
+            return self.pose  # stale IMU sample; ignore
+        self._step(t, q_imu, self._acc)
+        self._store()
+        i = self._head
+        self._h_qi[i] = q_imu
+        self._h_acc[i] = self._acc
+        self.samples += 1
+        return self._write_pose()
+
+    def _write_pose(self):
+        pose = self.pose
+        pose["t"] = self.t
+        pose["position"] = self.p
+        pose["velocity"] = self.v
+        pose["quat"] = _qmul(self.q_corr, self.q_imu)
+        d = self._P_diag
+        pose["pos_std"] = (math.sqrt(d[0]), math.sqrt(d[1]), math.sqrt(d[2]))
+        pose["ang_std"] = (math.sqrt(d[6]), math.sqrt(d[7]), math.sqrt(d[8]))
+        return pose
+
+    # -- correction ----------------------------------------------------------
+
+    def _update(self, position, quat, pos_var, ang_var):
+        r = self._r
+        r[0] = position[0] - self.p[0]
+        r[1] = position[1] - self.p[1]
+        r[2] = position[2] - self.p[2]
+        q_est = _qmul(self.q_corr, self.q_imu)
+        # Rotation error in the world frame: q_fix = exp(e) (x) q_est.
+        e = _qmul(quat, (q_est[0], -q_est[1], -q_est[2], -q_est[3]))
+        if e[0] < 0.0:
+            e = (-e[0], -e[1], -e[2], -e[3])
+        s = math.sqrt(e[1] * e[1] + e[2] * e[2] + e[3] * e[3])
+        k = 2.0 * math.atan2(s, e[0]) / s if s > 1e-12 else 2.0
+        r[3], r[4], r[5] = e[1] * k, e[2] * k, e[3] * k
+
+        # S X = H P with S = H P H^T + R, solved by in-place Gauss-Jordan on
+        # [S | H P]; then K = X^T, dx = X^T r, P -= X^T H P.
+        HP = self._HP
+        aug = self._aug
+        np.take(self.P, _OBS, axis=0, out=HP)
+        np.take(HP, _OBS, axis=1, out=aug[:, :6])
+        aug[:, 6:] = HP
+        for j in range(3):
+            aug[j, j] += pos_var
+            aug[j + 3, j + 3] += ang_var
+        col = self._col
+        outer = self._outer
+        for j in range(6):
+            aug[j] /= aug[j, j]
+            col[:] = aug[:, j]
+            col[j] = 0.0
+            np.multiply(col[:, None], aug[j], out=outer)
+            aug -= outer
+        X = aug[:, 6:]
+        np.matmul(X.T, r, out=self._dx)
+        np.matmul(X.T, HP, out=self._KHP)
+        self.P -= self._KHP
+        np.add(self.P, self.P.T, out=self._T)
+        np.multiply(self._T, 0.5, out=self.P)
+
+        dx = self._dx
+        self.p += dx[0:3]
+        self.v += dx[3:6]
+        self.q_corr = _qnormalize(_qmul(_qexp(dx[6], dx[7], dx[8]), self.q_corr))
+        self.updates += 1
+
+    def correct(self, t, position, quat, pos_std=None, ang_std=None):
+        """Add a world-frame body pose fix measured at time `t`.
+
+        Returns "applied", "pending" (newer than the IMU) or "dropped"
+        (older than the history ring).
+        """
+        q = _qnormalize(quat)
+        if q is None or self.t is None:
+            self.fixes_dropped += 1
+            return "dropped"
+        pos_var = self.pos_var if pos_std is None else pos_std ** 2
+        ang_var = self.ang_var if ang_std is None else ang_std ** 2
+        fix = (float(t), self._fix_seq, tuple(float(c) for c in position), q, pos_var, ang_var)
+        self._fix_seq += 1
+        oldest = self._h_t[(self._head - self._size + 1) % self.history]
+        if t <= oldest:
+            self.fixes_dropped += 1
+            return "dropped"
+        bisect.insort(self._fixes, fix)
+        # Forget fixes the history can no longer rewind to.
+        cut = bisect.bisect_right(self._fixes, (oldest, math.inf))
+        if cut:
+            del self._fixes[:cut]
+        if t > self.t:
+            return "pending"
+        self.fixes_late += 1
+        self._replay_from(t)
+        self._write_pose()
+        return "applied"
+
+    def _replay_from(self, t):
+        """Rewind to the newest stored state before `t` and replay forward."""
+        h = self.history
+        # Newest-first scan; history is short and fixes are only a few
+        # samples late, so this is cheaper than a search over the ring.
+        back = 0
+        i = self._head
+        while back < self._size - 1 and self._h_t[i] >= t:
+            i = (i - 1) % h
+            back += 1
+        self._restore(i)
+        for _ in range(back):
+            i = (i + 1) % h
+            self._step(float(self._h_t[i]), tuple(self._h_qi[i].tolist()), self._h_acc[i])
+            self._h_p[i] = self.p
+            self._h_v[i] = self.v
+            self._h_qc[i] = self.q_corr
+            self._h_P[i] = self.P
+            self.q_imu = tuple(self._h_qi[i].tolist())
+            self.replayed += 1
+
+    def report(self):
+        return {
+            "samples": self.samples,
+            "updates": self.updates,
+            "fixes_late": self.fixes_late,
+            "fixes_dropped": self.fixes_dropped,
+            "replayed_samples": self.replayed,
+        }
+
+
+def body_fix_from_camera(rot_wc, t_wc, rot_bc=None, t_bc=None):
+    """World-frame body (position, quat) from a camera-to-world transform.
+
+    rot_wc, t_wc: camera pose in the world (e.g. an `OnlineAligner` fit)
+    rot_bc, t_bc: camera pose in the body frame (camera mount extrinsics)
+    """
+    rot_wc = np.asarray(rot_wc, dtype=np.float64)
+    t_wc = np.asarray(t_wc, dtype=np.float64)
+    rot_bc = np.eye(3) if rot_bc is None else np.asarray(rot_bc, dtype=np.float64)
+    t_bc = np.zeros(3) if t_bc is None else np.asarray(t_bc, dtype=np.float64)
+    rot_wb = rot_wc @ rot_bc.T
+    position = t_wc - rot_wb @ t_bc
+    return position, quaternion.from_matrix(rot_wb)
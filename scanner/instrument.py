@@ -0,0 +1,550 @@
+"""Low-overhead metrics for the acquisition and processing hot paths.
+
+Modules create their metrics once at import time and keep the handles.
+The hot path then calls the handles directly:
+
+    _DECODE = instrument.histogram("tfluna_decode_seconds", "TF-Luna batch decode time")
+    _FRAMES = instrument.counter("tfluna_frames_total", "Frames decoded")
+
+    with _DECODE.time():
+        ...
+    _FRAMES.inc(len(out))
+
+Metrics are disabled unless the SCANNER_METRICS environment variable is
+set (to anything but "0"). A disabled handle has no-op methods, so the
+only cost left on the hot path is one method call. `enable()` and
+`disable()` switch every registered handle in place. References that
+modules already hold start or stop recording without being rebuilt.
+
+Histograms use HDR-style log-linear buckets. Each power of two between
+`lowest` and `highest` is split into 2**precision linear sub-buckets. A
+recorded value lands in a bucket at most 1/2**precision wide relative to
+the value, so memory is fixed no matter how many values are recorded.
+The default precision of 5 gives percentiles within about 3%.
+
+Updates take no lock and rely on the GIL. A metric that several threads
+update at the same instant can very rarely lose one update. That is fine
+for monitoring and keeps a counter increment close to a plain attribute
+update.
+
+Export options:
+
+    instrument.serve(9108)                         # Prometheus text on /metrics
+    with instrument.JsonExporter("metrics.json", interval=5.0):
+        ...
+    with instrument.SamplingProfiler(interval=0.005) as prof:
+        ...
+    prof.write("profile.folded")                   # flamegraph.pl / speedscope
+"""
+import collections
+import json
+import math
+import os
+import sys
+import threading
+import time
+import weakref
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import numpy as np
+
+
+_frexp = math.frexp
+ENABLED = os.environ.get("SCANNER_METRICS", "") not in ("", "0")
+_REGISTRIES = weakref.WeakSet()
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help="", labels=None):
+        self.name = name
+        self.help = help
+        self.labels = dict(labels or {})
+
+    def _label_text(self, extra=None):
+        labels = {**self.labels, **(extra or {})}
+        if not labels:
+            return ""
+        return "{" + ",".join(f'{k}="{v}"' for k, v in sorted(labels.items())) + "}"
+
+
+class Counter(_Metric):
+    """Monotonic count, e.g. frames decoded or read errors."""
+
+    kind = "counter"
+
+    def __init__(self, name, help="", labels=None):
+        super().__init__(name, help, labels)
+        self.value = 0
+
+    def inc(self, n=1):
+        self.value += n
+
+    def reset(self):
+        self.value = 0
+
+    def snapshot(self):
+        return {"value": self.value}
+
+    def _prometheus(self):
+        return [f"{self.name}{self._label_text()} {self.value}"]
+
+
+class Gauge(_Metric):
+    """Current value, e.g. queue depth or buffered bytes."""
+
+    kind = "gauge"
+
+    def __init__(self, name, help="", labels=None):
+        super().__init__(name, help, labels)
+        self.value = 0.0
+
+    def set(self, value):
+        self.value = value
+
+    def inc(self, n=1):
+        self.value += n
+
+    def dec(self, n=1):
+        self.value -= n
+
+    def reset(self):
+        self.value = 0.0
+
+    def snapshot(self):
+        return {"value": self.value}
+
+    def _prometheus(self):
+        return [f"{self.name}{self._label_text()} {self.value!r}"]
+
+
+class _Timer:
+    __slots__ = ("_hist", "_t0")
+
+    def __init__(self, hist):
+        self._hist = hist
+
+    def __enter__(self):
+        self._t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self._hist.record(time.perf_counter() - self._t0)
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class Histogram(_Metric):
+    """Fixed-memory distribution of values (seconds by default).
+
+    Values below `lowest` are counted in the first bucket and values above
+    `highest` in the last. `min`, `max`, `sum` and `count` are always exact.
+    """
+
+    kind = "histogram"
+
+    def __init__(self, name, help="", labels=None, lowest=1e-6, highest=1e3, precision=5):
+        super().__init__(name, help, labels)
+        if not 0 < lowest < highest:
+            raise ValueError("need 0 < lowest < highest")
+        self.lowest = float(lowest)
+        self.highest = float(highest)
+        self.precision = int(precision)
+        self._sub = 1 << self.precision
+        self._sub2 = 2 * self._sub
+        self._inv_lowest = 1.0 / self.lowest
+        self.octaves = max(1, math.ceil(math.log2(self.highest / self.lowest)))
+        self._counts = [0] * (self.octaves * self._sub)
+        self._last = len(self._counts) - 1
+        self.reset()
+
+    def reset(self):
+        self._counts[:] = [0] * len(self._counts)
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def record(self, value):
+        scaled = value * self._inv_lowest
+        if scaled < 1.0:
+            i = 0
+        else:
+            # scaled = 2m * 2**(e-1) with 2m in [1, 2): octave e-1, and the
+            # sub-bucket from the mantissa.
+            m, e = _frexp(scaled)
+            i = (e - 2) * self._sub + int(m * self._sub2)
+            if i >= self._last:
+                i = self._last
+        self._counts[i] += 1
+        self.count += 1
+        self.sum += value
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def record_many(self, values):
+        """Record an array of values at once."""
+        values = np.asarray(values, dtype=np.float64).ravel()
+        if not len(values):
+            return
+        scaled = values * self._inv_lowest
+        m, e = np.frexp(np.maximum(scaled, 1.0))
+        idx = np.minimum((e.astype(np.int64) - 2) * self._sub + (m * self._sub2).astype(np.int64), self._last)
+        counts = np.bincount(idx, minlength=len(self._counts))
+        nz = np.flatnonzero(counts)
+        for i, c in zip(nz.tolist(), counts[nz].tolist()):
+            self._counts[i] += c
+        self.count += len(values)
+        self.sum += float(values.sum())
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+
+    def time(self):
+        """Context manager that records the elapsed perf_counter time."""
+        return _Timer(self)
+
+    def bucket_bounds(self, i):
+        """(low, high) value range of bucket `i`."""
+        octave, sub = divmod(i, self._sub)
+        base = self.lowest * 2.0 ** octave
+        return base * (1 + sub / self._sub), base * (1 + (sub + 1) / self._sub)
+
+    def percentile(self, q):
+        """Approximate q-th percentile (0-100); NaN when empty."""
+        counts = np.array(self._counts)
+        lo, hi, n = self.min, self.max, int(counts.sum())
+        if not n:
+            return math.nan
+        i = int(np.searchsorted(np.cumsum(counts), max(1.0, q / 100.0 * n)))
+        if i >= self._last:
+            return float(hi)  # the overflow bucket has no upper bound
+        low, high = self.bucket_bounds(i)
+        return float(min(max((low + high) / 2, lo), hi))
+
+    def snapshot(self):
+        if not self.count:
+            return {"count": 0}
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "mean": self.sum / self.count,
+            "min": self.min,
+            "p50": self.percentile(50),
+            "p90": self.percentile(90),
+            "p99": self.percentile(99),
+            "p999": self.percentile(99.9),
+            "max": self.max,
+        }
+
+    def _prometheus(self):
+        # One cumulative bucket per octave keeps the exposition small; the
+        # sub-buckets only feed the percentiles.
+        per_octave = np.array(self._counts).reshape(self.octaves, self._sub).sum(axis=1)
+        total, s = int(per_octave.sum()), self.sum
+        lines = []
+        cum = np.cumsum(per_octave)
+        for o in range(self.octaves):
+            le = self.lowest * 2.0 ** (o + 1)
+            lines.append(f"{self.name}_bucket{self._label_text({'le': f'{le:.6g}'})} {int(cum[o])}")
+        lines.append(f"{self.name}_bucket{self._label_text({'le': '+Inf'})} {total}")
+        lines.append(f"{self.name}_sum{self._label_text()} {s!r}")
+        lines.append(f"{self.name}_count{self._label_text()} {total}")
+        return lines
+
+
+class _NullCounter(Counter):
+    def inc(self, n=1):
+        pass
+
+
+class _NullGauge(Gauge):
+    def set(self, value):
+        pass
+
+    def inc(self, n=1):
+        pass
+
+    def dec(self, n=1):
+        pass
+
+
+class _NullHistogram(Histogram):
+    def record(self, value):
+        pass
+
+    def record_many(self, values):
+        pass
+
+    def time(self):
+        return _NULL_TIMER
+
+
+_NULL = {Counter: _NullCounter, Gauge: _NullGauge, Histogram: _NullHistogram}
+_REAL = {v: k for k, v in _NULL.items()}
+
+
+class Registry:
+    """Named metrics, created once and looked up by (name, labels)."""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+        _REGISTRIES.add(self)
+
+    def _get(self, cls, name, help, labels, **kwargs):
+        key = (name, tuple(sorted((labels or {}).items())))
+        with self._lock:
+            metric = self._metrics.get(key)
+            if metric is None:
+                metric = cls(name, help, labels, **kwargs)
+                if not ENABLED:
+                    metric.__class__ = _NULL[cls]
+                self._metrics[key] = metric
+            elif _REAL.get(type(metric), type(metric)) is not cls:
+                raise ValueError(f"metric {name!r} already registered as a {metric.kind}")
+            return metric
+
+    def counter(self, name, help="", labels=None):
+        return self._get(Counter, name, help, labels)
+
+    def gauge(self, name, help="", labels=None):
+        return self._get(Gauge, name, help, labels)
+
+    def histogram(self, name, help="", labels=None, **kwargs):
+        return self._get(Histogram, name, help, labels, **kwargs)
+
+    def metrics(self):
+        with self._lock:
+            return list(self._metrics.values())
+
+    def _switch(self, enabled):
+        with self._lock:
+            for metric in self._metrics.values():
+                if enabled:
+                    metric.__class__ = _REAL.get(type(metric), type(metric))
+                else:
+                    metric.__class__ = _NULL.get(type(metric), type(metric))
+
+    def reset(self):
+        for metric in self.metrics():
+            metric.reset()
+
+    def snapshot(self):
+        """{name: value or histogram summary}; labelled metrics nest by label text."""
+        out = {}
+        for metric in self.metrics():
+            snap = metric.snapshot()
+            value = snap if metric.kind == "histogram" else snap["value"]
+            if metric.labels:
+                key = ",".join(f"{k}={v}" for k, v in sorted(metric.labels.items()))
+                out.setdefault(metric.name, {})[key] = value
+            else:
+                out[metric.name] = value
+        return out
+
+    def prometheus(self):
+        """Prometheus text exposition format (version 0.0.4)."""
+        lines = []
+        seen = set()
+        for metric in sorted(self.metrics(), key=lambda m: (m.name, sorted(m.labels.items()))):
+            if metric.name not in seen:
+                seen.add(metric.name)
+                if metric.help:
+                    lines.append(f"# HELP {metric.name} {metric.help}")
+                lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines += metric._prometheus()
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+counter = REGISTRY.counter
+gauge = REGISTRY.gauge
+histogram = REGISTRY.histogram
+snapshot = REGISTRY.snapshot
+prometheus = REGISTRY.prometheus
+
+
+def enable():
+    """Start recording into every metric, including ones already created."""
+    global ENABLED
+    ENABLED = True
+    for registry in list(_REGISTRIES):
+        registry._switch(True)
+
+
+def disable():
+    """Turn every metric back into a no-op; recorded values are kept."""
+    global ENABLED
+    ENABLED = False
+    for registry in list(_REGISTRIES):
+        registry._switch(False)
+
+
+def serve(port=9108, host="127.0.0.1", registry=None):
+    """Serve Prometheus text on http://host:port/metrics from a daemon thread.
+
+    Returns the server; call `shutdown()` on it to stop. Port 0 picks a free
+    port (see `server.server_address`).
+    """
+    registry = registry or REGISTRY
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] not in ("/metrics", "/"):
+                self.send_error(404)
+                return
+            body = registry.prometheus().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
+
+
+class JsonExporter:
+    """Rewrites a JSON snapshot of the registry every `interval` seconds.
+
+    Each write goes to a temporary file that is then renamed over `path`,
+    so readers never see a partial file. A final snapshot is written on
+    stop.
+    """
+
+    def __init__(self, path, interval=5.0, registry=None):
+        self.path = Path(path)
+        self.interval = interval
+        self.registry = registry or REGISTRY
+        self.writes = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def write(self):
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        tmp.write_text(json.dumps({"time": time.time(), "metrics": self.registry.snapshot()}, indent=2) + "\n")
+        os.replace(tmp, self.path)
+        self.writes += 1
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.write()
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="metrics-json", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.write()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+class SamplingProfiler:
+    """Statistical profiler that samples every thread's Python stack.
+
+    A background thread walks `sys._current_frames()` every `interval`
+    seconds and counts whole stacks, so the cost is per sample, not per
+    call, and nothing is paid between samples. Output is the folded
+    format read by flamegraph.pl and speedscope. Time spent inside C
+    calls that hold the GIL delays sampling, so those frames are
+    under-represented.
+    """
+
+    def __init__(self, interval=0.005, max_depth=64, threads=None):
+        self.interval = interval
+        self.max_depth = max_depth
+        self.threads = set(threads) if threads is not None else None
+        self.stacks = collections.Counter()
+        self.samples = 0
+        self.sample_time = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _sample(self):
+        own = threading.get_ident()
+        names = {t.ident: t.name for t in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == own:
+                continue
+            name = names.get(ident, str(ident))
+            if self.threads is not None and name not in self.threads:
+                continue
+            stack = []
+            while frame is not None and len(stack) < self.max_depth:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            stack.append(name)
+            self.stacks[";".join(reversed(stack))] += 1
+        self.samples += 1
+
+    def _run(self):
+        clock = time.perf_counter
+        while not self._stop.wait(self.interval):
+            t0 = clock()
+            self._sample()
+            self.sample_time += clock() - t0
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def folded(self):
+        """Folded stack lines ("thread;outer;...;inner count"), heaviest first."""
+        return [f"{stack} {n}" for stack, n in self.stacks.most_common()]
+
+    def write(self, path):
+        Path(path).write_text("\n".join(self.folded()) + "\n")
+
+    def top(self, n=10):
+        """[(function, self samples, share)] for the `n` hottest leaf functions."""
+        leaves = collections.Counter()
+        for stack, k in self.stacks.items():
+            leaves[stack.rsplit(";", 1)[-1]] += k
+        total = sum(leaves.values()) or 1
+        return [(fn, k, k / total) for fn, k in leaves.most_common(n)]
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -0,0 +1,393 @@
+"""Tiled, compressed on-disk map store with a level-of-detail pyramid.
+
+Points are quantized to cells of `quantum` metres. Level 0 keeps those
+cells, and each level above halves the resolution: level L has cells of
+`quantum * 2**L`. Every level is cut into cubic tiles of `tile_cells`
+cells per side, so a level L tile covers exactly the eight level L-1
+tiles below it (an octree), and every tile holds about as many cells as
+any other. A tile stores its occupied cells and the number of points
+that fell in each, so a coarse level is exactly the merge of the
+levels below it.
+
+Layout (all little-endian):
+
+    header   b"SCANMAP\\0", u32 version, u32 meta_len, JSON meta (quantum, tile_cells, levels)
+    tile*    b"TILE", u16 level, u16 session, i4 x3 tile, u4 cells, u4 size, then `size` bytes
+    commit   zlib of one INDEX_DTYPE row per live tile, JSON (sessions, bounds),
+             u64 index offset, u32 tiles, u64 JSON offset, u32 JSON len, b"SMAP"
+
+A tile body is zlib over two byte-shuffled u32 columns: the gaps between
+the tile's sorted local cell keys, and the per-cell point counts. Gaps on
+a scanned surface are mostly small, so their high bytes are zeros that
+the entropy coder all but removes.
+
+The file is append-only. Each session writes the tiles it touched
+(merged with what was there) and a new commit, and the tiles it replaced
+become dead bytes. Readers take the last complete commit, so a session
+that dies half way leaves the store as it was before it.
+
+    with MapStoreWriter("room.scanmap", session="north wall") as store:
+        store.add(points)
+    store = MapStoreReader("room.scanmap")
+    for level, tile, points, counts in store.stream(near=viewer_position):
+        ...                                 # coarsest level first, nearest tiles first
+    points, counts = store.read(0, lo, hi)  # full resolution inside a box
+"""
+import json
+import struct
+import time
+import zlib
+from collections import OrderedDict
+
+import numpy as np
+
+from .voxel import pack_keys, unpack_keys
+
+
+MAGIC = b"SCANMAP\0"
+VERSION = 1
+TILE_MAGIC = b"TILE"
+FOOTER_MAGIC = b"SMAP"
+
+_HEADER = struct.Struct("<8sII")
+_TILE = struct.Struct("<4sHHiiiII")
+_FOOTER = struct.Struct("<QIQI4s")
+
+INDEX_DTYPE = np.dtype(
+    [
+        ("level", "<u2"),
+        ("session", "<u2"),
+        ("tile", "<i4", (3,)),
+        ("cells", "<u4"),
+        ("size", "<u4"),
+        ("points", "<u8"),
+        ("offset", "<u8"),
+    ]
+)
+
+
+def _shuffle(a):
+    """u32 column as its four byte planes, lowest first."""
+    return np.ascontiguousarray(a, dtype="<u4").view(np.uint8).reshape(-1, 4).T.tobytes()
+
+
+def _unshuffle(raw, n):
+    return raw[:4 * n].reshape(4, n).T.copy().view("<u4").reshape(-1)
+
+
+def encode_tile(keys, counts, level=6):
+    """zlib body for sorted unique local cell `keys` and their point `counts`."""
+    gaps = np.diff(np.asarray(keys, dtype=np.int64), prepend=0)
+    return zlib.compress(_shuffle(gaps) + _shuffle(counts), level)
+
+
+def decode_tile(body, cells):
+    """(keys int64, counts uint32) from a tile body holding `cells` cells."""
+    raw = np.frombuffer(zlib.decompress(body), dtype=np.uint8)
+    keys = np.cumsum(_unshuffle(raw, cells), dtype=np.int64)
+    return keys, _unshuffle(raw[4 * cells:], cells)
+
+
+def _merge(keys, counts):
+    """Sum `counts` over equal `keys`; returns sorted unique keys."""
+    order = np.argsort(keys, kind="stable")
+    keys = keys[order]
+    if not len(keys):
+        return keys, counts[:0].astype(np.uint32)
+    first = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    return keys[first], np.add.reduceat(counts[order], first).astype(np.uint32)
+
+
+def _last_commit(mm, start):
+    """(index offset, tiles, meta offset, meta len, end) of the last complete commit, or None."""
+    pos = len(mm) - _FOOTER.size
+    tail = None
+    while pos >= start:
+        index_off, tiles, meta_off, meta_len, magic = _FOOTER.unpack_from(mm, pos)
+        if magic == FOOTER_MAGIC and start <= index_off <= meta_off and meta_off + meta_len == pos:
+            return index_off, tiles, meta_off, meta_len, pos + _FOOTER.size
+        # A session that died part way leaves a torn tail: step back to the
+        # footer before this one.
+        if tail is None:
+            tail = bytes(mm[start:])
+        found = tail.rfind(FOOTER_MAGIC, 0, pos - start + _FOOTER.size - 1)
+        pos = start + found - (_FOOTER.size - 4) if found >= 0 else -1
+    return None
+
+
+def _read_store(mm, path):
+    magic, version, meta_len = _HEADER.unpack_from(mm, 0)
+    if magic != MAGIC:
+        raise ValueError(f"{path} is not a map store")
+    if version > VERSION:
+        raise ValueError(f"{path}: unsupported map store version {version}")
+    config = json.loads(bytes(mm[_HEADER.size:_HEADER.size + meta_len]))
+    data_start = _HEADER.size + meta_len
+    commit = _last_commit(mm, data_start)
+    if commit is None:
+        raise ValueError(f"{path}: no complete commit")
+    index_off, tiles, meta_off, meta_len, end = commit
+    index = np.frombuffer(zlib.decompress(mm[index_off:meta_off]), dtype=INDEX_DTYPE, count=tiles)
+    meta = json.loads(bytes(mm[meta_off:meta_off + meta_len]))
+    return config, index, meta, end
+
+
+class _Config:
+    def __init__(self, quantum, tile_cells, levels):
+        if tile_cells & (tile_cells - 1) or not 2 <= tile_cells <= 1024:
+            raise ValueError("tile_cells must be a power of two from 2 to 1024")
+        self.quantum = float(quantum)
+        self.tile_cells = int(tile_cells)
+        self.levels = int(levels)
+        self.bits = self.tile_cells.bit_length() - 1
+
+    def cell_size(self, level):
+        return self.quantum * (1 << level)
+
+    def tile_size(self, level):
+        return self.cell_size(level) * self.tile_cells
+
+    def split(self, cells):
+        """Global cells -> (packed tile keys, local cell keys)."""
+        b = self.bits
+        local = cells & (self.tile_cells - 1)
+        return pack_keys(cells >> b), (local[:, 0] << (2 * b)) | (local[:, 1] << b) | local[:, 2]
+
+    def centers(self, level, tile, keys):
+        """World-space centres of the local cells `keys` of one tile."""
+        b, mask = self.bits, self.tile_cells - 1
+        local = np.stack([keys >> (2 * b), (keys >> b) & mask, keys & mask], axis=1)
+        cells = np.asarray(tile, dtype=np.int64) * self.tile_cells + local
+        return (cells + 0.5) * self.cell_size(level)
+
+
+class MapStoreWriter:
+    """Adds one session to a store, creating it if `path` does not exist.
+
+    Points from `add()` are held until `close()`, which writes every tile
+    they touch at every level and then the commit. `quantum`, `tile_cells`
+    and `levels` only apply to a new store; an existing one keeps its own.
+    """
+
+    def __init__(self, path, quantum=0.005, tile_cells=128, levels=6, session=None, metadata=None,
+                 compression=6):
+        self.path = str(path)
+        self.compression = compression
+        self._points, self._counts = [], []
+        self._session = {"name": session, "metadata": metadata or {}}
+        try:
+            fh = open(path, "r+b")
+        except FileNotFoundError:
+            fh = None
+        if fh is None:
+            self.config = _Config(quantum, tile_cells, levels)
+            blob = json.dumps({"quantum": self.config.quantum, "tile_cells": self.config.tile_cells,
+                               "levels": self.config.levels}).encode()
+            self._fh = open(path, "w+b")
+            self._fh.write(_HEADER.pack(MAGIC, VERSION, len(blob)))
+            self._fh.write(blob)
+            self._index = {}
+            self._meta = {"sessions": [], "bounds": None}
+            self._mm = None
+            return
+        mm = np.memmap(path, dtype=np.uint8, mode="r")
+        config, index, self._meta, end = _read_store(mm, path)
+        self.config = _Config(config["quantum"], config["tile_cells"], config["levels"])
+        self._index = {(int(r["level"]), int(k)): r.copy() for r, k in zip(index, pack_keys(index["tile"]))}
+        # Tiles are merged from the old bodies, read through the mapping.
+        self._mm = mm
+        fh.truncate(end)
+        fh.seek(end)
+        self._fh = fh
+
+    def add(self, points, counts=None):
+        """Add (N, 3) points, each standing for `counts[i]` hits (default 1)."""
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+        points = points[np.isfinite(points).all(axis=1)]
+        counts = np.ones(len(points), np.uint32) if counts is None else np.asarray(counts, np.uint32)
+        self._points.append(points)
+        self._counts.append(counts.reshape(-1)[:len(points)])
+
+    def _old(self, row):
+        start = int(row["offset"]) + _TILE.size
+        return decode_tile(self._mm[start:start + int(row["size"])], int(row["cells"]))
+
+    def _write_tile(self, level, tile, keys, counts, session):
+        body = encode_tile(keys, counts, self.compression)
+        offset = self._fh.tell()
+        self._fh.write(_TILE.pack(TILE_MAGIC, level, session, *(int(v) for v in tile), len(keys), len(body)))
+        self._fh.write(body)
+        return np.array((level, session, tuple(tile), len(keys), len(body), int(counts.sum()), offset), dtype=INDEX_DTYPE)
+
+    def close(self):
+        if self._fh.closed:
+            return
+        cfg = self.config
+        session = len(self._meta["sessions"])
+        points = np.concatenate(self._points) if self._points else np.zeros((0, 3))
+        counts = np.concatenate(self._counts) if self._counts else np.zeros(0, np.uint32)
+        start = self._fh.tell()
+        written = 0
+        if len(points):
+            cells = np.floor(points / cfg.quantum).astype(np.int64)
+            keys, counts = _merge(pack_keys(cells), counts)
+            cells = unpack_keys(keys)
+            for level in range(cfg.levels):
+                tkeys, local = cfg.split(cells >> level)
+                order = np.lexsort((local, tkeys))
+                tkeys, local, cnt = tkeys[order], local[order], counts[order]
+                first = np.flatnonzero(np.r_[True, (tkeys[1:] != tkeys[:-1]) | (local[1:] != local[:-1])])
+                tkeys, local, cnt = tkeys[first], local[first], np.add.reduceat(cnt, first)
+                bounds = np.r_[np.flatnonzero(np.r_[True, tkeys[1:] != tkeys[:-1]]), len(tkeys)]
+                for a, b in zip(bounds[:-1], bounds[1:]):
+                    tk, k, c = int(tkeys[a]), local[a:b], cnt[a:b]
+                    old = self._index.get((level, tk))
+                    if old is not None:
+                        ok, oc = self._old(old)
+                        k, c = _merge(np.r_[ok, k], np.r_[oc, c])
+                    tile = unpack_keys(np.array([tk]))[0]
+                    self._index[(level, tk)] = self._write_tile(level, tile, k, c, session)
+                    written += 1
+            lo, hi = points.min(axis=0), points.max(axis=0)
+            if self._meta["bounds"] is not None:
+                lo = np.minimum(lo, self._meta["bounds"][0])
+                hi = np.maximum(hi, self._meta["bounds"][1])
+            self._meta["bounds"] = [lo.tolist(), hi.tolist()]
+        self._session.update({
+            "created": time.time(),
+            "points": int(counts.sum()),
+            "tiles_written": written,
+            "bytes": self._fh.tell() - start,
+        })
+        self._meta["sessions"].append(self._session)
+        rows = sorted(self._index.items())
+        index = np.array([r for _, r in rows], dtype=INDEX_DTYPE)
+        meta = json.dumps(self._meta).encode()
+        index_off = self._fh.tell()
+        self._fh.write(zlib.compress(index.tobytes(), self.compression))
+        meta_off = self._fh.tell()
+        self._fh.write(meta)
+        self._fh.write(_FOOTER.pack(index_off, len(index), meta_off, len(meta), FOOTER_MAGIC))
+        self._fh.close()
+        self._mm = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class MapStoreReader:
+    """Memory-mapped reader; tiles are decoded on demand, the last
+    `cache_tiles` of them kept."""
+
+    def __init__(self, path, cache_tiles=256):
+        self.path = str(path)
+        self._mm = np.memmap(path, dtype=np.uint8, mode="r")
+        config, self.index, meta, _ = _read_store(self._mm, path)
+        self.config = _Config(config["quantum"], config["tile_cells"], config["levels"])
+        self.quantum = self.config.quantum
+        self.tile_cells = self.config.tile_cells
+        self.levels = self.config.levels
+        self.sessions = meta["sessions"]
+        self.bounds = None if meta["bounds"] is None else np.array(meta["bounds"])
+        self.cache_tiles = cache_tiles
+        self._cache = OrderedDict()
+        self.tiles_decoded = 0
+        keys = pack_keys(self.index["tile"])
+        # Commits store the index sorted by (level, tile key).
+        self._keys = [keys[self.index["level"] == level] for level in range(self.levels)]
+        self._rows = [np.flatnonzero(self.index["level"] == level) for level in range(self.levels)]
+
+    def cell_size(self, level):
+        return self.config.cell_size(level)
+
+    def tile_size(self, level):
+        return self.config.tile_size(level)
+
+    def level_for(self, spacing):
+        """Coarsest level whose cells are no larger than `spacing` metres (at least 0)."""
+        level = int(np.floor(np.log2(max(spacing, self.quantum) / self.quantum)))
+        return min(max(level, 0), self.levels - 1)
+
+    def tiles(self, level, lo=None, hi=None):
+        """(M, 3) coordinates of the stored tiles of `level` that overlap the box."""
+        tiles = self.index["tile"][self._rows[level]]
+        if lo is not None:
+            size = self.tile_size(level)
+            keep = ((tiles + 1) * size > np.asarray(lo)).all(axis=1) & (tiles * size <= np.asarray(hi)).all(axis=1)
+            tiles = tiles[keep]
+        return tiles
+
+    def _row(self, level, tile):
+        key = pack_keys(np.asarray(tile, dtype=np.int64).reshape(1, 3))[0]
+        keys = self._keys[level]
+        i = int(np.searchsorted(keys, key))
+        return self._rows[level][i] if i < len(keys) and keys[i] == key else None
+
+    def read_tile(self, level, tile):
+        """(cell centres (N, 3), point counts (N,)) of one tile; empty if it is not stored."""
+        i = self._row(level, tile)
+        if i is None:
+            return np.zeros((0, 3)), np.zeros(0, np.uint32)
+        hit = self._cache.get(i)
+        if hit is not None:
+            self._cache.move_to_end(i)
+            return hit
+        row = self.index[i]
+        start = int(row["offset"]) + _TILE.size
+        keys, counts = decode_tile(self._mm[start:start + int(row["size"])], int(row["cells"]))
+        hit = self.config.centers(level, row["tile"], keys), counts
+        self.tiles_decoded += 1
+        self._cache[i] = hit
+        if len(self._cache) > self.cache_tiles:
+            self._cache.popitem(last=False)
+        return hit
+
+    def iter_tiles(self, level, lo=None, hi=None, near=None):
+        """Yield (tile, centres, counts) for the tiles of `level` in the box,
+        nearest to `near` first if given."""
+        tiles = self.tiles(level, lo, hi)
+        if near is not None and len(tiles):
+            mid = (tiles + 0.5) * self.tile_size(level)
+            tiles = tiles[np.argsort(np.linalg.norm(mid - np.asarray(near), axis=1), kind="stable")]
+        for tile in tiles:
+            points, counts = self.read_tile(level, tile)
+            if lo is not None:
+                keep = ((points >= lo) & (points <= hi)).all(axis=1)
+                points, counts = points[keep], counts[keep]
+            yield tile, points, counts
+
+    def read(self, level, lo=None, hi=None):
+        """(centres, counts) of every cell of `level`, or of those inside the box."""
+        parts = list(self.iter_tiles(level, lo, hi))
+        if not parts:
+            return np.zeros((0, 3)), np.zeros(0, np.uint32)
+        return np.concatenate([p for _, p, _ in parts]), np.concatenate([c for _, _, c in parts])
+
+    def stream(self, lo=None, hi=None, near=None, finest=0):
+        """Yield (level, tile, centres, counts) coarse to fine, down to `finest`."""
+        for level in range(self.levels - 1, finest - 1, -1):
+            for tile, points, counts in self.iter_tiles(level, lo, hi, near):
+                yield level, tile, points, counts
+
+    def stats(self):
+        """Per level: tiles, cells, points and compressed bytes."""
+        out = []
+        for level in range(self.levels):
+            rows = self.index[self._rows[level]]
+            out.append({
+                "level": level,
+                "cell_size": self.cell_size(level),
+                "tiles": len(rows),
+                "cells": int(rows["cells"].sum()),
+                "points": int(rows["points"].sum()),
+                "bytes": int(rows["size"].sum()) + len(rows) * _TILE.size,
+            })
+        return out
+
+    def close(self):
+        self._cache.clear()
+        self._mm = None
+        self.index = None
@@ -0,0 +1,440 @@
+"""Pipelined ArUco detection for Pi Camera 3 frames.
+
+Capture, grayscale conversion, detection and pose estimation run as
+overlapping stages: a capture thread feeds frames to a pool of worker
+threads (OpenCV releases the GIL inside `cvtColor`, `detectMarkers` and
+`solvePnP`, so the workers really run in parallel), and results come back
+in capture order.
+
+    detector = MarkerDetector(camera_matrix=K, dist_coeffs=dist, roi=True)
+    with DetectionPipeline(detector, workers=3) as pipe:
+        for result in pipe.stream(camera, max_frames=300):
+            print(result["frame_id"], result["markers"]["id"])
+        print(pipe.report())
+
+Markers are returned as `scanner.scanlog.MARKER_RECORD` rows, so they can
+go straight into a scan log. Grayscale frames (the Y plane of a YUV420
+capture, or `MockCamera(size=...)`) are detected in place with no copy;
+colour frames are converted into a buffer each worker allocates once.
+"""
+import collections
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from . import instrument
+from .scanlog import MARKER_RECORD
+
+
+STAGES = ("capture", "queue", "convert", "detect", "pose", "total")
+
+_M_STAGE = {name: instrument.histogram("marker_stage_seconds", "ArUco pipeline time per stage", {"stage": name})
+            for name in STAGES}
+_M_FRAMES = instrument.counter("marker_frames_total", "Frames searched for ArUco markers")
+_M_MARKERS = instrument.counter("marker_detections_total", "ArUco markers detected")
+
+
+def _cv2():
+    import cv2
+
+    return cv2
+
+
+def marker_object_points(length):
+    """Marker corners in the marker frame, in OpenCV's corner order."""
+    h = length / 2.0
+    return np.array([[-h, h, 0.0], [h, h, 0.0], [h, -h, 0.0], [-h, -h, 0.0]], dtype=np.float32)
+
+
+def _to_gray(cv2, image, buf):
+    if image.ndim == 2:
+        return image, buf
+    code = cv2.COLOR_BGRA2GRAY if image.shape[2] == 4 else cv2.COLOR_BGR2GRAY
+    if buf is None or buf.shape != image.shape[:2]:
+        buf = np.empty(image.shape[:2], dtype=np.uint8)
+    cv2.cvtColor(image, code, dst=buf)
+    return buf, buf
+
+
+def _merge_boxes(boxes):
+    """Union overlapping (x0, y0, x1, y1) boxes until none overlap."""
+    boxes = [list(b) for b in boxes]
+    merged = True
+    while merged and len(boxes) > 1:
+        merged = False
+        for i in range(len(boxes)):
+            for j in range(i + 1, len(boxes)):
+                a, b = boxes[i], boxes[j]
+                if a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]:
+                    boxes[i] = [min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3])]
+                    del boxes[j]
+                    merged = True
+                    break
+            if merged:
+                break
+    return boxes
+
+
+class MarkerDetector:
+    """ArUco detection plus optional per-marker pose.
+
+    With `roi` set, the detector remembers where markers were in the most
+    recent frame and only searches boxes around them, padded by
+    `roi_margin` marker widths. It falls back to a full-frame search when
+    a tracked marker is lost, and every `full_every` frames to pick up
+    markers that have come into view.
+
+    `detect` is thread-safe: OpenCV detector objects are kept per thread
+    and the tracking state only moves forward in frame order.
+    """
+
+    def __init__(self, dictionary="DICT_4X4_50", camera_matrix=None, dist_coeffs=None, marker_length=0.05,
+                 roi=False, roi_margin=0.75, full_every=15):
+        cv2 = _cv2()
+        self._dictionary = cv2.aruco.getPredefinedDictionary(getattr(cv2.aruco, dictionary))
+        self.camera_matrix = None if camera_matrix is None else np.asarray(camera_matrix, dtype=np.float64)
+        self.dist_coeffs = None if dist_coeffs is None else np.asarray(dist_coeffs, dtype=np.float64)
+        self.marker_length = marker_length
+        self._object_points = marker_object_points(marker_length)
+        self.roi = roi
+        self.roi_margin = roi_margin
+        self.full_every = full_every
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._track_seq = -1
+        self._boxes = []
+        self._tracked = 0
+        self._since_full = 0
+        self.full_searches = 0
+        self.roi_searches = 0
+
+    @property
+    def estimates_pose(self):
+        return self.camera_matrix is not None and self.dist_coeffs is not None
+
+    def _aruco(self):
+        det = getattr(self._local, "detector", None)
+        if det is None:
+            det = self._local.detector = _cv2().aruco.ArucoDetector(self._dictionary)
+        return det
+
+    def _search(self, gray, box=None):
+        det = self._aruco()
+        if box is None:
+            corners, ids, _ = det.detectMarkers(gray)
+            offset = None
+        else:
+            x0, y0, x1, y1 = box
+            # A slice of the frame is a view; OpenCV reads it in place.
+            corners, ids, _ = det.detectMarkers(gray[y0:y1, x0:x1])
+            offset = np.array([x0, y0], dtype=np.float32)
+        if ids is None or not len(ids):
+            return [], []
+        corners = [c.reshape(4, 2) for c in corners]
+        if offset is not None:
+            corners = [c + offset for c in corners]
+        return ids.ravel().tolist(), corners
+
+    def _plan(self, seq):
+        """Boxes to search for frame `seq`, or None for a full-frame search."""
+        if not self.roi:
+            return None
+        with self._lock:
+            if not self._boxes or self._since_full >= self.full_every:
+                return None
+            self._since_full += 1
+            return list(self._boxes), self._tracked
+
+    def _track(self, seq, shape, corners, full):
+        if not self.roi:
+            return
+        boxes = []
+        h, w = shape[:2]
+        for c in corners:
+            lo = c.min(axis=0)
+            hi = c.max(axis=0)
+            pad = self.roi_margin * float((hi - lo).max())
+            boxes.append((
+                max(0, int(lo[0] - pad)), max(0, int(lo[1] - pad)),
+                min(w, int(np.ceil(hi[0] + pad)) + 1), min(h, int(np.ceil(hi[1] + pad)) + 1),
+            ))
+        with self._lock:
+            # Workers can finish out of order; never roll the tracker back.
+            if seq < self._track_seq:
+                return
+            self._track_seq = seq
+            self._boxes = _merge_boxes(boxes)
+            self._tracked = len(corners)
+            if full:
+                self._since_full = 0
+
+    def find(self, gray, seq=None):
+        """Detect markers in a grayscale image; returns (ids, corners)."""
+        plan = self._plan(seq)
+        ids, corners = [], []
+        full = plan is None
+        if not full:
+            boxes, tracked = plan
+            for box in boxes:
+                i, c = self._search(gray, box)
+                ids += i
+                corners += c
+            self.roi_searches += 1
+            if len(ids) < tracked:
+                full = True
+        if full:
+            ids, corners = self._search(gray)
+            self.full_searches += 1
+        if seq is not None:
+            self._track(seq, gray.shape, corners, full)
+        return ids, corners
+
+    def estimate_poses(self, corners):
+        """(rvecs, tvecs, ok) per marker from solvePnP's square-marker solver.
+
+        Markers whose solve failed have `ok` False and zero vectors.
+        """
+        cv2 = _cv2()
+        rvecs = np.zeros((len(corners), 3), dtype=np.float32)
+        tvecs = np.zeros((len(corners), 3), dtype=np.float32)
+        solved = np.zeros(len(corners), dtype=bool)
+        for i, c in enumerate(corners):
+            ok, rvec, tvec = cv2.solvePnP(
+                self._object_points, c, self.camera_matrix, self.dist_coeffs, flags=cv2.SOLVEPNP_IPPE_SQUARE
+            )
+            if ok:
+                rvecs[i] = rvec.ravel()
+                tvecs[i] = tvec.ravel()
+                solved[i] = True
+        return rvecs, tvecs, solved
+
+    def to_records(self, t, ids, corners, poses=None):
+        out = np.zeros(len(ids), dtype=MARKER_RECORD)
+        out["t"] = t
+        if len(ids):
+            out["id"] = ids
+            out["corners"] = np.stack(corners)
+            if poses is not None:
+                out["rvec"], out["tvec"], out["has_pose"] = poses
+        return out
+
+    def detect(self, gray, t=0.0, seq=None):
+        """Markers in one grayscale frame as MARKER_RECORD rows."""
+        with _M_STAGE["detect"].time():
+            ids, corners = self.find(gray, seq)
+        with _M_STAGE["pose"].time():
+            poses = self.estimate_poses(corners) if self.estimates_pose and ids else None
+        _M_FRAMES.inc()
+        _M_MARKERS.inc(len(ids))
+        return self.to_records(t, ids, corners, poses)
+
+
+class _StageStats:
+    """Per-stage durations in fixed-size arrays."""
+
+    def __init__(self, window=4096):
+        self.window = window
+        self.samples = {name: np.zeros(window) for name in STAGES}
+        self.count = 0
+
+    def add(self, latency):
+        i = self.count % self.window
+        for name in STAGES:
+            self.samples[name][i] = latency.get(name, 0.0)
+        self.count += 1
+
+    def report(self):
+        n = min(self.count, self.window)
+        out = {}
+        if not n:
+            return out
+        for name in STAGES:
+            ms = self.samples[name][:n] * 1e3
+            out[name] = {
+                "mean": float(ms.mean()),
+                "p50": float(np.percentile(ms, 50)),
+                "p99": float(np.percentile(ms, 99)),
+                "max": float(ms.max()),
+            }
+        return out
+
+
+class DetectionPipeline:
+    """Overlap capture and detection across a thread pool.
+
+    At most `max_in_flight` frames are queued or being processed; capture
+    blocks beyond that, so a slow detector throttles the camera rather than
+    growing a backlog. Results always come out in submission order.
+
+    Each result is a dict with frame_id, timestamp, markers (MARKER_RECORD
+    rows) and latency (seconds per stage), plus the frame itself when
+    `keep_frames` is set.
+    """
+
+    def __init__(self, detector, workers=2, max_in_flight=None, keep_frames=False, stats_window=4096):
+        self.detector = detector
+        self.workers = workers
+        self.max_in_flight = max_in_flight or 2 * workers
+        self.keep_frames = keep_frames
+        self._pool = ThreadPoolExecutor(workers, thread_name_prefix="aruco")
+        self._local = threading.local()
+        self._pending = collections.deque()
+        self._seq = 0
+        self.stats = _StageStats(stats_window)
+        self.frames = 0
+        self.started_at = None
+        self.stopped_at = None
+
+    def _work(self, seq, frame, latency, queued_at):
+        cv2 = _cv2()
+        clock = time.perf_counter
+        t0 = clock()
+        latency["queue"] = t0 - queued_at
+        gray, self._local.buf = _to_gray(cv2, np.asarray(frame["data"]), getattr(self._local, "buf", None))
+        t1 = clock()
+        ids, corners = self.detector.find(gray, seq)
+        t2 = clock()
+        poses = self.detector.estimate_poses(corners) if self.detector.estimates_pose and ids else None
+        t3 = clock()
+        latency["convert"] = t1 - t0
+        latency["detect"] = t2 - t1
+        latency["pose"] = t3 - t2
+        result = {
+            "frame_id": frame.get("frame_id", seq),
+            "timestamp": frame.get("timestamp"),
+            "markers": self.detector.to_records(frame.get("timestamp", 0.0), ids, corners, poses),
+            "latency": latency,
+        }
+        if self.keep_frames:
+            result["frame"] = frame["data"]
+        return result
+
+    def submit(self, frame, capture_s=0.0, captured_at=None):
+        """Queue one camera frame dict; blocks while the pipeline is full.
+
+        Returns the results that completed in order while waiting.
+        """
+        if self.started_at is None:
+            self.started_at = time.monotonic()
+        done = []
+        while len(self._pending) >= self.max_in_flight:
+            done.append(self._finish(self._pending.popleft()))
+        now = time.perf_counter()
+        latency = {"capture": capture_s, "_start": captured_at if captured_at is not None else now}
+        fut = self._pool.submit(self._work, self._seq, frame, latency, now)
+        self._seq += 1
+        self._pending.append(fut)
+        return done
+
+    def _finish(self, fut):
+        result = fut.result()
+        latency = result["latency"]
+        latency["total"] = time.perf_counter() - latency.pop("_start")
+        self.stats.add(latency)
+        for name, hist in _M_STAGE.items():
+            hist.record(latency.get(name, 0.0))
+        _M_FRAMES.inc()
+        _M_MARKERS.inc(len(result["markers"]))
+        self.frames += 1
+        self.stopped_at = time.monotonic()
+        return result
+
+    def poll(self):
+        """Results that are ready, in order, without blocking."""
+        done = []
+        while self._pending and self._pending[0].done():
+            done.append(self._finish(self._pending.popleft()))
+        return done
+
+    def drain(self):
+        """Wait for every queued frame and return the results in order."""
+        done = []
+        while self._pending:
+            done.append(self._finish(self._pending.popleft()))
+        return done
+
+    def stream(self, camera, max_frames=None, rate=None, stop=None):
+        """Capture from a HAL camera on a background thread and yield results.
+
+        `rate` caps the capture rate (absolute deadlines, no drift); `stop`
+        is an optional threading.Event that ends the stream.
+        """
+        stop = stop or threading.Event()
+        futures = queue.Queue(maxsize=self.max_in_flight)
+        error = []
+
+        def capture_loop():
+            period = 1.0 / rate if rate else 0.0
+            next_t = time.monotonic()
+            n = 0
+            try:
+                while not stop.is_set() and (max_frames is None or n < max_frames):
+                    if period:
+                        delay = next_t - time.monotonic()
+                        if delay > 0:
+                            time.sleep(delay)
+                        next_t = max(next_t + period, time.monotonic() - period)
+                    t0 = time.perf_counter()
+                    frame = camera.capture()
+                    t1 = time.perf_counter()
+                    latency = {"capture": t1 - t0, "_start": t0}
+                    fut = self._pool.submit(self._work, self._seq, frame, latency, t1)
+                    self._seq += 1
+                    futures.put(fut)
+                    n += 1
+            except Exception as exc:
+                error.append(exc)
+            finally:
+                futures.put(None)
+
+        # Frames already submitted through `submit` come out first.
+        for result in self.drain():
+            yield result
+        if self.started_at is None:
+            self.started_at = time.monotonic()
+        thread = threading.Thread(target=capture_loop, name="aruco-capture", daemon=True)
+        thread.start()
+        try:
+            while True:
+                fut = futures.get()
+                if fut is None:
+                    break
+                yield self._finish(fut)
+        finally:
+            stop.set()
+            # Unblock the capture thread if the consumer stopped early.
+            while thread.is_alive():
+                try:
+                    fut = futures.get(timeout=0.05)
+                except queue.Empty:
+                    continue
+                if fut is not None:
+                    fut.result()
+            thread.join()
+        if error:
+            raise error[0]
+
+    def report(self):
+        elapsed = (self.stopped_at or time.monotonic()) - (self.started_at or time.monotonic())
+        out = {
+            "frames": self.frames,
+            "fps": self.frames / elapsed if elapsed > 0 else 0.0,
+            "workers": self.workers,
+            "full_searches": self.detector.full_searches,
+            "roi_searches": self.detector.roi_searches,
+        }
+        out["latency_ms"] = self.stats.report()
+        return out
+
+    def close(self):
+        self.drain()
+        self._pool.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,399 @@
+"""Sparse pose graph for keyframe poses, odometry and anchor sightings.
+
+Nodes are body poses (world <- body rotation and position) at keyframes.
+Anchors are ArUco marker positions, fixed when the anchor is in the
+known-anchors file and estimated otherwise. Constraints:
+
+    odometry / loop   relative pose between two keyframes (IMU/fusion
+                      odometry, or a re-localization against an old one)
+    prior             absolute pose of one keyframe (a marker fix)
+    sighting          anchor position seen in the body frame from a
+                      keyframe: R_i^T (p_k - t_i) = z, the same
+                      correspondence `alignment.umeyama` fits
+
+    graph = PoseGraph()
+    a = graph.add_node(q0, p0, fixed=True)
+    b = graph.add_node(q1, p1)
+    graph.add_odometry(a, b, dq, dp, rot_std=0.01, pos_std=0.02)
+    graph.add_sighting(b, graph.anchor(7, known[7]), z_body)
+    report = graph.update()
+
+Each `optimize` is Levenberg-Marquardt over a SciPy sparse Jacobian, with
+rotations updated on the manifold (R <- R Exp(dw)). It always starts
+from the current estimates, so after a few new nodes it converges in one
+or two iterations. `update()` makes the incremental choice: it re-solves
+the last `window` keyframes with everything older held fixed, and only
+reopens older keyframes back to where a new constraint reaches (a loop
+closure, or an anchor seen again after a long gap).
+"""
+import time
+
+import numpy as np
+import scipy.sparse
+import scipy.sparse.linalg
+
+from . import quaternion
+
+
+def _exp(w):
+    return quaternion.to_matrix(quaternion.from_rvec(w))
+
+
+def _log(m):
+    return quaternion.to_rvec(quaternion.from_matrix(m))
+
+
+def _skew(v):
+    out = np.zeros(v.shape[:-1] + (3, 3))
+    out[..., 0, 1], out[..., 0, 2] = -v[..., 2], v[..., 1]
+    out[..., 1, 0], out[..., 1, 2] = v[..., 2], -v[..., 0]
+    out[..., 2, 0], out[..., 2, 1] = -v[..., 1], v[..., 0]
+    return out
+
+
+def _t(m):
+    return np.swapaxes(m, -1, -2)
+
+
+def _jr_inv(e):
+    # Inverse right Jacobian of SO(3), to second order.
+    return np.eye(3) + 0.5 * _skew(e) + _skew(e) @ _skew(e) / 12.0
+
+
+def relative(q_i, p_i, q_j, p_j):
+    """Pose of j in the frame of i, as (quat, translation); the odometry measurement."""
+    r_i = quaternion.to_matrix(q_i)
+    rel = _t(r_i) @ quaternion.to_matrix(q_j)
+    return quaternion.from_matrix(rel), (_t(r_i) @ (np.asarray(p_j) - np.asarray(p_i))[..., None])[..., 0]
+
+
+class _Edges:
+    """Append-only edge table stored as growing column arrays."""
+
+    def __init__(self, **fields):
+        self._cols = {name: np.zeros((16,) + tuple(shape), dtype=dtype) for name, (dtype, shape) in fields.items()}
+        self.n = 0
+
+    def __len__(self):
+        return self.n
+
+    def append(self, *values):
+        if self.n == len(next(iter(self._cols.values()))):
+            for name, col in self._cols.items():
+                new = np.zeros((2 * len(col),) + col.shape[1:], dtype=col.dtype)
+                new[:self.n] = col[:self.n]
+                self._cols[name] = new
+        for col, value in zip(self._cols.values(), values):
+            col[self.n] = value
+        self.n += 1
+
+    def arrays(self):
+        return {name: col[:self.n] for name, col in self._cols.items()}
+
+
+class PoseGraph:
+    """Keyframe poses, anchors and their constraints; see the module docstring."""
+
+    def __init__(self, capacity=1024):
+        self._rot = np.zeros((capacity, 3, 3))
+        self._pos = np.zeros((capacity, 3))
+        self._node_fixed = np.zeros(capacity, dtype=bool)
+        self.n_nodes = 0
+        self._anchor_pos = np.zeros((64, 3))
+        self._anchor_fixed = np.zeros(64, dtype=bool)
+        self._anchor_seen = np.zeros(64, dtype=np.int64)
+        self.n_anchors = 0
+        self.anchor_ids = {}
+        self.between = _Edges(i=(np.int64, ()), j=(np.int64, ()), rot=(np.float64, (3, 3)),
+                              trans=(np.float64, (3,)), weight=(np.float64, (6,)))
+        self.priors = _Edges(i=(np.int64, ()), rot=(np.float64, (3, 3)), pos=(np.float64, (3,)),
+                             weight=(np.float64, (6,)))
+        self.sightings = _Edges(i=(np.int64, ()), k=(np.int64, ()), z=(np.float64, (3,)), weight=(np.float64, (3,)))
+        self._oldest = None
+        self.solves = 0
+
+    # -- building ----------------------------------------------------------
+
+    def _grow(self, name, n):
+        arr = getattr(self, name)
+        if n > len(arr):
+            new = np.zeros((max(n, 2 * len(arr)),) + arr.shape[1:], dtype=arr.dtype)
+            new[:len(arr)] = arr
+            setattr(self, name, new)
+
+    def add_node(self, quat, position, fixed=False):
+        """New keyframe at an initial guess; returns its index."""
+        i = self.n_nodes
+        for name in ("_rot", "_pos", "_node_fixed"):
+            self._grow(name, i + 1)
+        self._rot[i] = quaternion.to_matrix(quaternion.normalize(quat)[0])
+        self._pos[i] = position
+        self._node_fixed[i] = fixed
+        self.n_nodes += 1
+        return i
+
+    def add_odometry(self, i, j, quat, translation, rot_std=0.01, pos_std=0.02):
+        """Pose of node j measured in the frame of node i (see `relative`)."""
+        rot = quaternion.to_matrix(quaternion.normalize(quat)[0])
+        weight = np.r_[np.full(3, 1.0 / rot_std), np.full(3, 1.0 / pos_std)]
+        self.between.append(i, j, rot, np.asarray(translation, dtype=np.float64), weight)
+        self._touch(min(i, j))
+
+    add_loop = add_odometry
+
+    def add_prior(self, i, quat, position, rot_std=0.02, pos_std=0.02):
+        """Absolute pose measurement of node i."""
+        rot = quaternion.to_matrix(quaternion.normalize(quat)[0])
+        weight = np.r_[np.full(3, 1.0 / rot_std), np.full(3, 1.0 / pos_std)]
+        self.priors.append(i, rot, np.asarray(position, dtype=np.float64), weight)
+
+    def anchor(self, marker_id, position=None, guess=None):
+        """Anchor index for `marker_id`, created on first use.
+
+        With `position` the anchor is a known, fixed point; otherwise it is
+        estimated, starting from `guess`.
+        """
+        k = self.anchor_ids.get(marker_id)
+        if k is None:
+            k = self.anchor_ids[marker_id] = self.n_anchors
+            for name in ("_anchor_pos", "_anchor_fixed", "_anchor_seen"):
+                self._grow(name, k + 1)
+            start = position if position is not None else guess
+            self._anchor_pos[k] = start if start is not None else np.nan
+            self._anchor_fixed[k] = position is not None
+            self._anchor_seen[k] = -1
+            self.n_anchors += 1
+        return k
+
+    def add_sighting(self, i, k, z_body, std=0.03):
+        """Anchor k seen at `z_body` (meters, body frame) from node i."""
+        z = np.asarray(z_body, dtype=np.float64)
+        if np.isnan(self._anchor_pos[k]).any():
+            self._anchor_pos[k] = self._pos[i] + self._rot[i] @ z
+        last = self._anchor_seen[k]
+        self._touch(min(i, last) if last >= 0 else i)
+        self._anchor_seen[k] = i
+        self.sightings.append(i, k, z, np.full(3, 1.0 / std))
+
+    def _touch(self, i):
+        self._oldest = i if self._oldest is None else min(self._oldest, i)
+
+    # -- state -------------------------------------------------------------
+
+    def poses(self):
+        """(quats (N, 4), positions (N, 3)) of every keyframe."""
+        n = self.n_nodes
+        return quaternion.from_matrix(self._rot[:n]), self._pos[:n].copy()
+
+    def anchors(self):
+        """{marker id: position} of every anchor."""
+        return {m: self._anchor_pos[k].copy() for m, k in self.anchor_ids.items()}
+
+    # -- solving -----------------------------------------------------------
+
+    def _columns(self, active_nodes, active_anchors):
+        node_col = np.full(self.n_nodes, -1, dtype=np.int64)
+        node_col[active_nodes] = 6 * np.arange(len(active_nodes))
+        anchor_col = np.full(self.n_anchors, -1, dtype=np.int64)
+        anchor_col[active_anchors] = 6 * len(active_nodes) + 3 * np.arange(len(active_anchors))
+        return node_col, anchor_col, 6 * len(active_nodes) + 3 * len(active_anchors)
+
+    @staticmethod
+    def _select(edges, keep):
+        return {name: col[keep] for name, col in edges.arrays().items()}
+
+    def _terms(self, rot, pos, anchors, edge_sets, jacobians):
+        """Whitened residual blocks and their Jacobian blocks, per constraint kind."""
+        out = []
+        b = edge_sets["between"]
+        if len(b["i"]):
+            ri, rj = rot[b["i"]], rot[b["j"]]
+            rit = _t(ri)
+            d = (rit @ (pos[b["j"]] - pos[b["i"]])[..., None])[..., 0]
+            mt = _t(b["rot"])
+            e = _log(mt @ rit @ rj)
+            r = np.concatenate([e, (mt @ (d - b["trans"])[..., None])[..., 0]], axis=1)
+            blocks = None
+            if jacobians:
+                ji = np.zeros((len(r), 6, 6))
+                jj = np.zeros((len(r), 6, 6))
+                jr = _jr_inv(e)
+                ji[:, :3, :3] = -jr @ _t(rj) @ ri
+                ji[:, 3:, :3] = mt @ _skew(d)
+                ji[:, 3:, 3:] = -mt @ rit
+                jj[:, :3, :3] = jr
+                jj[:, 3:, 3:] = mt @ rit
+                blocks = [("node", b["i"], ji), ("node", b["j"], jj)]
+            out.append((r, b["weight"], blocks))
+        p = edge_sets["prior"]
+        if len(p["i"]):
+            e = _log(_t(p["rot"]) @ rot[p["i"]])
+            r = np.concatenate([e, pos[p["i"]] - p["pos"]], axis=1)
+            blocks = None
+            if jacobians:
+                jp = np.zeros((len(r), 6, 6))
+                jp[:, :3, :3] = _jr_inv(e)
+                jp[:, 3:, 3:] = np.eye(3)
+                blocks = [("node", p["i"], jp)]
+            out.append((r, p["weight"], blocks))
+        s = edge_sets["sighting"]
+        if len(s["i"]):
+            rit = _t(rot[s["i"]])
+            w = (rit @ (anchors[s["k"]] - pos[s["i"]])[..., None])[..., 0]
+            r = w - s["z"]
+            blocks = None
+            if jacobians:
+                jn = np.concatenate([_skew(w), -rit], axis=2)
+                blocks = [("node", s["i"], jn), ("anchor", s["k"], rit)]
+            out.append((r, s["weight"], blocks))
+        return out
+
+    @staticmethod
+    def _robust(r, weight, huber):
+        # Whitened residuals, then Huber reweighting of each constraint.
+        rw = r * weight
+        if huber is None:
+            return rw, np.ones(len(r)), 0.5 * (rw * rw).sum()
+        norm = np.sqrt((rw * rw).sum(axis=1))
+        scale = np.where(norm <= huber, 1.0, huber / np.maximum(norm, 1e-300))
+        cost = np.where(norm <= huber, 0.5 * norm * norm, huber * (norm - 0.5 * huber)).sum()
+        return rw * np.sqrt(scale)[:, None], np.sqrt(scale), cost
+
+    def _cost(self, rot, pos, anchors, edge_sets, huber):
+        return sum(self._robust(r, w, huber)[2] for r, w, _ in self._terms(rot, pos, anchors, edge_sets, False))
+
+    def _system(self, edge_sets, node_col, anchor_col, n_cols, huber):
+        n, m = self.n_nodes, self.n_anchors
+        terms = self._terms(self._rot[:n], self._pos[:n], self._anchor_pos[:m], edge_sets, True)
+        rows, cols, vals, res = [], [], [], []
+        cost = 0.0
+        row0 = 0
+        for r, weight, blocks in terms:
+            rw, scale, c = self._robust(r, weight, huber)
+            cost += c
+            k = r.shape[1]
+            res.append(rw.ravel())
+            w = weight * scale[:, None]
+            base = row0 + k * np.arange(len(r))
+            for kind, idx, jac in blocks:
+                col = (node_col if kind == "node" else anchor_col)[idx]
+                keep = col >= 0
+                width = jac.shape[2]
+                jw = jac[keep] * w[keep][:, :, None]
+                rr = np.broadcast_to(base[keep][:, None, None] + np.arange(k)[None, :, None], jw.shape)
+                cc = np.broadcast_to(col[keep][:, None, None] + np.arange(width)[None, None, :], jw.shape)
+                rows.append(rr.ravel())
+                cols.append(cc.ravel())
+                vals.append(jw.ravel())
+            row0 += k * len(r)
+        jac = scipy.sparse.csr_matrix(
+            (np.concatenate(vals) if vals else np.empty(0),
+             (np.concatenate(rows) if rows else np.empty(0, np.int64),
+              np.concatenate(cols) if cols else np.empty(0, np.int64))),
+            shape=(row0, n_cols))
+        return jac, np.concatenate(res) if res else np.empty(0), cost
+
+    def _step(self, delta, active_nodes, active_anchors):
+        rot = self._rot[:self.n_nodes].copy()
+        pos = self._pos[:self.n_nodes].copy()
+        anchors = self._anchor_pos[:self.n_anchors].copy()
+        d = delta[:6 * len(active_nodes)].reshape(-1, 6)
+        rot[active_nodes] = rot[active_nodes] @ _exp(d[:, :3])
+        pos[active_nodes] += d[:, 3:]
+        anchors[active_anchors] += delta[6 * len(active_nodes):].reshape(-1, 3)
+        return rot, pos, anchors
+
+    def _active(self, nodes):
+        n, m = self.n_nodes, self.n_anchors
+        free = ~self._node_fixed[:n]
+        if not self._node_fixed[:n].any() and not len(self.priors) and not self._anchor_fixed[:m].any():
+            free[0] = False  # nothing ties the graph to the world; hold the first keyframe
+        if nodes is None:
+            in_scope = np.ones(n, dtype=bool)
+        else:
+            in_scope = np.zeros(n, dtype=bool)
+            in_scope[nodes] = True
+        active_nodes = np.flatnonzero(free & in_scope)
+        s = self.sightings.arrays()
+        anchor_scope = np.zeros(m, dtype=bool)
+        anchor_scope[s["k"][in_scope[s["i"]]]] = True
+        active_anchors = np.flatnonzero(anchor_scope & ~self._anchor_fixed[:m])
+        # Only constraints that touch something being solved matter.
+        node_on = np.zeros(n, dtype=bool)
+        node_on[active_nodes] = True
+        anchor_on = np.zeros(m, dtype=bool)
+        anchor_on[active_anchors] = True
+        b, p = self.between.arrays(), self.priors.arrays()
+        edge_sets = {
+            "between": self._select(self.between, node_on[b["i"]] | node_on[b["j"]]),
+            "prior": self._select(self.priors, node_on[p["i"]]),
+            "sighting": self._select(self.sightings, node_on[s["i"]] | anchor_on[s["k"]]),
+        }
+        return active_nodes, active_anchors, edge_sets
+
+    def optimize(self, iterations=20, nodes=None, huber=None, tol=1e-6, damping=1e-4):
+        """Levenberg-Marquardt from the current estimates.
+
+        `nodes` restricts the solve to those keyframes (and the unknown
+        anchors they see), holding the rest fixed. `huber` is the Huber
+        threshold on whitened constraint residuals, for outlier sightings
+        or false loop closures. Returns a report dict.
+        """
+        t0 = time.perf_counter()
+        active_nodes, active_anchors, edge_sets = self._active(nodes)
+        node_col, anchor_col, n_cols = self._columns(active_nodes, active_anchors)
+        report = {"nodes": len(active_nodes), "anchors": len(active_anchors), "iterations": 0}
+        if not n_cols:
+            report.update(initial_cost=0.0, final_cost=0.0, seconds=time.perf_counter() - t0)
+            return report
+        lam = damping
+        cost = None
+        for it in range(iterations):
+            jac, res, linear_cost = self._system(edge_sets, node_col, anchor_col, n_cols, huber)
+            if cost is None:
+                cost = report["initial_cost"] = linear_cost
+                report["constraints"] = jac.shape[0]
+            jt = jac.T.tocsr()
+            h = (jt @ jac).tocsc()
+            g = jt @ res
+            diag = h.diagonal()
+            while True:
+                a = h + scipy.sparse.diags(lam * np.maximum(diag, 1e-9), format="csc")
+                delta = -scipy.sparse.linalg.spsolve(a, g, permc_spec="MMD_AT_PLUS_A")
+                rot, pos, anchors = self._step(delta, active_nodes, active_anchors)
+                new_cost = self._cost(rot, pos, anchors, edge_sets, huber)
+                if new_cost <= cost or lam > 1e8:
+                    break
+                lam *= 10.0
+            report["iterations"] = it + 1
+            if new_cost > cost:
+                break
+            n, m = self.n_nodes, self.n_anchors
+            self._rot[:n], self._pos[:n], self._anchor_pos[:m] = rot, pos, anchors
+            gain, cost = cost - new_cost, new_cost
+            lam = max(lam / 10.0, 1e-12)
+            if gain <= tol * max(cost, 1e-12) or np.abs(delta).max() < 1e-10:
+                break
+        self.solves += 1
+        report["final_cost"] = cost
+        report["seconds"] = time.perf_counter() - t0
+        return report
+
+    def update(self, window=64, iterations=5, huber=None):
+        """Incremental solve after adding keyframes and constraints.
+
+        Re-optimizes the last `window` keyframes, or every keyframe from the
+        oldest one a constraint added since the previous update reaches back
+        to (a loop closure, an anchor seen again), whichever is more.
+        Everything older stays fixed; all of it starts from the current,
+        warm estimates.
+        """
+        start = max(0, self.n_nodes - window)
+        loop = self._oldest is not None and self._oldest < start
+        if loop:
+            start = self._oldest
+        self._oldest = None
+        report = self.optimize(4 * iterations if loop else iterations, nodes=np.arange(start, self.n_nodes),
+                               huber=huber)
+        report["mode"] = "loop" if loop else "window"
+        return report
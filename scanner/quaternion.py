@@ -0,0 +1,195 @@
+"""Vectorized quaternion math over (N, 4) arrays.
+
+Quaternions are (w, x, y, z), Hamilton convention, matching the BNO055
+output. Every function takes stacks of quaternions (any leading shape) and
+broadcasts like NumPy, with no per-sample Python code.
+
+The BNO055 reports an all-zero quaternion until its fusion has started
+(the first line of `test_outputs/bno055_output.txt`). `normalize` flags
+such readings as invalid and replaces them with the identity, so they
+pass through the rest of the math without producing NaNs:
+
+    q, valid = quaternion.normalize(raw)
+    R = quaternion.to_matrix(q[valid])
+    rvec = quaternion.to_rvec(q)          # OpenCV axis-angle, e.g. for ArUco
+"""
+import numpy as np
+
+
+EPS = 1e-9
+# Half-angle (rad) below which slerp falls back to normalized lerp; the
+# angular error there is under 1e-7 rad.
+NLERP_MAX_ANGLE = 0.01
+
+
+def identity(n=None, dtype=np.float64):
+    """The identity quaternion, or a stack of `n` of them."""
+    if n is None:
+        return np.array([1.0, 0.0, 0.0, 0.0], dtype=dtype)
+    out = np.zeros((n, 4), dtype=dtype)
+    out[:, 0] = 1.0
+    return out
+
+
+def normalize(q):
+    """Unit quaternions and a validity mask.
+
+    Rows with a zero (or non-finite) norm are invalid; they come back as
+    the identity so downstream math stays finite.
+    """
+    q = np.asarray(q, dtype=np.float64)
+    norm = np.sqrt(np.einsum("...i,...i->...", q, q))
+    valid = np.isfinite(norm) & (norm > EPS)
+    out = q / np.where(valid, norm, 1.0)[..., None]
+    if not valid.all():
+        out[~valid] = identity()
+    return out, valid
+
+
+def canonical(q):
+    """Flip signs so w >= 0 (q and -q are the same rotation)."""
+    q = np.asarray(q, dtype=np.float64)
+    return np.where(q[..., :1] < 0.0, -q, q)
+
+
+def conjugate(q):
+    q = np.asarray(q, dtype=np.float64)
+    return q * np.array([1.0, -1.0, -1.0, -1.0])
+
+
+def inverse(q):
+    """Inverse of arbitrary (not necessarily unit) quaternions."""
+    q = np.asarray(q, dtype=np.float64)
+    return conjugate(q) / np.einsum("...i,...i->...", q, q)[..., None]
+
+
+def multiply(a, b):
+    """Hamilton product a * b (apply b, then a)."""
+    a = np.asarray(a, dtype=np.float64)
+    b = np.asarray(b, dtype=np.float64)
+    aw, ax, ay, az = (a[..., i] for i in range(4))
+    bw, bx, by, bz = (b[..., i] for i in range(4))
+    return np.stack(
+        [
+            aw * bw - ax * bx - ay * by - az * bz,
+            aw * bx + ax * bw + ay * bz - az * by,
+            aw * by - ax * bz + ay * bw + az * bx,
+            aw * bz + ax * by - ay * bx + az * bw,
+        ],
+        axis=-1,
+    )
+
+
+def rotate(q, v):
+    """Rotate vectors `v` (..., 3) by unit quaternions `q` (..., 4)."""
+    q = np.asarray(q, dtype=np.float64)
+    v = np.asarray(v, dtype=np.float64)
+    # v' = v + 2w (u x v) + 2 u x (u x v), with u the vector part of q.
+    w = q[..., :1]
+    u = q[..., 1:]
+    uv = np.cross(u, v)
+    return v + 2.0 * (w * uv + np.cross(u, uv))
+
+
+def angle(a, b=None):
+    """Rotation angle of `a`, or between `a` and `b` (radians, 0..pi)."""
+    a = np.asarray(a, dtype=np.float64)
+    if b is None:
+        dot = np.abs(a[..., 0])
+    else:
+        dot = np.abs(np.einsum("...i,...i->...", a, np.asarray(b, dtype=np.float64)))
+    return 2.0 * np.arccos(np.clip(dot, 0.0, 1.0))
+
+
+def slerp(q0, q1, u):
+    """Spherical interpolation from q0 (u=0) to q1 (u=1), shortest path.
+
+    Nearly parallel pairs use normalized lerp, which is indistinguishable
+    at that size and avoids dividing by sin(theta) ~ 0.
+    """
+    q0 = np.asarray(q0, dtype=np.float64)
+    q1 = np.asarray(q1, dtype=np.float64)
+    u = np.asarray(u, dtype=np.float64)
+    dot = np.einsum("...i,...i->...", q0, q1)
+    q1 = np.where(dot[..., None] < 0.0, -q1, q1)
+    theta = np.arccos(np.clip(np.abs(dot), 0.0, 1.0))
+    near = theta < NLERP_MAX_ANGLE
+    safe = np.where(near, 1.0, np.sin(theta))
+    w0 = np.where(near, 1.0 - u, np.sin((1.0 - u) * theta) / safe)
+    w1 = np.where(near, u, np.sin(u * theta) / safe)
+    out = w0[..., None] * q0 + w1[..., None] * q1
+    return out / np.sqrt(np.einsum("...i,...i->...", out, out))[..., None]
+
+
+def to_matrix(q):
+    """(..., 3, 3) rotation matrices from unit quaternions."""
+    q = np.asarray(q, dtype=np.float64)
+    w, x, y, z = (q[..., i] for i in range(4))
+    xx, yy, zz = x * x, y * y, z * z
+    xy, xz, yz = x * y, x * z, y * z
+    wx, wy, wz = w * x, w * y, w * z
+    out = np.empty(q.shape[:-1] + (3, 3))
+    out[..., 0, 0] = 1.0 - 2.0 * (yy + zz)
+    out[..., 0, 1] = 2.0 * (xy - wz)
+    out[..., 0, 2] = 2.0 * (xz + wy)
+    out[..., 1, 0] = 2.0 * (xy + wz)
+    out[..., 1, 1] = 1.0 - 2.0 * (xx + zz)
+    out[..., 1, 2] = 2.0 * (yz - wx)
+    out[..., 2, 0] = 2.0 * (xz - wy)
+    out[..., 2, 1] = 2.0 * (yz + wx)
+    out[..., 2, 2] = 1.0 - 2.0 * (xx + yy)
+    return out
+
+
+def from_matrix(m):
+    """Unit quaternions (w >= 0) from (..., 3, 3) rotation matrices.
+
+    Uses Shepperd's method: each matrix is converted through whichever of
+    w, x, y, z is largest, which keeps the division well conditioned.
+    """
+    m = np.asarray(m, dtype=np.float64)
+    m00, m11, m22 = m[..., 0, 0], m[..., 1, 1], m[..., 2, 2]
+    trace = m00 + m11 + m22
+    # 4 * component^2 for w, x, y, z.
+    sq = np.stack([1.0 + trace, 1.0 + 2.0 * m00 - trace, 1.0 + 2.0 * m11 - trace, 1.0 + 2.0 * m22 - trace], axis=-1)
+    pick = np.argmax(sq, axis=-1)
+    big = np.sqrt(np.maximum(np.take_along_axis(sq, pick[..., None], axis=-1)[..., 0], EPS))
+    inv = 1.0 / big
+    a = (m[..., 2, 1] - m[..., 1, 2]) * inv  # 4wx / 2|c|
+    b = (m[..., 0, 2] - m[..., 2, 0]) * inv  # 4wy
+    c = (m[..., 1, 0] - m[..., 0, 1]) * inv  # 4wz
+    d = (m[..., 1, 0] + m[..., 0, 1]) * inv  # 4xy
+    e = (m[..., 0, 2] + m[..., 2, 0]) * inv  # 4xz
+    f = (m[..., 2, 1] + m[..., 1, 2]) * inv  # 4yz
+    half = 0.5 * big
+    q = np.select(
+        [pick[..., None] == 0, pick[..., None] == 1, pick[..., None] == 2],
+        [
+            np.stack([half, 0.5 * a, 0.5 * b, 0.5 * c], axis=-1),
+            np.stack([0.5 * a, half, 0.5 * d, 0.5 * e], axis=-1),
+            np.stack([0.5 * b, 0.5 * d, half, 0.5 * f], axis=-1),
+        ],
+        np.stack([0.5 * c, 0.5 * e, 0.5 * f, half], axis=-1),
+    )
+    return canonical(normalize(q)[0])
+
+
+def to_rvec(q):
+    """Rotation vectors (axis * angle, OpenCV `rvec` convention)."""
+    q = canonical(q)
+    v = q[..., 1:]
+    s = np.sqrt(np.einsum("...i,...i->...", v, v))
+    theta = 2.0 * np.arctan2(s, q[..., 0])
+    # theta / s -> 2 / w as s -> 0 (w -> 1 for a unit quaternion).
+    scale = np.where(s > EPS, theta / np.where(s > EPS, s, 1.0), 2.0)
+    return v * scale[..., None]
+
+
+def from_rvec(rvec):
+    """Unit quaternions from rotation vectors (e.g. ArUco `rvec`)."""
+    rvec = np.asarray(rvec, dtype=np.float64)
+    theta = np.sqrt(np.einsum("...i,...i->...", rvec, rvec))
+    half = 0.5 * theta
+    # sin(theta/2) / theta -> 1/2 as theta -> 0.
+    k = np.where(theta > EPS, np.sin(half) / np.where(theta > EPS, theta, 1.0), 0.5)
+    return np.concatenate([np.cos(half)[..., None], rvec * k[..., None]], axis=-1)
@@ -0,0 +1,134 @@
+"""Rebuild a voxel map from recorded scan logs on several cores.
+
+The range stream of each session is cut into fixed `chunk_seconds` time
+chunks. Worker processes open the .scanlog files themselves, and the
+reader memory-maps them, so every worker reads the same page-cache pages
+and no sample arrays are copied or pickled on the way in. Each worker
+projects its chunk (with `margin` seconds of IMU on either side for the
+slerp brackets) and bins the points into a partial voxel map: sorted
+unique keys, counts and point sums. The parent merges the partials in
+chunk order.
+
+    vmap, report = reconstruct(["a.scanlog", "b.scanlog"], voxel_size=0.02, workers=4)
+
+Chunk boundaries depend only on `chunk_seconds`, and partials are merged in
+chunk order, so the map is bit-identical for any number of workers.
+Occupancy is rebuilt from hit counts (`min(L_HIT * count, L_MAX)`, what
+inserting the same points into a `VoxelMap` gives); free-space misses
+are not replayed.
+"""
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from .projection import project
+from .scanlog import ScanLogReader
+from .voxel import VoxelMap, _unique, pack_keys
+
+
+# One reader per session per process, so a worker maps each file once.
+_READERS = {}
+
+
+def _reader(path):
+    log = _READERS.get(path)
+    if log is None:
+        log = _READERS[path] = ScanLogReader(path)
+    return log
+
+
+def plan_chunks(paths, chunk_seconds=10.0):
+    """(session, t0, t1) for every chunk of every session's range stream."""
+    chunks = []
+    for path in paths:
+        log = _reader(str(path))
+        if "range" not in log.streams:
+            continue
+        sid = list(log.streams).index("range")
+        rows = log.index[log.index["stream"] == sid]
+        if not len(rows):
+            continue
+        start, stop = float(rows["t_min"].min()), float(rows["t_max"].max())
+        edges = start + chunk_seconds * np.arange(int((stop - start) // chunk_seconds) + 1)
+        for t0, t1 in zip(edges, np.r_[edges[1:], np.nextafter(stop, np.inf)]):
+            chunks.append((str(path), float(t0), float(t1)))
+    return chunks
+
+
+def voxelize_chunk(path, t0, t1, voxel_size, extrinsics=None, margin=1.0):
+    """Partial voxel map for the range samples of `path` in [t0, t1).
+
+    Returns {"keys", "count", "sum", "samples", "points"} with keys sorted.
+    """
+    log = _reader(path)
+    rng = log.read("range", t0, t1)
+    imu = log.read("imu", t0 - margin, t1 + margin)
+    points = project(rng["distance_m"], rng["t"], imu["quat"], imu["t"], extrinsics=extrinsics)
+    keys = pack_keys(np.floor(points.astype(np.float64) / voxel_size).astype(np.int64))
+    if not len(keys):
+        return {"keys": keys, "count": np.empty(0, np.uint32), "sum": np.empty((0, 3)),
+                "samples": len(rng["t"]), "points": 0}
+    uniq, inv = _unique(keys, return_inverse=True)
+    sums = np.stack([np.bincount(inv, weights=points[:, a], minlength=len(uniq)) for a in range(3)], axis=1)
+    return {
+        "keys": uniq,
+        "count": np.bincount(inv, minlength=len(uniq)).astype(np.uint32),
+        "sum": sums,
+        "samples": len(rng["t"]),
+        "points": len(points),
+    }
+
+
+def _chunk_task(args):
+    return voxelize_chunk(*args)
+
+
+def merge_partials(partials):
+    """Merge partial maps in the given order into (keys, count, sum)."""
+    if not partials:
+        return np.empty(0, np.int64), np.empty(0, np.uint32), np.empty((0, 3))
+    keys = np.concatenate([p["keys"] for p in partials])
+    uniq, inv = _unique(keys, return_inverse=True)
+    count = np.bincount(inv, weights=np.concatenate([p["count"] for p in partials]), minlength=len(uniq))
+    sums = np.concatenate([p["sum"] for p in partials])
+    sums = np.stack([np.bincount(inv, weights=sums[:, a], minlength=len(uniq)) for a in range(3)], axis=1)
+    return uniq, count.astype(np.uint32), sums
+
+
+def reconstruct(paths, voxel_size=0.02, workers=None, chunk_seconds=10.0, extrinsics=None, margin=1.0):
+    """Voxel map of every session in `paths`, built on `workers` processes.
+
+    `workers=None` uses every core; `workers=1` runs in this process.
+    Returns (VoxelMap, report).
+    """
+    paths = [str(p) for p in paths]
+    workers = workers or os.cpu_count() or 1
+    t_start = time.perf_counter()
+    chunks = plan_chunks(paths, chunk_seconds)
+    tasks = [(path, t0, t1, voxel_size, extrinsics, margin) for path, t0, t1 in chunks]
+    if workers == 1:
+        partials = [_chunk_task(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(workers) as pool:
+            # map() yields in submission order, which keeps the merge order fixed.
+            partials = list(pool.map(_chunk_task, tasks, chunksize=max(1, len(tasks) // (workers * 4))))
+    _READERS.clear()
+    t_merge = time.perf_counter()
+    keys, count, sums = merge_partials(partials)
+    vmap = VoxelMap.from_voxels(voxel_size, keys, count, sums)
+    t_end = time.perf_counter()
+    report = {
+        "sessions": len(paths),
+        "chunks": len(chunks),
+        "workers": workers,
+        "samples": int(sum(p["samples"] for p in partials)),
+        "points": int(sum(p["points"] for p in partials)),
+        "partial_voxels": int(sum(len(p["keys"]) for p in partials)),
+        "voxels": len(vmap),
+        "voxelize_s": t_merge - t_start,
+        "merge_s": t_end - t_merge,
+        "total_s": t_end - t_start,
+    }
+    return vmap, report
@@ -0,0 +1,425 @@
+"""Chunked, columnar binary log for scan sessions.
+
+Layout (all little-endian):
+
+    header   b"SCANLOG\\0", u32 version, u32 meta_len, JSON meta (stream schemas)
+    chunk*   b"CHNK", u16 stream, u16 pad, u32 count, f8 t_min, f8 t_max,
+             then one contiguous column per field, each padded to 8 bytes
+    index    one INDEX_DTYPE row per chunk
+    footer   u64 index offset, u32 chunk count, b"SIDX"
+
+Each chunk holds records of a single stream, stored column by column, so a
+reader can hand out a field of a chunk as a zero-copy view of the
+memory-mapped file. A file whose writer died before `close()` has no
+footer; the reader then rebuilds the index by walking the chunk headers.
+
+    with ScanLogWriter("scan.scanlog") as log:
+        log.append("range", records)
+    log = ScanLogReader("scan.scanlog")
+    cols = log.read("range", t0, t1)        # {"t": ..., "distance_m": ...}
+"""
+import json
+import re
+import struct
+import time
+
+import numpy as np
+
+
+MAGIC = b"SCANLOG\0"
+VERSION = 1
+CHUNK_MAGIC = b"CHNK"
+FOOTER_MAGIC = b"SIDX"
+
+_HEADER = struct.Struct("<8sII")
+_CHUNK = struct.Struct("<4sHHIdd4x")
+_FOOTER = struct.Struct("<QI4s")
+
+INDEX_DTYPE = np.dtype(
+    [
+        ("stream", "<u2"),
+        ("count", "<u4"),
+        ("t_min", "<f8"),
+        ("t_max", "<f8"),
+        ("offset", "<u8"),
+    ]
+)
+
+RANGE_RECORD = np.dtype(
+    [
+        ("t", "<f8"),
+        ("distance_m", "<f4"),
+        ("strength", "<u2"),
+        ("temperature_c", "<f4"),
+    ]
+)
+IMU_RECORD = np.dtype(
+    [
+        ("t", "<f8"),
+        ("quat", "<f4", (4,)),
+        ("accel", "<f4", (3,)),
+        ("gyro", "<f4", (3,)),
+    ]
+)
+MARKER_RECORD = np.dtype(
+    [
+        ("t", "<f8"),
+        ("id", "<i4"),
+        ("has_pose", "u1"),
+        ("tvec", "<f4", (3,)),
+        ("rvec", "<f4", (3,)),
+        ("corners", "<f4", (4, 2)),
+    ]
+)
+POINT_RECORD = np.dtype([("t", "<f8"), ("xyz", "<f4", (3,))])
+
+STREAMS = {
+    "range": RANGE_RECORD,
+    "imu": IMU_RECORD,
+    "marker": MARKER_RECORD,
+    "point": POINT_RECORD,
+}
+
+
+def _pad8(n):
+    return (n + 7) & ~7
+
+
+def _field_layout(dtype, count):
+    """(name, column dtype, shape, offset) for each field of a chunk."""
+    layout = []
+    offset = 0
+    for name in dtype.names:
+        field = dtype.fields[name][0]
+        base = field.base if field.shape else field
+        shape = (count,) + field.shape
+        layout.append((name, base, shape, offset))
+        offset += _pad8(base.itemsize * int(np.prod(shape)))
+    return layout, offset
+
+
+def _descr(dtype):
+    return [[name, dtype.fields[name][0].base.str, list(dtype.fields[name][0].shape)] for name in dtype.names]
+
+
+def _from_descr(descr):
+    return np.dtype([(name, base, tuple(shape)) if shape else (name, base) for name, base, shape in descr])
+
+
+class ScanLogWriter:
+    """Append-only writer.
+
+    Records are staged per stream in preallocated arrays and written one
+    chunk at a time; the OS-level flush happens at most every
+    `flush_interval` seconds (and on `flush()`/`close()`).
+    """
+
+    def __init__(self, path, streams=None, chunk_records=4096, flush_interval=1.0, metadata=None):
+        self.streams = dict(STREAMS if streams is None else streams)
+        self._ids = {name: i for i, name in enumerate(self.streams)}
+        self.chunk_records = chunk_records
+        self.flush_interval = flush_interval
+        self._staged = {name: np.zeros(chunk_records, dtype=dt) for name, dt in self.streams.items()}
+        self._fill = dict.fromkeys(self.streams, 0)
+        self._index = []
+        self._last_flush = time.monotonic()
+        self.records_written = 0
+
+        meta = {
+            "streams": {name: _descr(dt) for name, dt in self.streams.items()},
+            "metadata": metadata or {},
+        }
+        blob = json.dumps(meta).encode()
+        blob += b" " * (_pad8(_HEADER.size + len(blob)) - _HEADER.size - len(blob))
+        self._fh = open(path, "wb")
+        self._fh.write(_HEADER.pack(MAGIC, VERSION, len(blob)))
+        self._fh.write(blob)
+
+    def append(self, stream, records):
+        """Append a structured array (or dict of equal-length columns)."""
+        staged = self._staged[stream]
+        if isinstance(records, dict):
+            n = len(records["t"])
+            names = records
+        else:
+            records = np.asarray(records)
+            n = len(records)
+            names = records.dtype.names
+        # Fields the caller does not provide are stored as zeros.
+        cols = {name: records[name] if name in names else None for name in staged.dtype.names}
+        pos = 0
+        while pos < n:
+            fill = self._fill[stream]
+            take = min(n - pos, self.chunk_records - fill)
+            for name, col in cols.items():
+                staged[name][fill:fill + take] = 0 if col is None else col[pos:pos + take]
+            self._fill[stream] = fill + take
+            pos += take
+            if self._fill[stream] == self.chunk_records:
+                self._write_chunk(stream)
+        self._maybe_flush()
+
+    def append_one(self, stream, record):
+        """Append a single record given as a tuple in field order."""
+        fill = self._fill[stream]
+        self._staged[stream][fill] = record
+        self._fill[stream] = fill + 1
+        if fill + 1 == self.chunk_records:
+            self._write_chunk(stream)
+            self._maybe_flush()
+
+    def _write_chunk(self, stream):
+        n = self._fill[stream]
+        if not n:
+            return
+        rec = self._staged[stream][:n]
+        t = rec["t"]
+        offset = self._fh.tell()
+        self._fh.write(_CHUNK.pack(CHUNK_MAGIC, self._ids[stream], 0, n, float(t.min()), float(t.max())))
+        for name in rec.dtype.names:
+            col = np.ascontiguousarray(rec[name])
+            self._fh.write(col.tobytes())
+            pad = _pad8(col.nbytes) - col.nbytes
+            if pad:
+                self._fh.write(b"\0" * pad)
+        self._index.append((self._ids[stream], n, float(t.min()), float(t.max()), offset))
+        self._fill[stream] = 0
+        self.records_written += n
+
+    def _maybe_flush(self):
+        now = time.monotonic()
+        if now - self._last_flush >= self.flush_interval:
+            self._fh.flush()
+            self._last_flush = now
+
+    def flush(self):
+        """Write out every partially filled chunk and flush the file."""
+        for stream in self.streams:
+            self._write_chunk(stream)
+        self._fh.flush()
+        self._last_flush = time.monotonic()
+
+    def close(self):
+        if self._fh.closed:
+            return
+        self.flush()
+        index = np.array(self._index, dtype=INDEX_DTYPE)
+        offset = self._fh.tell()
+        self._fh.write(index.tobytes())
+        self._fh.write(_FOOTER.pack(offset, len(index), FOOTER_MAGIC))
+        self._fh.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ScanLogReader:
+    """Memory-mapped reader; returned columns are views into the file."""
+
+    def __init__(self, path):
+        self.path = str(path)
+        self._mm = np.memmap(path, dtype=np.uint8, mode="r")
+        magic, version, meta_len = _HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a scan log")
+        if version > VERSION:
+            raise ValueError(f"{path}: unsupported scan log version {version}")
+        meta = json.loads(bytes(self._mm[_HEADER.size:_HEADER.size + meta_len]))
+        self.metadata = meta.get("metadata", {})
+        self.streams = {name: _from_descr(d) for name, d in meta["streams"].items()}
+        self._names = list(self.streams)
+        self._data_start = _HEADER.size + meta_len
+        self.index = self._load_index()
+
+    def _load_index(self):
+        mm = self._mm
+        if len(mm) >= self._data_start + _FOOTER.size:
+            offset, count, magic = _FOOTER.unpack_from(mm, len(mm) - _FOOTER.size)
+            if magic == FOOTER_MAGIC:
+                return np.frombuffer(mm, dtype=INDEX_DTYPE, count=count, offset=offset)
+        return self._scan_index()
+
+    def _scan_index(self):
+        # No footer: the writer did not close cleanly. Walk chunk headers
+        # and keep every chunk that is complete on disk.
+        rows = []
+        pos = self._data_start
+        end = len(self._mm)
+        while pos + _CHUNK.size <= end:
+            magic, sid, _, count, t_min, t_max = _CHUNK.unpack_from(self._mm, pos)
+            if magic != CHUNK_MAGIC or sid >= len(self._names):
+                break
+            _, size = _field_layout(self.streams[self._names[sid]], count)
+            if pos + _CHUNK.size + size > end:
+                break
+            rows.append((sid, count, t_min, t_max, pos))
+            pos += _CHUNK.size + size
+        return np.array(rows, dtype=INDEX_DTYPE)
+
+    def chunk_columns(self, row):
+        """Zero-copy column views for one index row."""
+        name = self._names[int(row["stream"])]
+        count = int(row["count"])
+        base = int(row["offset"]) + _CHUNK.size
+        layout, _ = _field_layout(self.streams[name], count)
+        return {
+            fname: np.ndarray(shape, dtype=dt, buffer=self._mm, offset=base + off)
+            for fname, dt, shape, off in layout
+        }
+
+    def count(self, stream):
+        sid = self._names.index(stream)
+        return int(self.index["count"][self.index["stream"] == sid].sum())
+
+    def iter_chunks(self, stream, t0=None, t1=None):
+        """Yield per-chunk column dicts restricted to t0 <= t < t1.
+
+        Within a chunk records are assumed to be in time order, which is how
+        every writer in this repo produces them.
+        """
+        sid = self._names.index(stream)
+        rows = self.index[self.index["stream"] == sid]
+        lo = -np.inf if t0 is None else t0
+        hi = np.inf if t1 is None else t1
+        rows = rows[(rows["t_max"] >= lo) & (rows["t_min"] < hi)]
+        for row in rows:
+            cols = self.chunk_columns(row)
+            t = cols["t"]
+            a = 0 if t0 is None else int(np.searchsorted(t, t0, side="left"))
+            b = len(t) if t1 is None else int(np.searchsorted(t, t1, side="left"))
+            if b > a:
+                yield {k: v[a:b] for k, v in cols.items()}
+
+    def read(self, stream, t0=None, t1=None):
+        """Columns for `stream` in [t0, t1).
+
+        Zero-copy when the range falls inside one chunk; spanning chunks
+        concatenates.
+        """
+        parts = list(self.iter_chunks(stream, t0, t1))
+        if len(parts) == 1:
+            return parts[0]
+        dtype = self.streams[stream]
+        if not parts:
+            return {name: np.empty((0,) + dtype.fields[name][0].shape, dtype=dtype.fields[name][0].base)
+                    for name in dtype.names}
+        return {name: np.concatenate([p[name] for p in parts]) for name in dtype.names}
+
+    def records(self, stream, t0=None, t1=None):
+        """Same as `read` but packed into a structured array (always a copy)."""
+        cols = self.read(stream, t0, t1)
+        out = np.empty(len(cols["t"]), dtype=self.streams[stream])
+        for name, col in cols.items():
+            out[name] = col
+        return out
+
+    def close(self):
+        # The mapping is released once the last returned view is gone.
+        self._mm = None
+        self.index = None
+
+
+def is_scanlog(path):
+    with open(path, "rb") as fh:
+        return fh.read(len(MAGIC)) == MAGIC
+
+
+# Conversions to and from the text/JSONL outputs of the tools/ scripts.
+
+_KV = re.compile(r"(\w+)=(\S+)")
+
+
+def parse_text_line(line):
+    """Parse `<timestamp> key=value ...` lines from tfluna_read/bno055_quat_read."""
+    parts = line.split(None, 1)
+    if not parts:
+        return None
+    try:
+        ts = float(parts[0])
+    except ValueError:
+        return None
+    values = {k: float(v) for k, v in _KV.findall(parts[1] if len(parts) > 1 else "")}
+    return ts, values
+
+
+def text_to_records(lines):
+    """Convert tool text output into (stream, structured array) pairs."""
+    ranges, imus = [], []
+    for line in lines:
+        parsed = parse_text_line(line)
+        if parsed is None:
+            continue
+        ts, v = parsed
+        if "dist_cm" in v:
+            ranges.append((ts, v["dist_cm"] / 100.0, v.get("strength", 0), v.get("temp_c", 0.0)))
+        elif "qw" in v:
+            quat = (v["qw"], v["qx"], v["qy"], v["qz"])
+            imus.append((ts, quat, (0.0, 0.0, 0.0), (0.0, 0.0, 0.0)))
+    out = []
+    if ranges:
+        out.append(("range", np.array(ranges, dtype=RANGE_RECORD)))
+    if imus:
+        out.append(("imu", np.array(imus, dtype=IMU_RECORD)))
+    return out
+
+
+def jsonl_to_markers(lines):
+    """Convert aruco_anchor_publisher JSONL into MARKER_RECORD rows.
+
+    Frames with no detections carry no rows, so they do not survive a round
+    trip.
+    """
+    rows = []
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        rec = json.loads(line)
+        ts = rec.get("timestamp")
+        for m in rec.get("markers", []):
+            has_pose = "tvec" in m
+            rows.append(
+                (
+                    ts,
+                    m["id"],
+                    has_pose,
+                    m.get("tvec", (0.0, 0.0, 0.0)),
+                    m.get("rvec", (0.0, 0.0, 0.0)),
+                    m.get("corners", np.zeros((4, 2))),
+                )
+            )
+    return np.array(rows, dtype=MARKER_RECORD)
+
+
+def markers_to_jsonl(cols):
+    """Inverse of `jsonl_to_markers`: yield one JSON line per timestamp."""
+    t = cols["t"]
+    if not len(t):
+        return
+    starts = np.flatnonzero(np.r_[True, t[1:] != t[:-1]])
+    ends = np.r_[starts[1:], len(t)]
+    for a, b in zip(starts.tolist(), ends.tolist()):
+        markers = []
+        for i in range(a, b):
+            m = {"id": int(cols["id"][i])}
+            if cols["has_pose"][i]:
+                m["tvec"] = cols["tvec"][i].tolist()
+                m["rvec"] = cols["rvec"][i].tolist()
+            else:
+                m["corners"] = cols["corners"][i].tolist()
+            markers.append(m)
+        yield json.dumps({"timestamp": float(t[a]), "markers": markers})
+
+
+def range_to_text(cols):
+    for ts, d, s, tc in zip(cols["t"].tolist(), cols["distance_m"].tolist(),
+                            cols["strength"].tolist(), cols["temperature_c"].tolist()):
+        yield f"{ts:.3f} dist_cm={round(d * 100)} strength={s} temp_c={tc:.2f}"
+
+
+def imu_to_text(cols):
+    for ts, (w, x, y, z) in zip(cols["t"].tolist(), cols["quat"].tolist()):
+        yield f"{ts:.3f} qw={w:.6f} qx={x:.6f} qy={y:.6f} qz={z:.6f}"
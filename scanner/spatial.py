@@ -0,0 +1,236 @@
+"""Incremental spatial index over the accumulated point cloud.
+
+Points are binned into cubic cells of `cell_size`. Each append becomes a
+segment: that batch's point ids sorted by cell, with a `voxel.KeyIndex`
+from cell key to the cell's run of ids. Segments are merged pairwise
+whenever the newer one reaches half the size of the one before it. So
+there are O(log n) of them, a point is re-sorted O(log n) times over its
+life, and appends never rebuild the whole index.
+
+    index = PointIndex(cell_size=0.05)
+    index.extend(project(rng["distance_m"], rng["t"], imu["quat"], imu["t"]))
+    ids, offsets = index.radius(queries, 0.03)      # CSR: ids[offsets[i]:offsets[i + 1]]
+    dist, ids = index.knn(queries, k=8)             # (Q, k), -1 / inf where short
+    ids = index.box(lo, hi)
+
+Every query takes a batch and returns NumPy arrays of point ids, which
+index `index.points` (append order). A radius search looks at the cells
+within ceil(r / cell_size) of each query. kNN grows that cube one ring
+at a time, starting from the query's own cell, until the k-th distance
+is inside it. Work is done in blocks of queries, which keeps the
+candidate arrays small.
+"""
+import numpy as np
+
+from .voxel import KeyIndex, pack_keys, unpack_keys
+
+
+_QUERY_BLOCK = 2048
+# Cubes wider than this fall back to scanning the points directly.
+_MAX_RING = 8
+
+
+def _expand(starts, counts):
+    """Concatenated ranges [start, start + count) and the row each came from."""
+    total = int(counts.sum())
+    row = np.repeat(np.arange(len(counts)), counts)
+    offset = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+    return row, np.repeat(starts, counts) + offset
+
+
+def _offsets(ring):
+    r = np.arange(-ring, ring + 1)
+    return np.stack(np.meshgrid(r, r, r, indexing="ij"), axis=-1).reshape(-1, 3)
+
+
+class _Segment:
+    def __init__(self, ids, keys):
+        order = np.argsort(keys, kind="stable")
+        self.ids = ids[order]
+        sk = keys[order]
+        first = np.flatnonzero(np.r_[True, sk[1:] != sk[:-1]])
+        self.cell_keys = sk[first]
+        self.cell_start = np.r_[first, len(sk)]
+        self.cells = KeyIndex(len(first) * 2)
+        self.cells.insert(self.cell_keys, np.arange(len(first)))
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def nbytes(self):
+        return self.ids.nbytes + self.cell_keys.nbytes + self.cell_start.nbytes + self.cells.nbytes
+
+    def candidates(self, keys):
+        """(row into `keys`, point id) for every point in the cells `keys`."""
+        cell = self.cells.lookup(keys)
+        hit = np.flatnonzero(cell >= 0)
+        cell = cell[hit]
+        start = self.cell_start[cell]
+        row, pos = _expand(start, self.cell_start[cell + 1] - start)
+        return hit[row], self.ids[pos]
+
+
+class PointIndex:
+    """Voxel-hash index with per-cell point lists; see the module docstring."""
+
+    def __init__(self, cell_size=0.05, capacity=1 << 16):
+        self.cell_size = float(cell_size)
+        self._points = np.zeros((capacity, 3), dtype=np.float32)
+        self.size = 0
+        self.segments = []
+        self.merges = 0
+
+    def __len__(self):
+        return self.size
+
+    @property
+    def points(self):
+        return self._points[:self.size]
+
+    def _cells(self, points):
+        return np.floor(np.asarray(points, dtype=np.float64) / self.cell_size).astype(np.int64)
+
+    def extend(self, points):
+        """Append (N, 3) points; returns their ids."""
+        points = np.asarray(points, dtype=np.float32).reshape(-1, 3)
+        n = len(points)
+        if self.size + n > len(self._points):
+            grown = np.zeros((max(self.size + n, 2 * len(self._points)), 3), dtype=np.float32)
+            grown[:self.size] = self._points[:self.size]
+            self._points = grown
+        ids = np.arange(self.size, self.size + n)
+        self._points[self.size:self.size + n] = points
+        self.size += n
+        if n:
+            self.segments.append(_Segment(ids, pack_keys(self._cells(points))))
+            while len(self.segments) > 1 and len(self.segments[-2]) <= 2 * len(self.segments[-1]):
+                b = self.segments.pop()
+                a = self.segments.pop()
+                merged = np.concatenate([a.ids, b.ids])
+                self.segments.append(_Segment(merged, pack_keys(self._cells(self._points[merged]))))
+                self.merges += 1
+        return ids
+
+    def memory(self):
+        """Bytes used, by part."""
+        return {
+            "points": self._points.nbytes,
+            "ids": sum(s.ids.nbytes for s in self.segments),
+            "cells": sum(s.cell_keys.nbytes + s.cell_start.nbytes for s in self.segments),
+            "hash": sum(s.cells.nbytes for s in self.segments),
+        }
+
+    @property
+    def nbytes(self):
+        return sum(self.memory().values())
+
+    # -- queries -----------------------------------------------------------
+
+    def _gather(self, query_cells, offsets):
+        """(query row, point id) for every point in the cells around each query."""
+        keys = pack_keys((query_cells[:, None, :] + offsets[None, :, :]).reshape(-1, 3))
+        rows, ids = [], []
+        for seg in self.segments:
+            r, i = seg.candidates(keys)
+            rows.append(r // len(offsets))
+            ids.append(i)
+        if not rows:
+            return np.empty(0, np.int64), np.empty(0, np.int64)
+        return np.concatenate(rows), np.concatenate(ids)
+
+    def _sq_dist(self, queries, rows, ids):
+        d = self._points[ids].astype(np.float64) - queries[rows]
+        return np.einsum("ij,ij->i", d, d)
+
+    def radius(self, queries, r, sort=False):
+        """Points within `r` of each query, as CSR (ids, offsets).
+
+        The neighbours of query i are ids[offsets[i]:offsets[i + 1]], in no
+        particular order unless `sort` (nearest first).
+        """
+        queries = np.asarray(queries, dtype=np.float64).reshape(-1, 3)
+        offsets = _offsets(max(1, int(np.ceil(r / self.cell_size))))
+        out_ids, out_rows = [], []
+        for a in range(0, len(queries), _QUERY_BLOCK):
+            q = queries[a:a + _QUERY_BLOCK]
+            rows, ids = self._gather(self._cells(q), offsets)
+            d2 = self._sq_dist(q, rows, ids)
+            keep = d2 <= r * r
+            rows, ids, d2 = rows[keep], ids[keep], d2[keep]
+            order = np.lexsort((d2, rows)) if sort else np.argsort(rows, kind="stable")
+            out_ids.append(ids[order])
+            out_rows.append(rows[order] + a)
+        ids = np.concatenate(out_ids) if out_ids else np.empty(0, np.int64)
+        rows = np.concatenate(out_rows) if out_rows else np.empty(0, np.int64)
+        return ids, np.r_[0, np.cumsum(np.bincount(rows, minlength=len(queries)))]
+
+    def count_radius(self, queries, r):
+        """Number of points within `r` of each query."""
+        return np.diff(self.radius(queries, r)[1])
+
+    def knn(self, queries, k=8):
+        """(distances, ids), each (Q, k), nearest first; inf / -1 past the last point."""
+        queries = np.asarray(queries, dtype=np.float64).reshape(-1, 3)
+        dist = np.full((len(queries), k), np.inf)
+        idx = np.full((len(queries), k), -1, dtype=np.int64)
+        for a in range(0, len(queries), _QUERY_BLOCK):
+            self._knn_block(queries[a:a + _QUERY_BLOCK], k, dist[a:a + _QUERY_BLOCK], idx[a:a + _QUERY_BLOCK])
+        return dist, idx
+
+    def _knn_block(self, q, k, dist, idx):
+        cells = self._cells(q)
+        # Distance from each query to the nearest face of its own cell.
+        inside = q - cells * self.cell_size
+        face = np.minimum(inside, self.cell_size - inside).min(axis=1)
+        pending = np.arange(len(q))
+        ring = 0
+        while len(pending) and ring <= _MAX_RING:
+            rows, ids = self._gather(cells[pending], _offsets(ring))
+            d2 = self._sq_dist(q[pending], rows, ids)
+            order = np.lexsort((d2, rows))
+            rows, ids, d2 = rows[order], ids[order], d2[order]
+            first = np.searchsorted(rows, np.arange(len(pending)))
+            rank = np.arange(len(rows)) - first[rows]
+            top = rank < k
+            r_top, rank_top = rows[top], rank[top]
+            got_d = np.full((len(pending), k), np.inf)
+            got_i = np.full((len(pending), k), -1, dtype=np.int64)
+            got_d[r_top, rank_top] = np.sqrt(d2[top])
+            got_i[r_top, rank_top] = ids[top]
+            # The searched cube holds every point this close to the query.
+            done = got_d[:, -1] <= ring * self.cell_size + face[pending]
+            dist[pending[done]] = got_d[done]
+            idx[pending[done]] = got_i[done]
+            pending = pending[~done]
+            ring = max(1, 2 * ring)
+        if len(pending) and self.size:
+            # Sparse surroundings: scan every point for what is left.
+            pts = self.points.astype(np.float64)
+            for p in pending:
+                d = np.sqrt(((pts - q[p]) ** 2).sum(axis=1))
+                top = np.argsort(d)[:k] if len(d) > k else np.argsort(d)
+                dist[p, :len(top)] = d[top]
+                idx[p, :len(top)] = top
+
+    def box(self, lo, hi):
+        """Ids of the points with lo <= p <= hi (per axis), ascending."""
+        lo = np.asarray(lo, dtype=np.float64)
+        hi = np.asarray(hi, dtype=np.float64)
+        c_lo, c_hi = self._cells(lo[None])[0], self._cells(hi[None])[0]
+        parts = []
+        for seg in self.segments:
+            ijk = unpack_keys(seg.cell_keys)
+            cell = np.flatnonzero(((ijk >= c_lo) & (ijk <= c_hi)).all(axis=1))
+            start = seg.cell_start[cell]
+            _, pos = _expand(start, seg.cell_start[cell + 1] - start)
+            ids = seg.ids[pos]
+            p = self._points[ids]
+            parts.append(ids[((p >= lo) & (p <= hi)).all(axis=1)])
+        return np.sort(np.concatenate(parts)) if parts else np.empty(0, np.int64)
+
+    def inliers(self, radius, min_neighbors, ids=None):
+        """Mask over `ids` (default: all points), True where a point has at
+        least `min_neighbors` other points within `radius`."""
+        ids = np.arange(self.size) if ids is None else np.asarray(ids)
+        return self.count_radius(self._points[ids], radius) - 1 >= min_neighbors
@@ -0,0 +1,357 @@
+"""Put every sensor stream on one monotonic clock and join the streams.
+
+All times here are `time.monotonic()` seconds. On Linux that is
+CLOCK_MONOTONIC, which every process on the host shares, so samples
+stamped by separate tools still line up.
+
+A read finishing is not the same as the sample being taken. Stamps for
+each kind of source:
+
+    SensorClockStamp  the sensor reports its own time (the camera's
+                      SensorTimestamp, or the TF-Luna frame counter times
+                      its frame period). A ClockEstimator maps that clock
+                      onto the host clock from the lower envelope of
+                      (host arrival - sensor time). Queueing only ever adds
+                      delay, so the envelope is the fixed latency and the
+                      sensor clock's offset and skew fall out of it.
+                      Clocks already on CLOCK_MONOTONIC pass `shared=True`.
+    MidpointStamp     polled I2C: the middle of the transaction, minus the
+                      expected age of the sample (half the fusion period
+                      for the BNO055).
+    EndStamp          read completion, the old behaviour.
+
+    acq.add("range", tfluna, sync=SensorClockStamp("frame_index", scale=1 / 100, latency=9 * 10 / 115200))
+    acq.add("imu", bno, rate=100, sync=MidpointStamp(age=0.005))
+
+`asof_indices` is the vectorized as-of join over sorted times. `AsOfJoin`
+does the same on live streams with bounded buffers. It releases a primary
+sample once the other streams have moved far enough past it that no later
+sample could be a better match.
+"""
+import time
+
+import numpy as np
+
+
+now = time.monotonic
+
+
+class ClockEstimator:
+    """Maps a sensor clock onto the host monotonic clock.
+
+    Observations are (sensor time, host arrival time) pairs. With
+    host - sensor = offset + skew * (sensor - ref) + delay and delay >= 0,
+    the line under the lowest delays is recovered by fitting the minimum
+    of each of `segments` slices of the last `window` observations. The
+    line is then lowered until it touches the lowest point. `latency` is
+    the part of the delay known to be fixed (UART transmission time, say),
+    which `to_host` subtracts as well.
+    """
+
+    def __init__(self, window=1024, segments=8, latency=0.0, refit_every=32):
+        self.window = int(window)
+        self.segments = int(segments)
+        self.latency = latency
+        self.refit_every = refit_every
+        self._sensor = np.zeros(self.window)
+        self._host = np.zeros(self.window)
+        self.count = 0
+        self.ref = None
+        self.offset = None
+        self.skew = 0.0
+        self._fitted_at = 0
+
+    def observe(self, sensor_t, host_t):
+        sensor_t = np.atleast_1d(np.asarray(sensor_t, dtype=np.float64))
+        host_t = np.broadcast_to(np.asarray(host_t, dtype=np.float64), sensor_t.shape)
+        if self.ref is None and len(sensor_t):
+            self.ref = float(sensor_t[0])
+        m = len(sensor_t)
+        idx = (self.count + np.arange(max(0, m - self.window), m)) % self.window
+        self._sensor[idx] = sensor_t[-self.window:]
+        self._host[idx] = host_t[-self.window:]
+        self.count += m
+
+    def _ordered(self):
+        n = min(self.count, self.window)
+        if self.count <= self.window:
+            return self._sensor[:n], self._host[:n]
+        start = self.count % self.window
+        return np.roll(self._sensor, -start), np.roll(self._host, -start)
+
+    def fit(self):
+        sensor, host = self._ordered()
+        if not len(sensor):
+            return
+        x = sensor - self.ref
+        y = host - sensor
+        k = min(self.segments, len(x))
+        idx = np.array([part[np.argmin(y[part])] for part in np.array_split(np.arange(len(x)), k)])
+        if k >= 2 and np.ptp(x[idx]) > 0:
+            slope, intercept = np.polyfit(x[idx], y[idx], 1)
+        else:
+            slope, intercept = 0.0, float(y.min())
+        intercept += float((y - (intercept + slope * x)).min())
+        self.skew = float(slope)
+        self.offset = float(intercept)
+        self._fitted_at = self.count
+
+    def _maybe_fit(self):
+        if self.offset is None or self.count - self._fitted_at >= self.refit_every:
+            self.fit()
+
+    def to_host(self, sensor_t):
+        """Host monotonic time at which sensor time `sensor_t` happened."""
+        self._maybe_fit()
+        if self.offset is None:
+            raise ValueError("no observations yet")
+        s = np.asarray(sensor_t, dtype=np.float64)
+        out = s + self.offset + self.skew * (s - self.ref) - self.latency
+        return float(out) if out.ndim == 0 else out
+
+    def delays(self):
+        """Observed delay beyond `latency` for each observation in the window."""
+        self._maybe_fit()
+        sensor, host = self._ordered()
+        if self.offset is None:
+            return np.empty(0)
+        return host - (sensor + self.offset + self.skew * (sensor - self.ref))
+
+    def report(self):
+        if not self.count:
+            return {"observations": 0}
+        d = self.delays() * 1e3
+        return {
+            "observations": self.count,
+            "offset_s": self.offset,
+            "skew_ppm": self.skew * 1e6,
+            "latency_ms": self.latency * 1e3,
+            "queue_delay_ms": {
+                "p50": float(np.percentile(d, 50)),
+                "p99": float(np.percentile(d, 99)),
+                "max": float(d.max()),
+            },
+        }
+
+
+class EndStamp:
+    """Stamp a reading with the time its read returned."""
+
+    def __call__(self, reading, start, end):
+        return end
+
+    def report(self):
+        return {"method": "end"}
+
+
+class MidpointStamp:
+    """Stamp a polled reading mid-transaction, minus the sample's expected age."""
+
+    def __init__(self, age=0.0):
+        self.age = age
+
+    def __call__(self, reading, start, end):
+        return 0.5 * (start + end) - self.age
+
+    def report(self):
+        return {"method": "midpoint", "age_ms": self.age * 1e3}
+
+
+class SensorClockStamp:
+    """Stamp from the sensor's own clock, `reading[key] * scale` seconds.
+
+    With `shared=True` the sensor already stamps on the host monotonic
+    clock (libcamera's SensorTimestamp), so its time is used as is and the
+    estimator only measures the delay to the read. Readings without the
+    key fall back to the read end time.
+    """
+
+    def __init__(self, key, scale=1.0, latency=0.0, window=1024, shared=False):
+        self.key = key
+        self.scale = scale
+        self.shared = shared
+        self.estimator = ClockEstimator(window=window, latency=latency)
+
+    def __call__(self, reading, start, end):
+        s = reading.get(self.key)
+        if s is None:
+            return end
+        s = s * self.scale
+        self.estimator.observe(s, end)
+        if self.shared:
+            return s - self.estimator.latency
+        return self.estimator.to_host(s)
+
+    def report(self):
+        return {"method": f"sensor clock ({self.key})", "shared": self.shared, **self.estimator.report()}
+
+
+def asof_indices(left_t, right_t, tolerance=np.inf, direction="backward"):
+    """Index into sorted `right_t` matching each of `left_t`, or -1.
+
+    "backward" takes the last right time <= left, "forward" the first
+    >= left, and "nearest" whichever is closer. Matches further than
+    `tolerance` away are -1.
+    """
+    left_t = np.asarray(left_t, dtype=np.float64)
+    right_t = np.asarray(right_t, dtype=np.float64)
+    n = len(right_t)
+    if not n:
+        return np.full(left_t.shape, -1, dtype=np.int64)
+    if direction == "backward":
+        idx = np.searchsorted(right_t, left_t, side="right") - 1
+    elif direction == "forward":
+        idx = np.searchsorted(right_t, left_t, side="left")
+    elif direction == "nearest":
+        hi = np.minimum(np.searchsorted(right_t, left_t, side="left"), n - 1)
+        lo = np.maximum(hi - 1, 0)
+        idx = np.where(np.abs(right_t[lo] - left_t) <= np.abs(right_t[hi] - left_t), lo, hi)
+    else:
+        raise ValueError(f"unknown direction {direction!r}")
+    ok = (idx >= 0) & (idx < n)
+    safe = np.clip(idx, 0, n - 1)
+    ok &= np.abs(right_t[safe] - left_t) <= tolerance
+    return np.where(ok, idx, -1)
+
+
+def merge_order(*times):
+    """(stream, index) pairs visiting several sorted time arrays in time order."""
+    stream = np.concatenate([np.full(len(t), k, dtype=np.int64) for k, t in enumerate(times)])
+    index = np.concatenate([np.arange(len(t)) for t in times])
+    order = np.argsort(np.concatenate([np.asarray(t, dtype=np.float64) for t in times]), kind="stable")
+    return stream[order], index[order]
+
+
+_EMPTY = np.dtype([("t", "<f8")])
+
+
+class _Buffer:
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.data = None
+        self.n = 0
+        self.dropped = 0
+
+    def extend(self, records):
+        if self.data is None:
+            self.data = np.zeros(self.capacity, dtype=records.dtype)
+        if len(records) > self.capacity:
+            self.dropped += len(records) - self.capacity
+            records = records[-self.capacity:]
+        over = self.n + len(records) - self.capacity
+        if over > 0:
+            self.discard(over)
+            self.dropped += over
+        self.data[self.n:self.n + len(records)] = records
+        self.n += len(records)
+
+    def discard(self, k):
+        k = min(k, self.n)
+        if k:
+            self.data[:self.n - k] = self.data[k:self.n]
+            self.n -= k
+
+    @property
+    def t(self):
+        return self.data["t"][:self.n] if self.data is not None else np.empty(0)
+
+
+class AsOfJoin:
+    """Streaming as-of join of `others` onto each `primary` sample.
+
+    Push time-ordered records (structured arrays with a "t" field on the
+    shared clock) as they arrive. `pop()` returns every primary sample
+    whose matches can no longer change, as a dict with "primary" rows,
+    "matches" {name: rows} and "valid" {name: mask}. Each buffer holds at
+    most `capacity` rows. When one overflows, its oldest rows are dropped
+    and counted in `dropped`.
+    """
+
+    def __init__(self, primary, others, tolerance=0.005, direction="nearest", capacity=8192):
+        if direction not in ("backward", "forward", "nearest"):
+            raise ValueError(f"unknown direction {direction!r}")
+        self.primary = primary
+        self.others = list(others)
+        self.tolerance = tolerance
+        self.direction = direction
+        self._buffers = {name: _Buffer(capacity) for name in [primary] + self.others}
+        self._closed = False
+        self._last = -np.inf
+        self.emitted = 0
+
+    @property
+    def dropped(self):
+        return {name: b.dropped for name, b in self._buffers.items()}
+
+    def push(self, name, records):
+        if len(records):
+            self._buffers[name].extend(records)
+
+    def close(self):
+        """No more data is coming; the next pop() releases everything."""
+        self._closed = True
+
+    def _ready(self, t):
+        if self._closed:
+            return len(t)
+        watermark = np.inf
+        for name in self.others:
+            bt = self._buffers[name].t
+            watermark = min(watermark, bt[-1] if len(bt) else -np.inf)
+        if self.direction == "nearest":
+            watermark -= self.tolerance
+        return int(np.searchsorted(t, watermark, side="right"))
+
+    def pop(self):
+        prim = self._buffers[self.primary]
+        k = self._ready(prim.t)
+        out = {"primary": prim.data[:k].copy() if prim.data is not None else np.zeros(0, _EMPTY),
+               "matches": {}, "valid": {}}
+        t = out["primary"]["t"]
+        for name in self.others:
+            buf = self._buffers[name]
+            idx = asof_indices(t, buf.t, self.tolerance, self.direction)
+            valid = idx >= 0
+            if buf.n:
+                rows = buf.data[np.maximum(idx, 0)]
+                rows[~valid] = 0
+            else:
+                rows = np.zeros(k, buf.data.dtype if buf.data is not None else _EMPTY)
+            out["matches"][name] = rows
+            out["valid"][name] = valid
+        prim.discard(k)
+        self.emitted += k
+        if k:
+            self._last = float(t[-1])
+        # Keep what the oldest pending (or next) primary sample could still match.
+        keep_from = (prim.t[0] if prim.n else self._last) - self.tolerance
+        for name in self.others:
+            buf = self._buffers[name]
+            buf.discard(max(0, int(np.searchsorted(buf.t, keep_from, side="left")) - 1))
+        return out
+
+
+def jitter_report(t, nominal_period=None):
+    """Rate, interval and jitter statistics for one stream of sample times.
+
+    Jitter is each interval's deviation from `nominal_period` (the median
+    interval when not given). Gaps are intervals over 1.5 periods.
+    """
+    t = np.asarray(t, dtype=np.float64)
+    out = {"samples": len(t)}
+    if len(t) < 3:
+        return out
+    dt = np.diff(t)
+    period = nominal_period or float(np.median(dt))
+    jitter = np.abs(dt - period) * 1e3
+    out.update({
+        "rate_hz": (len(t) - 1) / (t[-1] - t[0]) if t[-1] > t[0] else 0.0,
+        "period_ms": period * 1e3,
+        "interval_ms": {"p50": float(np.percentile(dt, 50) * 1e3), "p99": float(np.percentile(dt, 99) * 1e3),
+                        "max": float(dt.max() * 1e3)},
+        "jitter_ms": {"p50": float(np.percentile(jitter, 50)), "p99": float(np.percentile(jitter, 99)),
+                      "max": float(jitter.max())},
+        "gaps": int((dt > 1.5 * period).sum()),
+        "non_monotonic": int((dt <= 0).sum()),
+    })
+    return out
@@ -0,0 +1,535 @@
+"""Stream voxel map updates to a viewer (Godot) over TCP or UDP.
+
+Every `VoxelMap.insert` bumps the map's `tick`, and each voxel remembers
+the tick it was last hit or cleared by a free-space ray in `last_seen`,
+so the tick doubles as a map version. For each client the server tracks
+the version it has already been sent (TCP) or has acknowledged (UDP).
+`publish` then sends only the voxels touched since that version. The
+wire format has no removals, so maps that evict (`max_voxels`) cannot be
+served.
+
+Wire format (little-endian). Every message starts with HEADER:
+
+    magic "VX", kind u1, flags u1, seq u4, version u4, count u4,
+    payload_len u4, stamp f8 (sender wall clock)
+
+An update is one or more CHUNK messages; the last carries FLAG_END. A
+chunk payload (zlib-compressed when FLAG_ZLIB is set) is CHUNK_HEAD
+followed by `count` VOXEL_DTYPE rows:
+
+    CHUNK_HEAD: origin i4 x 3 (voxel index), voxel_size f4, level u1, 3 pad
+    VOXEL_DTYPE: ijk i2 x 3 (relative to origin), occupancy u1, hits u1
+
+That is 8 bytes per voxel before compression. `level` > 0 marks a
+coarsened update whose voxels are 2**level map voxels on a side. Clients
+answer each complete update with an ACK carrying its version and level
+(in `count`). A HELLO from the client opens the session, and its
+`version` lets a client resume from what it already holds.
+
+Send queues are bounded per client. When a client falls behind, the
+server either drops intermediate updates or sends a coarser one, set by
+`policy`. Nothing is lost in either case. A dropped or coarse update does
+not advance the client's version, so the full-detail voxels go out in the
+next update the client has room for.
+"""
+import queue
+import socket
+import struct
+import threading
+import time
+import zlib
+
+import numpy as np
+
+from .voxel import L_MAX, L_MIN, KeyIndex, pack_keys, unpack_keys
+
+
+HEADER = struct.Struct("<2sBBIIIId")
+MAGIC = b"VX"
+HELLO, CHUNK, ACK, BYE = 1, 2, 3, 4
+FLAG_ZLIB = 1
+FLAG_END = 2
+CHUNK_HEAD = struct.Struct("<iiifB3x")
+VOXEL_DTYPE = np.dtype([("ijk", "<i2", (3,)), ("occ", "u1"), ("hits", "u1")])
+
+_REGION_BITS = 15  # int16 offsets cover 2**15 voxels per axis from the origin
+UDP_MAX_POINTS = 4096  # keeps a datagram under 64 KiB even uncompressed
+
+
+def encode_message(kind, version=0, count=0, payload=b"", seq=0, flags=0, stamp=None):
+    stamp = time.time() if stamp is None else stamp
+    return HEADER.pack(MAGIC, kind, flags, seq, version, count, len(payload), stamp) + payload
+
+
+def decode_header(data):
+    magic, kind, flags, seq, version, count, length, stamp = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError("not a voxel stream message")
+    return {"kind": kind, "flags": flags, "seq": seq, "version": version, "count": count,
+            "length": length, "stamp": stamp}
+
+
+def quantize_occupancy(log_odds):
+    scaled = (np.asarray(log_odds, dtype=np.float32) - L_MIN) * (255.0 / (L_MAX - L_MIN))
+    return np.clip(np.rint(scaled), 0, 255).astype(np.uint8)
+
+
+def occupancy_log_odds(occ):
+    return np.asarray(occ, dtype=np.float32) * ((L_MAX - L_MIN) / 255.0) + L_MIN
+
+
+def changed_voxels(vmap, since=0):
+    """(ijk, occ, hits) of voxels hit or cleared after version `since`."""
+    n = vmap.size
+    sel = np.flatnonzero(vmap.last_seen[:n] > since)
+    ijk = unpack_keys(vmap.keys[sel])
+    occ = quantize_occupancy(vmap.log_odds[sel])
+    hits = np.minimum(vmap.count[sel], 255).astype(np.uint8)
+    return ijk, occ, hits
+
+
+def coarsen(ijk, occ, hits, level):
+    """Merge voxels into 2**level blocks: max occupancy, summed hits."""
+    if level <= 0 or not len(ijk):
+        return ijk, occ, hits
+    keys = pack_keys(np.asarray(ijk) >> level)
+    order = np.argsort(keys, kind="stable")
+    sk = keys[order]
+    starts = np.flatnonzero(np.r_[True, sk[1:] != sk[:-1]])
+    c_occ = np.maximum.reduceat(occ[order], starts)
+    c_hits = np.minimum(np.add.reduceat(hits[order].astype(np.int64), starts), 255).astype(np.uint8)
+    return unpack_keys(sk[starts]), c_occ, c_hits
+
+
+def encode_update(ijk, occ, hits, version, voxel_size, level=0, compress=True, chunk_points=16384, seq=0):
+    """Encode one update as a list of CHUNK messages (the last has FLAG_END)."""
+    ijk = np.asarray(ijk, dtype=np.int64).reshape(-1, 3)
+    stamp = time.time()
+    size = voxel_size * (1 << level)
+    messages = []
+    if len(ijk):
+        region = ijk >> _REGION_BITS
+        rkeys = pack_keys(region)
+        order = np.argsort(rkeys, kind="stable")
+        bounds = np.flatnonzero(np.r_[True, rkeys[order][1:] != rkeys[order][:-1], True])
+        for a, b in zip(bounds[:-1].tolist(), bounds[1:].tolist()):
+            origin = region[order[a]] << _REGION_BITS
+            for c in range(a, b, chunk_points):
+                idx = order[c:min(b, c + chunk_points)]
+                rows = np.empty(len(idx), dtype=VOXEL_DTYPE)
+                rows["ijk"] = ijk[idx] - origin
+                rows["occ"] = occ[idx]
+                rows["hits"] = hits[idx]
+                payload = CHUNK_HEAD.pack(*origin.tolist(), size, level) + rows.tobytes()
+                flags = 0
+                if compress:
+                    packed = zlib.compress(payload, 1)
+                    if len(packed) < len(payload):
+                        payload = packed
+                        flags |= FLAG_ZLIB
+                messages.append([flags, len(idx), payload])
+    if not messages:
+        messages.append([0, 0, CHUNK_HEAD.pack(0, 0, 0, size, level)])
+    messages[-1][0] |= FLAG_END
+    return [encode_message(CHUNK, version, count, payload, seq + i, flags, stamp)
+            for i, (flags, count, payload) in enumerate(messages)]
+
+
+def decode_chunk(header, payload):
+    """Chunk payload -> dict(ijk (N, 3) int64, occ, hits, voxel_size, level)."""
+    if header["flags"] & FLAG_ZLIB:
+        payload = zlib.decompress(payload)
+    ox, oy, oz, size, level = CHUNK_HEAD.unpack_from(payload)
+    rows = np.frombuffer(payload, dtype=VOXEL_DTYPE, count=header["count"], offset=CHUNK_HEAD.size)
+    return {
+        "ijk": rows["ijk"].astype(np.int64) + np.array([ox, oy, oz]),
+        "occ": rows["occ"],
+        "hits": rows["hits"],
+        "voxel_size": size,
+        "level": level,
+    }
+
+
+class _Client:
+    def __init__(self, addr, send, max_queue, version=0):
+        self.addr = addr
+        self.send = send
+        self.queue = queue.Queue(max_queue)
+        self.sent = version  # newest full-detail version queued
+        self.acked = version  # newest full-detail version confirmed
+        self.coarse_sent = version  # newest version queued as a coarse update
+        self.dropped = 0
+        self.coarsened = 0
+        self.updates = 0
+        self.bytes = 0
+        self.seq = 0
+        self.alive = True
+
+
+class PointCloudServer:
+    """Serve voxel map updates to any number of viewers.
+
+    port:         TCP (or UDP with `udp=True`) port; 0 picks a free one
+    max_queue:    updates queued per client before the backlog policy kicks in
+    policy:       "coarsen" sends a `coarse_level` update once a client's
+                  queue is half full, then drops when it is full;
+                  "drop" only drops
+    compress:     zlib each chunk (kept only when it actually shrinks)
+    send_buffer:  SO_SNDBUF for client sockets; smaller means a slow viewer
+                  backs up into the bounded queue sooner, instead of into
+                  kernel buffers that hold stale updates
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, udp=False, max_queue=8, policy="coarsen", coarse_level=2,
+                 compress=True, chunk_points=None, send_buffer=None):
+        if policy not in ("coarsen", "drop"):
+            raise ValueError("policy must be 'coarsen' or 'drop'")
+        self.udp = udp
+        self.max_queue = max_queue
+        self.policy = policy
+        self.coarse_level = coarse_level
+        self.compress = compress
+        self.chunk_points = chunk_points or (UDP_MAX_POINTS if udp else 16384)
+        self.send_buffer = send_buffer
+        self.clients = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._threads = []
+        kind = socket.SOCK_DGRAM if udp else socket.SOCK_STREAM
+        self._sock = socket.socket(socket.AF_INET, kind)
+        self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._sock.bind((host, port))
+        self.address = self._sock.getsockname()
+        if not udp:
+            self._sock.listen()
+        self._sock.settimeout(0.2)
+
+    # -- lifecycle ---------------------------------------------------------
+
+    def start(self):
+        target = self._udp_loop if self.udp else self._accept_loop
+        self._spawn(target, "voxel-server")
+        return self
+
+    def stop(self):
+        self._stop.set()
+        with self._lock:
+            clients = list(self.clients.values())
+        for client in clients:
+            self._disconnect(client)
+        for t in self._threads:
+            t.join(timeout=2.0)
+        self._sock.close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _spawn(self, target, name, *args):
+        t = threading.Thread(target=target, args=args, name=name, daemon=True)
+        t.start()
+        self._threads.append(t)
+
+    def _add_client(self, addr, send, version):
+        client = _Client(addr, send, self.max_queue, version)
+        with self._lock:
+            self.clients[addr] = client
+        self._spawn(self._send_loop, f"voxel-send-{addr}", client)
+        return client
+
+    def _disconnect(self, client):
+        client.alive = False
+        with self._lock:
+            self.clients.pop(client.addr, None)
+        try:
+            client.queue.put_nowait(None)
+        except queue.Full:
+            pass
+
+    # -- network threads ---------------------------------------------------
+
+    def _accept_loop(self):
+        while not self._stop.is_set():
+            try:
+                conn, addr = self._sock.accept()
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            if self.send_buffer:
+                conn.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, self.send_buffer)
+            conn.settimeout(None)
+            self._spawn(self._tcp_reader, f"voxel-recv-{addr}", conn, addr)
+
+    def _tcp_reader(self, conn, addr):
+        client = None
+        try:
+            while not self._stop.is_set():
+                head = _recv_exact(conn, HEADER.size)
+                if head is None:
+                    break
+                msg = decode_header(head)
+                if msg["length"] and _recv_exact(conn, msg["length"]) is None:
+                    break
+                if msg["kind"] == HELLO and client is None:
+                    client = self._add_client(addr, conn.sendall, msg["version"])
+                elif msg["kind"] == ACK and client is not None:
+                    self._ack(client, msg)
+                elif msg["kind"] == BYE:
+                    break
+        except (OSError, ValueError):
+            pass
+        finally:
+            if client is not None:
+                self._disconnect(client)
+            conn.close()
+
+    def _udp_loop(self):
+        while not self._stop.is_set():
+            try:
+                data, addr = self._sock.recvfrom(65535)
+                msg = decode_header(data)
+            except socket.timeout:
+                continue
+            except ValueError:
+                continue
+            except OSError:
+                break
+            client = self.clients.get(addr)
+            if msg["kind"] == HELLO and client is None:
+                self._add_client(addr, lambda m, a=addr: self._sock.sendto(m, a), msg["version"])
+            elif msg["kind"] == ACK and client is not None:
+                self._ack(client, msg)
+            elif msg["kind"] == BYE and client is not None:
+                self._disconnect(client)
+
+    def _ack(self, client, msg):
+        if msg["count"] == 0:  # level 0
+            client.acked = max(client.acked, msg["version"])
+
+    def _send_loop(self, client):
+        while client.alive:
+            item = client.queue.get()
+            if item is None:
+                break
+            try:
+                for m in item:
+                    client.send(m)
+                    client.bytes += len(m)
+            except OSError:
+                self._disconnect(client)
+                break
+
+    # -- publishing --------------------------------------------------------
+
+    def publish(self, vmap):
+        """Queue the changes since each client's version; never blocks."""
+        if vmap.max_voxels is not None:
+            raise ValueError("clients cannot be told about evicted voxels; serve a map without max_voxels")
+        version = vmap.tick
+        with self._lock:
+            clients = list(self.clients.values())
+        cache = {}
+        for client in clients:
+            # TCP delivers in order, so what is queued will arrive; UDP may
+            # lose datagrams, so resend everything not yet acknowledged.
+            base = client.acked if self.udp else client.sent
+            if base >= version:
+                continue
+            backlog = client.queue.qsize()
+            if backlog >= self.max_queue:
+                client.dropped += 1
+                continue
+            level = 0
+            if self.policy == "coarsen" and backlog >= max(1, self.max_queue // 2):
+                # Coarse placeholders only need what changed since the last
+                # coarse update; the full-detail base stays put.
+                level = self.coarse_level
+                base = max(base, client.coarse_sent)
+                if base >= version:
+                    client.dropped += 1
+                    continue
+            key = (base, level)
+            if key not in cache:
+                ijk, occ, hits = changed_voxels(vmap, base)
+                ijk, occ, hits = coarsen(ijk, occ, hits, level)
+                cache[key] = encode_update(ijk, occ, hits, version, vmap.voxel_size, level, self.compress,
+                                           self.chunk_points)
+            messages = cache[key]
+            try:
+                client.queue.put_nowait(messages)
+            except queue.Full:
+                client.dropped += 1
+                continue
+            client.updates += 1
+            if level:
+                client.coarsened += 1
+                client.coarse_sent = version
+            else:
+                client.sent = version
+
+    def report(self):
+        with self._lock:
+            clients = list(self.clients.values())
+        return {
+            f"{c.addr[0]}:{c.addr[1]}": {
+                "updates": c.updates,
+                "dropped": c.dropped,
+                "coarsened": c.coarsened,
+                "queued": c.queue.qsize(),
+                "bytes_sent": c.bytes,
+                "sent_version": c.sent,
+                "acked_version": c.acked,
+            }
+            for c in clients
+        }
+
+
+def _recv_exact(sock, n):
+    buf = bytearray(n)
+    view = memoryview(buf)
+    got = 0
+    while got < n:
+        k = sock.recv_into(view[got:])
+        if not k:
+            return None
+        got += k
+    return bytes(buf)
+
+
+class VoxelStore:
+    """Client-side voxel table keyed by packed ijk."""
+
+    def __init__(self, capacity=1 << 14):
+        self._index = KeyIndex(capacity * 2)
+        self.ijk = np.zeros((capacity, 3), dtype=np.int32)
+        self.occ = np.zeros(capacity, dtype=np.uint8)
+        self.hits = np.zeros(capacity, dtype=np.uint8)
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def apply(self, ijk, occ, hits):
+        keys = pack_keys(ijk)
+        ids = self._index.lookup(keys)
+        new = ids < 0
+        n_new = int(new.sum())
+        if n_new:
+            need = self.size + n_new
+            if need > len(self.occ):
+                cap = max(need, 2 * len(self.occ))
+                for name in ("ijk", "occ", "hits"):
+                    old = getattr(self, name)
+                    arr = np.zeros((cap,) + old.shape[1:], dtype=old.dtype)
+                    arr[:self.size] = old[:self.size]
+                    setattr(self, name, arr)
+            new_ids = np.arange(self.size, need)
+            ids[new] = new_ids
+            self._index.insert(keys[new], new_ids)
+            self.ijk[new_ids] = ijk[new]
+            self.size = need
+        self.occ[ids] = occ
+        self.hits[ids] = hits
+
+
+class PointCloudClient:
+    """Python stand-in for the Godot viewer.
+
+    Keeps full-detail voxels in `store` and coarse placeholders in
+    `coarse[level]`, and acknowledges each complete update. `delay` adds a
+    pause per message, to imitate a slow client.
+    """
+
+    def __init__(self, host, port, udp=False, since=0, delay=0.0, timeout=5.0, recv_buffer=None):
+        self.udp = udp
+        self.addr = (host, port)
+        self.delay = delay
+        self.version = since
+        self.store = VoxelStore()
+        self.coarse = {}
+        self.updates = 0
+        self.messages = 0
+        self.bytes = 0
+        self.latency = []
+        self.voxel_size = None
+        kind = socket.SOCK_DGRAM if udp else socket.SOCK_STREAM
+        self._sock = socket.socket(socket.AF_INET, kind)
+        self._sock.settimeout(timeout)
+        if recv_buffer:
+            self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, recv_buffer)
+        self._sock.connect(self.addr)
+        if not udp:
+            self._sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._send(encode_message(HELLO, since))
+
+    def _send(self, data):
+        self._sock.send(data) if self.udp else self._sock.sendall(data)
+
+    def _read(self):
+        if self.udp:
+            data = self._sock.recv(65535)
+            msg = decode_header(data)
+            return msg, data[HEADER.size:HEADER.size + msg["length"]]
+        head = _recv_exact(self._sock, HEADER.size)
+        if head is None:
+            raise ConnectionError("server closed the connection")
+        msg = decode_header(head)
+        payload = _recv_exact(self._sock, msg["length"]) if msg["length"] else b""
+        return msg, payload
+
+    def receive(self, timeout=None):
+        """Read until one update is complete; returns its version or None on timeout."""
+        if timeout is not None:
+            self._sock.settimeout(timeout)
+        try:
+            while True:
+                msg, payload = self._read()
+                self.messages += 1
+                self.bytes += HEADER.size + len(payload)
+                if self.delay:
+                    time.sleep(self.delay)
+                if msg["kind"] != CHUNK:
+                    continue
+                chunk = decode_chunk(msg, payload)
+                if chunk["level"] == 0:
+                    self.voxel_size = chunk["voxel_size"]
+                    target = self.store
+                else:
+                    target = self.coarse.setdefault(chunk["level"], VoxelStore())
+                if len(chunk["ijk"]):
+                    target.apply(chunk["ijk"], chunk["occ"], chunk["hits"])
+                if msg["flags"] & FLAG_END:
+                    self.updates += 1
+                    self.latency.append(time.time() - msg["stamp"])
+                    if chunk["level"] == 0:
+                        self.version = max(self.version, msg["version"])
+                    self._send(encode_message(ACK, msg["version"], chunk["level"]))
+                    return msg["version"]
+        except socket.timeout:
+            return None
+
+    def wait_for(self, version, timeout=5.0):
+        """Receive updates until full detail up to `version` has arrived."""
+        deadline = time.monotonic() + timeout
+        while self.version < version:
+            left = deadline - time.monotonic()
+            if left <= 0 or self.receive(timeout=left) is None:
+                return False
+        return True
+
+    def close(self):
+        try:
+            self._send(encode_message(BYE))
+        except OSError:
+            pass
+        self._sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
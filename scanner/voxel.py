@@ -0,0 +1,297 @@
+"""Incremental sparse voxel map for streaming room scans.
+
+Projected points are binned into cubic voxels keyed by packed integer
+coordinates. Keys live in an open-addressing hash table that is probed for
+a whole batch at a time, so inserting a batch costs O(batch) rather than
+O(map). Per voxel the map keeps a point count, a running centroid and an
+occupancy log-odds value.
+
+    vmap = VoxelMap(voxel_size=0.02, max_voxels=2_000_000)
+    vmap.insert(points, origin=sensor_position)
+    snap = vmap.snapshot()      # {"ijk", "centroid", "count", "log_odds"}
+
+When `max_voxels` is exceeded the least recently touched voxels are
+evicted, farthest from the latest sensor origin first.
+"""
+import numpy as np
+
+
+_EMPTY = np.int64(-1)
+_BITS = 21
+_OFFSET = 1 << (_BITS - 1)
+_FIELD = (1 << _BITS) - 1
+_HASH_MUL = np.uint64(0x9E3779B97F4A7C15)
+
+_RAY_BLOCK = 4096
+
+# OctoMap-style defaults.
+L_HIT = 0.85
+L_MISS = -0.4
+L_MIN = -2.0
+L_MAX = 3.5
+
+
+def pack_keys(ijk):
+    """Pack (N, 3) int voxel coordinates into int64 keys (21 bits per axis)."""
+    ijk = np.asarray(ijk, dtype=np.int64) + _OFFSET
+    return (ijk[:, 0] << (2 * _BITS)) | (ijk[:, 1] << _BITS) | ijk[:, 2]
+
+
+def unpack_keys(keys):
+    keys = np.asarray(keys, dtype=np.int64)
+    out = np.empty((len(keys), 3), dtype=np.int64)
+    out[:, 0] = (keys >> (2 * _BITS)) & _FIELD
+    out[:, 1] = (keys >> _BITS) & _FIELD
+    out[:, 2] = keys & _FIELD
+    return out - _OFFSET
+
+
+def _hash(keys, mask):
+    h = keys.view(np.uint64) * _HASH_MUL
+    return ((h >> np.uint64(32)) & np.uint64(mask)).astype(np.int64)
+
+
+def _unique(keys, return_inverse=False):
+    # Sort-based; np.unique's hash path degrades badly on packed voxel keys.
+    if not return_inverse:
+        keys = np.sort(keys)
+        return keys[np.r_[True, keys[1:] != keys[:-1]]]
+    order = np.argsort(keys)
+    sk = keys[order]
+    first = np.r_[True, sk[1:] != sk[:-1]]
+    inv = np.empty(len(keys), dtype=np.int64)
+    inv[order] = np.cumsum(first) - 1
+    return sk[first], inv
+
+
+class KeyIndex:
+    """int64 key -> int id map with vectorized linear probing."""
+
+    def __init__(self, capacity=1 << 16):
+        capacity = 1 << max(4, int(capacity - 1).bit_length())
+        self.keys = np.full(capacity, _EMPTY, dtype=np.int64)
+        self.ids = np.zeros(capacity, dtype=np.int64)
+        self.size = 0
+
+    @property
+    def capacity(self):
+        return len(self.keys)
+
+    @property
+    def nbytes(self):
+        return self.keys.nbytes + self.ids.nbytes
+
+    def lookup(self, keys):
+        """Ids for `keys`, -1 where absent."""
+        mask = self.capacity - 1
+        slot = _hash(keys, mask)
+        out = np.full(len(keys), -1, dtype=np.int64)
+        pending = np.arange(len(keys))
+        while len(pending):
+            s = slot[pending]
+            k = self.keys[s]
+            hit = k == keys[pending]
+            out[pending[hit]] = self.ids[s[hit]]
+            pending = pending[~hit & (k != _EMPTY)]
+            slot[pending] = (slot[pending] + 1) & mask
+        return out
+
+    def insert(self, keys, ids):
+        """Insert unique keys that are known to be absent."""
+        if (self.size + len(keys)) * 2 > self.capacity:
+            self._rebuild(max(self.capacity * 2, (self.size + len(keys)) * 4))
+        mask = self.capacity - 1
+        slot = _hash(keys, mask)
+        pending = np.arange(len(keys))
+        while len(pending):
+            s = slot[pending]
+            free = self.keys[s] == _EMPTY
+            cand = pending[free]
+            # Several keys may probe the same free slot; the first one wins
+            # and the rest move on.
+            won_slots, first = np.unique(s[free], return_index=True)
+            winners = cand[first]
+            self.keys[won_slots] = keys[winners]
+            self.ids[won_slots] = ids[winners]
+            placed = np.zeros(len(keys), dtype=bool)
+            placed[winners] = True
+            pending = pending[~placed[pending]]
+            slot[pending] = (slot[pending] + 1) & mask
+        self.size += len(keys)
+
+    def _rebuild(self, capacity, keys=None, ids=None):
+        if keys is None:
+            used = self.keys != _EMPTY
+            keys, ids = self.keys[used], self.ids[used]
+        self.__init__(capacity)
+        if len(keys):
+            self.insert(keys, ids)
+
+    def reset(self, keys, ids):
+        """Replace the contents with the given (unique) keys and ids."""
+        self._rebuild(max(16, len(keys) * 4), keys, ids)
+
+
+class VoxelMap:
+    def __init__(self, voxel_size=0.05, max_voxels=None, evict_fraction=0.1, initial_capacity=1 << 14):
+        self.voxel_size = float(voxel_size)
+        self.max_voxels = max_voxels
+        self.evict_fraction = evict_fraction
+        self._index = KeyIndex(initial_capacity * 2)
+        self.keys = np.empty(initial_capacity, dtype=np.int64)
+        self.count = np.zeros(initial_capacity, dtype=np.uint32)
+        self.sum = np.zeros((initial_capacity, 3), dtype=np.float64)
+        self.log_odds = np.zeros(initial_capacity, dtype=np.float32)
+        self.last_seen = np.zeros(initial_capacity, dtype=np.int64)
+        self.size = 0
+        self.tick = 0
+        self.evicted = 0
+        self.origin = np.zeros(3)
+
+    @classmethod
+    def from_voxels(cls, voxel_size, keys, count, sum, log_odds=None, **kwargs):
+        """Map holding already-binned voxels (unique packed keys, counts, point sums)."""
+        n = len(keys)
+        vmap = cls(voxel_size=voxel_size, initial_capacity=max(n, 16), **kwargs)
+        vmap.keys[:n] = keys
+        vmap.count[:n] = count
+        vmap.sum[:n] = sum
+        if log_odds is None:
+            log_odds = np.minimum(L_HIT * vmap.count[:n].astype(np.float32), L_MAX)
+        vmap.log_odds[:n] = log_odds
+        vmap.tick = 1
+        vmap.last_seen[:n] = 1
+        vmap.size = n
+        vmap._index.reset(vmap.keys[:n], np.arange(n))
+        return vmap
+
+    def __len__(self):
+        return self.size
+
+    @property
+    def nbytes(self):
+        arrays = (self.keys, self.count, self.sum, self.log_odds, self.last_seen)
+        return sum(a.nbytes for a in arrays) + self._index.nbytes
+
+    def voxel_keys(self, points):
+        ijk = np.floor(np.asarray(points, dtype=np.float64) / self.voxel_size).astype(np.int64)
+        return pack_keys(ijk)
+
+    def _grow(self, needed):
+        cap = len(self.keys)
+        if needed <= cap:
+            return
+        new = max(needed, cap * 2)
+        for name in ("keys", "count", "sum", "log_odds", "last_seen"):
+            old = getattr(self, name)
+            arr = np.zeros((new,) + old.shape[1:], dtype=old.dtype)
+            arr[:self.size] = old[:self.size]
+            setattr(self, name, arr)
+
+    def insert(self, points, origin=None, free_space=False, max_ray_steps=64):
+        """Add a batch of (N, 3) world points.
+
+        `origin` is the sensor position for this batch; it drives eviction
+        order and, with `free_space`, the miss updates along each ray.
+        Misses only lower the log-odds of voxels already in the map (and
+        count as touching them for `last_seen`); free space is not
+        materialized as new voxels.
+        """
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+        if origin is not None:
+            self.origin = np.asarray(origin, dtype=np.float64)
+        self.tick += 1
+        if not len(points):
+            return
+
+        if free_space and origin is not None:
+            self._apply_misses(points, max_ray_steps)
+
+        keys = self.voxel_keys(points)
+        uniq, inv = _unique(keys, return_inverse=True)
+        ids = self._index.lookup(uniq)
+        new = ids < 0
+        n_new = int(new.sum())
+        if n_new:
+            self._grow(self.size + n_new)
+            new_ids = np.arange(self.size, self.size + n_new)
+            ids[new] = new_ids
+            self.keys[new_ids] = uniq[new]
+            self._index.insert(uniq[new], new_ids)
+            self.size += n_new
+
+        hits = np.bincount(inv, minlength=len(uniq))
+        self.count[ids] += hits.astype(np.uint32)
+        for axis in range(3):
+            self.sum[ids, axis] += np.bincount(inv, weights=points[:, axis], minlength=len(uniq))
+        self.log_odds[ids] = np.minimum(self.log_odds[ids] + L_HIT * hits, L_MAX)
+        self.last_seen[ids] = self.tick
+
+        if self.max_voxels is not None and self.size > self.max_voxels:
+            self._evict()
+
+    def _apply_misses(self, points, max_ray_steps):
+        ray = points - self.origin
+        length = np.linalg.norm(ray, axis=1)
+        step = 0.5 * self.voxel_size
+        steps = np.minimum(np.floor(length / step).astype(np.int64) - 1, max_ray_steps)
+        keep = steps > 0
+        if not keep.any():
+            return
+        ray, length, steps = ray[keep], length[keep], steps[keep]
+        end_keys = self.voxel_keys(points[keep])
+        # Walk back from each hit in half-voxel steps, covering the free
+        # space just in front of the surface; samples that land in the hit
+        # voxel itself are skipped. Rays are processed in blocks to bound
+        # the temporary sample array.
+        j = np.arange(1, max_ray_steps + 1)
+        parts = []
+        for a in range(0, len(ray), _RAY_BLOCK):
+            sl = slice(a, a + _RAY_BLOCK)
+            frac = 1.0 - j[None, :] * step / length[sl, None]
+            valid = j[None, :] <= steps[sl, None]
+            samples = self.origin + ray[sl, None, :] * frac[..., None]
+            keys = self.voxel_keys(samples[valid])
+            keys = keys[keys != np.broadcast_to(end_keys[sl, None], valid.shape)[valid]]
+            parts.append(_unique(keys))
+        keys = _unique(np.concatenate(parts))
+        ids = self._index.lookup(keys)
+        ids = ids[ids >= 0]
+        self.log_odds[ids] = np.maximum(self.log_odds[ids] + L_MISS, L_MIN)
+        self.last_seen[ids] = self.tick
+
+    def _evict(self):
+        target = int(self.max_voxels * (1.0 - self.evict_fraction))
+        n_drop = self.size - target
+        centroid = self.sum[:self.size] / self.count[:self.size, None]
+        dist = np.linalg.norm(centroid - self.origin, axis=1)
+        # Oldest first; among equally old voxels, farthest first.
+        order = np.lexsort((-dist, self.last_seen[:self.size]))
+        keep = np.ones(self.size, dtype=bool)
+        keep[order[:n_drop]] = False
+        for name in ("keys", "count", "sum", "log_odds", "last_seen"):
+            arr = getattr(self, name)
+            kept = arr[:self.size][keep]
+            arr[:len(kept)] = kept
+        self.size = target
+        self.evicted += n_drop
+        self._index.reset(self.keys[:self.size], np.arange(self.size))
+
+    def snapshot(self, min_log_odds=None, min_count=1):
+        """Copy of the map as plain arrays, optionally filtered."""
+        n = self.size
+        sel = self.count[:n] >= min_count
+        if min_log_odds is not None:
+            sel &= self.log_odds[:n] >= min_log_odds
+        keys = self.keys[:n][sel]
+        count = self.count[:n][sel]
+        return {
+            "voxel_size": self.voxel_size,
+            "ijk": unpack_keys(keys).astype(np.int32),
+            "centroid": (self.sum[:n][sel] / count[:, None]).astype(np.float32),
+            "count": count.copy(),
+            "log_odds": self.log_odds[:n][sel].copy(),
+        }
+
+    def save(self, path, **filters):
+        np.savez_compressed(path, **self.snapshot(**filters))
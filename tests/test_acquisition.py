@@ -0,0 +1,43 @@
+import sys
+import time
+
+
+def run():
+    import numpy as np
+
+    from hal.acquisition import Acquisition, RingBuffer, RANGE_DTYPE
+    from hal.mocks import MockIMU, MockRangefinder
+
+    ring = RingBuffer(4, RANGE_DTYPE)
+    for i in range(6):
+        ring.append((float(i), 0.5, 0, 40.0))
+    records, cursor, lost = ring.read_since(0)
+    assert lost == 2 and cursor == 6, "overwritten records should be reported as lost"
+    assert records["t"].tolist() == [2.0, 3.0, 4.0, 5.0], "ring should return oldest-first"
+
+    acq = Acquisition()
+    acq.add("imu", MockIMU(seed=0), rate=200)
+    acq.add("range", MockRangefinder(seed=0, rate=100))
+    sub = acq.subscribe("range")
+    with acq:
+        time.sleep(0.5)
+    got = sub.poll()
+    report = acq.report()
+
+    assert len(got) == report["range"]["samples"], "subscriber should see every sample"
+    assert np.all(np.diff(got["t"]) > 0), "timestamps should be monotonic"
+    assert np.all(got["temperature_c"] == 40.0), "range rows should carry the sensor temperature"
+    # Absolute deadlines: no accumulated drift over the run.
+    assert 90 <= report["imu"]["samples"] <= 103, f"imu samples {report['imu']['samples']}"
+    assert 40 <= report["range"]["samples"] <= 53, f"range samples {report['range']['samples']}"
+    assert "jitter_ms" in report["imu"] and "latency_ms" in report["range"]
+
+    print("All acquisition tests passed")
+
+
+if __name__ == "__main__":
+    try:
+        run()
+    except AssertionError as e:
+        print("TEST FAILED:", e)
+        sys.exit(1)
@@ -0,0 +1,126 @@
+import sys
+
+
+def _scenario(adapt):
+    """18 s of still, fast pan, still, slow pan and weak returns on simulated time."""
+    import math
+
+    from hal.adaptive import RateController
+    from hal.simulator import Room, SimIMU, pan_tilt_rig
+
+    head, rng, sim = pan_tilt_rig(Room.default(), seed=0)
+    imu = SimIMU(sim, 100.0)
+    imu.block = None
+    ctl = RateController(rng, imu, adapt=adapt)
+    moves = [(3.0, 8.0, 2.0), (10.0, 8.4, 0.1), (14.0, 8.7, 0.1)]
+    states = {}
+    T = 0.0
+    while T < 18.0:
+        T = round(T + 0.05, 6)
+        if moves and T >= moves[0][0]:
+            head.move_to(moves[0][1], 0.0, moves[0][2])
+            moves.pop(0)
+        sim.dropout = 0.95 if 14.0 <= T < 17.0 else 0.002
+        r = rng.read_batch(max(0, math.ceil((T - rng.now) * rng.rate)))
+        m = imu.read_batch(max(0, math.ceil((T - imu.now) * imu.rate)))
+        ctl.update(m, r)
+        states[T] = (ctl.state, rng.rate, imu.rate)
+    return ctl.report(), states
+
+
+def run():
+    import time
+    from types import SimpleNamespace
+
+    import numpy as np
+
+    from hal.acquisition import Acquisition
+    from hal.adaptive import RateController
+    from hal.drivers import TFLunaRangefinder
+    from hal.interfaces import RANGE_SAMPLE
+    from hal.mocks import MockIMU, MockTFLunaSerial
+    from hal.simulator import Room, SimRangefinder, ScanSimulator, StepperTrajectory
+    from hal.tfluna import SET_RATE, parse_command, rate_command, supported_rate
+
+    # TF-Luna frame rate command: 5A 06 03 LL HH checksum.
+    assert rate_command(100) == bytes([0x5A, 0x06, 0x03, 0x64, 0x00, 0xC7])
+    assert parse_command(rate_command(250)) == (SET_RATE, bytes([0xFA, 0x00]))
+    assert parse_command(b"\x5a\x06\x03\x64\x00\x00") is None
+    assert [supported_rate(hz) for hz in (1, 3, 30, 100, 200, 1000)] == [1, 4, 50, 100, 250, 250]
+
+    # Mock serial: the new rate takes effect at once, and the echo is not a frame.
+    lidar = TFLunaRangefinder(MockTFLunaSerial(rate=250, seed=0))
+    assert lidar.set_rate(40) == 50
+    lidar.read_batch(64, timeout=0.05)
+    t0 = time.monotonic()
+    n = 0
+    while time.monotonic() - t0 < 0.4:
+        n += len(lidar.read_batch(64, timeout=0.05))
+    assert 10 <= n <= 30, n
+
+    # Simulated sensors carry on from the next unread sample.
+    sim = ScanSimulator(Room.default(), StepperTrajectory(), seed=0)
+    sr = SimRangefinder(sim, 250.0)
+    a = sr.read_batch(10)
+    sr.set_rate(10.0)
+    b = sr.read_batch(3)
+    assert np.allclose(np.diff(np.r_[a["t"], b["t"]])[-3:], [0.004, 0.1, 0.1])
+
+    # Acquisition tasks pace their own polls: the task's rate changes.
+    acq = Acquisition()
+    acq.add("imu", MockIMU(), rate=200.0)
+    sub = acq.subscribe("imu")
+    with acq:
+        time.sleep(0.3)
+        sub.poll()
+        assert acq.tasks["imu"].set_rate(20.0) == 20.0
+        try:
+            acq.tasks["imu"].set_rate(0)
+            raise AssertionError("a zero rate should be refused")
+        except ValueError:
+            pass
+        time.sleep(0.5)
+        got = len(sub.poll())
+    assert got <= 20, got
+
+    # A sensor without rate control is measured but left alone.
+    ctl = RateController(imu=SimpleNamespace(set_rate=lambda hz: None))
+    ctl.imu.want(10.0, 0.0, 1.0, True)
+    assert ctl.imu.fixed and ctl.imu.rate is None
+
+    # With no IMU there is no rotation speed, so good returns keep the range rate.
+    asked = []
+    ctl = RateController(rangefinder=SimpleNamespace(set_rate=lambda hz: asked.append(hz) or hz))
+    ranges = np.zeros(250, dtype=RANGE_SAMPLE)
+    ranges["t"] = np.arange(250) / 250.0
+    ranges["distance_m"], ranges["strength"] = 2.0, 1000
+    ctl.update(ranges=ranges)
+    assert asked == [] and ctl.range.rate is None, asked
+    ranges["strength"] = 0
+    ranges["t"] += 1.0
+    ctl.update(ranges=ranges)
+    assert asked == [10.0], "weak returns still lower the rate"
+
+    # Still, fast pan, still, slow pan, weak: rates follow the scene.
+    fixed, _ = _scenario(adapt=False)
+    adaptive, states = _scenario(adapt=True)
+    assert states[2.5] == ("still", 10.0, 10.0), states[2.5]
+    assert states[5.0][0] == "moving" and states[5.0][1] == 250.0 and states[5.0][2] == 100.0, states[5.0]
+    assert states[9.5][0] == "still" and states[9.5][1:] == (10.0, 10.0), states[9.5]
+    assert states[12.0][0] == "moving" and 10.0 < states[12.0][1] < 250.0, states[12.0]
+    assert states[16.0][0] == "weak" and states[16.0][1] == 10.0 and states[16.0][2] > 10.0, states[16.0]
+    assert fixed["range"]["changes"] == 0 and abs(fixed["range"]["mean_hz"] - 250) < 2, fixed
+    assert adaptive["useful_points"] > 0.9 * fixed["useful_points"], (adaptive, fixed)
+    assert adaptive["samples_per_useful_point"] < 0.5 * fixed["samples_per_useful_point"], (adaptive, fixed)
+    assert adaptive["range"]["changes"] < 12 and adaptive["imu"]["changes"] < 12, adaptive
+    assert abs(sum(adaptive["state_seconds"].values()) - adaptive["seconds"]) < 1e-6
+
+    print("All adaptive rate tests passed")
+
+
+if __name__ == "__main__":
+    try:
+        run()
+    except AssertionError as e:
+        print("TEST FAILED:", e)
+        sys.exit(1)
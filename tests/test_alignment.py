@@ -0,0 +1,67 @@
+import sys
+
+
+def run():
+    import numpy as np
+
+    from scanner.alignment import OnlineAligner, umeyama
+    from scanner.scanlog import MARKER_RECORD
+
+    rng = np.random.default_rng(0)
+    angle = 0.7
+    rot = np.array([[np.cos(angle), -np.sin(angle), 0.0], [np.sin(angle), np.cos(angle), 0.0], [0.0, 0.0, 1.0]])
+    trans = np.array([0.5, -1.0, 0.2])
+
+    # Batched and single solves agree and recover the transform.
+    src = rng.normal(size=(3, 6, 3))
+    dst = src @ rot.T + trans
+    rots, ts = umeyama(src, dst)
+    r1, t1 = umeyama(src[1], dst[1])
+    assert np.allclose(rots, rot) and np.allclose(ts, trans) and np.allclose(r1, rot) and np.allclose(t1, trans)
+
+    # Eight anchors; 5 and 6 report consistently wrong poses.
+    world = {i: rng.uniform(-2.0, 2.0, 3).tolist() for i in range(8)}
+    world_arr = np.array([world[i] for i in range(8)])
+    cam = (world_arr - trans) @ rot  # camera-frame positions, R^T (w - t)
+    aligner = OnlineAligner(world, window=1.0, inlier_threshold=0.05)
+    fits = []
+    for k in range(200):
+        frame = np.zeros(8, dtype=MARKER_RECORD)
+        frame["t"] = k * 0.02
+        frame["id"] = np.arange(8)
+        frame["has_pose"] = 1
+        frame["tvec"] = cam + rng.normal(0.0, 0.003, (8, 3))
+        frame["tvec"][5] += 0.4
+        frame["tvec"][6] -= 0.3
+        fits.append(aligner.observe(frame))
+    fit = fits[-1]
+    assert fit["inliers"] == [0, 1, 2, 3, 4, 7], f"RANSAC kept {fit['inliers']}"
+    assert np.abs(fit["R"] - rot).max() < 0.01 and np.abs(fit["t"] - trans).max() < 0.01
+    assert fit["rms"] < 0.01 and fit["residuals"][5] > 0.2
+
+    # Window: 1 s at 50 frames/s keeps 51 frames of 8 observations.
+    assert len(aligner) == 51 * 8, len(aligner)
+    assert fit["observations"] == 51 * 6
+
+    # Running-sum solve matches a batch Umeyama over the window's inliers.
+    obs = list(aligner._obs)
+    keep = [o for o in obs if o[1] in (0, 1, 2, 3, 4, 7)]
+    br, bt = umeyama(np.array([o[2] for o in keep]), world_arr[[o[1] for o in keep]])
+    assert np.allclose(br, fit["R"], atol=1e-9) and np.allclose(bt, fit["t"], atol=1e-9)
+
+    # Unknown ids and pose-less detections are ignored; too few anchors -> None.
+    small = OnlineAligner({0: [0, 0, 0], 1: [1, 0, 0], 2: [0, 1, 0]})
+    frame = np.zeros(3, dtype=MARKER_RECORD)
+    frame["id"] = [0, 1, 9]
+    frame["has_pose"] = [1, 1, 1]
+    assert small.observe(frame) is None and small.ignored == 1
+
+    print("All alignment tests passed")
+
+
+if __name__ == "__main__":
+    try:
+        run()
+    except AssertionError as e:
+        print("TEST FAILED:", e)
+        sys.exit(1)
@@ -0,0 +1,159 @@
+import sys
+
+
+def run():
+    import math
+    import os
+    import tempfile
+    from pathlib import Path
+
+    import numpy as np
+
+    from hal.simulator import ROT_BODY_CAMERA, Room, ScanSimulator, StepperTrajectory
+    from scanner import quaternion
+    from scanner.calibration import (
+        Calibration,
+        CalibrationStore,
+        calibrate_extrinsics,
+        calibrate_intrinsics,
+        detect_frames,
+        load_calibration,
+    )
+
+    def turn(axis, deg):
+        axis = np.asarray(axis, dtype=np.float64)
+        return quaternion.to_matrix(quaternion.from_rvec(axis / np.linalg.norm(axis) * math.radians(deg)))
+
+    # Extrinsics: a rig whose camera is 2 degrees off and whose rangefinder
+    # is tilted and offset, scanned from two tripod positions.
+    rot_bc = turn([0.3, 1.0, 0.2], 2.0) @ ROT_BODY_CAMERA
+    beam = np.array([1.0, 0.02, 0.01]) / np.linalg.norm([1.0, 0.02, 0.01])
+    origin = np.array([0.03, -0.02, 0.04])
+    sessions = [
+        ScanSimulator(Room.default(), StepperTrajectory(position), seed=seed, beam=beam, beam_origin=origin,
+                      body_camera=rot_bc).generate(60.0)
+        for seed, position in ((21, (0.5, 0.5, 1.0)), (22, (-1.0, -0.8, 1.6)))
+    ]
+    calib, report = calibrate_extrinsics(sessions)
+    rot_err = math.degrees(quaternion.angle(quaternion.from_matrix(calib.rot_bc), quaternion.from_matrix(rot_bc)))
+    assert rot_err < 0.1, f"camera rotation off by {rot_err:.3f} deg"
+    beam_err = math.degrees(math.acos(min(1.0, float(calib.range_beam @ beam))))
+    assert beam_err < 0.5, f"beam direction off by {beam_err:.3f} deg"
+    assert np.linalg.norm(calib.range_origin - origin) < 0.02, f"origin {calib.range_origin} vs {origin}"
+    assert report["range"]["inliers"] > 1000 and report["range"]["rms_m"] < 0.03, report["range"]
+    # The nominal mount is 1.2 degrees and 5 cm off; the result is what projection takes.
+    ext = calib.range_extrinsics()
+    assert np.allclose(ext.beam_body, calib.range_beam)
+    # A camera rotation that is given is kept, not solved.
+    kept, kept_report = calibrate_extrinsics(sessions, rot_bc=rot_bc)
+    assert "camera" not in kept_report and np.allclose(kept.rot_bc, rot_bc)
+    try:
+        calibrate_extrinsics([{k: v[:0] for k, v in sessions[0].items()}])
+        raise AssertionError("empty sessions should not calibrate")
+    except ValueError:
+        pass
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        store = CalibrationStore(tmp / "calibration")
+        assert store.find("rig-1") is None and store.versions("rig-1") == []
+
+        try:
+            import cv2
+        except ImportError:
+            cv2 = None
+        if cv2 is None:
+            print("OpenCV not installed; skipping intrinsics tests")
+        else:
+            from hal.mocks import charuco_frames
+            from scanner.calibration import CharucoBoard
+
+            board = CharucoBoard()
+            k = np.array([[620.0, 0.0, 405.0], [0.0, 615.0, 296.0], [0.0, 0.0, 1.0]])
+            dist = np.array([-0.21, 0.06, 0.001, -0.0008, 0.0])
+            frames, _ = charuco_frames(board, k, dist, count=20, seed=3)
+            # Half the frames from disk, as a recorded set would be; a pool
+            # of workers finds the same corners as this process.
+            paths = []
+            for i, frame in enumerate(frames[:10]):
+                paths.append(str(tmp / f"view{i:02d}.png"))
+                cv2.imwrite(paths[-1], frame)
+            inputs = paths + frames[10:]
+            serial = detect_frames(inputs, board, workers=1)
+            pooled = detect_frames(inputs, board, workers=2)
+            for a, b in zip(serial, pooled):
+                assert np.array_equal(a["ids"], b["ids"]) and np.allclose(a["corners"], b["corners"])
+            intr, rep = calibrate_intrinsics(serial, board)
+            assert rep["used"] == 20 and rep["rms_px"] < 0.6, rep
+            assert np.allclose(intr.camera_matrix[[0, 1], [0, 1]], k[[0, 1], [0, 1]], rtol=0.01), intr.camera_matrix
+            assert np.abs(intr.camera_matrix[:2, 2] - k[:2, 2]).max() < 8.0, intr.camera_matrix
+            try:
+                calibrate_intrinsics(serial[:2], board)
+                raise AssertionError("two frames should not be enough")
+            except ValueError:
+                pass
+
+            # Store: intrinsics, then extrinsics, accumulate into one version.
+            assert store.save(intr, serial="rig-1") == 1
+            assert store.save(calib, serial="rig-1") == 2
+            assert store.versions("rig-1") == [1, 2]
+            latest = store.load("rig-1")
+            assert latest.version == 2 and latest.has_intrinsics and latest.has_extrinsics
+            assert np.allclose(latest.camera_matrix, intr.camera_matrix)
+            assert np.allclose(latest.range_beam, calib.range_beam)
+            assert store.load("rig-1", version=1).range_beam is None
+            assert load_calibration(serial="rig-1", store=store.root).version == 2
+
+            # Undistortion maps: computed on first use, read back after.
+            image = frames[0]
+            out = latest.undistort(image)
+            sidecars = list(latest.path.parent.glob("v0002.maps-*.npz"))
+            assert len(sidecars) == 1, sidecars
+            again = store.load("rig-1")
+            mtime = os.stat(sidecars[0]).st_mtime_ns
+            assert np.array_equal(again.undistort(image), out)
+            assert os.stat(sidecars[0]).st_mtime_ns == mtime, "maps should not be recomputed"
+            buf = np.empty_like(image)
+            assert again.undistort(image, out=buf) is buf
+            straight = cv2.undistort(image, latest.camera_matrix, latest.dist_coeffs)
+            assert np.abs(out.astype(int) - straight.astype(int))[50:-50, 50:-50].mean() < 2.0
+
+            # The .npz keeps the keys the --calib loaders have always read.
+            with np.load(latest.path) as data:
+                assert {"camera_matrix", "dist_coeffs", "format"} <= set(data.files)
+
+        # Older bare files load; files from a newer format are refused.
+        np.savez(tmp / "old.npz", camera_matrix=np.eye(3), dist_coeffs=np.zeros(5))
+        old = Calibration.load(tmp / "old.npz")
+        assert old.has_intrinsics and not old.has_extrinsics and old.version is None
+        try:
+            old.range_extrinsics()
+            raise AssertionError("no extrinsics to return")
+        except ValueError:
+            pass
+        arrays = calib.to_arrays()
+        arrays["format"] = np.int32(99)
+        np.savez(tmp / "new.npz", **arrays)
+        try:
+            Calibration.load(tmp / "new.npz")
+            raise AssertionError("a newer format should be refused")
+        except ValueError:
+            pass
+        # Serials are file names only after cleaning.
+        store.save(calib, serial="../odd serial")
+        assert store.versions("../odd serial") == [1] and (store.root / ".._odd_serial").is_dir()
+        try:
+            store.load("nobody")
+            raise AssertionError("missing device should raise")
+        except FileNotFoundError:
+            pass
+
+    print("All calibration tests passed")
+
+
+if __name__ == "__main__":
+    try:
+        run()
+    except AssertionError as e:
+        print("TEST FAILED:", e)
+        sys.exit(1)
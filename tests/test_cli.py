@@ -0,0 +1,106 @@
+import sys
+
+
+def run():
+    import contextlib
+    import io
+    import json
+    import os
+    import subprocess
+    import tempfile
+    import time
+    from pathlib import Path
+
+    root = Path(__file__).resolve().parent.parent
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["SCANNER_CACHE_DIR"] = tmp
+        from hal import backends
+
+        # Detection is cached per interpreter and redone when sys.path changes.
+        first = backends.detect(refresh=True)
+        assert not first["cached"] and first["modules"]["numpy"] and set(first["devices"]) == set(backends.DEVICES)
+        assert backends.detect()["cached"] and backends.detect()["modules"] == first["modules"]
+        extra = Path(tmp) / "site"
+        extra.mkdir()
+        sys.path.append(str(extra))
+        try:
+            assert not backends.detect()["cached"] and backends.detect()["cached"]
+            (extra / "scanner_fake_backend.py").write_text("")
+            os.utime(extra, (time.time() + 5, time.time() + 5))
+            backends.MODULES["fake"] = "scanner_fake_backend"
+            assert backends.detect()["modules"]["fake"], "a newly installed module is found"
+            del backends.MODULES["fake"]
+        finally:
+            sys.path.remove(str(extra))
+        backends.MODULES["nothing"] = "scanner_no_such_module"
+        backends.INSTALL["nothing"] = "pip install nothing"
+        try:
+            assert backends.missing(["numpy", "nothing"]) == ["nothing"]
+
+            # A tool whose backend is missing stops with a message, not a traceback.
+            from scanner import cli
+
+            cli.COMMANDS["fake"] = ("tfluna_read.py", ("nothing",), (), "needs a missing backend")
+            err = io.StringIO()
+            with contextlib.redirect_stderr(err):
+                assert cli.main(["fake"]) == 2
+            assert "pip install nothing" in err.getvalue()
+            del cli.COMMANDS["fake"]
+        finally:
+            del backends.MODULES["nothing"], backends.INSTALL["nothing"]
+
+        for _ in range(2):
+            out = io.StringIO()
+            with contextlib.redirect_stdout(out):
+                assert cli.main(["backends", "--json"]) == 0
+        assert json.loads(out.getvalue())["cached"]
+        with contextlib.redirect_stdout(io.StringIO()):
+            assert cli.main([]) == 0
+        with contextlib.redirect_stderr(io.StringIO()), contextlib.redirect_stdout(io.StringIO()):
+            assert cli.main(["no-such-command"]) == 2
+
+        # The command list, and a tool's --help, import neither NumPy nor
+        # the rest of hal/scanner.
+        env = dict(os.environ, PYTHONPATH=str(root))
+        probe = ("import sys; from scanner import cli; cli.usage(); sys.argv = ['x']; "
+                 "print(sorted(m for m in sys.modules if m == 'numpy' or m.startswith(('hal.', 'scanner.'))))")
+        loaded = subprocess.run([sys.executable, "-c", probe], env=env, capture_output=True, text=True, cwd=tmp)
+        assert loaded.stdout.strip() == "['hal.backends', 'scanner.cli']", loaded.stdout + loaded.stderr
+        helped = subprocess.run([sys.executable, "-m", "scanner", "acquire", "--help"], env=env, capture_output=True,
+                                text=True, cwd=tmp)
+        assert helped.returncode == 0 and helped.stdout.startswith("usage: scanner acquire"), helped.stderr
+
+        # One long-lived worker per sensor, reused across runs.
+        from hal.workers import SensorWorker, WorkerPool
+
+        with WorkerPool(mock=True) as pool:
+            runs = [pool.sample(["imu", "range"], 0.3) for _ in range(3)]
+            pids = {kind: w._proc.pid for kind, w in pool.workers.items()}
+            assert pool.get("imu")._proc.pid == pids["imu"] and pool.workers["range"].requests == 3
+        for run_ in runs:
+            assert 15 <= run_["imu"]["samples"] <= 40 and 40 <= run_["range"]["samples"] <= 100, run_
+        assert not any(w.alive for w in pool.workers.values())
+
+        try:
+            SensorWorker("range", port=os.path.join(tmp, "no-such-port")).start()
+            raise AssertionError("a sensor that cannot be opened fails start()")
+        except RuntimeError as e:
+            assert "range" in str(e)
+
+        out = io.StringIO()
+        report = os.path.join(tmp, "check.json")
+        with contextlib.redirect_stdout(out):
+            assert cli.main(["check", "--mock", "--duration", "0.2", "--repeat", "2", "--report", report]) == 0
+        rep = json.loads(Path(report).read_text())
+        assert len(rep["runs"]) == 2 and rep["workers"]["imu"]["requests"] == 2, rep
+
+    print("All CLI tests passed")
+
+
+if __name__ == "__main__":
+    try:
+        run()
+    except AssertionError as e:
+        print("TEST FAILED:", e)
+        sys.exit(1)
@@ -0,0 +1,50 @@
+import sys
+
+
+def run():
+    import numpy as np
+
+    from scanner.filters import FilterChain, HampelFilter, Kalman1D, RangeGate, RollingMedian
+
+    rng = np.random.default_rng(0)
+    x = np.round(1.5 + rng.normal(0.0, 0.01, 2000), 2)
+    spikes = rng.choice(2000, 40, replace=False)
+    x[spikes] += rng.choice([-1.0, 1.0], 40)
+
+    # Batch and per-sample paths agree exactly, across uneven batch splits.
+    for make in (lambda: RollingMedian(5), lambda: RollingMedian(4), lambda: HampelFilter(9, 3.0), Kalman1D):
+        a, b = make(), make()
+        inc = np.array([a.update(v) for v in x])
+        bat = np.concatenate([b.process(part) for part in np.split(x, [1, 3, 10, 700, 707])])
+        assert np.array_equal(inc, bat), f"{type(a).__name__}: batch and incremental outputs differ"
+
+    assert np.array_equal(RollingMedian(3).process([3.0, 1.0, 2.0, 10.0]), [3.0, 2.0, 2.0, 2.0])
+
+    hampel = HampelFilter(9, 3.0)
+    cleaned = hampel.process(x)
+    assert np.abs(cleaned - 1.5).max() < 0.2, "Hampel should remove the injected spikes"
+    assert hampel.replaced >= 40
+
+    gate = RangeGate(min_strength=100)
+    mask = gate.mask([1.0, 1.0, 0.1, 1.0], strength=[500, 50, 500, 65535], temperature=[30, 30, 30, 30])
+    assert mask.tolist() == [True, False, False, False], "gate should drop weak, short and saturated samples"
+
+    chain = FilterChain(RangeGate(), [RollingMedian(5), HampelFilter(9, 3.0), Kalman1D()])
+    twin = FilterChain(RangeGate(), [RollingMedian(5), HampelFilter(9, 3.0), Kalman1D()])
+    strength = np.where(np.arange(2000) % 50 == 0, 10, 1000)
+    out, accepted = chain.process(x, strength, np.full(2000, 35.0))
+    one = [twin.update(d, s, 35.0) for d, s in zip(x.tolist(), strength.tolist())]
+    assert accepted.sum() == 1960 and len(out) == 1960
+    assert np.array_equal(out, [v for v in one if v is not None]), "chain paths should agree"
+    timings = chain.timings(rate_hz=250)
+    assert set(timings) >= {"gate", "median", "hampel", "kalman", "realtime_load"}
+
+    print("All filter tests passed")
+
+
+if __name__ == "__main__":
+    try:
+        run()
+    except AssertionError as e:
+        print("TEST FAILED:", e)
+        sys.exit(1)
@@ -0,0 +1,78 @@
+import sys
+
+
+def run():
+    import random
+
+    import numpy as np
+
+    from hal.mocks import MockIMU, ScriptedTrajectory
+    from scanner import quaternion
+    from scanner.fusion import PoseFilter
+
+    traj = ScriptedTrajectory.circle(radius=1.0, period=8.0)
+
+    # 100 Hz on simulated time, with a 0.6 deg/s heading drift.
+    imu = MockIMU(seed=1, rate=100, trajectory=traj, realtime=False, yaw_drift=0.01, accel_noise=0.05,
+                  quat_noise=0.002)
+    rng = random.Random(2)
+    n = 1500
+    samples = [imu.read() for _ in range(n)]
+    fixes = []
+    for s in samples[5::10]:  # 10 Hz marker fixes
+        p, q = traj.pose(s["timestamp"])
+        fixes.append((s["timestamp"] + rng.uniform(0.03, 0.3), s["timestamp"],
+                      [c + rng.gauss(0.0, 0.01) for c in p], q))
+
+    # On-time: every fix is handed over before the IMU reaches it.
+    ontime = PoseFilter()
+    # Late: fixes show up 30-300 ms afterwards, several at once, shuffled.
+    late = PoseFilter()
+    deadreck = PoseFilter()
+    assert late.predict(0.0, [0.0, 0.0, 0.0, 0.0], [0.0, 0.0, 9.8]) is None, "zero quaternion cannot start the filter"
+    queue = sorted(fixes)
+    pos_err, ang_err = [], []
+    for k, s in enumerate(samples):
+        t = s["timestamp"]
+        if k % 10 == 5:
+            _, t_fix, p, q = fixes[k // 10]
+            assert ontime.correct(t_fix, p, q) == "pending"
+        ontime.predict(t, s["quat"], s["accel"])
+        deadreck.predict(t, s["quat"], s["accel"])
+        pose = late.predict(t, s["quat"], s["accel"])
+        arrived = [f for f in queue if f[0] <= t]
+        queue = [f for f in queue if f[0] > t]
+        rng.shuffle(arrived)
+        for _, t_fix, p, q in arrived:
+            assert late.correct(t_fix, p, q) == "applied"
+        if t > 3.0:
+            p_true, q_true = traj.pose(t)
+            pos_err.append(np.linalg.norm(pose["position"] - p_true))
+            ang_err.append(np.degrees(quaternion.angle(pose["quat"], q_true)))
+
+    # Replaying late, out-of-order fixes lands on the same state as on-time fixes.
+    for _, t_fix, p, q in queue:
+        late.correct(t_fix, p, q)
+    assert np.allclose(late.pose["position"], ontime.pose["position"], atol=1e-6), "late fixes were not replayed"
+    assert np.allclose(late.pose["quat"], ontime.pose["quat"], atol=1e-9)
+    assert late.fixes_late == len(fixes) and late.replayed > 0
+
+    rms = float(np.sqrt(np.mean(np.square(pos_err))))
+    assert rms < 0.04, f"position RMS {rms:.3f} m"
+    assert np.mean(ang_err) < 1.0, f"mean orientation error {np.mean(ang_err):.2f} deg"
+    drift = np.linalg.norm(deadreck.pose["position"] - traj.pose(samples[-1]["timestamp"])[0])
+    assert drift > 10 * rms, "dead reckoning alone should drift far more than the fused estimate"
+
+    # The pose stream stays at the IMU rate and reports shrinking uncertainty.
+    assert late.samples == n and late.pose["pos_std"].max() < 0.05
+    assert late.correct(0.001, [0.0, 0.0, 0.0], [1.0, 0.0, 0.0, 0.0]) == "dropped", "fix older than history"
+
+    print("All fusion tests passed")
+
+
+if __name__ == "__main__":
+    try:
+        run()
+    except AssertionError as e:
+        print("TEST FAILED:", e)
+        sys.exit(1)
@@ -19,6 +19,70 @@ def run():
     d = rng.distance()["distance_m"]
     assert 1.4 <= d <= 1.6, "Rangefinder reading out of expected bounds"
 
+    # Batched reads: structured arrays, paced like the single reads.
+    import time
+
+    import numpy as np
+
+    from hal.drivers import TFLunaRangefinder
+    from hal.interfaces import IMU, IMU_SAMPLE, RANGE_SAMPLE, Rangefinder
+    from hal.mocks import MockSerial
+    from hal.tfluna import encode_frames
+    from scanner.scanlog import IMU_RECORD, RANGE_RECORD
+
+    assert IMU_SAMPLE == IMU_RECORD and RANGE_SAMPLE == RANGE_RECORD, "batches should go straight into a scan log"
+    batch = MockRangefinder(seed=3, base=1.5).read_batch(500)
+    assert batch.dtype == RANGE_SAMPLE and len(batch) == 500
+    assert (np.abs(batch["distance_m"] - 1.5) <= 0.1 + 1e-6).all()
+    a, b = MockIMU(seed=4).read_batch(10), MockIMU(seed=4).read_batch(10)
+    assert a.dtype == IMU_SAMPLE and np.array_equal(a["quat"], b["quat"])
+    first = MockIMU(seed=4).read()
+    assert len(first["quat"]) == 4 and isinstance(first["accel"][0], float)
+
+    paced = MockRangefinder(seed=0, rate=500)
+    t0 = time.monotonic()
+    got = paced.read_batch(50)
+    elapsed = time.monotonic() - t0
+    assert len(got) == 50 and 0.08 < elapsed < 0.3, elapsed
+    assert np.allclose(np.diff(got["t"]), 1 / 500, atol=1e-6)
+    out = np.zeros(64, dtype=RANGE_SAMPLE)
+    part = paced.read_batch(64, timeout=0.02, out=out)
+    assert 0 < len(part) < 64 and np.shares_memory(part, out), "timeout returns what is due"
+
+    # The ABC default builds batches from single reads.
+    class Counting(Rangefinder):
+        k = 0
+
+        def distance(self):
+            self.k += 1
+            return {"timestamp": float(self.k), "distance_m": 0.5}
+
+    class Fixed(IMU):
+        def read(self):
+            return {"timestamp": 1.0, "accel": [0, 0, 9.8], "gyro": [0, 0, 0], "quat": [1, 0, 0, 0]}
+
+    got = Counting().read_batch(5)
+    assert got["t"].tolist() == [1, 2, 3, 4, 5] and got["strength"].tolist() == [0] * 5
+    assert Fixed().read_batch(3)["quat"][:, 0].tolist() == [1, 1, 1]
+    try:
+        Counting().read_batch(5, out=np.zeros(4, dtype=RANGE_SAMPLE))
+        raise AssertionError("a short out buffer should be rejected")
+    except ValueError:
+        pass
+
+    # TF-Luna driver over a replayed UART stream.
+    tfl = TFLunaRangefinder(MockSerial(encode_frames(np.arange(300) + 100, 900, 35.0), chunk=90))
+    first = tfl.distance()
+    assert first["distance_m"] == 1.0 and first["frame_index"] == 0
+    got = tfl.read_batch(200)
+    assert len(got) == 200 and np.allclose(got["distance_m"], (np.arange(1, 201) + 100) / 100)
+    # Frames from one serial read are a frame period apart, not stamped together.
+    assert np.allclose(np.diff(got["t"][:9]), 1.0 / tfl.rate), np.diff(got["t"][:9])
+    assert np.all(np.diff(np.r_[first["timestamp"], got["t"]]) > 0), "stamps should increase across reads"
+    rest = tfl.read_batch(500)
+    assert len(rest) == 99 and rest["strength"][0] == 900
+    assert not len(tfl.read_batch(10)), "an exhausted port returns an empty batch"
+
     print("All HAL mock tests passed")
 
 
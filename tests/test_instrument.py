@@ -0,0 +1,136 @@
+import sys
+
+
+def run():
+    import json
+    import tempfile
+    import threading
+    import time
+    import urllib.request
+    from pathlib import Path
+
+    import numpy as np
+
+    from hal.acquisition import Acquisition
+    from hal.mocks import MockIMU
+    from hal.tfluna import TFLunaDecoder, encode_frames
+    from scanner import instrument
+
+    was_enabled = instrument.ENABLED
+    instrument.disable()
+    try:
+        # Disabled handles are no-ops; enabling switches existing handles in place.
+        reg = instrument.Registry()
+        c = reg.counter("t_events_total", "events")
+        h = reg.histogram("t_latency_seconds", "latency", {"stage": "a"})
+        c.inc(5)
+        h.record(0.5)
+        with h.time():
+            pass
+        assert c.value == 0 and h.count == 0
+        assert reg.counter("t_events_total") is c, "metrics are looked up by name"
+        try:
+            reg.gauge("t_events_total")
+            raise AssertionError("re-registering a name as another kind should fail")
+        except ValueError:
+            pass
+        instrument.enable()
+        c.inc()
+        c.inc(2)
+        assert c.value == 3
+
+        # HDR-style buckets: percentiles within the bucket width, fixed memory.
+        values = np.random.default_rng(0).lognormal(np.log(2e-3), 1.0, 50000)
+        for v in values[:20000]:
+            h.record(float(v))
+        h.record_many(values[20000:])
+        assert h.count == len(values) and np.isclose(h.sum, values.sum())
+        assert h.min == values.min() and h.max == values.max()
+        for q in (50, 90, 99, 99.9):
+            exact = np.percentile(values, q)
+            assert abs(h.percentile(q) / exact - 1) < 0.04, (q, h.percentile(q), exact)
+        assert len(h._counts) == h.octaves * 32
+        h.record(0.0)
+        h.record(1e9)
+        assert h.min == 0.0 and h.max == 1e9 and h.percentile(100) == 1e9
+
+        # Prometheus text: one HELP/TYPE per name, cumulative buckets.
+        reg.histogram("t_latency_seconds", "latency", {"stage": "b"}).record(0.01)
+        text = reg.prometheus()
+        assert text.count("# TYPE t_latency_seconds histogram") == 1
+        assert "t_events_total 3" in text
+        assert f't_latency_seconds_count{{stage="a"}} {h.count}' in text
+        assert 't_latency_seconds_bucket{le="+Inf",stage="b"} 1' in text
+        buckets = [int(line.rsplit(" ", 1)[1]) for line in text.splitlines()
+                   if line.startswith('t_latency_seconds_bucket{') and 'stage="a"' in line]
+        assert buckets == sorted(buckets) and buckets[-1] == h.count
+        snap = reg.snapshot()
+        assert snap["t_events_total"] == 3 and snap["t_latency_seconds"]["stage=b"]["count"] == 1
+
+        # Exporters: HTTP endpoint and periodic JSON file.
+        server = instrument.serve(0, registry=reg)
+        try:
+            url = f"http://127.0.0.1:{server.server_address[1]}/metrics"
+            with urllib.request.urlopen(url, timeout=5) as resp:
+                assert resp.read().decode() == reg.prometheus()
+        finally:
+            server.shutdown()
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "metrics.json"
+            with instrument.JsonExporter(path, interval=0.02, registry=reg) as exporter:
+                time.sleep(0.1)
+            assert exporter.writes >= 2
+            assert json.loads(path.read_text())["metrics"]["t_events_total"] == 3
+
+        # Pipeline hooks: TF-Luna decoding and HAL reads report into the registry.
+        instrument.REGISTRY.reset()
+        dec = TFLunaDecoder()
+        raw = encode_frames(np.arange(100) + 50, 1000, 30.0)
+        dec.feed(raw[:400])  # a partial frame stays buffered
+        dec.feed(raw[400:450] + b"\x00\x01\x02" + raw[450:])
+        snap = instrument.snapshot()
+        assert snap["tfluna_frames_total"] == dec.frames == 100
+        assert snap["tfluna_decode_seconds"]["count"] == 2
+        acq = Acquisition()
+        acq.add("imu", MockIMU(seed=0), rate=200)
+        with acq:
+            time.sleep(0.2)
+        reads = instrument.snapshot()["hal_read_seconds"]["sensor=imu"]
+        assert reads["count"] == acq.tasks["imu"].stats.count > 10
+
+        # Disabling again stops recording but keeps what was recorded.
+        instrument.disable()
+        dec.feed(raw)
+        assert instrument.snapshot()["tfluna_frames_total"] == 100
+
+        # The sampling profiler sees a busy thread's hot function.
+        stop = threading.Event()
+
+        def busy_loop():
+            x = 0
+            while not stop.is_set():
+                for i in range(100000):
+                    x += i
+
+        worker = threading.Thread(target=busy_loop, name="busy")
+        with instrument.SamplingProfiler(interval=0.002, threads={"busy"}) as prof:
+            worker.start()
+            time.sleep(0.3)
+            stop.set()
+            worker.join()
+        assert prof.samples > 5
+        fn, count, share = prof.top(1)[0]
+        assert fn.startswith("busy_loop") and share > 0.5, prof.top(3)
+        assert all(line.startswith("busy;") for line in prof.folded())
+    finally:
+        (instrument.enable if was_enabled else instrument.disable)()
+
+    print("All instrumentation tests passed")
+
+
+if __name__ == "__main__":
+    try:
+        run()
+    except AssertionError as e:
+        print("TEST FAILED:", e)
+        sys.exit(1)
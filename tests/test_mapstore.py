@@ -0,0 +1,119 @@
+import sys
+
+
+def _room_points(n, seed):
+    """Points where random rays from the middle of the default room hit."""
+    import numpy as np
+
+    from hal.simulator import Room
+
+    rng = np.random.default_rng(seed)
+    dirs = rng.normal(size=(n, 3))
+    dirs /= np.linalg.norm(dirs, axis=1, keepdims=True)
+    origin = np.array([0.3, -0.2, 1.2])
+    dist = Room.default().cast(np.broadcast_to(origin, dirs.shape), dirs)[0]
+    return origin + dirs[np.isfinite(dist)] * dist[np.isfinite(dist), None]
+
+
+def run():
+    import os
+    import tempfile
+
+    import numpy as np
+
+    from scanner.mapstore import MapStoreReader, MapStoreWriter, decode_tile, encode_tile
+    from scanner.voxel import pack_keys
+
+    keys = np.array([0, 3, 4, 1000, 2 ** 21 - 1])
+    counts = np.array([1, 5, 1, 70000, 2], dtype=np.uint32)
+    k, c = decode_tile(encode_tile(keys, counts), len(keys))
+    assert np.array_equal(k, keys) and np.array_equal(c, counts), "tile coding should round-trip"
+
+    q = 0.01
+    first = _room_points(40000, seed=0)
+    # A second pass over one end of the room.
+    second = _room_points(40000, seed=1)
+    second = second[second[:, 0] > 2.0]
+
+    def cells(points, level):
+        """Reference: unique cells of `level` and their point counts."""
+        ijk = np.floor(points / q).astype(np.int64) >> level
+        return np.unique(pack_keys(ijk), return_counts=True)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "room.scanmap")
+        with MapStoreWriter(path, quantum=q, tile_cells=32, levels=5, session="first") as store:
+            store.add(first[:25000])
+            store.add(first[25000:])
+        reader = MapStoreReader(path)
+        assert reader.levels == 5 and [s["name"] for s in reader.sessions] == ["first"]
+        for level in range(5):
+            centres, counts = reader.read(level)
+            ref, ref_counts = cells(first, level)
+            got = pack_keys(np.floor(centres / reader.cell_size(level)).astype(np.int64))
+            order = np.argsort(got)
+            assert np.array_equal(got[order], ref) and np.array_equal(counts[order], ref_counts), level
+        stats = reader.stats()
+        assert stats[0]["points"] == len(first) and stats[4]["cells"] < stats[0]["cells"] / 5, stats
+        assert stats[4]["tiles"] <= 8, stats
+        # Compressed well below the 12 bytes of a float32 point, level 0 alone.
+        assert stats[0]["bytes"] < 4 * stats[0]["cells"], stats
+
+        # Box reads touch only the tiles that overlap the box.
+        lo, hi = np.array([1.5, -2.0, 0.0]), np.array([2.5, 0.0, 1.0])
+        reader = MapStoreReader(path)
+        centres, counts = reader.read(0, lo, hi)
+        inside = ((first >= lo) & (first <= hi)).all(axis=1)
+        assert ((centres >= lo) & (centres <= hi)).all() and abs(int(counts.sum()) - inside.sum()) < 0.02 * len(first)
+        assert reader.tiles_decoded == len(reader.tiles(0, lo, hi)) < len(reader.tiles(0))
+
+        # Streaming: coarse levels first, nearest tiles first within a level.
+        levels = [level for level, *_ in MapStoreReader(path).stream(near=(2.0, 1.5, 1.0), finest=2)]
+        assert levels == sorted(levels, reverse=True) and levels[0] == 4 and levels[-1] == 2
+        _, tile, _, _ = next(iter(MapStoreReader(path).stream(near=(2.0, 1.5, 1.0))))
+        assert np.array_equal(tile, np.floor(np.array([2.0, 1.5, 1.0]) / reader.tile_size(4)))
+        assert reader.level_for(0.04) == 2 and reader.level_for(0.001) == 0 and reader.level_for(10) == 4
+
+        # Appending a session rewrites nothing already on disk, and only
+        # writes the tiles it touches.
+        before = open(path, "rb").read()
+        with MapStoreWriter(path, quantum=0.5, session="second", metadata={"operator": "test"}) as store:
+            store.add(second)
+        after = open(path, "rb").read()
+        assert after[:len(before)] == before and len(after) - len(before) < 0.3 * len(before)
+        reader = MapStoreReader(path)
+        assert reader.quantum == q and [s["name"] for s in reader.sessions] == ["first", "second"]
+        both = np.concatenate([first, second])
+        for level in (0, 3):
+            centres, counts = reader.read(level)
+            ref, ref_counts = cells(both, level)
+            got = pack_keys(np.floor(centres / reader.cell_size(level)).astype(np.int64))
+            order = np.argsort(got)
+            assert np.array_equal(got[order], ref) and np.array_equal(counts[order], ref_counts), level
+        assert np.allclose(reader.bounds, [both.min(axis=0), both.max(axis=0)])
+
+        # A session that dies part way leaves the last commit readable, and
+        # the next session carries on from it.
+        with open(path, "ab") as fh:
+            fh.write(b"TILE" + bytes(100))
+        assert len(MapStoreReader(path).sessions) == 2
+        with MapStoreWriter(path, session="third") as store:
+            store.add(first[:100])
+        reader = MapStoreReader(path)
+        assert len(reader.sessions) == 3 and reader.stats()[0]["points"] == len(both) + 100
+
+        try:
+            MapStoreWriter(os.path.join(tmp, "bad.scanmap"), tile_cells=100)
+            raise AssertionError("tile_cells must be a power of two")
+        except ValueError:
+            pass
+
+    print("All map store tests passed")
+
+
+if __name__ == "__main__":
+    try:
+        run()
+    except AssertionError as e:
+        print("TEST FAILED:", e)
+        sys.exit(1)
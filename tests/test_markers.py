@@ -0,0 +1,67 @@
+import sys
+
+
+def run():
+    try:
+        import cv2  # noqa: F401
+    except ImportError:
+        print("OpenCV not installed; skipping marker tests")
+        return
+
+    import numpy as np
+
+    from hal.mocks import MockCamera
+    from scanner.markers import DetectionPipeline, MarkerDetector
+
+    cam = MockCamera(seed=0, size=(640, 480), marker_ids=(3, 7, 11), marker_px=80)
+    frames = [cam.capture() for _ in range(30)]
+    assert frames[0]["data"].shape == (480, 640) and frames[0]["data"].dtype == np.uint8
+
+    # Full-frame and ROI-tracking detection both recover the rendered corners.
+    for roi in (False, True):
+        det = MarkerDetector(roi=roi, full_every=10)
+        for seq, frame in enumerate(frames):
+            found = det.detect(frame["data"], t=frame["timestamp"], seq=seq)
+            assert sorted(found["id"].tolist()) == [3, 7, 11], f"roi={roi}: missed markers in frame {seq}"
+            for row in found:
+                err = np.abs(row["corners"] - frame["markers"][row["id"]]).max()
+                assert err <= 1.0, f"roi={roi}: corner error {err:.2f} px"
+        if roi:
+            assert det.roi_searches > det.full_searches, "ROI mode should mostly skip full-frame searches"
+
+    # The pipeline keeps frame order and fills poses when calibrated.
+    k = np.array([[500.0, 0.0, 320.0], [0.0, 500.0, 240.0], [0.0, 0.0, 1.0]])
+    det = MarkerDetector(camera_matrix=k, dist_coeffs=np.zeros(5), marker_length=0.05, roi=True)
+    with DetectionPipeline(det, workers=3) as pipe:
+        results = list(pipe.stream(MockCamera(seed=0, size=(640, 480), marker_ids=(3, 7, 11), marker_px=80),
+                                   max_frames=40))
+        report = pipe.report()
+    assert [r["frame_id"] for r in results] == list(range(1, 41)), "results should come back in capture order"
+    markers = np.concatenate([r["markers"] for r in results])
+    assert len(markers) == 120 and markers["has_pose"].all()
+    # 80 px marker at f=500 is 0.05 * 500 / 80 = 0.3125 m away, facing the camera.
+    assert np.allclose(markers["tvec"][:, 2], 0.3125, atol=0.01), "pose depth does not match marker size"
+    assert report["frames"] == 40 and set(report["latency_ms"]) >= {"capture", "detect", "pose", "total"}
+    # Only markers whose solve succeeded are marked as having a pose.
+    corners = [frames[0]["markers"][i].astype(np.float32) for i in (3, 7)]
+    rvecs, tvecs, ok = det.estimate_poses(corners)
+    assert ok.tolist() == [True, True]
+    rows = det.to_records(0.0, [3, 7], corners, (rvecs, tvecs, np.array([True, False])))
+    assert rows["has_pose"].tolist() == [1, 0]
+
+    # Colour frames go through the per-worker conversion buffer.
+    frame = dict(frames[0], data=cv2.cvtColor(frames[0]["data"], cv2.COLOR_GRAY2BGR))
+    with DetectionPipeline(MarkerDetector(), workers=1) as pipe:
+        pipe.submit(frame)
+        (result,) = pipe.drain()
+    assert sorted(result["markers"]["id"].tolist()) == [3, 7, 11]
+
+    print("All marker tests passed")
+
+
+if __name__ == "__main__":
+    try:
+        run()
+    except AssertionError as e:
+        print("TEST FAILED:", e)
+        sys.exit(1)
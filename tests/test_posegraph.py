@@ -0,0 +1,111 @@
+import sys
+
+
+def run():
+    import numpy as np
+
+    from scanner import quaternion
+    from scanner.posegraph import PoseGraph, relative
+
+    rng = np.random.default_rng(0)
+
+    # A handheld loop around a room: 200 keyframes on a circle, heading along it.
+    n = 200
+    a = np.linspace(0, 2 * np.pi, n, endpoint=False)
+    true_p = np.stack([2 * np.cos(a), 2 * np.sin(a), 1.2 + 0.1 * np.sin(3 * a)], axis=1)
+    true_q = quaternion.from_rvec(np.stack([0.05 * np.sin(2 * a), np.zeros(n), a + np.pi / 2], axis=1))
+    anchors = {0: [2.5, 0, 1.0], 1: [0, 2.5, 1.5], 2: [-2.5, 0, 1.0], 3: [0, -2.5, 1.5]}
+
+    # Noisy odometry, chained into a drifting initial guess.
+    graph = PoseGraph(capacity=16)
+    odo = []
+    q, p = true_q[0], true_p[0]
+    graph.add_node(q, p, fixed=True)
+    for i in range(1, n):
+        dq, dp = relative(true_q[i - 1], true_p[i - 1], true_q[i], true_p[i])
+        dq = quaternion.multiply(dq, quaternion.from_rvec(rng.normal(0, 0.01, 3)))
+        dp = dp + rng.normal(0, 0.01, 3)
+        odo.append((dq, dp))
+        r = quaternion.to_matrix(q)
+        q, p = quaternion.multiply(q, dq), p + r @ dp
+        graph.add_node(q, p)
+        graph.add_odometry(i - 1, i, dq, dp, rot_std=0.01, pos_std=0.01)
+    _, drifted = graph.poses()
+    drift = np.linalg.norm(drifted - true_p, axis=1).max()
+    assert drift > 0.1, drift
+
+    # Loop closure and anchor sightings pull the drift back out.
+    dq, dp = relative(true_q[-1], true_p[-1], true_q[0], true_p[0])
+    graph.add_loop(n - 1, 0, dq, dp, rot_std=0.01, pos_std=0.01)
+    for i in range(0, n, 5):
+        for m, pos in anchors.items():
+            z = quaternion.to_matrix(quaternion.conjugate(true_q[i])) @ (np.asarray(pos) - true_p[i])
+            if np.linalg.norm(z) < 3.0:
+                graph.add_sighting(i, graph.anchor(m, pos if m != 3 else None), z + rng.normal(0, 0.01, 3), std=0.01)
+    report = graph.optimize()
+    _, fixed = graph.poses()
+    err = np.linalg.norm(fixed - true_p, axis=1)
+    assert err.max() < 0.05 and err.max() < drift / 4, (err.max(), drift)
+    assert report["final_cost"] < report["initial_cost"] and report["iterations"] < 20, report
+    est = graph.anchors()
+    assert np.linalg.norm(est[0] - anchors[0]) == 0, "known anchors stay put"
+    assert np.linalg.norm(est[3] - anchors[3]) < 0.05, "unknown anchors are estimated"
+
+    # Warm start: solving again from the optimum does (almost) nothing.
+    again = graph.optimize()
+    assert again["iterations"] <= 2 and abs(again["final_cost"] - report["final_cost"]) < 1e-6 * report["final_cost"]
+
+    # A false loop closure is down-weighted by the Huber kernel.
+    def with_false_loop(huber, loop=True):
+        bad = PoseGraph()
+        for i in range(n):
+            bad.add_node(true_q[i], true_p[i], fixed=(i == 0))
+            if i:
+                bad.add_odometry(i - 1, i, *odo[i - 1], rot_std=0.01, pos_std=0.01)
+            if i % 5 == 0:
+                for m, pos in anchors.items():
+                    z = quaternion.to_matrix(quaternion.conjugate(true_q[i])) @ (np.asarray(pos) - true_p[i])
+                    if np.linalg.norm(z) < 3.0:
+                        bad.add_sighting(i, bad.anchor(m, pos), z, std=0.01)
+        if loop:
+            bad.add_loop(n // 2, 0, quaternion.identity(), [0.5, 0, 0], rot_std=0.01, pos_std=0.01)
+        bad.optimize(huber=huber)
+        return np.linalg.norm(bad.poses()[1] - true_p, axis=1).max()
+
+    clean, robust, plain = with_false_loop(None, loop=False), with_false_loop(1.0), with_false_loop(None)
+    assert robust < 1.5 * clean and plain > 5 * clean, (clean, robust, plain)
+
+    # Incremental: window solves while walking, the whole loop on the loop closure.
+    inc = PoseGraph()
+    q, p = true_q[0], true_p[0]
+    inc.add_node(q, p, fixed=True)
+    modes = []
+    for i in range(1, n):
+        dq, dp = odo[i - 1]
+        q, p = quaternion.multiply(q, dq), p + quaternion.to_matrix(q) @ dp
+        inc.add_node(q, p)
+        inc.add_odometry(i - 1, i, dq, dp, rot_std=0.01, pos_std=0.01)
+        if i % 5 == 0:
+            for m in (0, 1):
+                z = quaternion.to_matrix(quaternion.conjugate(true_q[i])) @ (np.asarray(anchors[m]) - true_p[i])
+                if np.linalg.norm(z) < 3.0:
+                    inc.add_sighting(i, inc.anchor(m, anchors[m]), z, std=0.01)
+            modes.append(inc.update(window=20)["mode"])
+    dq, dp = relative(true_q[-1], true_p[-1], true_q[0], true_p[0])
+    inc.add_loop(n - 1, 0, dq, dp, rot_std=0.01, pos_std=0.01)
+    last = inc.update(window=20)
+    assert last["mode"] == "loop" and last["nodes"] == n - 1 and "window" in modes, modes
+    _, p_inc = inc.poses()
+    inc.optimize(iterations=50, tol=0)
+    assert np.abs(inc.poses()[1] - p_inc).max() < 1e-3, "incremental updates reach the batch optimum"
+    assert np.linalg.norm(p_inc - true_p, axis=1).max() < drift
+
+    print("All pose graph tests passed")
+
+
+if __name__ == "__main__":
+    try:
+        run()
+    except AssertionError as e:
+        print("TEST FAILED:", e)
+        sys.exit(1)
@@ -0,0 +1,55 @@
+import sys
+
+
+def run():
+    import numpy as np
+
+    from hal.acquisition import IMU_DTYPE, RANGE_DTYPE
+    from scanner.projection import Extrinsics, orientation_at, project, project_readings
+
+    c, s = np.cos(np.pi / 4), np.sin(np.pi / 4)
+    quats = np.array([[1.0, 0.0, 0.0, 0.0], [c, 0.0, 0.0, s]])  # 0 -> 90 deg yaw
+    imu_t = np.array([0.0, 1.0])
+
+    pts = project([2.0, 2.0, 2.0], [0.0, 0.5, 1.0], quats, imu_t)
+    expected = [[2.0, 0.0, 0.0], [2.0 * c, 2.0 * s, 0.0], [0.0, 2.0, 0.0]]
+    assert pts.dtype == np.float32 and pts.shape == (3, 3)
+    assert np.allclose(pts, expected, atol=1e-5), "slerp midpoint should be 45 deg"
+
+    # Lever arm and beam direction go through the mount rotation.
+    ext = Extrinsics(rotation=[c, 0.0, 0.0, s], translation=(0.1, 0.0, 0.0))
+    pts = project([1.0], [0.0], quats, imu_t, extrinsics=ext)
+    assert np.allclose(pts, [[0.1, 1.0, 0.0]], atol=1e-6), "extrinsics not applied"
+
+    # All-zero quaternions (BNO055 before fusion settles), out-of-span
+    # timestamps and zero distances are dropped.
+    quats = np.array([[0.0, 0.0, 0.0, 0.0], [1.0, 0.0, 0.0, 0.0], [1.0, 0.0, 0.0, 0.0]])
+    pts, mask = project([1.0, 1.0, 0.0, 1.0], [0.5, 1.5, 1.5, 3.0], quats, [0.0, 1.0, 2.0], return_mask=True)
+    assert mask.tolist() == [False, True, False, False], f"unexpected mask {mask}"
+
+    q, valid = orientation_at([0.25], [0.0, 1.0], [[1.0, 0.0, 0.0, 0.0], [-c, 0.0, 0.0, -s]])
+    assert valid[0] and np.allclose(np.abs(q[0]), [np.cos(np.pi / 16), 0, 0, np.sin(np.pi / 16)], atol=1e-6), \
+        "slerp should take the short path across the double cover"
+
+    # HAL reading dicts and acquisition ring records give the same result.
+    ranges = [{"timestamp": 10.0 + 0.1 * i, "distance_m": 1.0 + i} for i in range(5)]
+    imus = [{"timestamp": 10.0 + 0.2 * i, "quat": [1.0, 0.0, 0.0, 0.0]} for i in range(4)]
+    a = project_readings(ranges, imus)
+    r = np.zeros(5, dtype=RANGE_DTYPE)
+    r["t"] = [x["timestamp"] for x in ranges]
+    r["distance_m"] = [x["distance_m"] for x in ranges]
+    m = np.zeros(4, dtype=IMU_DTYPE)
+    m["t"] = [x["timestamp"] for x in imus]
+    m["quat"] = [1.0, 0.0, 0.0, 0.0]
+    b = project_readings(r, m)
+    assert a.shape == (5, 3) and np.allclose(a, b), "dict and structured inputs should agree"
+
+    print("All projection tests passed")
+
+
+if __name__ == "__main__":
+    try:
+        run()
+    except AssertionError as e:
+        print("TEST FAILED:", e)
+        sys.exit(1)
@@ -0,0 +1,83 @@
+import sys
+
+
+def run():
+    import numpy as np
+
+    from scanner import quaternion as quat
+
+    rng = np.random.default_rng(0)
+    n = 2000
+    a, _ = quat.normalize(rng.normal(size=(n, 4)))
+    b, _ = quat.normalize(rng.normal(size=(n, 4)))
+    c, _ = quat.normalize(rng.normal(size=(n, 4)))
+    v = rng.normal(size=(n, 3))
+
+    def same_rotation(p, q, atol=1e-9):
+        return np.allclose(quat.canonical(p), quat.canonical(q), atol=atol)
+
+    # Zero and non-finite readings (BNO055 start-up) become flagged identities.
+    raw = np.array([[0.0, 0.0, 0.0, 0.0], [0.677429, 0.627563, 0.383789, 0.000061], [np.nan, 0, 0, 0]])
+    q, valid = quat.normalize(raw)
+    assert valid.tolist() == [False, True, False], "zero/NaN quaternions should be invalid"
+    assert np.array_equal(q[[0, 2]], quat.identity(2)) and np.isfinite(quat.to_rvec(q)).all()
+
+    # Products are associative, preserve norm and compose rotations.
+    ab = quat.multiply(a, b)
+    assert np.allclose(quat.multiply(ab, c), quat.multiply(a, quat.multiply(b, c)))
+    assert np.allclose(np.linalg.norm(ab, axis=1), 1.0)
+    assert np.allclose(quat.rotate(ab, v), quat.rotate(a, quat.rotate(b, v))), "products should compose rotations"
+    assert np.allclose(quat.multiply(a, quat.conjugate(a)), quat.identity(n))
+    assert np.allclose(quat.multiply(2.0 * a, quat.inverse(2.0 * a)), quat.identity(n))
+
+    # Rotation preserves length and agrees with the matrix form.
+    rv = quat.rotate(a, v)
+    assert np.allclose(np.linalg.norm(rv, axis=1), np.linalg.norm(v, axis=1))
+    mats = quat.to_matrix(a)
+    assert np.allclose(np.einsum("nij,nj->ni", mats, v), rv)
+    assert np.allclose(mats @ np.swapaxes(mats, 1, 2), np.eye(3)) and np.allclose(np.linalg.det(mats), 1.0)
+
+    # Round trips through matrices and rotation vectors, including the
+    # awkward cases: identity, tiny angles and 180-degree turns.
+    special = np.array([[1, 0, 0, 0], [0, 1, 0, 0], [0, 0, 1, 0], [0, 0, 0, 1], [1, 1e-12, 0, 0],
+                        [np.cos(1.5), 0.0, 0.0, np.sin(1.5)]], dtype=np.float64)
+    for qs in (a, quat.normalize(special)[0]):
+        assert same_rotation(quat.from_matrix(quat.to_matrix(qs)), qs), "matrix round trip"
+        assert same_rotation(quat.from_rvec(quat.to_rvec(qs)), qs), "rvec round trip"
+    rvecs = quat.to_rvec(a)
+    assert np.all(np.linalg.norm(rvecs, axis=1) <= np.pi + 1e-9)
+    assert np.allclose(quat.angle(a), np.linalg.norm(rvecs, axis=1))
+
+    # Matches OpenCV's Rodrigues where OpenCV is available.
+    try:
+        import cv2
+
+        for q_i, r_i in zip(a[:20], rvecs[:20]):
+            assert np.allclose(cv2.Rodrigues(r_i)[0], quat.to_matrix(q_i)), "rvec disagrees with cv2.Rodrigues"
+    except ImportError:
+        pass
+
+    # Slerp hits its endpoints, moves at constant angular speed and takes
+    # the short way round regardless of sign.
+    assert same_rotation(quat.slerp(a, b, 0.0), a) and same_rotation(quat.slerp(a, b, 1.0), b)
+    u = rng.uniform(0.0, 1.0, n)
+    mid = quat.slerp(a, -b, u)
+    total = quat.angle(a, b)
+    assert np.allclose(quat.angle(a, mid), u * total, atol=1e-7)
+    assert np.allclose(quat.angle(mid, b), (1.0 - u) * total, atol=1e-7)
+    close = quat.normalize(a + 1e-6 * rng.normal(size=(n, 4)))[0]
+    assert np.allclose(np.linalg.norm(quat.slerp(a, close, u), axis=1), 1.0)
+
+    # Broadcasting: one quaternion against many vectors and vice versa.
+    assert np.allclose(quat.rotate(a[0], v), v @ mats[0].T)
+    assert quat.multiply(a[0], b).shape == (n, 4) and quat.to_matrix(a.reshape(40, 50, 4)).shape == (40, 50, 3, 3)
+
+    print("All quaternion tests passed")
+
+
+if __name__ == "__main__":
+    try:
+        run()
+    except AssertionError as e:
+        print("TEST FAILED:", e)
+        sys.exit(1)
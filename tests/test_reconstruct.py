@@ -0,0 +1,67 @@
+import sys
+
+
+def run():
+    import tempfile
+    from pathlib import Path
+
+    import numpy as np
+
+    from hal.simulator import HandheldTrajectory, Room, ScanSimulator
+    from scanner.projection import project
+    from scanner.reconstruct import plan_chunks, reconstruct
+    from scanner.scanlog import ScanLogReader
+    from scanner.voxel import VoxelMap
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = []
+        for seed in (0, 1):
+            path = Path(tmp) / f"session{seed}.scanlog"
+            ScanSimulator(Room.default(), HandheldTrajectory(), seed=seed).write(path, 12.0, camera_rate=0)
+            paths.append(path)
+
+        chunks = plan_chunks(paths, chunk_seconds=2.5)
+        assert len(chunks) == 10 and all(t1 > t0 for _, t0, t1 in chunks)
+
+        # Same map, to the bit, whatever the worker count.
+        maps = {}
+        for workers in (1, 2, 3):
+            vmap, report = reconstruct(paths, voxel_size=0.05, workers=workers, chunk_seconds=2.5)
+            maps[workers] = vmap.snapshot()
+            assert report["chunks"] == 10 and report["samples"] == 2 * 12 * 250
+        for workers in (2, 3):
+            for field in ("ijk", "centroid", "count", "log_odds"):
+                assert np.array_equal(maps[1][field], maps[workers][field]), (workers, field)
+
+        # ... and the same map as projecting and inserting each whole session.
+        ref = VoxelMap(voxel_size=0.05)
+        for path in paths:
+            log = ScanLogReader(path)
+            rng, imu = log.read("range"), log.read("imu")
+            ref.insert(project(rng["distance_m"], rng["t"], imu["quat"], imu["t"]))
+        want = ref.snapshot()
+        got = maps[1]
+        order_w = np.lexsort(want["ijk"].T)
+        order_g = np.lexsort(got["ijk"].T)
+        assert np.array_equal(want["ijk"][order_w], got["ijk"][order_g])
+        assert np.array_equal(want["count"][order_w], got["count"][order_g])
+        assert np.allclose(want["centroid"][order_w], got["centroid"][order_g], atol=1e-6)
+        assert np.allclose(want["log_odds"][order_w], got["log_odds"][order_g])
+        assert report["points"] == want["count"].sum()
+
+        # Chunks shorter than an IMU interval still find their bracketing samples.
+        log = ScanLogReader(paths[0])
+        rng, imu = log.read("range"), log.read("imu")
+        first = len(project(rng["distance_m"], rng["t"], imu["quat"], imu["t"]))
+        small, report = reconstruct(paths[:1], voxel_size=0.05, workers=1, chunk_seconds=0.005, margin=0.05)
+        assert report["chunks"] > 2000 and report["points"] == first == small.count[:len(small)].sum()
+
+    print("All reconstruction tests passed")
+
+
+if __name__ == "__main__":
+    try:
+        run()
+    except AssertionError as e:
+        print("TEST FAILED:", e)
+        sys.exit(1)
@@ -0,0 +1,111 @@
+import sys
+
+
+def run():
+    import tempfile
+    import time
+    from pathlib import Path
+
+    import numpy as np
+
+    from hal.acquisition import Acquisition
+    from hal.interfaces import Camera
+    from hal.mocks import MockIMU, MockRangefinder
+    from hal.replay import ReplayCamera, ReplayClock, ReplayIMU, ReplayRangefinder, SessionRecorder
+
+    class FrameCamera(Camera):
+        def __init__(self):
+            self.k = 0
+
+        def capture(self):
+            self.k += 1
+            data = np.full((4, 6), self.k, dtype=np.uint8)
+            return {"timestamp": 100.0 + self.k / 30.0, "frame_id": self.k, "data": data,
+                    "markers": {7: np.zeros((4, 2))}}
+
+    root = Path(__file__).resolve().parent.parent
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "session.scanlog"
+
+        # Record: the wrappers are still HAL sensors and return the live readings.
+        with SessionRecorder(path) as rec:
+            imu = rec.wrap(MockIMU(seed=1))
+            rng = rec.wrap(MockRangefinder(seed=2, base=1.5))
+            cam = rec.wrap(FrameCamera())
+            assert isinstance(cam, Camera)
+            live_imu = [imu.read() for _ in range(300)]
+            live_rng = [rng.distance() for _ in range(5000)]  # > one scan log chunk
+            live_cam = [cam.capture() for _ in range(10)]
+
+        # As fast as possible, replay reproduces the recording exactly.
+        r_imu = ReplayIMU(path, speed=0)
+        got = list(r_imu)
+        assert len(got) == 300 and r_imu.exhausted
+        assert np.allclose([g["quat"] for g in got], [x["quat"] for x in live_imu], atol=1e-6)
+        assert [g["timestamp"] for g in got] == [x["timestamp"] for x in live_imu]
+        r_rng = ReplayRangefinder(path, speed=0)
+        d = [r_rng.distance()["distance_m"] for _ in range(5000)]
+        assert np.allclose(d, [x["distance_m"] for x in live_rng], atol=1e-6)
+        try:
+            r_rng.distance()
+            raise AssertionError("reading past the end should raise EOFError")
+        except EOFError:
+            pass
+        frames = list(ReplayCamera(Path(tmp) / "session.camera.jsonl", speed=0))
+        assert len(frames) == 10 and frames[3]["frame_id"] == 4
+        assert np.array_equal(frames[3]["data"], live_cam[3]["data"]), "recorded images should replay"
+        assert frames[3]["markers"][0]["id"] == 7
+
+        # Real time at 10x keeps the recorded spacing (30 frames/s -> 300/s).
+        cam = ReplayCamera(Path(tmp) / "session.camera.jsonl", speed=10.0)
+        t0 = time.monotonic()
+        list(cam)
+        elapsed = time.monotonic() - t0
+        assert 0.025 < elapsed < 0.2, f"10x replay of 0.3 s took {elapsed:.3f} s"
+
+        # Sensors on a shared clock stay aligned; retime stamps them with now.
+        clock = ReplayClock(speed=50.0)
+        a = ReplayCamera(Path(tmp) / "session.camera.jsonl", clock=clock, retime=True)
+        b = ReplayCamera(Path(tmp) / "session.camera.jsonl", clock=clock)
+        fa, fb = a.capture(), b.capture()
+        assert fa["recorded_timestamp"] == fb["timestamp"] and abs(fa["timestamp"] - time.time()) < 1.0
+
+        # Replay sensors plug into Acquisition like live ones.
+        acq = Acquisition()
+        acq.add("imu", ReplayIMU(path, speed=0), capacity=1024)
+        sub = acq.subscribe("imu")
+        with acq:
+            deadline = time.monotonic() + 5.0
+            while acq.tasks["imu"].ring.seq < 300 and time.monotonic() < deadline:
+                time.sleep(0.01)
+        recs = sub.poll()
+        assert len(recs) == 300 and np.allclose(recs["quat"], [x["quat"] for x in live_imu], atol=1e-6)
+
+        # Batch reads and rate changes pass through the wrappers, and batches are recorded.
+        batched = Path(tmp) / "batched.scanlog"
+        with SessionRecorder(batched) as rec:
+            imu = rec.wrap(MockIMU(seed=3))
+            rng = rec.wrap(MockRangefinder(seed=4))
+            assert imu.set_rate(500.0) == 500.0 and imu.sensor.rate == 500.0
+            live_imu = imu.read_batch(40)
+            live_rng = rng.read_batch(100)
+        got = ReplayIMU(batched, speed=0).read_batch(40)
+        assert np.array_equal(got["t"], live_imu["t"]) and np.allclose(got["quat"], live_imu["quat"], atol=1e-6)
+        got = ReplayRangefinder(batched, speed=0).read_batch(100)
+        assert np.allclose(got["distance_m"], live_rng["distance_m"], atol=1e-6)
+
+    # Existing tool outputs replay directly.
+    bno = list(ReplayIMU(root / "test_outputs" / "bno055_output.txt", speed=0))
+    assert len(bno) == 40 and bno[1]["quat"][0] == 0.677429
+    anchors = list(ReplayCamera(root / "test_outputs" / "anchors_20260206_195616.jsonl", speed=0))
+    assert len(anchors) == 10 and all("markers" in f for f in anchors)
+
+    print("All replay tests passed")
+
+
+if __name__ == "__main__":
+    try:
+        run()
+    except AssertionError as e:
+        print("TEST FAILED:", e)
+        sys.exit(1)
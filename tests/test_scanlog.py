@@ -0,0 +1,81 @@
+import os
+import sys
+import tempfile
+
+
+def run():
+    import numpy as np
+
+    from scanner.scanlog import (
+        IMU_RECORD,
+        RANGE_RECORD,
+        ScanLogReader,
+        ScanLogWriter,
+        jsonl_to_markers,
+        markers_to_jsonl,
+        text_to_records,
+    )
+
+    tmp = tempfile.mkdtemp()
+    path = os.path.join(tmp, "scan.scanlog")
+
+    ranges = np.zeros(1000, dtype=RANGE_RECORD)
+    ranges["t"] = np.arange(1000) * 0.004
+    ranges["distance_m"] = np.linspace(0.5, 3.0, 1000)
+    imus = np.zeros(400, dtype=IMU_RECORD)
+    imus["t"] = np.arange(400) * 0.01
+    imus["quat"] = [1.0, 0.0, 0.0, 0.0]
+
+    with ScanLogWriter(path, chunk_records=256) as log:
+        log.append("range", ranges[:700])
+        log.append("imu", imus)
+        log.append("range", {"t": ranges["t"][700:], "distance_m": ranges["distance_m"][700:]})
+        log.append_one("point", (4.0, (1.0, 2.0, 3.0)))
+
+    log = ScanLogReader(path)
+    assert log.count("range") == 1000 and log.count("imu") == 400 and log.count("point") == 1
+    cols = log.read("range")
+    assert np.array_equal(cols["t"], ranges["t"]), "range timestamps should round-trip"
+    assert np.allclose(cols["distance_m"], ranges["distance_m"])
+
+    # A window inside one chunk is a view into the mapped file.
+    win = log.read("range", 0.1, 0.2)
+    assert len(win["t"]) == 25 and win["t"][0] >= 0.1 and win["t"][-1] < 0.2
+    assert not win["t"].flags.owndata, "single-chunk reads should be zero-copy"
+    assert log.records("imu", 1.0, 2.0)["quat"].shape == (100, 4)
+
+    # Truncated file (no footer): the index is rebuilt from chunk headers.
+    with open(path, "rb") as fh:
+        data = fh.read()
+    trunc = os.path.join(tmp, "trunc.scanlog")
+    with open(trunc, "wb") as fh:
+        fh.write(data[:len(data) // 2])
+    partial = ScanLogReader(trunc)
+    assert 0 < partial.count("range") < 1000, "complete chunks should survive truncation"
+
+    text = [
+        "1770412504.161 qw=0.000000 qx=0.000000 qy=0.000000 qz=0.000000",
+        "1770412504.279 qw=0.677429 qx=0.627563 qy=0.383789 qz=0.000061",
+        "1770412505.000 dist_cm=123 strength=456 temp_c=41.25",
+    ]
+    recs = dict(text_to_records(text))
+    assert len(recs["imu"]) == 2 and recs["range"]["distance_m"][0] == np.float32(1.23)
+
+    jsonl = [
+        '{"timestamp": 1.5, "markers": [{"id": 3, "tvec": [0.1, 0.2, 0.3], "rvec": [0, 0, 1]}]}',
+        '{"timestamp": 2.0, "markers": []}',
+        '{"timestamp": 2.5, "markers": [{"id": 7, "corners": [[1, 2], [3, 4], [5, 6], [7, 8]]}]}',
+    ]
+    markers = jsonl_to_markers(jsonl)
+    back = list(markers_to_jsonl({k: markers[k] for k in markers.dtype.names}))
+    assert len(back) == 2 and '"id": 7' in back[1] and '"corners"' in back[1]
+
+    print("All scan log tests passed")
+
+
+if __name__ == "__main__":
+    try:
+        run()
+    except AssertionError as e:
+        print("TEST FAILED:", e)
+        sys.exit(1)
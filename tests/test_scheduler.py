@@ -0,0 +1,108 @@
+import sys
+
+
+def run():
+    import math
+
+    import numpy as np
+
+    from hal.interfaces import ENCODER_SAMPLE, Actuator
+    from hal.mocks import MockActuator, MockRangefinder
+    from hal.scheduler import SCAN_POINT, ScanScheduler, raster, scan_points, spiral
+    from hal.simulator import Room, pan_tilt_rig
+
+    # Trapezoidal moves on a hand-driven clock.
+    now = [0.0]
+    head = MockActuator(max_speed=2.0, accel=10.0, clock=lambda: now[0])
+    head.move_to(1.0, 0.0)
+    # 0.2 s ramps cover 0.4 rad, so 0.3 s of cruise: done at 0.7 s.
+    t = np.linspace(0.0, 1.0, 1001)
+    pan, tilt = head.angles(t)
+    assert abs(pan[700] - 1.0) < 1e-9 and np.all(pan[700:] == 1.0) and np.all(tilt == 0.0)
+    assert np.all(np.diff(pan) >= 0) and np.diff(pan).max() <= 2.0 * 1e-3 + 1e-9, "speed limit"
+    assert abs(pan[200] - 0.2) < 1e-9, "accel limit"
+    now[0] = 0.5
+    assert head.moving()
+    # Re-targeting mid-move starts from where the head is, at the speed it has.
+    head.move_to(0.0, 0.5)
+    pan2, tilt2 = head.angles(t)
+    assert np.allclose(pan2[:501], pan[:501])
+    assert np.abs(np.diff(pan2)).max() <= 2.0 * 1e-3 + 1e-9 and np.abs(np.diff(np.diff(pan2))).max() < 2e-5
+    now[0] = 3.0
+    assert not head.moving() and head.angles(3.0) == (0.0, 0.5)
+    # Through moves keep going at speed.
+    head.move_to(1.0, 0.5, speed=1.0, through=True)
+    now[0] = 10.0
+    assert head.moving() and abs(float(head.angles(10.0)[0]) - (7.0 - 0.05)) < 1e-9
+    try:
+        head.move_to(0.0, 2.0)
+        raise AssertionError("tilt limits are enforced")
+    except ValueError:
+        pass
+
+    # Encoder: samples at `rate` up to the clock, in whole steps.
+    now[0] = 0.0
+    enc = MockActuator(rate=1000.0, steps_per_rev=200, clock=lambda: now[0])
+    assert len(enc.read_batch(64)) == 1
+    enc.move_to(0.3, 0.1)
+    now[0] = 0.05
+    batch = enc.read_batch(64)
+    assert batch.dtype == ENCODER_SAMPLE and len(batch) == 50
+    steps = batch["pan"] / (2 * math.pi / 200)
+    assert np.allclose(steps, np.round(steps), atol=1e-4)
+    assert len(enc.read_batch(64)) == 0
+    assert isinstance(enc, Actuator) and set(enc.position()) == {"timestamp", "pan", "tilt"}
+
+    # Paths.
+    r = raster((-1.0, 1.0), (0.0, 0.1), 0.05)
+    assert len(r) == 6 and list(r["sweep"]) == [False, True] * 3
+    assert list(r["pan"]) == [-1, 1, 1, -1, -1, 1] and np.allclose(r["tilt"], np.repeat([0, 0.05, 0.1], 2))
+    sp = spiral((0.0, 0.2), 0.5, 0.02)
+    radius = np.hypot(sp["pan"], sp["tilt"] - 0.2)
+    assert np.all(np.diff(radius) >= -1e-12) and abs(radius[-1] - 0.5) < 1e-9 and sp["sweep"][1:].all()
+
+    # Simulated room scan: on-the-fly reads, tagged with the head angle.
+    res = math.radians(0.5)
+    head, rng, sim = pan_tilt_rig(Room.default(), seed=1)
+    scheduler = ScanScheduler(head, rng, resolution=res)
+    scan, report = scheduler.run(raster((-1.0, 1.0), (-0.3, 0.3), res))
+    assert scan.dtype == SCAN_POINT and report["samples"] == len(scan)
+    true_pan, true_tilt = head.angles(scan["t"])
+    step = 2 * math.pi / 3200
+    assert np.abs(scan["pan"] - true_pan).max() < step and np.abs(scan["tilt"] - true_tilt).max() < step
+    assert abs(report["sensor_rate"] - 250) < 1 and abs(report["spacing"] - res) < 0.15 * res, report
+    assert 0.6 < report["efficiency"] <= 1.0 and report["max_points_per_s"] == 250.0, report
+    pts = scan_points(scan, origin=(0.0, 0.0, 1.2))
+    truth = sim.ranges(scan["t"][scan["distance_m"] > 0], return_truth=True)[1]
+    assert np.abs(np.linalg.norm(pts - (0.0, 0.0, 1.2), axis=1) - truth).max() < 0.2
+
+    # A slower sensor than expected: the sweep slows down to keep the spacing.
+    head, rng, sim = pan_tilt_rig(Room.default(), range_rate=100.0, seed=2)
+    scheduler = ScanScheduler(head, rng, resolution=res, sensor_rate=250.0)
+    _, slow = scheduler.run(raster((-1.0, 1.0), (0.0, 0.1), res))
+    assert abs(slow["sensor_rate"] - 100) < 1 and abs(slow["spacing"] - res) < 0.15 * res, slow
+    assert slow["seconds"] > 2 * slow["full_sweep_s"] and slow["commands"] > 6, slow
+
+    # A spiral is one continuous sweep: the head never stops on the way out.
+    head, rng, sim = pan_tilt_rig(Room.default(), seed=3)
+    scheduler = ScanScheduler(head, rng, resolution=res)
+    scan, spi = scheduler.run(spiral((0.0, 0.2), 0.3, res))
+    speed = np.hypot(*np.gradient(np.array(head.angles(scan["t"])), scan["t"], axis=1))
+    ramp = scan["t"] > scan["t"][0] + 0.5
+    assert speed[ramp][:-100].min() > 0.5 * res * 250, speed[ramp].min()
+    assert abs(spi["spacing"] - res) < 0.15 * res and spi["efficiency"] > 0.8, spi
+
+    # Real time, on the wall clock.
+    rt = ScanScheduler(MockActuator(), MockRangefinder(seed=0, rate=500), resolution=0.01, sensor_rate=500)
+    scan, live = rt.run(raster((0.0, 0.2), (0.0, 0.04), 0.01))
+    assert live["points"] > 50 and 300 < live["sensor_rate"] < 600, live
+
+    print("All scan scheduler tests passed")
+
+
+if __name__ == "__main__":
+    try:
+        run()
+    except AssertionError as e:
+        print("TEST FAILED:", e)
+        sys.exit(1)
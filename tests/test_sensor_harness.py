@@ -0,0 +1,67 @@
+import sys
+
+
+def run():
+    import json
+    import subprocess
+    import tempfile
+    from pathlib import Path
+
+    from tools.run_all_tests import StreamStats
+
+    # A 100 Hz stream with one missing sample and a few unrelated lines.
+    stats = StreamStats("bno055", start=0.0)
+    stamps = [1000.0 + k * 0.01 for k in range(50) if k != 20]
+    for k, t in enumerate(stamps):
+        assert stats.feed(f"{t:.3f} qw=1.000000 qx=0.000000 qy=0.000000 qz=0.000000", arrival=0.5 + k * 0.01)
+    assert not stats.feed("Traceback (most recent call last):", arrival=1.0)
+    s = stats.summary()
+    assert s["samples"] == 49 and s["lines"] == 50
+    assert abs(s["rate_hz"] - 48 / 0.49) < 0.5, s["rate_hz"]
+    assert s["missed"] == 1, "one 20 ms gap should count as one missed sample"
+    assert abs(s["interval_ms"]["p50"] - 10.0) < 0.01 and s["interval_ms"]["max"] > 19.0
+    assert s["first_sample_s"] == 0.5
+
+    # Repeated stamps (older tfluna_read output) give no gap estimate; losses come from the decoder counters.
+    tf = StreamStats("tfluna", start=0.0)
+    for k in range(40):
+        tf.feed(f"{1000.0 + (k // 4) * 0.016:.3f} dist_cm=150 strength=1200 temp_c=40.00", arrival=0.2)
+    tf.feed("frames=40 bad_checksum=2 dropped=3 skipped_bytes=27", arrival=1.0)
+    s = tf.summary()
+    assert s["samples"] == 40 and s["missed"] is None
+    assert s["checksum_errors"] == 2 and s["dropped_frames"] == 3 and s["frames"] == 40
+    # A summary glued onto a sample line the interrupt cut short still counts.
+    assert not tf.feed("1000.200 dist_cm=15frames=41 bad_checksum=4 dropped=5 skipped_bytes=27")
+    assert tf.summary()["checksum_errors"] == 4 and tf.summary()["frames"] == 41
+
+    # End to end: both mock tools run at once and stream into the summary.
+    root = Path(__file__).resolve().parent.parent
+    with tempfile.TemporaryDirectory() as tmp:
+        out = subprocess.run(
+            [sys.executable, str(root / "tools" / "run_all_tests.py"), "--bno", "--tfluna", "--parallel", "--mock",
+             "--bno-rate", "50", "--duration", "2.5", "--out-dir", tmp],
+            capture_output=True, text=True, timeout=60,
+        )
+        assert out.returncode == 0, out.stdout + out.stderr
+        summary = json.loads((Path(tmp) / "summary.json").read_text())
+        assert summary["duration_s"] < 5.0, "tools should run concurrently, not one after another"
+        bno = summary["sensors"]["bno055"]
+        tfluna = summary["sensors"]["tfluna"]
+        assert bno["ok"] and tfluna["ok"]
+        assert 35 < bno["rate_hz"] < 60, bno
+        assert 200 < tfluna["rate_hz"] < 300, tfluna
+        assert "checksum_errors" in tfluna, f"no counter summary parsed: {tfluna}"
+        assert tfluna["missed"] is not None, f"TF-Luna stamps should not repeat: {tfluna}"
+        assert tfluna["checksum_errors"] == tfluna["dropped_frames"] and tfluna["frames"] > 0
+        assert bno["first_sample_s"] < 2.0 and tfluna["first_sample_s"] < 2.0
+        assert len((Path(tmp) / "tfluna_output.txt").read_text().splitlines()) == tfluna["lines"]
+
+    print("All sensor harness tests passed")
+
+
+if __name__ == "__main__":
+    try:
+        run()
+    except AssertionError as e:
+        print("TEST FAILED:", e)
+        sys.exit(1)
@@ -0,0 +1,109 @@
+import sys
+
+
+def run():
+    import json
+    import tempfile
+    from pathlib import Path
+
+    import numpy as np
+
+    from hal.interfaces import Camera, IMU, Rangefinder
+    from hal.replay import ReplayRangefinder
+    from hal.simulator import HandheldTrajectory, Room, ScanSimulator, StepperTrajectory
+    from scanner import quaternion
+    from scanner.alignment import umeyama
+    from scanner.projection import project
+
+    room = Room.default()
+
+    # Ray casting against the shell (from inside), an obstacle and a plane.
+    dist, cos, surface = room.cast([[0, 0, 1.2], [0, 0, 0.5], [0, 0, 1.2], [0, 0, 1.2]],
+                                   [[1, 0, 0], [1, 0, 0], [0, 0, -1], [0.6, 0.8, 0.0]])
+    assert np.allclose(dist, [2.5, 0.8, 1.2, 2.5]), dist
+    assert surface.tolist() == [0, 1, 0, 0] and np.allclose(cos, [1, 1, 1, 0.8])
+    spec = {"shell": {"min": [-3, -3, 0], "max": [3, 3, 3]},
+            "planes": [{"point": [0, 0, 2.0], "normal": [0, 0, -1], "reflectivity": 0.3}],
+            "anchors": {"7": [1.0, 2.0, 1.0]}}
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "room.json"
+        path.write_text(json.dumps(spec))
+        ceiling = Room.load(path)
+    dist, _, surface = ceiling.cast([[0, 0, 1.0], [0, 0, 1.0]], [[0, 0, 1], [0, 0, -1]], max_range=5.0)
+    assert np.allclose(dist, [1.0, 1.0]) and surface.tolist() == [1, 0]
+    assert ceiling.known_anchors() == {"7": [1.0, 2.0, 1.0]}
+    assert np.isinf(ceiling.cast([[0, 0, 1.0]], [[1, 0, 0]], max_range=2.0)[0][0]), "beyond max_range is a miss"
+
+    # TF-Luna ranges: centimetre steps, ~2 cm noise, dropouts read 0.
+    stepper = StepperTrajectory(position=(0.0, 0.0, 1.2))
+    sim = ScanSimulator(room, stepper, seed=1, dropout=0.01)
+    t = np.arange(int(stepper.duration * 250)) / 250.0
+    rec, truth = sim.ranges(t, return_truth=True)
+    valid = rec["distance_m"] > 0
+    err = rec["distance_m"][valid] - truth[valid]
+    assert 0.005 < err.std() < 0.04 and abs(err.mean()) < 0.005, err.std()
+    assert np.allclose(rec["distance_m"] * 100, np.round(rec["distance_m"] * 100), atol=1e-3)
+    assert 0.005 < 1 - valid.mean() < 0.1, "expected a small share of dropouts"
+    assert (rec["strength"][valid] >= 100).all()
+
+    # IMU quaternions follow the trajectory; a fixed tripod only feels gravity.
+    imu = sim.imu(t[::5])
+    q_true = stepper.orientation(t[::5])
+    assert np.degrees(quaternion.angle(quaternion.normalize(imu["quat"])[0], q_true)).max() < 0.05
+    assert np.allclose(np.linalg.norm(imu["accel"], axis=1), 9.80665, atol=0.3)
+
+    # Ranges and quaternions together rebuild points on the room's surfaces.
+    pos, q = stepper.pose(t)
+    pts, mask = project(rec["distance_m"], t, imu["quat"], imu["t"], origins=pos, return_mask=True)
+    assert mask.sum() > 0.95 * valid.sum()
+    exact = (pos + quaternion.rotate(q, [1.0, 0.0, 0.0]) * truth[:, None])[mask]
+    assert np.median(np.linalg.norm(pts - exact, axis=1)) < 0.04
+
+    # Marker detections agree with the camera pose the simulator used.
+    walk = ScanSimulator(room, HandheldTrajectory(), seed=2, marker_dropout=0.0)
+    frames = np.arange(300) / 15.0
+    markers = walk.markers(frames)
+    assert len(markers) and set(markers["id"].tolist()) <= set(range(6))
+    rot_wc, cam = walk.camera_poses(frames)
+    anchors = np.array([v for _, v in sorted(room.known_anchors().items())])
+    k = np.searchsorted(frames, markers["t"])
+    world = np.einsum("nij,nj->ni", rot_wc[k], markers["tvec"]) + cam[k]
+    err = np.linalg.norm(world - anchors[markers["id"]], axis=1)
+    assert np.median(err) < 0.03 and err.max() < 0.15, "tvecs should place anchors where they are"
+    # Several anchors in one frame pin down the camera pose.
+    rows = markers[k == np.bincount(k).argmax()]
+    assert len(rows) >= 2
+    if len(rows) >= 3:
+        rot, trans = umeyama(rows["tvec"].astype(np.float64), anchors[rows["id"]])
+        assert np.linalg.norm(trans - cam[np.bincount(k).argmax()]) < 0.1
+    r_cm = quaternion.to_matrix(quaternion.from_rvec(markers["rvec"].astype(np.float64)))
+    normals = (rot_wc[k] @ r_cm)[:, :, 2]
+    assert np.allclose(np.abs(normals).max(axis=1), 1.0, atol=1e-3), "marker normals should be wall normals"
+    center = markers["corners"].mean(axis=1)
+    proj = markers["tvec"][:, :2] / markers["tvec"][:, 2:] * 1000.0 + np.array([640.0, 360.0])
+    assert np.median(np.linalg.norm(center - proj, axis=1)) < 10.0
+
+    # HAL sensors and scan log output.
+    r, i, c = walk.sensors()
+    assert isinstance(r, Rangefinder) and isinstance(i, IMU) and isinstance(c, Camera)
+    stamps = [r.distance()["timestamp"] for _ in range(1500)]
+    assert np.allclose(np.diff(stamps), 1 / 250.0)
+    assert len(i.read()["quat"]) == 4
+    seen = sum(len(c.capture()["markers"]) for _ in range(150))
+    assert seen > 0
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "sim.scanlog"
+        counts = walk.write(path, duration=10.0, block=3.0)
+        assert counts["range"] == 2500 and counts["imu"] == 1000
+        replayed = list(ReplayRangefinder(path, speed=0))
+        assert len(replayed) == 2500 and replayed[-1]["timestamp"] == 2499 / 250.0
+
+    print("All simulator tests passed")
+
+
+if __name__ == "__main__":
+    try:
+        run()
+    except AssertionError as e:
+        print("TEST FAILED:", e)
+        sys.exit(1)
@@ -0,0 +1,76 @@
+import sys
+
+
+def run():
+    import numpy as np
+
+    from scanner.spatial import PointIndex
+
+    rng = np.random.default_rng(0)
+    # Wall-like clusters plus a few isolated points, appended in uneven batches.
+    pts = np.concatenate([
+        rng.uniform([0, 0, 0], [2, 0.02, 2], (6000, 3)),
+        rng.uniform([0, 0, 0], [0.02, 2, 2], (6000, 3)),
+        rng.uniform(-1, 3, (300, 3)),
+    ]).astype(np.float32)
+    perm = rng.permutation(len(pts))
+    pts = pts[perm]
+    on_wall = perm < 12000
+    index = PointIndex(cell_size=0.05, capacity=16)
+    a = 0
+    for size in rng.integers(1, 1500, 100):
+        ids = index.extend(pts[a:a + size])
+        assert np.array_equal(ids, np.arange(a, min(a + size, len(pts))))
+        a += size
+        if a >= len(pts):
+            break
+    assert len(index) == len(pts) and np.array_equal(index.points, pts)
+    assert len(index.segments) <= 2 * int(np.log2(len(pts))) and index.merges > 0
+    mem = index.memory()
+    assert index.nbytes == sum(mem.values()) and mem["ids"] == 8 * len(pts)
+
+    queries = np.concatenate([pts[:200], rng.uniform(-1, 3, (100, 3))])
+    brute = np.sqrt(((queries[:, None, :].astype(np.float64) - pts[None].astype(np.float64)) ** 2).sum(-1))
+
+    # Radius queries, with radii below and above the cell size.
+    for r in (0.03, 0.12):
+        ids, offsets = index.radius(queries, r)
+        for i in range(len(queries)):
+            want = np.flatnonzero(brute[i] <= r)
+            assert np.array_equal(np.sort(ids[offsets[i]:offsets[i + 1]]), want), (r, i)
+    ids, offsets = index.radius(queries[:5], 0.1, sort=True)
+    for i in range(5):
+        d = brute[i, ids[offsets[i]:offsets[i + 1]]]
+        assert (np.diff(d) >= 0).all()
+    assert np.array_equal(index.count_radius(queries, 0.03), (brute <= 0.03).sum(axis=1))
+
+    # kNN, including queries far from everything.
+    dist, idx = index.knn(queries, k=8)
+    want = np.sort(brute, axis=1)[:, :8]
+    assert np.allclose(dist, want, atol=1e-6), np.abs(dist - want).max()
+    assert np.allclose(brute[np.arange(len(queries))[:, None], idx], want, atol=1e-6)
+    far = index.knn([[50.0, 50.0, 50.0]], k=3)[0]
+    assert np.allclose(far[0], np.sort(brute_far := np.linalg.norm(pts - 50.0, axis=1))[:3], atol=1e-4), brute_far.min()
+    small = PointIndex()
+    small.extend(pts[:2])
+    d, i = small.knn(pts[:1], k=4)
+    assert i[0, 0] == 0 and (i[0, 2:] == -1).all() and np.isinf(d[0, 2:]).all()
+
+    # Box queries.
+    lo, hi = np.array([0.5, -0.1, 0.5]), np.array([1.2, 0.01, 1.0])
+    want = np.flatnonzero(((pts >= lo) & (pts <= hi)).all(axis=1))
+    assert np.array_equal(index.box(lo, hi), want)
+
+    # Outlier removal: the scattered points go, the walls stay.
+    keep = index.inliers(0.05, 3)
+    assert keep[on_wall].mean() > 0.99 and keep[~on_wall].mean() < 0.3
+
+    print("All spatial index tests passed")
+
+
+if __name__ == "__main__":
+    try:
+        run()
+    except AssertionError as e:
+        print("TEST FAILED:", e)
+        sys.exit(1)
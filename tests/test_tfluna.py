@@ -0,0 +1,48 @@
+import sys
+
+
+def run():
+    import numpy as np
+
+    from hal.mocks import MockSerial
+    from hal.tfluna import TFLunaDecoder, encode_frames
+
+    dist = np.arange(100, 400, dtype=np.uint16)
+    stream = encode_frames(dist, 1200, 40.0)
+
+    # Clean stream arriving in awkward chunk sizes decodes completely.
+    dec = TFLunaDecoder(capacity=64)
+    port = MockSerial(stream, chunk=13)
+    out = []
+    while port.in_waiting:
+        out.append(dec.drain(port))
+    out = np.concatenate(out)
+    assert out["distance_cm"].tolist() == dist.tolist(), "decoded distances should match"
+    assert np.allclose(out["temperature_c"], 40.0), "temperature should round-trip"
+    assert dec.frames == len(dist) and dec.dropped == 0 and dec.bad_checksum == 0
+
+    # Corrupt one byte in frame 5 and splice garbage in front of frame 10.
+    raw = bytearray(stream)
+    raw[5 * 9 + 3] ^= 0xFF
+    raw[10 * 9:10 * 9] = b"\x59\x00\x13"
+    dec = TFLunaDecoder()
+    out = dec.feed(bytes(raw))
+    assert len(out) == len(dist) - 1, "only the corrupted frame should be lost"
+    assert dec.bad_checksum == 1, "corrupted frame should be counted"
+    assert dec.dropped == 1, "one frame worth of bytes should be dropped"
+    assert dec.skipped_bytes == 9 + 3
+
+    # A 0x59 0x59 pair inside the payload must not desync the stream.
+    tricky = encode_frames([0x5959, 0x5959, 500], 0x5959, 20.0)
+    out = TFLunaDecoder().feed(tricky)
+    assert out["distance_cm"].tolist() == [0x5959, 0x5959, 500]
+
+    print("All TF-Luna decoder tests passed")
+
+
+if __name__ == "__main__":
+    try:
+        run()
+    except AssertionError as e:
+        print("TEST FAILED:", e)
+        sys.exit(1)
@@ -0,0 +1,140 @@
+import sys
+
+
+def run():
+    import time
+
+    import numpy as np
+
+    from hal.acquisition import Acquisition
+    from hal.interfaces import Camera
+    from scanner.timesync import (AsOfJoin, ClockEstimator, MidpointStamp, SensorClockStamp, asof_indices,
+                                  jitter_report, merge_order)
+
+    rng = np.random.default_rng(0)
+
+    # A sensor clock 12.3 s behind the host, running 80 ppm slow, seen
+    # through 1 ms of fixed latency plus queueing delay.
+    true_t = np.cumsum(rng.uniform(0.004, 0.006, 5000)) + 100.0
+    sensor_t = (true_t - 12.3) * (1 - 80e-6)
+    arrival = true_t + 0.001 + rng.exponential(0.002, len(true_t))
+    est = ClockEstimator(window=2048, latency=0.001)
+    est.observe(sensor_t, arrival)
+    err = est.to_host(sensor_t[-2048:]) - true_t[-2048:]
+    assert np.abs(err).max() < 2e-4, np.abs(err).max()
+    assert abs(est.skew * 1e6 - 80) < 10, est.skew
+    report = est.report()
+    assert 1.0 < report["queue_delay_ms"]["p50"] < 2.0 and report["observations"] == 5000
+
+    # TF-Luna at 100 Hz read in bursts: the frame counter recovers emission
+    # times that the read-end stamps miss by whole read periods.
+    emitted = 50.0 + np.arange(3000) * 0.01 * (1 + 30e-6)
+    read_at = emitted[0] + np.cumsum(rng.uniform(0.015, 0.030, 2500))
+    stamp = SensorClockStamp("frame_index", scale=0.01, latency=9 * 10 / 115200)
+    got, naive = [], []
+    for k, t in enumerate(emitted):
+        end = read_at[np.searchsorted(read_at, t + 9 * 10 / 115200)] + rng.uniform(0, 2e-4)
+        got.append(stamp({"frame_index": k}, end - 1e-4, end))
+        naive.append(end)
+    late = np.abs(np.array(got[1000:]) - emitted[1000:])
+    assert late.max() < 5e-4, late.max()
+    assert np.abs(np.array(naive[1000:]) - emitted[1000:]).mean() > 5e-3
+    assert stamp({}, 1.0, 2.0) == 2.0, "readings without a sensor clock keep the read end"
+    assert abs(MidpointStamp(age=0.005)({}, 10.0, 10.002) - 9.996) < 1e-9
+
+    # As-of indices against brute force.
+    left = np.sort(rng.uniform(0, 10, 500))
+    right = np.sort(rng.uniform(0, 10, 300))
+    for direction in ("backward", "forward", "nearest"):
+        idx = asof_indices(left, right, 0.05, direction)
+        for i, t in enumerate(left):
+            d = right - t
+            if direction == "backward":
+                cand = np.flatnonzero(d <= 0)
+                best = cand[-1] if len(cand) else -1
+            elif direction == "forward":
+                cand = np.flatnonzero(d >= 0)
+                best = cand[0] if len(cand) else -1
+            else:
+                best = int(np.argmin(np.abs(d)))
+            if best >= 0 and abs(d[best]) > 0.05:
+                best = -1
+            assert idx[i] == best or (best >= 0 and abs(d[idx[i]]) == abs(d[best])), (direction, i)
+    stream, index = merge_order(left, right)
+    merged = np.where(stream == 0, left[index], right[np.minimum(index, len(right) - 1)])
+    assert (np.diff(merged) >= 0).all() and (stream == 1).sum() == len(right)
+
+    # The streaming join gives the offline answer whatever the arrival pattern.
+    dt = np.dtype([("t", "<f8"), ("v", "<f4")])
+    rng_t = np.zeros(2000, dt)
+    rng_t["t"] = np.arange(2000) * 0.004
+    rng_t["v"] = np.arange(2000)
+    imu = np.zeros(800, dt)
+    imu["t"] = np.arange(800) * 0.01 + 0.0013
+    imu["v"] = -np.arange(800)
+    join = AsOfJoin("range", ["imu"], tolerance=0.006, direction="nearest", capacity=256)
+    out_t, out_v, out_ok = [], [], []
+
+    def collect(res):
+        if len(res["primary"]):
+            out_t.extend(res["primary"]["t"].tolist())
+            out_v.extend(res["matches"]["imu"]["v"].tolist())
+            out_ok.extend(res["valid"]["imu"].tolist())
+
+    # Each stream arrives in bursts and up to 50 ms late.
+    a = b = 0
+    for clock in np.arange(0, 8.2, 0.02):
+        a_to = max(a, int(np.searchsorted(rng_t["t"], clock - rng.uniform(0, 0.05))))
+        b_to = max(b, int(np.searchsorted(imu["t"], clock - rng.uniform(0, 0.05))))
+        join.push("range", rng_t[a:a_to])
+        join.push("imu", imu[b:b_to])
+        a, b = a_to, b_to
+        collect(join.pop())
+    join.push("range", rng_t[a:])
+    join.push("imu", imu[b:])
+    join.close()
+    collect(join.pop())
+    expect = asof_indices(rng_t["t"], imu["t"], 0.006, "nearest")
+    assert out_t == rng_t["t"].tolist() and join.emitted == len(rng_t)
+    assert out_ok == (expect >= 0).tolist()
+    assert np.array_equal(np.array(out_v)[expect >= 0], imu["v"][expect[expect >= 0]])
+    assert sum(join.dropped.values()) == 0, join.dropped
+    small = AsOfJoin("range", ["imu"], capacity=100)
+    small.push("range", rng_t[:300])
+    assert small.dropped["range"] == 200 and not len(small.pop()["primary"]), "waits for the other stream"
+
+    # Jitter report.
+    t = np.arange(1000) * 0.01
+    t[500:] += 0.03
+    rep = jitter_report(t + rng.normal(0, 1e-4, len(t)), 0.01)
+    assert rep["gaps"] == 1 and rep["jitter_ms"]["p50"] < 0.2 and 99 < rep["rate_hz"] < 101
+
+    # Acquisition stamps samples at the sensor's event time.
+    class LaggyCamera(Camera):
+        def capture(self):
+            time.sleep(0.004)
+            return {"timestamp": time.time(), "frame_id": 0, "data": None,
+                    "sensor_timestamp": time.monotonic() - 0.004}
+
+    acq = Acquisition()
+    cam_sync = SensorClockStamp("sensor_timestamp", shared=True)
+    acq.add("cam", LaggyCamera(), rate=100, sync=cam_sync)
+    acq.add("plain", LaggyCamera(), rate=100)
+    with acq:
+        time.sleep(0.5)
+    cam, plain = acq.tasks["cam"].ring.latest(20)["t"], acq.tasks["plain"].ring.latest(20)["t"]
+    assert len(cam) == 20 and len(plain) == 20
+    rep = acq.report()
+    assert rep["cam"]["sync"]["method"].startswith("sensor clock") and 0.002 < rep["cam"]["sync"]["offset_s"] < 0.02
+    assert cam_sync({"sensor_timestamp": 5.0}, 5.001, 5.004) == 5.0, "shared clocks are not re-estimated"
+    assert "stamp_jitter_ms" in rep["plain"] and rep["plain"]["sync"] == {"method": "end"}
+
+    print("All timesync tests passed")
+
+
+if __name__ == "__main__":
+    try:
+        run()
+    except AssertionError as e:
+        print("TEST FAILED:", e)
+        sys.exit(1)
@@ -0,0 +1,109 @@
+import sys
+
+
+def run():
+    import time
+
+    import numpy as np
+
+    from scanner.transport import (
+        PointCloudClient, PointCloudServer, changed_voxels, coarsen, decode_chunk, decode_header, encode_update,
+    )
+    from scanner.voxel import VoxelMap, pack_keys
+
+    rng = np.random.default_rng(0)
+
+    # Chunks round-trip, including voxels far enough apart to need
+    # separate int16 origins.
+    ijk = np.concatenate([rng.integers(-500, 500, (3000, 3)), rng.integers(40000, 41000, (100, 3))])
+    occ = rng.integers(0, 256, len(ijk)).astype(np.uint8)
+    hits = rng.integers(0, 256, len(ijk)).astype(np.uint8)
+    msgs = encode_update(ijk, occ, hits, version=7, voxel_size=0.05, chunk_points=1000)
+    decoded = [decode_chunk(decode_header(m), m[28:]) for m in msgs]
+    got = np.concatenate([d["ijk"] for d in decoded])
+    order_a = np.lexsort(ijk.T)
+    order_b = np.lexsort(got.T)
+    assert np.array_equal(got[order_b], ijk[order_a]), "voxel coordinates did not round-trip"
+    assert np.array_equal(np.concatenate([d["occ"] for d in decoded])[order_b], occ[order_a])
+    assert decode_header(msgs[-1])["flags"] & 2 and not decode_header(msgs[0])["flags"] & 2
+
+    c_ijk, c_occ, c_hits = coarsen(np.array([[0, 0, 0], [1, 1, 1], [4, 0, 0]]), np.array([10, 200, 5], np.uint8),
+                                   np.array([200, 100, 1], np.uint8), level=2)
+    assert c_ijk.tolist() == [[0, 0, 0], [1, 0, 0]] and c_occ.tolist() == [200, 5] and c_hits.tolist() == [255, 1]
+
+    def scan(vmap, n=5000):
+        vmap.insert(rng.uniform(-2.0, 2.0, (n, 3)))
+
+    for udp in (False, True):
+        vmap = VoxelMap(voxel_size=0.1)
+        with PointCloudServer(udp=udp) as server:
+            client = PointCloudClient(*server.address, udp=udp)
+            deadline = time.monotonic() + 2.0
+            while not server.clients and time.monotonic() < deadline:
+                time.sleep(0.01)
+            scan(vmap)
+            server.publish(vmap)
+            assert client.wait_for(vmap.tick), f"udp={udp}: first update not received"
+            assert len(client.store) == len(vmap)
+
+            # Only voxels touched since the last version go out again.
+            before = client.store.size
+            vmap.insert(np.array([vmap.snapshot()["centroid"][0], [9.0, 9.0, 9.0]]))
+            sent_before = client.bytes
+            server.publish(vmap)
+            assert client.wait_for(vmap.tick)
+            assert client.store.size == before + 1
+            assert client.bytes - sent_before < 200, "delta update should only carry the changed voxels"
+            ijk, occ, _ = changed_voxels(vmap, 0)
+            ids = client.store._index.lookup(pack_keys(ijk))
+            assert (ids >= 0).all() and np.array_equal(client.store.occ[ids], occ), "client map differs from server"
+
+            # A ray through a voxel lowers its occupancy, and that goes out too.
+            target = vmap.snapshot()["centroid"][0]
+            origin = target - np.array([1.0, 0.0, 0.0])
+            vmap.insert([target + np.array([1.0, 0.0, 0.0])], origin=origin, free_space=True)
+            server.publish(vmap)
+            assert client.wait_for(vmap.tick)
+            ijk, occ, _ = changed_voxels(vmap, 0)
+            ids = client.store._index.lookup(pack_keys(ijk))
+            assert np.array_equal(client.store.occ[ids], occ), "cleared voxels should reach the client"
+            client.close()
+
+    # Evicted voxels cannot be sent as removals, so evicting maps are refused.
+    with PointCloudServer() as server:
+        try:
+            server.publish(VoxelMap(voxel_size=0.1, max_voxels=1000))
+            raise AssertionError("a map with max_voxels should be refused")
+        except ValueError:
+            pass
+
+    # A slow client gets dropped or coarsened updates, never an unbounded
+    # queue, and still converges once it catches up.
+    vmap = VoxelMap(voxel_size=0.05)
+    with PointCloudServer(max_queue=4, policy="coarsen", chunk_points=256, send_buffer=4096) as server:
+        client = PointCloudClient(*server.address, delay=0.002, recv_buffer=4096)
+        while not server.clients:
+            time.sleep(0.01)
+        for _ in range(40):
+            scan(vmap, 2000)
+            server.publish(vmap)
+            assert all(c.queue.qsize() <= 4 for c in server.clients.values())
+        stats = next(iter(server.report().values()))
+        assert stats["dropped"] + stats["coarsened"] > 0, "backlog policy never triggered"
+        for _ in range(100):
+            server.publish(vmap)
+            if client.version >= vmap.tick or client.receive(timeout=2.0) is None:
+                break
+        assert len(client.store) == len(vmap), "slow client did not converge to the full map"
+        assert client.coarse, "coarse updates should have been delivered while behind"
+        client.close()
+
+    print("All transport tests passed")
+
+
+if __name__ == "__main__":
+    try:
+        run()
+    except AssertionError as e:
+        print("TEST FAILED:", e)
+        sys.exit(1)
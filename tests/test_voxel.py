@@ -0,0 +1,56 @@
+import sys
+
+
+def run():
+    import numpy as np
+
+    from scanner.voxel import KeyIndex, VoxelMap, pack_keys, unpack_keys
+
+    ijk = np.array([[0, 0, 0], [-1, 2, -3], [100000, -100000, 7]])
+    assert np.array_equal(unpack_keys(pack_keys(ijk)), ijk), "key packing should round-trip"
+
+    rng = np.random.default_rng(0)
+    keys = rng.integers(0, 1 << 62, 50000)
+    index = KeyIndex(16)
+    index.insert(keys, np.arange(len(keys)))
+    assert np.array_equal(index.lookup(keys), np.arange(len(keys))), "hash lookups should find every key"
+    assert (index.lookup(keys + 1) == -1).all(), "absent keys should miss"
+
+    # Counts and centroids match a brute-force binning, across batches.
+    pts = rng.uniform(-1.0, 1.0, (20000, 3))
+    vmap = VoxelMap(voxel_size=0.25)
+    vmap.insert(pts[:12000])
+    vmap.insert(pts[12000:])
+    snap = vmap.snapshot()
+    ref_keys, inv, ref_counts = np.unique(vmap.voxel_keys(pts), return_inverse=True, return_counts=True)
+    order = np.argsort(pack_keys(snap["ijk"]))
+    assert np.array_equal(pack_keys(snap["ijk"])[order], ref_keys)
+    assert np.array_equal(snap["count"][order], ref_counts), "voxel counts should match brute force"
+    ref_centroid = np.stack([np.bincount(inv.ravel(), pts[:, a]) for a in range(3)], axis=1) / ref_counts[:, None]
+    assert np.allclose(snap["centroid"][order], ref_centroid, atol=1e-5), "centroids should match brute force"
+
+    # Hits raise occupancy, misses along a later ray lower it.
+    vmap = VoxelMap(voxel_size=0.1)
+    vmap.insert([[1.05, 0.05, 0.05]] * 3)
+    before = vmap.snapshot()["log_odds"][0]
+    vmap.insert([[2.05, 0.05, 0.05]], origin=(0.05, 0.05, 0.05), free_space=True)
+    snap = vmap.snapshot()
+    assert snap["log_odds"][0] < before, "a ray through an occupied voxel should lower its log-odds"
+
+    # Memory cap: stale, distant voxels go first.
+    vmap = VoxelMap(voxel_size=0.1, max_voxels=1000, evict_fraction=0.2)
+    vmap.insert(rng.uniform(50.0, 60.0, (900, 3)), origin=(0.0, 0.0, 0.0))
+    recent = rng.uniform(0.0, 1.0, (500, 3))
+    vmap.insert(recent, origin=(0.0, 0.0, 0.0))
+    assert len(vmap) <= 1000 and vmap.evicted > 0
+    assert np.isin(vmap.voxel_keys(recent), vmap.keys[:len(vmap)]).all(), "recent voxels must survive eviction"
+
+    print("All voxel map tests passed")
+
+
+if __name__ == "__main__":
+    try:
+        run()
+    except AssertionError as e:
+        print("TEST FAILED:", e)
+        sys.exit(1)
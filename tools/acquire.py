@@ -0,0 +1,195 @@
+"""Capture TF-Luna, BNO055 and camera samples concurrently.
+
+Runs every sensor on its own thread through `hal.acquisition`, then prints a
+JSON report with per-sensor sample rate, read latency and jitter. With
+`--log`, range and IMU samples are also written to a binary scan log.
+`--metrics-port` and `--metrics-json` turn on `scanner.instrument` and
+export its metrics; `--profile` writes a sampled folded-stack profile.
+Hardware samples are stamped at the time they were taken on the shared
+monotonic clock (see `scanner.timesync`); `--sync end` keeps read-end stamps.
+`--adaptive` lets `hal.adaptive.RateController` set the TF-Luna and IMU rates
+from motion and signal strength, and adds its report under "adaptive".
+
+Usage:
+  python3 tools/acquire.py --duration 10
+  python3 tools/acquire.py --mock --duration 5 --imu-rate 100 --range-rate 250
+  python3 tools/acquire.py --duration 60 --log test_outputs/scan.scanlog
+  python3 tools/acquire.py --replay test_outputs/scan.scanlog --speed 4 --duration 0
+  python3 tools/acquire.py --duration 30 --adaptive
+  python3 tools/acquire.py --mock --metrics-port 9108 --metrics-json metrics.json --profile acquire.folded
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+def build_sensors(args):
+    sensors = []
+    if args.replay:
+        from hal.replay import ReplayCamera, ReplayClock, ReplayIMU, ReplayRangefinder
+
+        # Replayed sensors free-run; the shared clock restores the recorded
+        # timing (or none at all with --speed 0).
+        clock = ReplayClock(args.speed)
+        path = Path(args.replay)
+        camera_path = path.with_suffix(".camera.jsonl")
+        if not args.no_range:
+            sensors.append(("range", ReplayRangefinder(path, clock=clock), None, None))
+        if not args.no_imu:
+            sensors.append(("imu", ReplayIMU(path, clock=clock), None, None))
+        if not args.no_camera and camera_path.exists():
+            sensors.append(("camera", ReplayCamera(camera_path, clock=clock), None, None))
+        return sensors
+    if args.mock:
+        from hal.mocks import MockCamera, MockIMU, MockRangefinder
+
+        # Mirror the hardware setup: the mock TF-Luna paces itself, the
+        # other sensors are polled on a schedule.
+        if not args.no_range:
+            sensors.append(("range", MockRangefinder(seed=0, rate=args.range_rate), None, None))
+        if not args.no_imu:
+            sensors.append(("imu", MockIMU(seed=0), args.imu_rate, None))
+        if not args.no_camera:
+            sensors.append(("camera", MockCamera(seed=0), args.camera_rate, None))
+        return sensors
+
+    from hal.drivers import BNO055IMU, PiCamera, TFLunaRangefinder
+    from scanner.timesync import MidpointStamp, SensorClockStamp
+
+    # The TF-Luna streams at its own configured rate, so it free-runs;
+    # the IMU and camera are polled on a fixed schedule. Each is stamped
+    # from the best clock it has: the TF-Luna frame counter, the middle of
+    # the BNO055 transaction, the camera's own SensorTimestamp. The frame
+    # counter only measures time at a fixed rate, so with --adaptive the
+    # TF-Luna is stamped at read end.
+    stamp = args.sync == "sensor"
+    if not args.no_range:
+        sync = SensorClockStamp("frame_index", scale=1.0 / args.tfluna_rate,
+                                latency=9 * 10 / args.tfluna_baud) if stamp and not args.adaptive else None
+        sensors.append(("range", TFLunaRangefinder(args.tfluna_port, args.tfluna_baud, rate=args.tfluna_rate), None, sync))
+    if not args.no_imu:
+        sync = MidpointStamp(age=0.5 / args.imu_rate) if stamp else None
+        sensors.append(("imu", BNO055IMU(int(args.bno_address, 16), rate=args.imu_rate), args.imu_rate, sync))
+    if not args.no_camera:
+        sync = SensorClockStamp("sensor_timestamp", shared=True) if stamp else None
+        sensors.append(("camera", PiCamera(), args.camera_rate, sync))
+    return sensors
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Acquire all sensors concurrently.")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds to run (0 = until Ctrl-C)")
+    parser.add_argument("--mock", action="store_true", help="Use hal.mocks sensors instead of hardware")
+    parser.add_argument("--replay", default=None, help="Replay a recorded .scanlog session instead of sensors")
+    parser.add_argument("--speed", type=float, default=1.0, help="Replay speed (1 = real time, 0 = as fast as possible)")
+    parser.add_argument("--imu-rate", type=float, default=100.0)
+    parser.add_argument("--range-rate", type=float, default=250.0, help="Mock TF-Luna rate (real sensor free-runs)")
+    parser.add_argument("--camera-rate", type=float, default=30.0)
+    parser.add_argument("--no-imu", action="store_true")
+    parser.add_argument("--no-range", action="store_true")
+    parser.add_argument("--no-camera", action="store_true")
+    parser.add_argument("--tfluna-port", default="/dev/serial0")
+    parser.add_argument("--tfluna-baud", type=int, default=115200)
+    parser.add_argument("--tfluna-rate", type=float, default=100.0, help="TF-Luna configured output rate (Hz)")
+    parser.add_argument("--bno-address", default="0x28")
+    parser.add_argument("--sync", choices=("sensor", "end"), default="sensor",
+                        help="Stamp hardware samples from sensor clocks or at read end")
+    parser.add_argument("--adaptive", action="store_true",
+                        help="Adapt the TF-Luna and IMU rates to motion and signal strength")
+    parser.add_argument("--report", default=None, help="Also write the JSON report to this path")
+    parser.add_argument("--log", default=None, help="Write range/IMU samples to this .scanlog file")
+    parser.add_argument("--metrics-port", type=int, default=None, help="Serve Prometheus metrics on this port")
+    parser.add_argument("--metrics-json", default=None, help="Rewrite a JSON metrics snapshot at this path")
+    parser.add_argument("--metrics-interval", type=float, default=5.0, help="Seconds between JSON snapshots")
+    parser.add_argument("--profile", default=None, help="Write a sampling profile (folded stacks) to this path")
+    args = parser.parse_args()
+
+    from hal.acquisition import Acquisition
+    from scanner import instrument
+
+    server = exporter = profiler = None
+    if args.metrics_port is not None or args.metrics_json:
+        instrument.enable()
+    if args.metrics_port is not None:
+        server = instrument.serve(args.metrics_port)
+        print(f"Metrics on http://127.0.0.1:{server.server_address[1]}/metrics", file=sys.stderr)
+    if args.metrics_json:
+        exporter = instrument.JsonExporter(args.metrics_json, args.metrics_interval).start()
+    if args.profile:
+        profiler = instrument.SamplingProfiler().start()
+
+    acq = Acquisition()
+    for name, sensor, rate, sync in build_sensors(args):
+        acq.add(name, sensor, rate=rate, sync=sync)
+
+    log = None
+    subs = {}
+    if args.log:
+        from scanner.scanlog import ScanLogWriter
+
+        log = ScanLogWriter(args.log, metadata={"clock": "monotonic"})
+        subs = {name: acq.subscribe(name) for name in ("range", "imu") if name in acq.tasks}
+
+    controller = None
+    if args.adaptive:
+        from hal.adaptive import RateController
+
+        controller = RateController(rangefinder=acq.tasks.get("range"), imu=acq.tasks.get("imu"))
+        watched = {name: acq.subscribe(name) for name in ("range", "imu") if name in acq.tasks}
+
+    def drain_to_log():
+        for name, sub in subs.items():
+            records = sub.poll()
+            if len(records):
+                log.append(name, records)
+
+    def adapt():
+        polled = {name: sub.poll() for name, sub in watched.items()}
+        controller.update(polled.get("imu"), polled.get("range"))
+
+    acq.start()
+    deadline = time.monotonic() + args.duration if args.duration > 0 else None
+    try:
+        while deadline is None or time.monotonic() < deadline:
+            time.sleep(0.1 if deadline is None else min(0.1, max(0.0, deadline - time.monotonic())))
+            drain_to_log()
+            if controller is not None:
+                adapt()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        acq.stop()
+        for task in acq.tasks.values():
+            close = getattr(task.sensor, "close", None)
+            if close:
+                close()
+        if log is not None:
+            drain_to_log()
+            log.close()
+            print(f"Wrote {args.log}", file=sys.stderr)
+        if profiler is not None:
+            profiler.stop()
+            profiler.write(args.profile)
+            print(f"Wrote {args.profile} ({profiler.samples} samples)", file=sys.stderr)
+        if exporter is not None:
+            exporter.stop()
+        if server is not None:
+            server.shutdown()
+
+    report = acq.report()
+    if controller is not None:
+        report["adaptive"] = controller.report()
+    if instrument.ENABLED:
+        report["metrics"] = instrument.snapshot()
+    report = json.dumps(report, indent=2)
+    print(report)
+    if args.report:
+        Path(args.report).write_text(report + "\n")
+
+
+if __name__ == "__main__":
+    main()
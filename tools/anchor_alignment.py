@@ -4,20 +4,49 @@ Usage:
   python3 tools/anchor_alignment.py --observations test_outputs/anchors_YYYYMMDD_*.jsonl --known known_anchors.json
 
 `known_anchors.json` should be a dict {id: [x,y,z], ...} in world meters.
+Observations can be the JSONL written by aruco_anchor_publisher.py or a binary
+`.scanlog` with a `marker` stream (see scanner/scanlog.py).
 
 The script loads observations (marker tvecs in camera frame) and computes a rigid
 transform (rotation + translation) from camera frame to world frame using
 Procrustes / Umeyama on matched anchors.
+
+With --online, observations are replayed through `scanner.alignment.OnlineAligner`
+instead: one camera-to-world transform (with per-anchor residuals and RANSAC
+inliers) is printed as a JSON line per frame, fitted over a sliding time window.
+
+  python3 tools/anchor_alignment.py --observations scan.scanlog --known known_anchors.json --online --window 0.5
 """
 import argparse
 import json
-import numpy as np
+import sys
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+def _load_scanlog_markers(path, obs):
+    import numpy as np
+    from scanner.scanlog import ScanLogReader
+
+    cols = ScanLogReader(path).read("marker")
+    posed = np.flatnonzero(cols["has_pose"])
+    ts = cols["t"][posed].tolist()
+    ids = cols["id"][posed].tolist()
+    tvecs = cols["tvec"][posed].astype(np.float64)
+    for ts_i, mid, tvec in zip(ts, ids, tvecs):
+        obs.setdefault(mid, []).append((ts_i, tvec))
+
 
 def load_observations(paths):
+    import numpy as np
+    from scanner.scanlog import is_scanlog
+
     obs = {}
     for p in paths:
+        if is_scanlog(p):
+            _load_scanlog_markers(p, obs)
+            continue
         with open(p) as fh:
             for line in fh:
                 rec = json.loads(line)
@@ -28,31 +57,47 @@ def load_observations(paths):
     return obs
 
 
-def umeyama(src, dst):
-    # src, dst: Nx3 arrays. returns R, t
-    assert src.shape == dst.shape
-    mu_src = src.mean(axis=0)
-    mu_dst = dst.mean(axis=0)
-    src_c = src - mu_src
-    dst_c = dst - mu_dst
-    cov = src_c.T @ dst_c / src.shape[0]
-    U, S, Vt = np.linalg.svd(cov)
-    R = U @ Vt
-    if np.linalg.det(R) < 0:
-        Vt[-1, :] *= -1
-        R = U @ Vt
-    t = mu_dst - R @ mu_src
-    return R, t
+def load_marker_records(paths):
+    import numpy as np
+    from scanner.scanlog import ScanLogReader, is_scanlog, jsonl_to_markers
+
+    parts = []
+    for p in paths:
+        if is_scanlog(p):
+            parts.append(ScanLogReader(p).read("marker"))
+        else:
+            with open(p) as fh:
+                parts.append(jsonl_to_markers(fh))
+    records = np.concatenate(parts)
+    return records[np.argsort(records["t"], kind="stable")]
+
+
+def run_online(args, known):
+    from scanner.alignment import OnlineAligner, fit_to_json
+
+    aligner = OnlineAligner(known, window=args.window, inlier_threshold=args.threshold)
+    for fit in aligner.stream(load_marker_records(args.observations)):
+        print(json.dumps(fit_to_json(fit)))
 
 
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("--observations", nargs="+", required=True)
     parser.add_argument("--known", required=True, help="JSON file mapping id->[x,y,z]")
+    parser.add_argument("--online", action="store_true", help="Stream a windowed RANSAC fit per frame")
+    parser.add_argument("--window", type=float, default=1.0, help="Online window in seconds")
+    parser.add_argument("--threshold", type=float, default=0.05, help="Online inlier threshold in meters")
     args = parser.parse_args()
 
-    obs = load_observations(args.observations)
+    import numpy as np
+    from scanner.alignment import umeyama
+
     known = json.load(open(args.known))
+    if args.online:
+        run_online(args, known)
+        return
+
+    obs = load_observations(args.observations)
 
     # For each marker id, pick the most recent observed tvec
     ids = []
@@ -61,9 +106,7 @@ def main():
     for mid, samples in obs.items():
         if str(mid) not in known and mid not in known:
             continue
-        # choose latest sample
-        samples.sort(key=lambda x: x[0])
-        tvec = samples[-1][1]
+        tvec = max(samples, key=lambda x: x[0])[1]
         ids.append(mid)
         cam_pts.append(tvec)
         world_pts.append(np.array(known.get(str(mid), known.get(mid))))
@@ -3,44 +3,82 @@
 Writes newline-delimited JSON records to `test_outputs/anchors_<timestamp>.jsonl`.
 Each record contains: timestamp, markers: [{id, tvec, rvec}].
 
-Usage: python3 tools/aruco_anchor_publisher.py --calib camera.npz --marker-length 0.05
+Capture and detection are pipelined (`scanner.markers`): frames are grabbed
+on one thread and detected on a pool of workers, and records are written in
+frame order. A per-stage latency report is printed to stderr on exit.
+
+Poses need a camera calibration: this device's latest one from
+tools/calibrate.py, or the .npz given with --calib.
+
+Usage: python3 tools/aruco_anchor_publisher.py --marker-length 0.05
+       python3 tools/aruco_anchor_publisher.py --calib camera.npz --marker-length 0.05
+       python3 tools/aruco_anchor_publisher.py --mock --frames 100
 """
 import argparse
 import json
+import sys
 import time
 from pathlib import Path
 
-def load_calibration(path):
-    import numpy as np
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+def load_calibration(args):
+    from scanner.calibration import device_serial, load_calibration
+
+    serial = args.serial or (None if args.mock else device_serial())
+    calib = load_calibration(args.calib, serial)
+    if calib is None or not calib.has_intrinsics:
+        return None, None
+    return calib.camera_matrix, calib.dist_coeffs
 
-    data = np.load(path)
-    return data["camera_matrix"], data["dist_coeffs"]
+
+def frame_record(result):
+    rec = {"timestamp": result["timestamp"], "markers": []}
+    for m in result["markers"]:
+        if m["has_pose"]:
+            rec["markers"].append({"id": int(m["id"]), "tvec": m["tvec"].tolist(), "rvec": m["rvec"].tolist()})
+        else:
+            # No pose, only ids and corner pixel coords
+            rec["markers"].append({"id": int(m["id"]), "corners": m["corners"].tolist()})
+    return rec
 
 
 def main():
     parser = argparse.ArgumentParser(description="Publish ArUco anchor poses to a JSONL file")
     parser.add_argument("--calib", default=None, help=".npz with camera_matrix and dist_coeffs")
+    parser.add_argument("--serial", default=None, help="Use this device's stored calibration (default: this board)")
     parser.add_argument("--marker-length", type=float, default=0.05, help="Marker side length in meters")
     parser.add_argument("--out", default=None, help="Output jsonl path (default: test_outputs/anchors_<ts>.jsonl)")
-    parser.add_argument("--rate", type=float, default=5.0, help="Frames per second to check")
+    parser.add_argument("--rate", type=float, default=0.0, help="Max frames per second (0 = camera rate)")
+    parser.add_argument("--workers", type=int, default=3, help="Detection threads")
+    parser.add_argument("--no-roi", action="store_true", help="Search the whole frame every time")
+    parser.add_argument("--frames", type=int, default=None, help="Stop after this many frames")
+    parser.add_argument("--mock", action="store_true", help="Use synthetic MockCamera frames")
     parser.add_argument("--display", action="store_true", help="Show detection preview")
     args = parser.parse_args()
 
-    try:
-        from picamera2 import Picamera2
-    except Exception as e:
-        raise SystemExit("picamera2 is required: sudo apt install -y python3-picamera2")
-
     try:
         import cv2
-        import numpy as np
     except Exception:
         raise SystemExit("OpenCV is required: sudo apt install -y python3-opencv")
 
-    cam_mtx = None
-    dist = None
-    if args.calib:
-        cam_mtx, dist = load_calibration(args.calib)
+    if args.mock:
+        from hal.mocks import MockCamera
+
+        camera = MockCamera(seed=0, size=(1280, 720))
+    else:
+        try:
+            from hal.drivers import PiCamera
+
+            # The Y plane is already grayscale, so no conversion is needed.
+            camera = PiCamera((1280, 720), gray=True)
+        except ImportError:
+            raise SystemExit("picamera2 is required: sudo apt install -y python3-picamera2")
+
+    from scanner.markers import DetectionPipeline, MarkerDetector
+
+    cam_mtx, dist = load_calibration(args)
 
     project_root = Path(__file__).resolve().parent.parent
     out_dir = project_root / "test_outputs"
@@ -51,52 +89,36 @@ def main():
         ts = time.strftime("%Y%m%d_%H%M%S")
         out_path = out_dir / f"anchors_{ts}.jsonl"
 
-    camera = Picamera2()
-    config = camera.create_preview_configuration(main={"size": (1280, 720)})
-    camera.configure(config)
-    camera.start()
-
-    dictionary = cv2.aruco.getPredefinedDictionary(cv2.aruco.DICT_4X4_50)
-    detector = cv2.aruco.ArucoDetector(dictionary)
-
-    interval = 1.0 / max(args.rate, 0.1)
+    detector = MarkerDetector(
+        camera_matrix=cam_mtx, dist_coeffs=dist, marker_length=args.marker_length, roi=not args.no_roi
+    )
+    pipe = DetectionPipeline(detector, workers=args.workers, keep_frames=args.display)
     with open(out_path, "a") as fh:
         try:
-            while True:
-                frame = camera.capture_array()
-                gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-                corners, ids, _ = detector.detectMarkers(gray)
-                rec = {"timestamp": time.time(), "markers": []}
-                if ids is not None and len(ids) > 0:
-                    ids_list = [int(x) for x in ids.flatten()]
-                    if cam_mtx is not None and dist is not None:
-                        rvecs, tvecs, _ = cv2.aruco.estimatePoseSingleMarkers(
-                            corners, args.marker_length, cam_mtx, dist
-                        )
-                        for idx, marker_id in enumerate(ids_list):
-                            tvec = tvecs[idx][0].tolist()
-                            rvec = rvecs[idx][0].tolist()
-                            rec["markers"].append({"id": int(marker_id), "tvec": tvec, "rvec": rvec})
-                    else:
-                        # No pose, only ids and corner pixel coords
-                        for idx, marker_id in enumerate(ids_list):
-                            pts = corners[idx][0].astype(float).reshape(-1, 2).tolist()
-                            rec["markers"].append({"id": int(marker_id), "corners": pts})
-
-                fh.write(json.dumps(rec) + "\n")
+            for result in pipe.stream(camera, max_frames=args.frames, rate=args.rate or None):
+                fh.write(json.dumps(frame_record(result)) + "\n")
                 fh.flush()
 
                 if args.display:
-                    if ids is not None and len(ids) > 0:
-                        cv2.aruco.drawDetectedMarkers(frame, corners, ids)
+                    frame = result["frame"]
+                    markers = result["markers"]
+                    if len(markers):
+                        cv2.aruco.drawDetectedMarkers(
+                            frame, list(markers["corners"][:, None]), markers["id"].reshape(-1, 1)
+                        )
                     cv2.imshow("Aruco", frame)
                     if cv2.waitKey(1) & 0xFF == ord("q"):
                         break
-                time.sleep(interval)
+        except KeyboardInterrupt:
+            pass
         finally:
-            camera.stop()
+            pipe.close()
+            close = getattr(camera, "close", None)
+            if close:
+                close()
             if args.display:
                 cv2.destroyAllWindows()
+            print(json.dumps(pipe.report(), indent=2), file=sys.stderr)
 
 
 if __name__ == "__main__":
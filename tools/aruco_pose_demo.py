@@ -1,38 +1,69 @@
+"""Print ArUco detections (and poses, once calibrated) from the Pi Camera 3.
+
+The camera calibration is this device's latest one from tools/calibrate.py,
+or the .npz given with --calib. With --undistort the preview is shown
+undistorted through remap tables computed once and kept with the
+calibration.
+
+Usage:
+  python3 tools/aruco_pose_demo.py --display --undistort
+  python3 tools/aruco_pose_demo.py --calib camera.npz --display
+  python3 tools/aruco_pose_demo.py --mock
+"""
 import argparse
+import json
 import sys
-import time
+from pathlib import Path
 
-import numpy as np
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 
 
-def load_calibration(path):
-    data = np.load(path)
-    camera_matrix = data.get("camera_matrix")
-    dist_coeffs = data.get("dist_coeffs")
-    if camera_matrix is None or dist_coeffs is None:
-        raise ValueError("Calibration file must contain camera_matrix and dist_coeffs.")
-    return camera_matrix, dist_coeffs
+def load_calibration(args):
+    from scanner.calibration import device_serial, load_calibration
+
+    # Mock frames come from no real lens; only an explicit --calib applies.
+    serial = args.serial or (None if args.mock else device_serial())
+    calib = load_calibration(args.calib, serial)
+    if calib is not None and not calib.has_intrinsics:
+        if args.calib:
+            raise ValueError("Calibration file must contain camera_matrix and dist_coeffs.")
+        calib = None
+    return calib
 
 
 def main():
     parser = argparse.ArgumentParser(description="Detect ArUco markers with Pi Camera 3.")
     parser.add_argument("--marker-length", type=float, default=0.05, help="Marker side length (meters)")
     parser.add_argument("--calib", default=None, help="Path to .npz with camera_matrix and dist_coeffs")
-    parser.add_argument("--rate", type=float, default=10.0, help="Detection rate in Hz")
+    parser.add_argument("--serial", default=None, help="Use this device's stored calibration (default: this board)")
+    parser.add_argument("--undistort", action="store_true", help="Show the preview undistorted")
+    parser.add_argument("--rate", type=float, default=0.0, help="Max detection rate in Hz (0 = camera rate)")
+    parser.add_argument("--workers", type=int, default=3, help="Detection threads")
+    parser.add_argument("--no-roi", action="store_true", help="Search the whole frame every time")
     parser.add_argument("--display", action="store_true", help="Show a live preview window")
+    parser.add_argument("--mock", action="store_true", help="Use synthetic 30 Hz MockCamera frames")
     args = parser.parse_args()
 
-    try:
-        from picamera2 import Picamera2
-    except ImportError:
-        print(
-            "picamera2 is not installed. On Raspberry Pi OS, run: sudo apt install -y python3-picamera2",
-            file=sys.stderr,
-        )
-        raise SystemExit(1)
+    if args.mock:
+        from hal.mocks import MockCamera
+
+        camera = MockCamera(seed=0, rate=30.0, size=(1280, 720))
+    else:
+        try:
+            from hal.drivers import PiCamera
+
+            camera = PiCamera((1280, 720), gray=True)
+        except ImportError:
+            print(
+                "picamera2 is not installed. On Raspberry Pi OS, run: sudo apt install -y python3-picamera2",
+                file=sys.stderr,
+            )
+            raise SystemExit(1)
 
     try:
         import cv2
+
+        from scanner.markers import DetectionPipeline, MarkerDetector
     except ImportError:
         print(
             "OpenCV is not installed. On Raspberry Pi OS, run: sudo apt install -y python3-opencv",
@@ -40,51 +71,49 @@ def main():
         )
         raise SystemExit(1)
 
-    camera_matrix = None
-    dist_coeffs = None
-    if args.calib:
-        camera_matrix, dist_coeffs = load_calibration(args.calib)
-
-    camera = Picamera2()
-    config = camera.create_preview_configuration(main={"size": (1280, 720)})
-    camera.configure(config)
-    camera.start()
-
-    dictionary = cv2.aruco.getPredefinedDictionary(cv2.aruco.DICT_4X4_50)
-    detector = cv2.aruco.ArucoDetector(dictionary)
-
-    interval = 1.0 / max(args.rate, 0.1)
+    calib = load_calibration(args)
+    camera_matrix = dist_coeffs = None
+    if calib is not None:
+        camera_matrix, dist_coeffs = calib.camera_matrix, calib.dist_coeffs
+        source = calib.path if calib.version is None else f"{calib.serial} v{calib.version}"
+        print(f"calibration: {source}", file=sys.stderr)
+
+    detector = MarkerDetector(
+        camera_matrix=camera_matrix,
+        dist_coeffs=dist_coeffs,
+        marker_length=args.marker_length,
+        roi=not args.no_roi,
+    )
+    pipe = DetectionPipeline(detector, workers=args.workers, keep_frames=args.display)
+    preview = None
     try:
-        while True:
-            frame = camera.capture_array()
-            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-            corners, ids, _ = detector.detectMarkers(gray)
-
-            if ids is not None and len(ids) > 0:
-                ids_list = [int(x) for x in ids.flatten()]
-                print(f"markers={ids_list}")
-
-                if camera_matrix is not None and dist_coeffs is not None:
-                    rvecs, tvecs, _ = cv2.aruco.estimatePoseSingleMarkers(
-                        corners, args.marker_length, camera_matrix, dist_coeffs
-                    )
-                    for idx, marker_id in enumerate(ids_list):
-                        tvec = tvecs[idx][0]
-                        print(
-                            f"id={marker_id} tvec_m=({tvec[0]:.3f}, {tvec[1]:.3f}, {tvec[2]:.3f})"
-                        )
+        for result in pipe.stream(camera, rate=args.rate or None):
+            markers = result["markers"]
+            if len(markers):
+                print(f"{result['timestamp']:.3f} markers={markers['id'].tolist()}", flush=True)
+                for m in markers[markers["has_pose"] == 1]:
+                    tvec = m["tvec"]
+                    print(f"id={m['id']} tvec_m=({tvec[0]:.3f}, {tvec[1]:.3f}, {tvec[2]:.3f})")
 
             if args.display:
-                cv2.aruco.drawDetectedMarkers(frame, corners, ids)
+                frame = result["frame"]
+                if len(markers):
+                    cv2.aruco.drawDetectedMarkers(frame, list(markers["corners"][:, None]), markers["id"].reshape(-1, 1))
+                if args.undistort and calib is not None:
+                    frame = preview = calib.undistort(frame, out=preview)
                 cv2.imshow("Aruco", frame)
                 if cv2.waitKey(1) & 0xFF == ord("q"):
                     break
-
-            time.sleep(interval)
+    except KeyboardInterrupt:
+        pass
     finally:
-        camera.stop()
+        pipe.close()
+        close = getattr(camera, "close", None)
+        if close:
+            close()
         if args.display:
             cv2.destroyAllWindows()
+        print(json.dumps(pipe.report(), indent=2), file=sys.stderr)
 
 
 if __name__ == "__main__":
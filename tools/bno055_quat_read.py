@@ -1,33 +1,51 @@
 import argparse
+import sys
 import time
-
-import board
-import busio
-import adafruit_bno055
+from pathlib import Path
 
 
 def main():
     parser = argparse.ArgumentParser(description="Read BNO055 quaternion output over I2C.")
     parser.add_argument("--address", default="0x28", help="I2C address (hex), default 0x28")
     parser.add_argument("--rate", type=float, default=10.0, help="Output rate in Hz")
+    parser.add_argument("--mock", action="store_true", help="Read hal.mocks.MockIMU instead of the sensor")
     args = parser.parse_args()
 
     address = int(args.address, 16)
     interval = 1.0 / max(args.rate, 0.1)
 
-    i2c = busio.I2C(board.SCL, board.SDA)
-    sensor = adafruit_bno055.BNO055_I2C(i2c, address=address)
-
-    while True:
-        quat = sensor.quaternion
-        if quat is not None:
-            w, x, y, z = quat
-            timestamp = time.time()
-            print(
-                f"{timestamp:.3f} qw={w:.6f} qx={x:.6f} qy={y:.6f} qz={z:.6f}",
-                flush=True,
-            )
-        time.sleep(interval)
+    if args.mock:
+        sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+        from hal.mocks import MockIMU
+
+        imu = MockIMU(seed=0)
+
+        def read_quat():
+            return imu.read()["quat"]
+    else:
+        import board
+        import busio
+        import adafruit_bno055
+
+        i2c = busio.I2C(board.SCL, board.SDA)
+        sensor = adafruit_bno055.BNO055_I2C(i2c, address=address)
+
+        def read_quat():
+            return sensor.quaternion
+
+    try:
+        while True:
+            quat = read_quat()
+            if quat is not None:
+                w, x, y, z = quat
+                timestamp = time.time()
+                print(
+                    f"{timestamp:.3f} qw={w:.6f} qx={x:.6f} qy={y:.6f} qz={z:.6f}",
+                    flush=True,
+                )
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        pass
 
 
 if __name__ == "__main__":
@@ -0,0 +1,190 @@
+"""Calibrate the camera and the sensor mounting, and keep the results per device.
+
+Results go into the calibration store (see `scanner.calibration`) under
+this board's serial number, as a new version each time. The ArUco tools
+and reconstruct.py pick the latest version up by themselves.
+
+Usage:
+  python3 tools/calibrate.py board --out test_outputs/charuco.png
+  python3 tools/calibrate.py intrinsics test_outputs/charuco/ --workers 4
+  python3 tools/calibrate.py intrinsics --mock --frames 30
+  python3 tools/calibrate.py extrinsics test_outputs/scan.scanlog
+  python3 tools/calibrate.py show
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+IMAGE_SUFFIXES = {".png", ".jpg", ".jpeg", ".bmp", ".pgm", ".tif", ".tiff"}
+
+
+def _vector(text):
+    values = [float(v) for v in text.split(",")]
+    if len(values) != 3:
+        raise argparse.ArgumentTypeError("expected x,y,z")
+    return values
+
+
+def _squares(text):
+    cols, rows = (int(v) for v in text.lower().split("x"))
+    return cols, rows
+
+
+def _board(args):
+    from scanner.calibration import CharucoBoard
+
+    return CharucoBoard(args.squares, args.square, args.marker, args.dictionary)
+
+
+def _images(inputs):
+    paths = []
+    for item in inputs:
+        p = Path(item)
+        if p.is_dir():
+            paths.extend(sorted(q for q in p.iterdir() if q.suffix.lower() in IMAGE_SUFFIXES))
+        else:
+            paths.append(p)
+    return paths
+
+
+def _store(args):
+    from scanner.calibration import CalibrationStore
+
+    return CalibrationStore(args.store)
+
+
+def _finish(args, calib, report):
+    if args.out:
+        calib.save(args.out)
+        report["out"] = args.out
+    if not args.no_store:
+        report["version"] = _store(args).save(calib, serial=args.serial)
+        report["serial"] = args.serial
+    print(json.dumps(report, indent=2))
+
+
+def board(args):
+    import cv2
+
+    out = Path(args.out)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    cv2.imwrite(str(out), _board(args).image(args.px))
+    print(f"wrote {out}: print it at {args.square * 1000:.0f} mm squares")
+
+
+def intrinsics(args):
+    import time
+
+    from scanner.calibration import calibrate_intrinsics, detect_frames
+
+    board = _board(args)
+    if args.mock:
+        from hal.mocks import charuco_frames
+
+        truth = [[620.0, 0.0, 405.0], [0.0, 615.0, 296.0], [0.0, 0.0, 1.0]]
+        frames, _ = charuco_frames(board, truth, [-0.21, 0.06, 0.001, -0.0008, 0.0], count=args.frames)
+    else:
+        frames = _images(args.frames_in)
+        if not frames:
+            raise SystemExit("no images given")
+    t0 = time.perf_counter()
+    detections = detect_frames(frames, board, workers=args.workers)
+    detect_s = time.perf_counter() - t0
+    calib, report = calibrate_intrinsics(detections, board, min_corners=args.min_corners)
+    report["detect_s"] = detect_s
+    report["camera_matrix"] = calib.camera_matrix.tolist()
+    report["dist_coeffs"] = calib.dist_coeffs.tolist()
+    report["image_size"] = list(calib.image_size)
+    report.pop("frame_rms_px")
+    _finish(args, calib, report)
+
+
+def extrinsics(args):
+    from scanner.calibration import calibrate_extrinsics
+
+    rot_bc = None
+    if args.keep_camera:
+        stored = _store(args).find(args.serial)
+        if stored is None or stored.rot_bc is None:
+            raise SystemExit(f"no stored camera rotation for {args.serial}; run without --keep-camera")
+        rot_bc = stored.rot_bc
+    calib, report = calibrate_extrinsics(args.sessions, rot_bc=rot_bc, t_bc=args.t_bc, origin=args.origin,
+                                         beam=args.beam, max_dt=args.max_dt)
+    report["rot_bc"] = calib.rot_bc.tolist()
+    report["range_origin"] = calib.range_origin.tolist()
+    report["range_beam"] = calib.range_beam.tolist()
+    _finish(args, calib, report)
+
+
+def show(args):
+    store = _store(args)
+    versions = store.versions(args.serial)
+    try:
+        calib = store.load(args.serial, args.version)
+    except FileNotFoundError as e:
+        raise SystemExit(str(e))
+    out = {"serial": args.serial, "versions": versions, "version": calib.version, "path": str(calib.path),
+           "metadata": calib.metadata}
+    for name in ("camera_matrix", "dist_coeffs", "image_size", "rot_bc", "t_bc", "range_origin", "range_beam"):
+        value = getattr(calib, name)
+        if value is not None:
+            out[name] = value.tolist() if hasattr(value, "tolist") else list(value)
+    print(json.dumps(out, indent=2))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Camera and mounting calibration")
+    parser.add_argument("--serial", default=None, help="Device serial to store under (default: this board's)")
+    parser.add_argument("--store", default=None, help="Calibration store directory (default: ~/.cache/scanner)")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    def board_args(p):
+        p.add_argument("--squares", type=_squares, default=(7, 5), help="Board squares, COLSxROWS")
+        p.add_argument("--square", type=float, default=0.04, help="Square side in meters")
+        p.add_argument("--marker", type=float, default=0.03, help="Marker side in meters")
+        p.add_argument("--dictionary", default="DICT_4X4_50")
+
+    def save_args(p):
+        p.add_argument("--out", default=None, help="Also write the result to this .npz")
+        p.add_argument("--no-store", action="store_true", help="Do not save a new version in the store")
+
+    p = sub.add_parser("board", help="Write a printable ChArUco board image")
+    board_args(p)
+    p.add_argument("--out", default="test_outputs/charuco.png")
+    p.add_argument("--px", type=int, default=200, help="Pixels per square")
+
+    p = sub.add_parser("intrinsics", help="Camera matrix and distortion from ChArUco frames")
+    board_args(p)
+    save_args(p)
+    p.add_argument("frames_in", nargs="*", metavar="frames", help="Images, or directories of images")
+    p.add_argument("--workers", type=int, default=None, help="Detection processes (default: all cores)")
+    p.add_argument("--min-corners", type=int, default=8, help="Skip frames with fewer board corners")
+    p.add_argument("--mock", action="store_true", help="Use synthetic frames from a known lens")
+    p.add_argument("--frames", type=int, default=30, help="Synthetic frames with --mock")
+
+    p = sub.add_parser("extrinsics", help="Camera rotation and rangefinder mount from scan logs")
+    save_args(p)
+    p.add_argument("sessions", nargs="+", help=".scanlog files with marker, range and IMU streams")
+    p.add_argument("--keep-camera", action="store_true", help="Keep the stored camera rotation")
+    p.add_argument("--t-bc", type=_vector, default=[0.0, 0.0, 0.0], help="Measured camera position in the body frame")
+    p.add_argument("--origin", type=_vector, default=[0.0, 0.0, 0.0], help="Nominal rangefinder origin")
+    p.add_argument("--beam", type=_vector, default=[1.0, 0.0, 0.0], help="Nominal beam direction")
+    p.add_argument("--max-dt", type=float, default=0.01, help="Seconds between a frame and the ranges matched to it")
+
+    p = sub.add_parser("show", help="Print the stored calibration")
+    p.add_argument("--version", type=int, default=None, help="Version to show (default: latest)")
+    args = parser.parse_args()
+
+    from scanner.calibration import device_serial
+
+    if args.serial is None:
+        args.serial = "mock" if getattr(args, "mock", False) else device_serial()
+
+    {"board": board, "intrinsics": intrinsics, "extrinsics": extrinsics, "show": show}[args.cmd](args)
+
+
+if __name__ == "__main__":
+    main()
@@ -52,10 +52,21 @@ def main():
     parser.add_argument("--output", default=None, help="Output image filename (saved into test_outputs)")
     parser.add_argument("--width", type=int, default=1280, help="Capture width")
     parser.add_argument("--height", type=int, default=720, help="Capture height")
+    parser.add_argument("--mock", action="store_true", help="Save a synthetic frame (PGM) instead of using the camera")
     args = parser.parse_args()
 
     out_path = _make_output_path(args.output)
 
+    if args.mock:
+        import numpy as np
+
+        out_path = out_path.with_suffix(".pgm")
+        ramp = np.linspace(0, 255, args.width).astype(np.uint8)
+        image = np.repeat(ramp[None, :], args.height, axis=0)
+        out_path.write_bytes(f"P5 {args.width} {args.height} 255\n".encode() + image.tobytes())
+        print(f"Saved {out_path}")
+        return
+
     # Try picamera2 first
     try:
         from picamera2 import Picamera2
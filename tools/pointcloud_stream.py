@@ -0,0 +1,122 @@
+"""Stream a growing voxel map to viewers, or watch a stream as a client.
+
+`serve` builds a voxel map from mock range/IMU data (or a scan log) and
+publishes changes to every connected viewer at `--rate` Hz. `client` is
+the Python stand-in for the Godot viewer: it mirrors the map and prints
+update counts, latency and the size of the mirrored map.
+
+Usage:
+  python3 tools/pointcloud_stream.py serve --port 9500 --rate 10
+  python3 tools/pointcloud_stream.py serve --log test_outputs/scan.scanlog --udp
+  python3 tools/pointcloud_stream.py client --port 9500 --duration 10
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+def point_batches(args):
+    import numpy as np
+    from scanner.projection import project
+
+    if args.log:
+        from scanner.scanlog import ScanLogReader
+
+        log = ScanLogReader(args.log)
+        rng = log.read("range")
+        imu = log.read("imu")
+        n = len(rng["t"])
+        step = max(1, int(n / max(1.0, args.duration * args.rate)))
+        for a in range(0, n, step):
+            yield project(rng["distance_m"][a:a + step], rng["t"][a:a + step], imu["quat"], imu["t"])
+        return
+
+    from hal.mocks import MockIMU, MockRangefinder, ScriptedTrajectory
+
+    # Walk a circle while the rangefinder sweeps, on simulated time.
+    traj = ScriptedTrajectory.circle()
+    imu = MockIMU(seed=0, rate=100.0, trajectory=traj, realtime=False)
+    rng = MockRangefinder(seed=0, base=2.0)
+    range_hz = 250.0
+    n = int(range_hz / args.rate)
+    t = 0.0
+    while t < args.duration:
+        imu_samples = [imu.read() for _ in range(int(100.0 / args.rate) + 1)]
+        rt = t + np.arange(n) / range_hz
+        d = np.array([rng.distance()["distance_m"] for _ in range(n)])
+        origins = np.array([traj.pose(x)[0] for x in rt])
+        yield project(d, rt, np.array([s["quat"] for s in imu_samples]),
+                      np.array([s["timestamp"] for s in imu_samples]), origins=origins)
+        t += n / range_hz
+
+
+def serve(args):
+    from scanner.transport import PointCloudServer
+    from scanner.voxel import VoxelMap
+
+    vmap = VoxelMap(voxel_size=args.voxel)
+    server = PointCloudServer(args.host, args.port, udp=args.udp, max_queue=args.max_queue, policy=args.policy,
+                              compress=not args.no_compress).start()
+    print(f"Serving on {server.address[0]}:{server.address[1]} ({'udp' if args.udp else 'tcp'})", file=sys.stderr)
+    try:
+        for points in point_batches(args):
+            vmap.insert(points)
+            server.publish(vmap)
+            time.sleep(1.0 / args.rate)
+        while args.linger:
+            server.publish(vmap)
+            time.sleep(1.0 / args.rate)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(json.dumps({"voxels": len(vmap), "version": vmap.tick, "clients": server.report()}, indent=2))
+        server.stop()
+
+
+def client(args):
+    import numpy as np
+    from scanner.transport import PointCloudClient
+
+    c = PointCloudClient(args.host, args.port, udp=args.udp)
+    deadline = time.monotonic() + args.duration
+    try:
+        while time.monotonic() < deadline:
+            c.receive(timeout=max(0.01, deadline - time.monotonic()))
+    except (KeyboardInterrupt, ConnectionError):
+        pass
+    finally:
+        c.close()
+    lat = np.array(c.latency) * 1e3
+    print(json.dumps({
+        "updates": c.updates,
+        "version": c.version,
+        "voxels": len(c.store),
+        "bytes": c.bytes,
+        "latency_ms": {"p50": float(np.percentile(lat, 50)), "p99": float(np.percentile(lat, 99))} if len(lat) else None,
+    }, indent=2))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Voxel map streaming server and client.")
+    parser.add_argument("mode", choices=("serve", "client"))
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9500)
+    parser.add_argument("--udp", action="store_true")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds of mock data, or to listen for")
+    parser.add_argument("--rate", type=float, default=10.0, help="Publish rate in Hz")
+    parser.add_argument("--voxel", type=float, default=0.02)
+    parser.add_argument("--log", default=None, help="Serve points from this .scanlog instead of mocks")
+    parser.add_argument("--max-queue", type=int, default=8)
+    parser.add_argument("--policy", choices=("coarsen", "drop"), default="coarsen")
+    parser.add_argument("--no-compress", action="store_true")
+    parser.add_argument("--linger", action="store_true", help="Keep serving the final map until Ctrl-C")
+    args = parser.parse_args()
+    serve(args) if args.mode == "serve" else client(args)
+
+
+if __name__ == "__main__":
+    main()
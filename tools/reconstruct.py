@@ -0,0 +1,67 @@
+"""Rebuild a full-resolution voxel map from recorded scan logs.
+
+Splits the sessions into time chunks, projects and voxelizes them on
+`--workers` processes (all cores by default) and merges the partial maps.
+The output is the same for any worker count. Writes the map as the
+`VoxelMap.save` .npz, and with `--store` appends it as a new session of a
+tiled `scanner.mapstore` map, then prints a JSON report. With --calib or
+--serial, ranges are projected through the calibrated rangefinder mount
+(tools/calibrate.py extrinsics) instead of the nominal one.
+
+Usage:
+  python3 tools/reconstruct.py test_outputs/scan.scanlog --out test_outputs/map.npz
+  python3 tools/reconstruct.py a.scanlog b.scanlog --voxel 0.01 --workers 4 --chunk 5
+  python3 tools/reconstruct.py test_outputs/scan.scanlog --store test_outputs/room.scanmap
+  python3 tools/reconstruct.py test_outputs/scan.scanlog --serial 10000000abcdef01
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline parallel voxel map reconstruction.")
+    parser.add_argument("sessions", nargs="+", help="Recorded .scanlog files")
+    parser.add_argument("--out", default=None, help="Write the map to this .npz")
+    parser.add_argument("--voxel", type=float, default=0.02)
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument("--chunk", type=float, default=10.0, help="Seconds of range samples per work item")
+    parser.add_argument("--store", default=None, help="Append the map to this tiled map store")
+    parser.add_argument("--calib", default=None, help="Calibration .npz with the rangefinder mount")
+    parser.add_argument("--serial", default=None, help="Use this device's stored calibration")
+    parser.add_argument("--min-count", type=int, default=1, help="Drop voxels with fewer hits from the output")
+    args = parser.parse_args()
+
+    from scanner.reconstruct import reconstruct
+
+    extrinsics = None
+    if args.calib or args.serial:
+        from scanner.calibration import load_calibration
+
+        calib = load_calibration(args.calib, args.serial)
+        if calib is None:
+            raise SystemExit(f"no stored calibration for {args.serial}; run tools/calibrate.py extrinsics")
+        try:
+            extrinsics = calib.range_extrinsics()
+        except ValueError as e:
+            raise SystemExit(str(e))
+    vmap, report = reconstruct(args.sessions, voxel_size=args.voxel, workers=args.workers, chunk_seconds=args.chunk,
+                               extrinsics=extrinsics)
+    if args.out:
+        vmap.save(args.out, min_count=args.min_count)
+        report["out"] = args.out
+    if args.store:
+        from scanner.mapstore import MapStoreWriter
+
+        snap = vmap.snapshot(min_count=args.min_count)
+        with MapStoreWriter(args.store, session=", ".join(Path(s).name for s in args.sessions)) as store:
+            store.add(snap["centroid"], snap["count"])
+        report["store"] = args.store
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -5,14 +5,26 @@ This script invokes the existing test scripts in the `tools/` folder and
 captures short samples from each device so you can verify wiring and basic
 operation on a Raspberry Pi.
 
+With `--parallel`, all selected tools run at once and their output is
+parsed as it streams in, giving per-sensor rate, jitter, checksum/drop
+counts and time to first sample, plus a JSON summary. `--mock` runs the
+tools against `hal.mocks` sensors, so the harness also works without
+hardware (CI).
+
 Usage examples:
   python3 tools/run_all_tests.py --all --duration 10
   python3 tools/run_all_tests.py --bno --duration 20 --bno-address 0x28
+  python3 tools/run_all_tests.py --all --parallel --duration 10
+  python3 tools/run_all_tests.py --bno --tfluna --parallel --mock --duration 3
 """
 
 import argparse
+import json
+import re
+import signal
 import subprocess
 import sys
+import threading
 from pathlib import Path
 import os
 import shutil
@@ -46,48 +58,230 @@ def run_command(cmd, duration, out_path=None):
         print(text)
 
 
-def run_bno(address, rate, duration, out_dir):
-    script = str(HERE / "bno055_quat_read.py")
-    cmd = [sys.executable, script, "--address", hex(address), "--rate", str(rate)]
-    out_path = out_dir / "bno055_output.txt"
-    run_command(cmd, duration, out_path)
+def _python(system_python):
+    # Camera tools are often installed as system packages (picamera2), so
+    # they can be run with the system Python when requested.
+    return "/usr/bin/python3" if system_python else sys.executable
+
 
+def bno_command(address, rate, out_dir, mock=False):
+    cmd = [sys.executable, str(HERE / "bno055_quat_read.py"), "--address", hex(address), "--rate", str(rate)]
+    if mock:
+        cmd.append("--mock")
+    return "bno055", cmd, out_dir / "bno055_output.txt"
 
-def run_camera(output, width, height, duration, out_dir):
-    script = str(HERE / "camera_test.py")
+
+def camera_command(output, width, height, out_dir, mock=False, system_python=False):
     out_image = out_dir / output
-    # camera tool is often installed as a system package (picamera2). Allow
-    # running it with the system Python when requested.
-    cam_python = sys.executable
-    if hasattr(run_camera, "use_system_python") and run_camera.use_system_python:
-        cam_python = "/usr/bin/python3"
-    cmd = [cam_python, script, "--output", str(out_image), "--width", str(width), "--height", str(height)]
-    # camera_test exits after capture; duration not critical but honored
-    run_command(cmd, duration, None)
-
-
-def run_aruco(marker_length, calib, rate, duration, out_dir):
-    script = str(HERE / "aruco_pose_demo.py")
-    aruco_python = sys.executable
-    if hasattr(run_aruco, "use_system_python") and run_aruco.use_system_python:
-        aruco_python = "/usr/bin/python3"
-    cmd = [aruco_python, script, "--marker-length", str(marker_length), "--rate", str(rate)]
-    if calib:
-        cmd += ["--calib", str(calib)]
-    out_path = out_dir / "aruco_output.txt"
-    run_command(cmd, duration, out_path)
+    cmd = [_python(system_python), str(HERE / "camera_test.py"), "--output", str(out_image), "--width", str(width),
+           "--height", str(height)]
+    if mock:
+        cmd.append("--mock")
+    # camera_test exits after capture; its output is only printed
+    return "camera", cmd, None
 
 
-def run_tfluna(port, baud, duration, out_dir):
-    script = str(HERE / "tfluna_read.py")
-    cmd = [sys.executable, script, "--port", port, "--baud", str(baud)]
-    out_path = out_dir / "tfluna_output.txt"
-    run_command(cmd, duration, out_path)
+def aruco_command(marker_length, calib, rate, out_dir, mock=False, system_python=False):
+    cmd = [_python(system_python), str(HERE / "aruco_pose_demo.py"), "--marker-length", str(marker_length),
+           "--rate", str(rate)]
+    if calib:
+        cmd += ["--calib", str(calib)]
+    if mock:
+        cmd.append("--mock")
+    return "aruco", cmd, out_dir / "aruco_output.txt"
+
+
+def tfluna_command(port, baud, out_dir, mock=False):
+    cmd = [sys.executable, str(HERE / "tfluna_read.py"), "--port", port, "--baud", str(baud)]
+    if mock:
+        cmd.append("--mock")
+    return "tfluna", cmd, out_dir / "tfluna_output.txt"
+
+
+# Sample lines are "<unix time> key=value ..."; the first key tells the
+# sensors apart. Counter lines ("frames=... bad_checksum=...") are summaries
+# the tools print to stderr on exit; stderr shares the pipe with stdout, so
+# a summary can land after a sample line cut short by the interrupt.
+_SAMPLE_KEYS = {"bno055": "qw", "tfluna": "dist_cm", "aruco": "markers"}
+_SAMPLE = re.compile(r"^(\d+(?:\.\d+)?) (\w+)=")
+_COUNTERS = re.compile(r"frames=\d+ .*$")
+_COUNTER = re.compile(r"(\w+)=(\d+)(?=\s|$)")
+
+
+class StreamStats:
+    """Incremental metrics for one sensor tool's output, fed line by line.
+
+    Rates and intervals use the sample timestamps the tool prints, and
+    gaps longer than 1.5 median intervals are counted as missed samples.
+    Repeated stamps are collapsed. The TF-Luna tool stamps each frame by
+    back-dating from its read at the output rate, so frames lost on the
+    wire leave no gap; its losses come from the decoder counters.
+    """
+
+    def __init__(self, name, start=None):
+        self.name = name
+        self.key = _SAMPLE_KEYS.get(name)
+        self.start = time.monotonic() if start is None else start
+        self.samples = 0
+        self.lines = 0
+        self.first_latency = None
+        self.first_stamp = None
+        self.last_stamp = None
+        self.intervals = []
+        self.repeats = 0
+        self.counters = {}
+        self.saved = None
+
+    def feed(self, line, arrival=None):
+        self.lines += 1
+        counters = _COUNTERS.search(line)
+        if counters:
+            self.counters.update((k, int(v)) for k, v in _COUNTER.findall(counters.group(0)))
+            return False
+        m = _SAMPLE.match(line)
+        if m and m.group(2) == self.key:
+            stamp = float(m.group(1))
+            if self.first_latency is None:
+                arrival = time.monotonic() if arrival is None else arrival
+                self.first_latency = arrival - self.start
+                self.first_stamp = stamp
+            elif stamp > self.last_stamp:
+                self.intervals.append(stamp - self.last_stamp)
+            else:
+                self.repeats += 1
+            self.last_stamp = stamp
+            self.samples += 1
+            return True
+        if line.startswith("Saved "):
+            self.saved = line[6:].strip()
+            if self.first_latency is None:
+                arrival = time.monotonic() if arrival is None else arrival
+                self.first_latency = arrival - self.start
+            self.samples += 1
+            return True
+        return False
+
+    def summary(self):
+        out = {
+            "samples": self.samples,
+            "lines": self.lines,
+            "first_sample_s": None if self.first_latency is None else round(self.first_latency, 4),
+            "rate_hz": None,
+            "interval_ms": None,
+            "jitter_ms": None,
+            "missed": None,
+        }
+        if self.saved:
+            out["saved"] = self.saved
+        if self.intervals:
+            iv = sorted(self.intervals)
+            median = iv[len(iv) // 2]
+            span = self.last_stamp - self.first_stamp
+            out["rate_hz"] = round((self.samples - 1) / span, 2) if span > 0 else None
+            dev = sorted(abs(x - median) for x in iv)
+            out["interval_ms"] = _percentiles(iv)
+            out["jitter_ms"] = _percentiles(dev)
+            if not self.repeats:
+                out["missed"] = sum(int(round(x / median)) - 1 for x in iv if x > 1.5 * median)
+        if self.counters:
+            out["checksum_errors"] = self.counters.get("bad_checksum", 0)
+            out["dropped_frames"] = self.counters.get("dropped", 0)
+            out["frames"] = self.counters.get("frames")
+        return out
+
+
+def _percentiles(values):
+    """p50/p90/p99/max in ms of an already sorted list of seconds."""
+    n = len(values)
+    out = {f"p{p}": round(1e3 * values[min(n - 1, int(p / 100.0 * n))], 3) for p in (50, 90, 99)}
+    out["max"] = round(1e3 * values[-1], 3)
+    return out
+
+
+def run_parallel(tasks, duration, summary_path=None):
+    """Run every tool at once, streaming each child's output into StreamStats.
+
+    Output is tee'd to each task's file as it arrives instead of being held
+    in memory. After `duration` the children get SIGINT (so they print their
+    counters), then SIGTERM if they do not exit.
+    """
+    env = dict(os.environ, PYTHONUNBUFFERED="1")
+    running = []
+    start = time.monotonic()
+    for name, cmd, out_path in tasks:
+        print("Starting:", " ".join(cmd))
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, errors="replace",
+                                bufsize=1, env=env)
+        stats = StreamStats(name, start)
+        if out_path:
+            out_path.parent.mkdir(parents=True, exist_ok=True)
+        sink = out_path.open("w") if out_path else None
+        reader = threading.Thread(target=_pump, args=(proc, stats, sink), daemon=True)
+        reader.start()
+        running.append((name, proc, stats, reader, sink, out_path))
+
+    deadline = start + duration
+    try:
+        while time.monotonic() < deadline and any(p.poll() is None for _, p, *_ in running):
+            time.sleep(0.05)
+    except KeyboardInterrupt:
+        print("Interrupted by user")
+    for _, proc, *_ in running:
+        if proc.poll() is None:
+            proc.send_signal(signal.SIGINT)
+    for _, proc, *_ in running:
+        try:
+            proc.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            proc.terminate()
+            proc.wait(timeout=5)
+
+    summary = {"duration_s": round(time.monotonic() - start, 3), "sensors": {}}
+    for name, proc, stats, reader, sink, out_path in running:
+        reader.join(timeout=5)
+        if sink:
+            sink.close()
+        entry = stats.summary()
+        # -SIGINT / 130 are how the tools exit when stopped on schedule.
+        entry["exit_code"] = proc.returncode
+        entry["ok"] = stats.samples > 0 and proc.returncode in (0, 130, -signal.SIGINT)
+        if out_path:
+            entry["output"] = str(out_path)
+        summary["sensors"][name] = entry
+
+    for name, entry in summary["sensors"].items():
+        rate = f"{entry['rate_hz']:.1f} Hz" if entry["rate_hz"] else "-"
+        jitter = entry["jitter_ms"]
+        jitter = f"p50 {jitter['p50']:.1f} / p99 {jitter['p99']:.1f} ms" if jitter else "-"
+        missed = "-" if entry["missed"] is None else entry["missed"]
+        first = f"{entry['first_sample_s']:.2f} s" if entry["first_sample_s"] is not None else "never"
+        extra = ""
+        if "checksum_errors" in entry:
+            extra = f", checksum errors {entry['checksum_errors']}, dropped frames {entry['dropped_frames']}"
+        print(f"{'OK  ' if entry['ok'] else 'FAIL'} {name}: {entry['samples']} samples, {rate}, jitter {jitter}, "
+              f"missed {missed}, first sample {first}{extra}")
+    if summary_path:
+        summary_path.parent.mkdir(parents=True, exist_ok=True)
+        summary_path.write_text(json.dumps(summary, indent=2) + "\n")
+        print(f"Wrote summary to {summary_path}")
+    return summary
+
+
+def _pump(proc, stats, sink):
+    for line in proc.stdout:
+        stats.feed(line, time.monotonic())
+        if sink:
+            sink.write(line)
+        else:
+            print(f"[{stats.name}] {line}", end="")
 
 
 def main():
     parser = argparse.ArgumentParser(description="Run quick tests for attached sensors.")
     parser.add_argument("--all", action="store_true", help="Run all available tests sequentially")
+    parser.add_argument("--parallel", action="store_true", help="Run the selected tests at once and report live metrics")
+    parser.add_argument("--mock", action="store_true", help="Run the tools against hal.mocks sensors")
+    parser.add_argument("--summary", default=None, help="JSON summary path for --parallel (default: OUT_DIR/summary.json)")
 
     parser.add_argument("--duration", type=float, default=10.0, help="Run time per test (seconds)")
 
@@ -119,11 +313,6 @@ def main():
     out_dir = Path(args.out_dir)
     out_dir.mkdir(parents=True, exist_ok=True)
 
-    # If requested, set functions to use system python for camera/aruco
-    if args.use_system_camera:
-        run_camera.use_system_python = True
-        run_aruco.use_system_python = True
-
     if args.auto_detect:
         # Try to detect I2C addresses (requires i2cdetect present)
         i2c_addresses = []
@@ -147,7 +336,8 @@ def main():
         if 0x28 in i2c_addresses or 0x29 in i2c_addresses:
             addr = 0x28 if 0x28 in i2c_addresses else 0x29
             print(f"Detected BNO055 at 0x{addr:02x}, running BNO055 test")
-            run_bno(addr, 10.0, args.duration, out_dir)
+            _, cmd, out_path = bno_command(addr, 10.0, out_dir)
+            run_command(cmd, args.duration, out_path)
         else:
             print("No BNO055 detected on I2C addresses 0x28/0x29")
 
@@ -182,7 +372,8 @@ def main():
                     break
 
         if found_port:
-            run_tfluna(found_port, args.tfluna_baud, args.duration, out_dir)
+            _, cmd, out_path = tfluna_command(found_port, args.tfluna_baud, out_dir)
+            run_command(cmd, args.duration, out_path)
         else:
             print("No serial activity detected on common ports")
 
@@ -190,34 +381,35 @@ def main():
         return
 
     # Determine what to run
+    system = args.use_system_camera
     tasks = []
     if args.all or args.bno:
-        tasks.append((run_bno, (args.bno_address, args.bno_rate, args.duration, out_dir)))
+        tasks.append(bno_command(args.bno_address, args.bno_rate, out_dir, args.mock))
     if args.all or args.camera:
-        tasks.append((run_camera, (args.camera_output, args.width, args.height, args.duration, out_dir)))
+        tasks.append(camera_command(args.camera_output, args.width, args.height, out_dir, args.mock, system))
     if args.all or args.aruco:
-        tasks.append((run_aruco, (args.marker_length, args.calib, args.aruco_rate, args.duration, out_dir)))
+        tasks.append(aruco_command(args.marker_length, args.calib, args.aruco_rate, out_dir, args.mock, system))
     if args.all or args.tfluna:
-        tasks.append((run_tfluna, (args.tfluna_port, args.tfluna_baud, args.duration, out_dir)))
+        tasks.append(tfluna_command(args.tfluna_port, args.tfluna_baud, out_dir, args.mock))
 
     if not tasks:
         print("Nothing selected to run. Use --all or specific --bno/--camera/--aruco/--tfluna flags.")
         raise SystemExit(1)
 
-    for fn, params in tasks:
+    if args.parallel:
+        summary_path = Path(args.summary) if args.summary else out_dir / "summary.json"
+        summary = run_parallel(tasks, args.duration, summary_path)
+        raise SystemExit(0 if all(e["ok"] for e in summary["sensors"].values()) else 1)
+
+    for _, cmd, out_path in tasks:
         try:
-            fn(*params)
+            run_command(cmd, args.duration, out_path)
         except KeyboardInterrupt:
             print("Interrupted by user")
             break
         except Exception as e:
             print(f"Error running test: {e}")
 
-    # If requested, set functions to use system python for camera/aruco
-    if args.use_system_camera:
-        run_camera.use_system_python = True
-        run_aruco.use_system_python = True
-
 
 if __name__ == "__main__":
     main()
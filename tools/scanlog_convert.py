@@ -0,0 +1,90 @@
+"""Convert between tool text/JSONL outputs and the binary scan log format.
+
+Usage:
+  python3 tools/scanlog_convert.py pack test_outputs/bno055_output.txt test_outputs/anchors_*.jsonl -o scan.scanlog
+  python3 tools/scanlog_convert.py unpack scan.scanlog --out-dir exported/
+  python3 tools/scanlog_convert.py info scan.scanlog
+"""
+import argparse
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+def pack(inputs, out_path):
+    from scanner.scanlog import ScanLogWriter, jsonl_to_markers, text_to_records
+
+    batches = []
+    for path in inputs:
+        with open(path) as fh:
+            lines = fh.read().splitlines()
+        if path.endswith(".jsonl"):
+            batches.append(("marker", jsonl_to_markers(lines)))
+        else:
+            batches.extend(text_to_records(lines))
+    with ScanLogWriter(out_path, metadata={"sources": [str(p) for p in inputs]}) as log:
+        for stream, records in batches:
+            # Records from different files may interleave in time; the log
+            # expects each stream in time order.
+            log.append(stream, records[records["t"].argsort(kind="stable")])
+            print(f"{stream}: {len(records)} records")
+    print(f"Wrote {out_path}")
+
+
+def unpack(path, out_dir):
+    from scanner.scanlog import ScanLogReader, imu_to_text, markers_to_jsonl, range_to_text
+
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    log = ScanLogReader(path)
+    outputs = [
+        ("range", "tfluna_output.txt", range_to_text),
+        ("imu", "bno055_output.txt", imu_to_text),
+        ("marker", "anchors.jsonl", markers_to_jsonl),
+    ]
+    for stream, name, fmt in outputs:
+        if stream not in log.streams or not log.count(stream):
+            continue
+        with open(out_dir / name, "w") as fh:
+            for chunk in log.iter_chunks(stream):
+                fh.write("\n".join(fmt(chunk)) + "\n")
+        print(f"Wrote {out_dir / name}")
+
+
+def info(path):
+    from scanner.scanlog import ScanLogReader
+
+    log = ScanLogReader(path)
+    print(f"{path}: {len(log.index)} chunks")
+    for stream in log.streams:
+        rows = log.index[log.index["stream"] == list(log.streams).index(stream)]
+        if len(rows):
+            print(f"  {stream}: {int(rows['count'].sum())} records, t={rows['t_min'].min():.3f}..{rows['t_max'].max():.3f}")
+        else:
+            print(f"  {stream}: 0 records")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scan log conversion")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("pack", help="Text/JSONL tool outputs -> .scanlog")
+    p.add_argument("inputs", nargs="+")
+    p.add_argument("-o", "--out", required=True)
+    p = sub.add_parser("unpack", help=".scanlog -> text/JSONL tool outputs")
+    p.add_argument("path")
+    p.add_argument("--out-dir", default="test_outputs/unpacked")
+    p = sub.add_parser("info", help="Summarize a .scanlog")
+    p.add_argument("path")
+    args = parser.parse_args()
+
+    if args.cmd == "pack":
+        pack(args.inputs, args.out)
+    elif args.cmd == "unpack":
+        unpack(args.path, args.out_dir)
+    else:
+        info(args.path)
+
+
+if __name__ == "__main__":
+    main()
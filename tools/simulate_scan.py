@@ -0,0 +1,65 @@
+"""Write a simulated scan session (TF-Luna, BNO055 and marker streams) to a scan log.
+
+The session comes from `hal.simulator`: a trajectory ray-cast against a
+room file, so ranges, orientation and marker detections all agree with one
+ground truth. The output replays with `hal.replay` and feeds every
+offline tool that reads .scanlog files.
+
+Usage:
+  python3 tools/simulate_scan.py --out test_outputs/sim.scanlog --duration 600
+  python3 tools/simulate_scan.py --room tools/rooms/lab.json --trajectory stepper --out sim.scanlog \
+      --known-out known_anchors.json
+  python3 tools/simulate_scan.py --out mount.scanlog --beam 1,0.02,0.01 --beam-origin 0.03,-0.02,0.04
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+def _vector(text):
+    values = [float(v) for v in text.split(",")]
+    if len(values) != 3:
+        raise argparse.ArgumentTypeError("expected x,y,z")
+    return values
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a simulated scan session.")
+    parser.add_argument("--out", required=True, help="Output .scanlog path")
+    parser.add_argument("--room", default=None, help="Room JSON (default: the built-in lab room)")
+    parser.add_argument("--trajectory", choices=("handheld", "stepper"), default="handheld")
+    parser.add_argument("--duration", type=float, default=60.0, help="Seconds of simulated time")
+    parser.add_argument("--range-rate", type=float, default=250.0)
+    parser.add_argument("--imu-rate", type=float, default=100.0)
+    parser.add_argument("--camera-rate", type=float, default=15.0)
+    parser.add_argument("--dropout", type=float, default=0.002, help="Random TF-Luna dropout probability")
+    parser.add_argument("--yaw-drift", type=float, default=0.0, help="IMU heading drift in rad/s")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--beam", type=_vector, default=[1.0, 0.0, 0.0], help="Beam direction in the body frame")
+    parser.add_argument("--beam-origin", type=_vector, default=[0.0, 0.0, 0.0],
+                        help="Rangefinder position in the body frame (m), for calibration tests")
+    parser.add_argument("--known-out", default=None, help="Also write the anchor positions as known_anchors JSON")
+    args = parser.parse_args()
+
+    from hal.simulator import HandheldTrajectory, Room, ScanSimulator, StepperTrajectory
+
+    room = Room.load(args.room) if args.room else Room.default()
+    trajectory = StepperTrajectory() if args.trajectory == "stepper" else HandheldTrajectory()
+    sim = ScanSimulator(room, trajectory, seed=args.seed, dropout=args.dropout, yaw_drift=args.yaw_drift,
+                        beam=args.beam, beam_origin=args.beam_origin)
+    t0 = time.perf_counter()
+    counts = sim.write(args.out, args.duration, args.range_rate, args.imu_rate, args.camera_rate,
+                       metadata={"trajectory": args.trajectory, "seed": args.seed, "beam": args.beam,
+                                 "beam_origin": args.beam_origin})
+    elapsed = time.perf_counter() - t0
+    if args.known_out:
+        Path(args.known_out).write_text(json.dumps(room.known_anchors(), indent=2) + "\n")
+    print(json.dumps({"out": args.out, "records": counts, "seconds": round(elapsed, 3)}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,41 +1,10 @@
 import argparse
+import json
+import sys
 import time
+from pathlib import Path
 
-import serial
-
-
-FRAME_HEADER = 0x59
-FRAME_LENGTH = 9
-
-
-def read_frame(port):
-    while True:
-        first = port.read(1)
-        if not first:
-            return None
-        if first[0] != FRAME_HEADER:
-            continue
-        second = port.read(1)
-        if not second:
-            return None
-        if second[0] != FRAME_HEADER:
-            continue
-        rest = port.read(FRAME_LENGTH - 2)
-        if len(rest) != FRAME_LENGTH - 2:
-            return None
-        frame = bytes([FRAME_HEADER, FRAME_HEADER]) + rest
-        checksum = sum(frame[0:8]) & 0xFF
-        if checksum != frame[8]:
-            continue
-        return frame
-
-
-def parse_frame(frame):
-    distance_cm = frame[2] + (frame[3] << 8)
-    strength = frame[4] + (frame[5] << 8)
-    temp_raw = frame[6] + (frame[7] << 8)
-    temperature_c = (temp_raw / 8.0) - 256.0
-    return distance_cm, strength, temperature_c
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 
 
 def main():
@@ -43,19 +12,66 @@ def main():
     parser.add_argument("--port", default="/dev/serial0", help="Serial port path")
     parser.add_argument("--baud", type=int, default=115200, help="Serial baud rate")
     parser.add_argument("--timeout", type=float, default=1.0, help="Serial timeout seconds")
+    parser.add_argument("--filter", action="store_true", help="Gate and filter distances (adds filt_cm)")
+    parser.add_argument("--mock", action="store_true", help="Read a simulated 250 Hz TF-Luna instead of the UART")
+    parser.add_argument("--rate", type=float, default=None,
+                        help="Sensor output rate in Hz, to space frame timestamps (default: 100, 250 with --mock)")
     args = parser.parse_args()
 
-    with serial.Serial(args.port, args.baud, timeout=args.timeout) as port:
-        while True:
-            frame = read_frame(port)
-            if frame is None:
-                continue
-            distance_cm, strength, temperature_c = parse_frame(frame)
-            timestamp = time.time()
+    from hal.tfluna import DEFAULT_RATE, TFLunaDecoder, frame_times
+
+    rate = args.rate or (250.0 if args.mock else DEFAULT_RATE)
+
+    chain = None
+    if args.filter:
+        from scanner.filters import FilterChain, HampelFilter, Kalman1D, RangeGate, RollingMedian
+
+        chain = FilterChain(RangeGate(), [RollingMedian(5), HampelFilter(9, 3.0), Kalman1D()])
+
+    decoder = TFLunaDecoder()
+    if args.mock:
+        from hal.mocks import MockTFLunaSerial
+
+        port = MockTFLunaSerial(seed=0, rate=rate, base=1.5, corrupt_every=500, timeout=args.timeout)
+    else:
+        import serial
+
+        port = serial.Serial(args.port, args.baud, timeout=args.timeout)
+    last = None
+    with port:
+        try:
+            for batch in decoder.iter_batches(port):
+                # One stamp per frame: the newest at read time, the rest a frame period apart.
+                stamps = frame_times(len(batch), time.time(), rate, after=last)
+                last = stamps[-1]
+                if chain is None:
+                    lines = [
+                        f"{timestamp:.3f} dist_cm={distance_cm} strength={strength} temp_c={temperature_c:.2f}"
+                        for timestamp, (distance_cm, strength, temperature_c) in zip(stamps.tolist(), batch.tolist())
+                    ]
+                else:
+                    filtered, accepted = chain.process_frames(batch)
+                    lines = [
+                        f"{timestamp:.3f} dist_cm={distance_cm} strength={strength} temp_c={temperature_c:.2f} "
+                        f"filt_cm={filt * 100.0:.1f}"
+                        for timestamp, (distance_cm, strength, temperature_c), filt in zip(
+                            stamps[accepted].tolist(), batch[accepted].tolist(), filtered.tolist()
+                        )
+                    ]
+                if lines:
+                    print("\n".join(lines), flush=True)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            # Finish any sample line the interrupt cut short before the summary.
+            sys.stdout.flush()
             print(
-                f"{timestamp:.3f} dist_cm={distance_cm} strength={strength} temp_c={temperature_c:.2f}",
-                flush=True,
+                f"\nframes={decoder.frames} bad_checksum={decoder.bad_checksum} "
+                f"dropped={decoder.dropped} skipped_bytes={decoder.skipped_bytes}",
+                file=sys.stderr,
             )
+            if chain is not None:
+                print(json.dumps(chain.timings(rate_hz=rate)), file=sys.stderr)
 
 
 if __name__ == "__main__":